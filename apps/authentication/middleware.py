@@ -20,6 +20,8 @@ class AuthMiddleware:
             '/media/',
             '/favicon.ico',
             '/admin/login/',
+            '/api/v1/logs/metrics/',  # A view exige staff ou METRICS_TOKEN
+            '/api/v1/logs/push/',  # Notificações da catraca (DEVICE_PUSH_TOKEN / DEVICE_PUSH_ALLOWED_IPS)
         ]
         
         # Verificar se a rota é pública
@@ -0,0 +1,321 @@
+"""
+Serviço de exportação em streaming (CSV/XLSX) para logs, sessões e funcionários.
+
+Os dados são lidos com values_list + iterator(chunk_size=...), de modo que o uso
+de memória permanece constante mesmo para exportações com milhões de linhas.
+"""
+import csv
+import io
+import logging
+import tempfile
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse, FileResponse
+from apps.core.utils import TimezoneUtils
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+class ExportDataset:
+    """Definição de um conjunto exportável: colunas, consulta e formatação das linhas."""
+
+    def __init__(self, name, title, headers, fields, build_queryset, format_row):
+        self.name = name
+        self.title = title
+        self.headers = headers
+        self.fields = fields
+        self.build_queryset = build_queryset
+        self.format_row = format_row
+
+
+def _format_dt(value):
+    """Formata datetime para o timezone de exibição (vazio se None)."""
+    return TimezoneUtils.format_datetime(value) if value else ''
+
+
+# ---------------------------------------------------------------------------
+# Logs de acesso
+# ---------------------------------------------------------------------------
+
+def _access_logs_queryset(params):
+    from apps.logs.filters import filter_access_logs
+    return filter_access_logs(params).order_by('-device_timestamp')
+
+
+def _access_logs_row(row):
+    device_log_id, user_id, user_name, event_type, event_description, portal_id, device_timestamp, status, session_processed = row
+    return [
+        device_log_id,
+        user_id,
+        user_name,
+        event_type,
+        event_description,
+        portal_id if portal_id is not None else '',
+        _format_dt(device_timestamp),
+        status,
+        'Sim' if session_processed else 'Não',
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Sessões de funcionários
+# ---------------------------------------------------------------------------
+
+def _sessions_queryset(params):
+    from apps.employee_sessions.models import EmployeeSession
+    from apps.logs.filters import parse_date_param, local_day_start
+
+    sessions = EmployeeSession.objects.all()
+
+    state = params.get('state', '')
+    if state:
+        sessions = sessions.filter(state=state)
+
+    user_id = params.get('user_id', '')
+    if user_id:
+        sessions = sessions.filter(employee__device_id=user_id)
+
+    search = params.get('search', '')
+    if search:
+        sessions = sessions.filter(
+            Q(employee__name__icontains=search) |
+            Q(employee__employee_code__icontains=search)
+        )
+
+    date_from = parse_date_param(params.get('date_from', ''))
+    if date_from:
+        sessions = sessions.filter(first_access__gte=local_day_start(date_from))
+
+    date_to = parse_date_param(params.get('date_to', ''))
+    if date_to:
+        sessions = sessions.filter(first_access__lt=local_day_start(date_to + timedelta(days=1)))
+
+    return sessions.order_by('-first_access')
+
+
+def _sessions_row(row):
+    device_id, name, code, state, first_access, block_start, return_time, work, rest = row
+    return [
+        device_id,
+        name,
+        code or '',
+        state,
+        _format_dt(first_access),
+        _format_dt(block_start),
+        _format_dt(return_time),
+        work,
+        rest,
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Funcionários
+# ---------------------------------------------------------------------------
+
+def _employees_queryset(params):
+    from apps.employees.models import Employee, EmployeeGroupMembership
+
+    employees = Employee.objects.all()
+
+    if str(params.get('active_only', '')).lower() in ('1', 'true', 'on', 'yes'):
+        employees = employees.filter(is_active=True)
+
+    search = params.get('search', '')
+    if search:
+        employees = employees.filter(
+            Q(name__icontains=search) |
+            Q(employee_code__icontains=search)
+        )
+
+    # Join na tabela de associações (uma linha por funcionário/grupo/tipo)
+    group = params.get('group', '')
+    if group:
+        employees = employees.filter(
+            group_memberships__group__name=group,
+            group_memberships__kind=EmployeeGroupMembership.KIND_MEMBER,
+        )
+
+    return employees.order_by('name')
+
+
+def _employees_row(row):
+    device_id, name, code, is_active, groups = row
+    return [
+        device_id,
+        name,
+        code or '',
+        'Ativo' if is_active else 'Inativo',
+        ', '.join(groups) if groups else 'Sem grupos',
+    ]
+
+
+class ExportService:
+    """Motor de exportação em streaming compartilhado por views e comandos."""
+
+    def __init__(self):
+        self.chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        self.datasets = {}
+        self.register(ExportDataset(
+            name='access_logs',
+            title='Logs de Acesso',
+            headers=['Log_ID', 'ID_Usuario', 'Nome', 'Evento', 'Descricao', 'Portal',
+                     'Data_Hora', 'Status', 'Processado_Sessao'],
+            fields=['device_log_id', 'user_id', 'user_name', 'event_type', 'event_description',
+                    'portal_id', 'device_timestamp', 'processing_status', 'session_processed'],
+            build_queryset=_access_logs_queryset,
+            format_row=_access_logs_row,
+        ))
+        self.register(ExportDataset(
+            name='sessions',
+            title='Sessoes',
+            headers=['ID_Dispositivo', 'Nome', 'Matricula', 'Estado', 'Primeiro_Acesso',
+                     'Inicio_Bloqueio', 'Retorno', 'Trabalho_Min', 'Interjornada_Min'],
+            fields=['employee__device_id', 'employee__name', 'employee__employee_code', 'state',
+                    'first_access', 'block_start', 'return_time',
+                    'work_duration_minutes', 'rest_duration_minutes'],
+            build_queryset=_sessions_queryset,
+            format_row=_sessions_row,
+        ))
+        self.register(ExportDataset(
+            name='employees',
+            title='Funcionarios',
+            headers=['ID_Dispositivo', 'Nome', 'Matricula', 'Status', 'Grupos'],
+            fields=['device_id', 'name', 'employee_code', 'is_active', 'groups'],
+            build_queryset=_employees_queryset,
+            format_row=_employees_row,
+        ))
+
+    def register(self, dataset: ExportDataset):
+        """Registra um conjunto exportável."""
+        self.datasets[dataset.name] = dataset
+
+    def get_dataset(self, name) -> ExportDataset:
+        """Obtém um conjunto pelo nome."""
+        try:
+            return self.datasets[name]
+        except KeyError:
+            raise ValueError(f"Conjunto de exportação desconhecido: {name}")
+
+    def iter_rows(self, name, params=None):
+        """
+        Itera as linhas formatadas de um conjunto, em memória constante.
+
+        Args:
+            name: nome do conjunto ('access_logs', 'sessions', 'employees')
+            params: dict/QueryDict com filtros
+
+        Yields:
+            list: valores da linha já formatados
+        """
+        params = params or {}
+        dataset = self.get_dataset(name)
+        queryset = dataset.build_queryset(params).values_list(*dataset.fields)
+
+        for row in queryset.iterator(chunk_size=self.chunk_size):
+            yield dataset.format_row(row)
+
+    def iter_csv(self, name, params=None):
+        """Gera o CSV em blocos de texto (um bloco por chunk lido do banco)."""
+        dataset = self.get_dataset(name)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(dataset.headers)
+
+        rows = self.iter_rows(name, params)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if chunk:
+                writer.writerows(chunk)
+            data = buffer.getvalue()
+            if data:
+                yield data
+                buffer.seek(0)
+                buffer.truncate(0)
+            if not chunk:
+                break
+
+    def write_csv(self, name, stream, params=None) -> int:
+        """Escreve o CSV num arquivo texto. Retorna o número de linhas de dados."""
+        dataset = self.get_dataset(name)
+        writer = csv.writer(stream)
+        writer.writerow(dataset.headers)
+        count = 0
+        for row in self.iter_rows(name, params):
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def write_xlsx(self, name, target, params=None) -> int:
+        """
+        Escreve XLSX com openpyxl em modo write-only (memória constante).
+
+        Args:
+            target: caminho ou arquivo binário de destino
+
+        Returns:
+            int: número de linhas de dados
+        """
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise RuntimeError("openpyxl não está instalado - exportação XLSX indisponível")
+
+        dataset = self.get_dataset(name)
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=dataset.title[:31])
+        sheet.append(dataset.headers)
+        count = 0
+        for row in self.iter_rows(name, params):
+            sheet.append(row)
+            count += 1
+        workbook.save(target)
+        return count
+
+    def export_to_file(self, name, path, fmt='csv', params=None) -> int:
+        """Exporta um conjunto para arquivo. Retorna o número de linhas."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação inválido: {fmt}")
+        if fmt == 'xlsx':
+            return self.write_xlsx(name, path, params)
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            return self.write_csv(name, stream, params)
+
+    def build_response(self, name, fmt='csv', params=None):
+        """
+        Monta a resposta HTTP de exportação.
+
+        CSV é enviado via StreamingHttpResponse; XLSX é gerado em arquivo
+        temporário (o formato zip exige o arquivo completo) e enviado por FileResponse.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação inválido: {fmt}")
+        self.get_dataset(name)
+
+        timestamp = TimezoneUtils.get_display_now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{name}_{timestamp}.{fmt}"
+
+        if fmt == 'xlsx':
+            tmp = tempfile.TemporaryFile()
+            self.write_xlsx(name, tmp, params)
+            tmp.seek(0)
+            return FileResponse(
+                tmp,
+                as_attachment=True,
+                filename=filename,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+
+        response = StreamingHttpResponse(
+            self.iter_csv(name, params),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+# Instância global do serviço
+export_service = ExportService()
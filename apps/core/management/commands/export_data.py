@@ -0,0 +1,66 @@
+"""
+Comando Django para exportar logs, sessões ou funcionários em CSV/XLSX.
+"""
+import os
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.export_service import export_service, EXPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Exporta logs de acesso, sessões ou funcionários em streaming (CSV/XLSX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dataset',
+            type=str,
+            choices=sorted(export_service.datasets.keys()),
+            help='Conjunto a exportar',
+        )
+        parser.add_argument(
+            '--format',
+            type=str,
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='Formato de saída (padrão: csv)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Arquivo de saída (padrão: <dataset>_export.<formato>)',
+        )
+        parser.add_argument(
+            '--filter',
+            action='append',
+            default=[],
+            metavar='CHAVE=VALOR',
+            help='Filtro no formato chave=valor (ex: date_from=2024-01-01, event_type=7, state=blocked)',
+        )
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        fmt = options['format']
+        output_path = options['output'] or f"{dataset}_export.{fmt}"
+        
+        params = {}
+        for item in options['filter']:
+            if '=' not in item:
+                raise CommandError(f"Filtro inválido '{item}' - use chave=valor")
+            key, value = item.split('=', 1)
+            params[key.strip()] = value.strip()
+        
+        self.stdout.write(f"📊 Exportando {dataset} ({fmt.upper()})...")
+        if params:
+            self.stdout.write(f"🔍 Filtros: {params}")
+        
+        try:
+            total = export_service.export_to_file(dataset, output_path, fmt, params)
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Exportação concluída!\n"
+                f"📁 Arquivo: {os.path.abspath(output_path)}\n"
+                f"📊 {total} registros exportados"
+            )
+        )
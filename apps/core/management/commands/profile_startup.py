@@ -0,0 +1,94 @@
+"""
+Comando para medir o custo de inicialização por app (imports, queries e rede).
+"""
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.startup_profile import REPORT_MARKER
+
+
+class Command(BaseCommand):
+    help = 'Mede tempo de import, queries e conexões de rede por app num processo limpo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Quantidade de módulos mais lentos exibidos (padrão: 10)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Exibe o relatório completo em JSON',
+        )
+
+    def handle(self, *args, **options):
+        # O perfil roda num subprocesso para medir um cold start real,
+        # sem os módulos já carregados por este comando
+        result = subprocess.run(
+            [sys.executable, '-m', 'apps.core.startup_profile'],
+            cwd=str(settings.BASE_DIR),
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        report_line = next(
+            (line for line in result.stdout.splitlines() if line.startswith(REPORT_MARKER)), None
+        )
+        if result.returncode != 0 or report_line is None:
+            raise CommandError(f'Falha ao executar o perfil de inicialização:\n{result.stderr[-2000:]}')
+
+        report = json.loads(report_line[len(REPORT_MARKER):])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS('⏱️ PERFIL DE INICIALIZAÇÃO'))
+        self.stdout.write(f"   🚀 django.setup(): {report['setup_ms']} ms")
+        self.stdout.write(f"   📦 Demais módulos (services, tasks, views...): {report['on_demand_ms']} ms")
+        self.stdout.write(f"   🗄️ Queries: {report['total_queries']}")
+        self.stdout.write(f"   🌐 Conexões de rede: {report['total_connections']}")
+
+        self.stdout.write('\n📊 POR APP:')
+        self.stdout.write(f"   {'App':<28}{'Módulos':>8}{'Import ms':>12}{'ready ms':>10}{'Queries':>9}{'Rede':>6}")
+        for app, entry in sorted(report['apps'].items(), key=lambda item: item[1]['ms'], reverse=True):
+            line = (
+                f"   {app:<28}{entry['modules']:>8}{entry['ms']:>12}{entry['ready_ms']:>10}"
+                f"{entry['queries']:>9}{entry['connections']:>6}"
+            )
+            if entry['queries'] or entry['connections']:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+
+        self.stdout.write(f"\n🐢 {options['top']} MÓDULOS MAIS LENTOS:")
+        for module in report['modules'][:options['top']]:
+            extras = ''
+            if module['queries'] or module['connections']:
+                extras = f" ⚠️ {module['queries']} queries, {module['connections']} conexões"
+            self.stdout.write(f"   {module['ms']:>8} ms  {module['name']} ({module['phase']}){extras}")
+
+        side_effects = [m for m in report['modules'] if m['queries'] or m['connections']]
+        if side_effects:
+            self.stdout.write(self.style.WARNING('\n⚠️ MÓDULOS COM I/O NA INICIALIZAÇÃO:'))
+            for module in side_effects:
+                self.stdout.write(
+                    f"   {module['name']}: {module['queries']} queries, {module['connections']} conexões"
+                )
+        else:
+            self.stdout.write(self.style.SUCCESS('\n✅ Nenhuma query ou conexão de rede durante os imports'))
+
+        services = report.get('services', {})
+        initialized = [name for name, ready in services.items() if ready]
+        self.stdout.write(
+            f"\n🧩 Serviços preguiçosos inicializados durante os imports: {len(initialized)}/{len(services)}"
+        )
+        for name in initialized:
+            self.stdout.write(self.style.WARNING(f'   ⚠️ {name}'))
+
+        for module_name, error in report['failures'].items():
+            self.stdout.write(self.style.ERROR(f'   ❌ {module_name}: {error}'))
@@ -0,0 +1,141 @@
+"""
+Comando para executar os micro-benchmarks do caminho crítico com orçamento de queries.
+"""
+import json
+import logging
+import os
+import platform
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.microbenchmarks import compare, run_suite
+from apps.core.utils import TimezoneUtils
+from apps.logs.benchmark import isolated_database
+
+DEFAULT_RESULTS_FILE = os.path.join('benchmarks', 'microbenchmarks.json')
+
+
+class Command(BaseCommand):
+    help = 'Mede tempo e queries das funções do caminho crítico (banco de teste descartável)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help='Rodadas medidas por benchmark (padrão: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Rodadas de aquecimento (padrão: 2)')
+        parser.add_argument(
+            '--only',
+            action='append',
+            help='Executa apenas benchmarks cujo nome contém o texto (pode repetir)',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            action='append',
+            help='Executa apenas estes tamanhos de cenário (pode repetir, ex: --size 100)',
+        )
+        parser.add_argument(
+            '--save',
+            nargs='?',
+            const=DEFAULT_RESULTS_FILE,
+            help=f'Salva os resultados em JSON (padrão: {DEFAULT_RESULTS_FILE})',
+        )
+        parser.add_argument(
+            '--compare',
+            nargs='?',
+            const=DEFAULT_RESULTS_FILE,
+            help=f'Compara com resultados salvos (padrão: {DEFAULT_RESULTS_FILE})',
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=0.25,
+            help='Aumento máximo do tempo mediano aceito na comparação (padrão: 0.25 = 25%%)',
+        )
+        parser.add_argument('--json', action='store_true', help='Saída em JSON')
+
+    def _path(self, path):
+        return path if os.path.isabs(path) else os.path.join(str(settings.BASE_DIR), path)
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            compare_path = self._path(options['compare'])
+            try:
+                with open(compare_path, encoding='utf-8') as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Não foi possível ler {compare_path}: {e}')
+
+        if not options['json']:
+            self.stdout.write('⏱️ Executando micro-benchmarks (banco de teste descartável)...')
+
+        # Os logs dos serviços (vários por operação) distorcem a medição e a saída
+        if options['verbosity'] < 2:
+            logging.disable(logging.WARNING)
+        try:
+            with isolated_database():
+                results = run_suite(
+                    rounds=options['rounds'], warmup=options['warmup'],
+                    only=options['only'], sizes=options['size'],
+                )
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if not results:
+            raise CommandError('Nenhum benchmark selecionado')
+
+        regressions = compare(results, baseline, options['max_regression']) if baseline else []
+        over_budget = [key for key, result in results.items() if result['over_budget']]
+
+        if options['save']:
+            self.save(self._path(options['save']), results, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(
+                {'results': results, 'regressions': regressions, 'over_budget': over_budget}, indent=2,
+            ))
+        else:
+            self.print_results(results, regressions)
+
+        if over_budget or regressions:
+            raise CommandError(
+                f'{len(over_budget)} benchmark(s) acima do orçamento de queries, '
+                f'{len(regressions)} regressão(ões) em relação à base'
+            )
+
+    def save(self, path, results, options):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': TimezoneUtils.get_utc_now().isoformat(),
+                'python': platform.python_version(),
+                'machine': platform.node(),
+                'rounds': options['rounds'],
+                'results': results,
+            }, f, indent=2)
+        if not options['json']:
+            self.stdout.write(f'💾 Resultados salvos em {path}')
+
+    def print_results(self, results, regressions):
+        self.stdout.write(f"\n   {'Benchmark':<40}{'Mediana':>12}{'Mín':>12}{'Máx':>12}{'Queries':>10}")
+        for key, result in results.items():
+            line = (
+                f"   {key:<40}{result['median'] * 1000:>10.3f}ms{result['min'] * 1000:>10.3f}ms"
+                f"{result['max'] * 1000:>10.3f}ms{result['queries']:>5}/{result['query_budget']:<4}"
+            )
+            if result['over_budget']:
+                line = self.style.ERROR(line + ' ❌ orçamento de queries')
+            self.stdout.write(line)
+
+        if regressions:
+            self.stdout.write(self.style.ERROR('\n❌ REGRESSÕES:'))
+            for regression in regressions:
+                details = []
+                if regression['slower']:
+                    details.append(
+                        f"{regression['baseline_median'] * 1000:.3f}ms → {regression['median'] * 1000:.3f}ms "
+                        f"({regression['ratio']:.2f}x)"
+                    )
+                if regression['more_queries']:
+                    details.append(f"queries {regression['baseline_queries']} → {regression['queries']}")
+                self.stdout.write(f"   {regression['key']}: {'; '.join(details)}")
+        elif all(not result['over_budget'] for result in results.values()):
+            self.stdout.write(self.style.SUCCESS('\n✅ Todos os benchmarks dentro do orçamento'))
@@ -0,0 +1,276 @@
+"""
+Métricas em memória (contadores, gauges e histogramas).
+
+Registro leve, sem dependências externas, para instrumentar o pipeline de
+logs. Cada métrica guarda seus valores por combinação de labels; as operações
+custam um lock e algumas somas, então podem ficar no caminho quente.
+
+    fetch_seconds = metrics.histogram('device_fetch_seconds', 'Latência da busca', ['operation'])
+    with fetch_seconds.time(operation='access_logs'):
+        ...
+
+O estado é por processo: `snapshot()` gera um dicionário serializável em JSON,
+`merge()` combina snapshots de vários processos e `render()` gera o formato de
+texto do Prometheus.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Metric:
+    """Base das métricas: valores indexados pela tupla de labels."""
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            samples = [[list(key), self._copy(value)] for key, value in self._values.items()]
+        return {
+            'type': self.kind,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'samples': samples,
+        }
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valor instantâneo."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_max(self, value: float, **labels):
+        """Atualiza apenas se o valor for maior (ex: maior ID já visto)."""
+        key = self._key(labels)
+        with self._lock:
+            if value > self._values.get(key, float('-inf')):
+                self._values[key] = value
+
+    def value(self, **labels) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos (contagens não cumulativas internamente)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            data['counts'][index] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict:
+        data = super().snapshot()
+        data['buckets'] = list(self.buckets)
+        return data
+
+    @staticmethod
+    def _copy(value):
+        return {'counts': list(value['counts']), 'sum': value['sum'], 'count': value['count']}
+
+
+class MetricsRegistry:
+    """Registro das métricas do processo."""
+
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        full_name = f'{self.prefix}{name}'
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrica {full_name} já registrada como {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def reset(self):
+        """Zera os valores (mantém as métricas registradas)."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+    # ------------------------------------------------------------------
+    # Combinação e exportação
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def merge(snapshots: Iterable[Dict[str, Dict]]) -> Dict[str, Dict]:
+        """
+        Combina snapshots de vários processos.
+
+        Contadores e histogramas são somados; gauges ficam com o maior valor
+        (os gauges do pipeline são IDs e posições, onde o maior é o atual).
+        """
+        merged: Dict[str, Dict] = {}
+        for snapshot in snapshots:
+            for name, data in snapshot.items():
+                target = merged.get(name)
+                if target is None:
+                    target = merged[name] = {
+                        key: value for key, value in data.items() if key != 'samples'
+                    }
+                    target['values'] = {}
+                elif target['type'] != data['type']:
+                    continue
+                for labels, value in data['samples']:
+                    key = tuple(labels)
+                    current = target['values'].get(key)
+                    if current is None:
+                        target['values'][key] = Histogram._copy(value) if data['type'] == 'histogram' else value
+                    elif data['type'] == 'counter':
+                        target['values'][key] = current + value
+                    elif data['type'] == 'gauge':
+                        target['values'][key] = max(current, value)
+                    elif len(current['counts']) == len(value['counts']):
+                        current['counts'] = [a + b for a, b in zip(current['counts'], value['counts'])]
+                        current['sum'] += value['sum']
+                        current['count'] += value['count']
+
+        for data in merged.values():
+            data['samples'] = [[list(key), value] for key, value in data.pop('values').items()]
+        return merged
+
+    @staticmethod
+    def _format_labels(labelnames, labels, extra=None) -> str:
+        pairs = list(zip(labelnames, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        escaped = (
+            (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in pairs
+        )
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+    @staticmethod
+    def _format_value(value) -> str:
+        if isinstance(value, float):
+            if math.isinf(value):
+                return '+Inf' if value > 0 else '-Inf'
+            return repr(value)
+        return str(value)
+
+    @classmethod
+    def render(cls, snapshot: Dict[str, Dict]) -> str:
+        """Gera o formato de texto do Prometheus (versão 0.0.4)."""
+        lines: List[str] = []
+        for name, data in sorted(snapshot.items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            labelnames = data['labelnames']
+            for labels, value in data['samples']:
+                if data['type'] != 'histogram':
+                    lines.append(f'{name}{cls._format_labels(labelnames, labels)} {cls._format_value(value)}')
+                    continue
+                cumulative = 0
+                bounds = [cls._format_value(float(b)) for b in data['buckets']] + ['+Inf']
+                for bound, count in zip(bounds, value['counts']):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{cls._format_labels(labelnames, labels, ('le', bound))} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{cls._format_labels(labelnames, labels)} {cls._format_value(value['sum'])}")
+                lines.append(f"{name}_count{cls._format_labels(labelnames, labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def quantile(buckets: Sequence[float], value: Dict, q: float) -> Optional[float]:
+        """Estima um quantil de um histograma por interpolação linear nos buckets."""
+        total = value['count']
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(list(buckets) + [None], value['counts']):
+            if count and cumulative + count >= rank:
+                if bound is None:
+                    return lower
+                return lower + (bound - lower) * ((rank - cumulative) / count)
+            cumulative += count
+            if bound is not None:
+                lower = bound
+        return lower
+
+
+# Registro global do processo
+metrics = MetricsRegistry(prefix='interjornada_')
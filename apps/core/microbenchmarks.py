@@ -0,0 +1,418 @@
+"""
+Micro-benchmarks das funções do caminho crítico.
+
+Cada benchmark mede o tempo de uma operação (várias rodadas, com aquecimento)
+e conta as queries executadas, comparando com um orçamento fixo: um N+1 novo
+faz a contagem crescer com o tamanho do cenário e estoura o orçamento.
+
+Executado pelo comando `manage.py run_microbenchmarks`, num banco de teste
+descartável (SQLite, sem catraca). Os resultados podem ser salvos em JSON e
+comparados com uma execução anterior para detectar regressões antes do deploy.
+"""
+import statistics
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.core.utils import TimezoneUtils
+
+SESSION_SIZES = (10, 100, 1000)
+
+
+def _reset_data():
+    """Remove os dados criados por benchmarks anteriores."""
+    from apps.employee_sessions.models import EmployeeSession
+    from apps.employees.models import Employee
+    from apps.logs.models import AccessLog
+
+    EmployeeSession.objects.all().delete()
+    AccessLog.objects.all().delete()
+    Employee.objects.all().delete()
+
+
+def _groups():
+    from apps.employees.models import EmployeeGroup
+
+    default_group, _ = EmployeeGroup.objects.get_or_create(name='Funcionários', defaults={'device_group_id': 1})
+    blacklist_group, _ = EmployeeGroup.objects.update_or_create(
+        name='BLACKLIST_INTERJORNADA',
+        defaults={'device_group_id': 1000, 'is_blacklist': True, 'is_active': True},
+    )
+    return default_group, blacklist_group
+
+
+def _seed_sessions(size, state='active', in_blacklist=False, start=1):
+    """Cria `size` funcionários (device_id a partir de `start`), cada um com uma sessão no estado informado."""
+    from apps.employee_sessions.models import EmployeeSession
+    from apps.employees.models import Employee
+
+    default_group, blacklist_group = _groups()
+    employees = Employee.objects.bulk_create([
+        Employee(
+            device_id=device_id, name=f'Funcionário {device_id}',
+            group=blacklist_group if in_blacklist else default_group,
+            original_group=default_group if in_blacklist else None,
+        )
+        for device_id in range(start, start + size)
+    ])
+
+    now = TimezoneUtils.get_utc_now()
+    first_access = now - timedelta(hours=1)
+    if state == 'blocked':
+        first_access = now - timedelta(hours=9)
+    EmployeeSession.objects.bulk_create([
+        EmployeeSession(
+            employee=employee, state=state, first_access=first_access, last_access=first_access,
+            block_start=now if state == 'blocked' else None,
+            return_time=now + timedelta(hours=11) if state == 'blocked' else None,
+            work_duration_minutes=8 * 60, rest_duration_minutes=11 * 60,
+        )
+        for employee in employees
+    ])
+
+
+class MicroBenchmark:
+    """
+    Um benchmark: `prepare` roda uma vez por tamanho, `setup` antes de cada
+    rodada (fora da medição) e `run` é a operação medida.
+    """
+
+    name = ''
+    description = ''
+    sizes: Iterable[Optional[int]] = (None,)
+    # Máximo de queries por rodada de `run`
+    query_budget = 0
+
+    def prepare(self, size):
+        _reset_data()
+
+    def setup(self):
+        return None
+
+    def run(self, state):
+        raise NotImplementedError
+
+
+class MapEventBenchmark(MicroBenchmark):
+    name = 'map_to_interjornada_event'
+    description = 'Mapeamento de eventos da catraca (códigos e textos) para eventos de interjornada'
+    query_budget = 0
+
+    INPUTS = [
+        (7, 1), (7, 2), (6, 1), (13, 1), (3, 1), (8, 1),
+        ('Acesso autorizado', 1), ('Acesso não autorizado', 1), ('Entrada reconhecida', 1),
+        ('Saída Portal 2', 2), ('Desistência', 1), ('Não identificado', 1),
+    ] * 100
+
+    def prepare(self, size):
+        from apps.logs.services import log_monitor_service
+
+        self.service = log_monitor_service
+
+    def run(self, state):
+        for event, portal_id in self.INPUTS:
+            self.service.map_to_interjornada_event(event, portal_id)
+
+
+class ProcessAccessLogBenchmark(MicroBenchmark):
+    name = 'process_access_log'
+    description = 'Log de entrada autorizada (evento 7, portal 1) até a sessão criada'
+    query_budget = 10
+
+    def prepare(self, size):
+        from apps.employees.models import Employee
+        from apps.logs.services import log_monitor_service
+
+        _reset_data()
+        default_group, _ = _groups()
+        self.employee = Employee.objects.create(device_id=1, name='Funcionário 1', group=default_group)
+        self.service = log_monitor_service
+        self.next_log_id = 1
+
+    def setup(self):
+        from apps.logs.models import AccessLog
+
+        self.employee.sessions.all().delete()
+        now = TimezoneUtils.get_utc_now()
+        log = AccessLog.objects.create(
+            device_log_id=self.next_log_id, user_id=self.employee.device_id, user_name=self.employee.name,
+            event_type=7, event_description='Acesso autorizado', portal_id=1,
+            device_timestamp=now, created_at=now, updated_at=now,
+        )
+        self.next_log_id += 1
+        return log
+
+    def run(self, state):
+        self.service.process_access_log(state)
+
+
+class ProcessAccessEventEntryBenchmark(MicroBenchmark):
+    name = 'process_access_event.entry'
+    description = 'InterjornadaService.process_access_event para entrada sem sessão (cria a sessão)'
+    query_budget = 4
+
+    def prepare(self, size):
+        from apps.employees.models import Employee
+        from apps.interjornada.services import InterjornadaService
+
+        _reset_data()
+        default_group, _ = _groups()
+        self.employee = Employee.objects.create(device_id=1, name='Funcionário 1', group=default_group)
+        self.service = InterjornadaService()
+
+    def setup(self):
+        self.employee.sessions.all().delete()
+
+    def run(self, state):
+        self.service.process_access_event(
+            employee=self.employee, event_type='pending_validation',
+            timestamp=TimezoneUtils.get_utc_now(), portal_id=1,
+        )
+
+
+class ProcessAccessEventExitBenchmark(MicroBenchmark):
+    name = 'process_access_event.exit'
+    description = 'InterjornadaService.process_access_event para saída com jornada cumprida (bloqueia)'
+    query_budget = 5
+
+    def prepare(self, size):
+        from apps.employees.models import Employee
+        from apps.interjornada.services import InterjornadaService
+
+        _reset_data()
+        _seed_sessions(1)
+        self.employee = Employee.objects.get()
+        self.service = InterjornadaService()
+
+    def setup(self):
+        self.employee.sessions.update(
+            state='active', block_start=None, return_time=None,
+            first_access=TimezoneUtils.get_utc_now() - timedelta(hours=9),
+        )
+
+    def run(self, state):
+        self.service.process_access_event(
+            employee=self.employee, event_type=2, timestamp=TimezoneUtils.get_utc_now(), portal_id=2,
+        )
+
+
+class EnforceSessionTimeoutsBenchmark(MicroBenchmark):
+    name = 'enforce_session_timeouts'
+    description = 'Regras de tempo do monitoramento com N sessões abertas dentro da jornada'
+    sizes = SESSION_SIZES
+    # Inclui a consulta das durações distintas (cortes de tempo filtrados em SQL)
+    query_budget = 5
+
+    def prepare(self, size):
+        from apps.logs.services import log_monitor_service
+
+        _reset_data()
+        _seed_sessions(size)
+        self.service = log_monitor_service
+
+    def run(self, state):
+        self.service.enforce_session_timeouts()
+
+
+class ReplayBenchmark(MicroBenchmark):
+    name = 'replay_sessions'
+    description = 'Replay em memória de 10 mil logs (entradas, saídas e reentradas de 100 funcionários)'
+    query_budget = 0
+
+    def prepare(self, size):
+        from apps.employees.models import Employee
+
+        _reset_data()
+        default_group, _ = _groups()
+        Employee.objects.bulk_create([
+            Employee(device_id=device_id, name=f'Funcionário {device_id}', group=default_group)
+            for device_id in range(1, 101)
+        ])
+        start = TimezoneUtils.get_utc_now() - timedelta(days=5)
+        # Evento 7 a cada 12 minutos por funcionário: portal 2 a cada 5 passagens
+        self.rows = [
+            (index, 1, index, index % 100 + 1, 7, None, 2 if index % 500 < 100 else 1,
+             start + timedelta(seconds=7.2 * index))
+            for index in range(10000)
+        ]
+
+    def setup(self):
+        from apps.logs.replay import ReplayEngine
+
+        # Funcionários e políticas carregados fora da medição
+        return ReplayEngine()
+
+    def run(self, state):
+        state.run(self.rows).finish()
+
+
+class SyncGroupsBenchmark(MicroBenchmark):
+    name = 'sync_groups_with_system_state'
+    description = 'Conciliação blacklist × sessões bloqueadas com N funcionários já consistentes'
+    sizes = SESSION_SIZES
+    query_budget = 3
+
+    def prepare(self, size):
+        from apps.employees.group_service import group_service
+
+        _reset_data()
+        _seed_sessions(size, state='blocked', in_blacklist=True)
+        _, group_service.blacklist_group = _groups()
+        self.service = group_service
+
+    def run(self, state):
+        corrected = self.service.sync_groups_with_system_state()
+        if corrected:
+            raise RuntimeError(f'{corrected} correções inesperadas (cenário deveria estar consistente)')
+
+
+class SessionViewBenchmark(MicroBenchmark):
+    """Views JSON de sessões chamadas diretamente, com N sessões abertas."""
+
+    sizes = SESSION_SIZES
+    view_name = ''
+
+    def prepare(self, size):
+        from django.contrib.auth.models import User
+        from django.test import RequestFactory
+        from apps.employee_sessions import views
+
+        _reset_data()
+        _seed_sessions(size // 2)
+        _seed_sessions(size - size // 2, state='blocked', in_blacklist=True, start=size // 2 + 1)
+
+        self.user, _ = User.objects.get_or_create(
+            username='microbenchmark', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        self.factory = RequestFactory()
+        self.view = getattr(views, self.view_name)
+
+    def setup(self):
+        request = self.factory.get('/')
+        request.user = self.user
+        return request
+
+    def run(self, state):
+        response = self.view(state)
+        if response.status_code != 200:
+            raise RuntimeError(f'{self.view_name} respondeu {response.status_code}')
+
+
+class SessoesPublicasViewBenchmark(SessionViewBenchmark):
+    name = 'api_sessoes_publicas'
+    description = 'JSON de sessões abertas (metade ativas, metade bloqueadas)'
+    view_name = 'api_sessoes_publicas'
+    query_budget = 1
+
+
+class SessoesAtivasViewBenchmark(SessionViewBenchmark):
+    name = 'api_sessoes_ativas'
+    description = 'JSON de sessões abertas do admin (metade ativas, metade bloqueadas)'
+    view_name = 'api_sessoes_ativas'
+    query_budget = 1
+
+
+class SessionCountsViewBenchmark(SessionViewBenchmark):
+    name = 'api_session_counts'
+    description = 'Contadores de sessões ativas e bloqueadas'
+    view_name = 'api_session_counts'
+    query_budget = 2
+
+
+BENCHMARKS = [
+    MapEventBenchmark,
+    ProcessAccessLogBenchmark,
+    ProcessAccessEventEntryBenchmark,
+    ProcessAccessEventExitBenchmark,
+    EnforceSessionTimeoutsBenchmark,
+    ReplayBenchmark,
+    SyncGroupsBenchmark,
+    SessoesPublicasViewBenchmark,
+    SessoesAtivasViewBenchmark,
+    SessionCountsViewBenchmark,
+]
+
+
+def case_key(name: str, size: Optional[int]) -> str:
+    return name if size is None else f'{name}[{size}]'
+
+
+def measure(benchmark: MicroBenchmark, size, rounds: int, warmup: int) -> Dict:
+    """Executa um benchmark num tamanho e retorna tempos (segundos) e queries."""
+    benchmark.prepare(size)
+
+    timings: List[float] = []
+    queries: List[int] = []
+    for iteration in range(warmup + rounds):
+        state = benchmark.setup()
+        # O log de queries da conexão é limitado; cheio, a captura viria vazia
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            benchmark.run(state)
+            elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured.captured_queries))
+
+    max_queries = max(queries)
+    median = statistics.median(timings)
+    return {
+        'name': benchmark.name,
+        'size': size,
+        'description': benchmark.description,
+        'rounds': rounds,
+        'min': min(timings),
+        'median': median,
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+        'stddev': statistics.pstdev(timings),
+        'ops_per_second': 1 / median if median else None,
+        'queries': max_queries,
+        'query_budget': benchmark.query_budget,
+        'over_budget': max_queries > benchmark.query_budget,
+    }
+
+
+def run_suite(rounds: int = 20, warmup: int = 2, only: Optional[List[str]] = None,
+              sizes: Optional[List[int]] = None) -> Dict[str, Dict]:
+    """Executa os benchmarks (todos ou os filtrados por nome) no banco atual."""
+    results = {}
+    for benchmark_class in BENCHMARKS:
+        benchmark = benchmark_class()
+        if only and not any(name in benchmark.name for name in only):
+            continue
+        for size in benchmark.sizes:
+            if sizes and size is not None and size not in sizes:
+                continue
+            results[case_key(benchmark.name, size)] = measure(benchmark, size, rounds, warmup)
+    _reset_data()
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], max_regression: float) -> List[Dict]:
+    """
+    Compara com uma execução anterior: tempo mediano acima de
+    (1 + max_regression) × base ou mais queries que a base.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        ratio = current['median'] / previous['median'] if previous['median'] else None
+        slower = ratio is not None and ratio > 1 + max_regression
+        more_queries = current['queries'] > previous['queries']
+        if slower or more_queries:
+            regressions.append({
+                'key': key,
+                'ratio': ratio,
+                'median': current['median'],
+                'baseline_median': previous['median'],
+                'queries': current['queries'],
+                'baseline_queries': previous['queries'],
+                'slower': slower,
+                'more_queries': more_queries,
+            })
+    return regressions
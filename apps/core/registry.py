@@ -0,0 +1,78 @@
+"""
+Registro de serviços com inicialização preguiçosa.
+
+Os serviços globais (ex: `group_service`, `log_monitor_service`) continuam
+sendo importados pelo mesmo nome, mas o módulo passa a expor um proxy: a
+instância real só é construída no primeiro acesso a um atributo. Assim,
+importar um módulo de serviços não executa queries nem abre conexões; esse
+custo fica para quem realmente usa o serviço.
+
+    group_service = service_registry.register('group_service', GroupService)
+"""
+import logging
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """Proxy que constrói o serviço no primeiro uso."""
+
+    __slots__ = ('_name', '_factory', '_instance', '_lock')
+
+    def __init__(self, name: str, factory: Callable):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+                    logger.debug(f"Serviço inicializado: {self._name}")
+        return instance
+
+    @property
+    def is_initialized(self):
+        return self._instance is not None
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._resolve(), key, value)
+
+    def __repr__(self):
+        state = 'inicializado' if self.is_initialized else 'pendente'
+        return f"<LazyService {self._name} ({state})>"
+
+
+class ServiceRegistry:
+    """Registro dos serviços globais preguiçosos."""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+
+    def register(self, name: str, factory: Callable) -> LazyService:
+        """Registra um serviço e retorna o proxy a ser exposto pelo módulo."""
+        service = LazyService(name, factory)
+        self._services[name] = service
+        return service
+
+    def get(self, name: str):
+        """Obtém a instância real de um serviço (construindo se necessário)."""
+        return self._services[name]._resolve()
+
+    def get_status(self) -> Dict[str, bool]:
+        """Serviços registrados e se já foram inicializados."""
+        return {name: service.is_initialized for name, service in sorted(self._services.items())}
+
+
+# Registro global
+service_registry = ServiceRegistry()
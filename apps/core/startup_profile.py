@@ -0,0 +1,246 @@
+"""
+Perfil de inicialização do Django.
+
+Mede, num processo limpo, o custo de cada módulo dos apps locais: tempo de
+import (próprio, sem contar imports aninhados), queries executadas e conexões
+de rede abertas durante o import, além do tempo e das queries de cada
+AppConfig.ready(). Depois do django.setup() importa os módulos restantes dos
+apps (services, tasks, views...) para cobrir o que comandos e workers carregam.
+
+Executado pelo comando `manage.py profile_startup`, que chama este módulo num
+subprocesso (`python -m apps.core.startup_profile`) e lê o JSON da linha marcada
+com REPORT_MARKER na saída.
+"""
+import importlib
+import importlib.abc
+import json
+import os
+import pkgutil
+import socket
+import sys
+import time
+
+LOCAL_PREFIX = 'apps.'
+REPORT_MARKER = '__STARTUP_PROFILE__'
+SKIPPED_SUBPACKAGES = {'management', 'migrations', 'tests'}
+
+
+class _Record:
+    """Custos atribuídos a um módulo (ou ready) específico."""
+
+    __slots__ = ('name', 'app', 'phase', 'elapsed', 'children', 'queries', 'connections')
+
+    def __init__(self, name, app, phase):
+        self.name = name
+        self.app = app
+        self.phase = phase
+        self.elapsed = 0.0
+        self.children = 0.0
+        self.queries = 0
+        self.connections = 0
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'app': self.app,
+            'phase': self.phase,
+            'ms': round((self.elapsed - self.children) * 1000, 2),
+            'queries': self.queries,
+            'connections': self.connections,
+        }
+
+
+class StartupProfiler:
+    """Coleta custos por módulo usando um finder de imports e wrappers de query/socket."""
+
+    def __init__(self):
+        self.records = []
+        self.stack = []
+        self.phase = 'setup'
+        self.unattributed = _Record('<fora de módulos locais>', None, 'setup')
+
+    # ------------------------------------------------------------------
+    # Atribuição
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def app_of(module_name):
+        parts = module_name.split('.')
+        return '.'.join(parts[:2]) if len(parts) > 1 else module_name
+
+    def _current(self):
+        return self.stack[-1] if self.stack else self.unattributed
+
+    def measure(self, name, app, func, *args):
+        """Executa func atribuindo tempo, queries e conexões a um novo registro."""
+        record = _Record(name, app, self.phase)
+        self.records.append(record)
+        self.stack.append(record)
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            record.elapsed = time.perf_counter() - started
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1].children += record.elapsed
+
+    def on_query(self, execute, sql, params, many, context):
+        self._current().queries += 1
+        return execute(sql, params, many, context)
+
+    # ------------------------------------------------------------------
+    # Instalação dos hooks
+    # ------------------------------------------------------------------
+
+    def install(self):
+        profiler = self
+
+        class TimingLoader(importlib.abc.Loader):
+            def __init__(self, loader):
+                self.loader = loader
+
+            def create_module(self, spec):
+                return self.loader.create_module(spec)
+
+            def exec_module(self, module):
+                profiler.measure(
+                    module.__name__, profiler.app_of(module.__name__),
+                    self.loader.exec_module, module,
+                )
+
+            def __getattr__(self, item):
+                return getattr(self.loader, item)
+
+        class TimingFinder(importlib.abc.MetaPathFinder):
+            def find_spec(self, name, path, target=None):
+                if not name.startswith(LOCAL_PREFIX):
+                    return None
+                for finder in sys.meta_path:
+                    if finder is self or not hasattr(finder, 'find_spec'):
+                        continue
+                    spec = finder.find_spec(name, path, target)
+                    if spec is not None:
+                        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                            spec.loader = TimingLoader(spec.loader)
+                        return spec
+                return None
+
+        sys.meta_path.insert(0, TimingFinder())
+
+        original_connect = socket.socket.connect
+
+        def counting_connect(sock, address):
+            profiler._current().connections += 1
+            return original_connect(sock, address)
+
+        socket.socket.connect = counting_connect
+
+    def wrap_ready(self, local_apps):
+        """Envolve AppConfig.ready dos apps locais antes do populate."""
+        from django.apps import AppConfig
+
+        profiler = self
+        for app_name in local_apps:
+            try:
+                module = importlib.import_module(f'{app_name}.apps')
+            except ImportError:
+                continue
+            for value in vars(module).values():
+                if (isinstance(value, type) and issubclass(value, AppConfig)
+                        and value is not AppConfig and 'ready' in vars(value)):
+                    original_ready = value.ready
+
+                    def ready(config, _original=original_ready, _app=app_name):
+                        return profiler.measure(f'{_app}.ready()', _app, _original, config)
+
+                    value.ready = ready
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def import_remaining(self, local_apps):
+        """Importa os módulos dos apps locais que o setup não carregou."""
+        self.phase = 'on_demand'
+        failures = {}
+        for app_name in local_apps:
+            package = importlib.import_module(app_name)
+            for info in pkgutil.iter_modules(package.__path__):
+                if info.name in SKIPPED_SUBPACKAGES or info.name.startswith('_'):
+                    continue
+                module_name = f'{app_name}.{info.name}'
+                if module_name in sys.modules:
+                    continue
+                try:
+                    importlib.import_module(module_name)
+                except Exception as e:
+                    failures[module_name] = str(e)
+        return failures
+
+    def run(self):
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'interjornada_system.settings')
+        self.install()
+
+        from django.conf import settings
+        from django.db import connection
+
+        local_apps = [app for app in settings.INSTALLED_APPS if app.startswith(LOCAL_PREFIX)]
+        self.wrap_ready(local_apps)
+
+        with connection.execute_wrapper(self.on_query):
+            import django
+
+            started = time.perf_counter()
+            django.setup()
+            setup_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            failures = self.import_remaining(local_apps)
+            on_demand_seconds = time.perf_counter() - started
+
+        from apps.core.registry import service_registry
+
+        report = self.report(local_apps, setup_seconds, on_demand_seconds, failures)
+        report['services'] = service_registry.get_status()
+        return report
+
+    def report(self, local_apps, setup_seconds, on_demand_seconds, failures):
+        apps = {
+            app: {'modules': 0, 'ms': 0.0, 'queries': 0, 'connections': 0, 'ready_ms': 0.0}
+            for app in local_apps
+        }
+        for record in self.records:
+            entry = apps.setdefault(
+                record.app, {'modules': 0, 'ms': 0.0, 'queries': 0, 'connections': 0, 'ready_ms': 0.0}
+            )
+            data = record.as_dict()
+            if record.name.endswith('.ready()'):
+                entry['ready_ms'] += data['ms']
+            else:
+                entry['modules'] += 1
+                entry['ms'] += data['ms']
+            entry['queries'] += record.queries
+            entry['connections'] += record.connections
+
+        for entry in apps.values():
+            entry['ms'] = round(entry['ms'], 2)
+            entry['ready_ms'] = round(entry['ready_ms'], 2)
+
+        return {
+            'setup_ms': round(setup_seconds * 1000, 2),
+            'on_demand_ms': round(on_demand_seconds * 1000, 2),
+            'total_queries': sum(r.queries for r in self.records) + self.unattributed.queries,
+            'total_connections': sum(r.connections for r in self.records) + self.unattributed.connections,
+            'apps': apps,
+            'modules': sorted(
+                (r.as_dict() for r in self.records), key=lambda item: item['ms'], reverse=True
+            ),
+            'failures': failures,
+        }
+
+
+if __name__ == '__main__':
+    report = StartupProfiler().run()
+    # Logs dos módulos também vão para a saída padrão: o relatório é a linha marcada
+    sys.stdout.write(f'\n{REPORT_MARKER}{json.dumps(report)}\n')
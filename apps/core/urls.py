@@ -13,4 +13,6 @@ urlpatterns = [
     path('api/test-connection/', views.test_device_connection, name='test_device_connection'),
     path('sincronizar-blacklist/', views.sincronizar_blacklist, name='sincronizar_blacklist'),
     path('api/sync-blacklist/', views.processar_sincronizacao_blacklist, name='processar_sincronizacao_blacklist'),
+    path('exportar/<str:dataset>/', views.exportar_dados, name='exportar_dados'),
+    path('importar-funcionarios/', views.importar_funcionarios, name='importar_funcionarios'),
 ]
\ No newline at end of file
@@ -298,4 +298,68 @@ def processar_sincronizacao_blacklist(request):
         return JsonResponse({
             'success': False,
             'message': f'Erro ao processar sincronização: {str(e)}'
-        })
\ No newline at end of file
+        })
+
+@staff_member_required
+def exportar_dados(request, dataset):
+    """Exporta logs, sessões ou funcionários em CSV/XLSX (streaming)."""
+    from .export_service import export_service
+    
+    fmt = request.GET.get('format', 'csv').lower()
+    
+    try:
+        return export_service.build_response(dataset, fmt, request.GET)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=400)
+    except RuntimeError as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+
+@staff_member_required
+def importar_funcionarios(request):
+    """Página de importação de funcionários a partir de CSV."""
+    from apps.employees.import_service import employee_import_service, IMPORT_COLUMNS
+    
+    context = {
+        'columns': IMPORT_COLUMNS,
+        'result': None,
+        'errors': [],
+        'error': None,
+        'dry_run': False,
+    }
+    
+    if request.method == 'POST':
+        upload = request.FILES.get('arquivo')
+        dry_run = request.POST.get('dry_run') == 'on'
+        create_groups = request.POST.get('create_groups') == 'on'
+        context['dry_run'] = dry_run
+        
+        if not upload:
+            context['error'] = 'Selecione um arquivo CSV'
+        else:
+            try:
+                result = employee_import_service.import_file(
+                    upload.file,
+                    dry_run=dry_run,
+                    create_groups=create_groups,
+                    source=upload.name,
+                )
+                context['result'] = result.summary()
+                context['errors'] = result.errors[:500]
+                if dry_run:
+                    messages.info(request, 'Validação concluída (nenhuma alteração gravada)')
+                else:
+                    messages.success(
+                        request,
+                        f'Importação concluída: {result.created} novos, {result.updated} atualizados'
+                    )
+            except (ValueError, UnicodeDecodeError) as e:
+                context['error'] = f'Erro ao ler o arquivo: {e}'
+    
+    return render(request, 'admin/core/importar_funcionarios.html', context)
@@ -0,0 +1,315 @@
+"""
+Cliente assíncrono para dispositivos IDFace e poller concorrente.
+
+AsyncDeviceClient expõe as mesmas operações do DeviceClient (login,
+load_objects de users/groups/user_groups/access_logs/access_events,
+modify_objects) sobre um httpx.AsyncClient compartilhado, com pool de
+conexões. ConcurrentDevicePoller consulta todos os dispositivos habilitados
+em paralelo, cada um com o seu prazo: uma catraca lenta ou fora do ar não
+atrasa as demais, e o ciclo dura o tempo do dispositivo mais lento.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+import httpx
+from django.conf import settings
+from apps.logs.metrics import device_fetch_errors, device_fetch_seconds, group_move_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def build_http_client(max_connections: int = 20) -> httpx.AsyncClient:
+    """httpx.AsyncClient com pool de conexões e os timeouts dos dispositivos."""
+    return httpx.AsyncClient(
+        verify=getattr(settings, 'SSL_VERIFY', False),
+        timeout=httpx.Timeout(
+            getattr(settings, 'DEVICE_REQUEST_TIMEOUT', 10),
+            connect=getattr(settings, 'DEVICE_CONNECTION_TIMEOUT', 15),
+        ),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+class AsyncDeviceClient:
+    """Cliente assíncrono para um dispositivo IDFace."""
+
+    def __init__(self, device=None, http: Optional[httpx.AsyncClient] = None, session_token: Optional[str] = None):
+        """
+        Inicializa o cliente.
+
+        Args:
+            device: Instância do modelo Device (opcional; sem ela usa o dispositivo primário do settings)
+            http: httpx.AsyncClient compartilhado (opcional; sem ele o cliente cria e fecha o próprio)
+            session_token: Sessão já obtida em um ciclo anterior (opcional)
+        """
+        self.device = device
+        self.session_token = session_token
+        self._owns_http = http is None
+        self.http = http or build_http_client()
+
+        if device:
+            self.base_url = device.base_url
+            self.username = device.username
+            self.password = device.password
+            self.name = device.name
+        else:
+            protocol = "https" if settings.PRIMARY_DEVICE_USE_HTTPS else "http"
+            self.base_url = f"{protocol}://{settings.PRIMARY_DEVICE_IP}:{settings.PRIMARY_DEVICE_PORT}"
+            self.username = settings.PRIMARY_DEVICE_USERNAME
+            self.password = settings.PRIMARY_DEVICE_PASSWORD
+            self.name = settings.PRIMARY_DEVICE_IP
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def login(self) -> bool:
+        """Faz login no dispositivo."""
+        try:
+            response = await self.http.post(
+                f"{self.base_url}/login.fcgi",
+                json={"login": self.username, "password": self.password},
+            )
+            if response.status_code == 200:
+                self.session_token = response.json().get("session")
+                if self.session_token:
+                    logger.debug(f"Login bem-sucedido no dispositivo {self.name}")
+                    return True
+            logger.error(f"Falha no login em {self.name}: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.error(f"Erro ao fazer login em {self.name}: {e}")
+            return False
+
+    async def _post(self, endpoint: str, data: Dict) -> httpx.Response:
+        """POST autenticado; em 401 refaz o login uma vez e repete a requisição."""
+        if not self.session_token and not await self.login():
+            raise ConnectionError(f"Falha no login em {self.name}")
+
+        response = await self.http.post(f"{self.base_url}/{endpoint}?session={self.session_token}", json=data)
+        if response.status_code == 401:
+            logger.warning(f"Sessão expirada em {self.name} - refazendo login")
+            self.session_token = None
+            if not await self.login():
+                raise ConnectionError(f"Falha no login em {self.name}")
+            response = await self.http.post(f"{self.base_url}/{endpoint}?session={self.session_token}", json=data)
+        return response
+
+    async def load_objects(self, object_name: str, where: Optional[Dict] = None, order: Optional[List] = None,
+                           limit: Optional[int] = None, raise_errors: bool = False) -> List[Dict]:
+        """
+        Carrega objetos de uma tabela do dispositivo (load_objects.fcgi).
+
+        Com raise_errors=True, falhas de rede/HTTP são propagadas em vez de
+        retornar lista vazia (usado pelo poller para distinguir "sem logs" de erro).
+        """
+        data = {"object": object_name}
+        if where:
+            data["where"] = {object_name: where}
+        if order:
+            data["order"] = order
+        if limit:
+            data["limit"] = limit
+
+        try:
+            response = await self._post("load_objects.fcgi", data)
+            if response.status_code != 200:
+                raise ConnectionError(f"HTTP {response.status_code}")
+            return response.json().get(object_name, [])
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Erro ao carregar {object_name} de {self.name}: {e}")
+            return []
+
+    async def modify_objects(self, object_name: str, values: Dict, where: Optional[Dict] = None) -> bool:
+        """Altera objetos de uma tabela do dispositivo (modify_objects.fcgi)."""
+        data = {"object": object_name, "values": values}
+        if where:
+            data["where"] = {object_name: where}
+        try:
+            response = await self._post("modify_objects.fcgi", data)
+            if response.status_code == 200:
+                return True
+            logger.error(f"Erro ao alterar {object_name} em {self.name}: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.error(f"Erro ao alterar {object_name} em {self.name}: {e}")
+            return False
+
+    async def get_users(self) -> List[Dict]:
+        """Carrega lista de usuários."""
+        return await self.load_objects("users")
+
+    async def get_groups(self) -> List[Dict]:
+        """Carrega lista de todos os grupos."""
+        return await self.load_objects("groups")
+
+    async def get_user_groups(self, user_id: int) -> List[Dict]:
+        """Carrega grupos de um usuário específico."""
+        return await self.load_objects("user_groups", where={"user_id": user_id})
+
+    async def get_all_user_groups(self) -> List[Dict]:
+        """Carrega a tabela completa de vínculos usuário/grupo."""
+        return await self.load_objects("user_groups")
+
+    async def get_recent_access_logs(self, limit: int = 100, min_id: int = 0, raise_errors: bool = False) -> List[Dict]:
+        """Carrega logs de acesso mais recentes (ID > min_id, do mais novo para o mais antigo)."""
+        started = time.perf_counter()
+        try:
+            return await self.load_objects(
+                "access_logs", where={"id": {">": min_id}}, order=["id", "descending"],
+                limit=min(limit, 1000), raise_errors=True,
+            )
+        except Exception as e:
+            device_fetch_errors.inc(operation='recent_access_logs')
+            if raise_errors:
+                raise
+            logger.error(f"Erro ao carregar logs recentes de {self.name}: {e}")
+            return []
+        finally:
+            device_fetch_seconds.observe(time.perf_counter() - started, operation='recent_access_logs')
+
+    async def get_access_logs(self, last_processed_id: int = 0, raise_errors: bool = False) -> List[Dict]:
+        """Carrega logs de acesso recentes (mesma janela do DeviceClient.get_access_logs)."""
+        if last_processed_id > 0:
+            return await self.get_recent_access_logs(limit=500, min_id=last_processed_id, raise_errors=raise_errors)
+        return await self.get_recent_access_logs(limit=10, min_id=0, raise_errors=raise_errors)
+
+    async def get_access_logs_after(self, cursor: int, limit: int = 50, raise_errors: bool = False) -> List[Dict]:
+        """
+        Carrega os próximos logs após o cursor (ID > cursor, em ordem crescente).
+        
+        Diferente de get_recent_access_logs, não pula logs quando há mais de
+        `limit` pendentes: o restante vem nas próximas chamadas.
+        """
+        started = time.perf_counter()
+        try:
+            return await self.load_objects(
+                "access_logs", where={"id": {">": cursor}}, order=["id"],
+                limit=min(limit, 1000), raise_errors=True,
+            )
+        except Exception as e:
+            device_fetch_errors.inc(operation='access_logs_after')
+            if raise_errors:
+                raise
+            logger.error(f"Erro ao carregar logs após o ID {cursor} de {self.name}: {e}")
+            return []
+        finally:
+            device_fetch_seconds.observe(time.perf_counter() - started, operation='access_logs_after')
+
+    async def get_head_log_id(self, raise_errors: bool = False) -> int:
+        """Maior ID de log existente no dispositivo (0 sem logs)."""
+        logs = await self.get_recent_access_logs(limit=1, raise_errors=raise_errors)
+        return max((log.get('id') or 0 for log in logs), default=0)
+
+    async def get_access_events(self, last_processed_id: int = 0) -> List[Dict]:
+        """Carrega eventos de acesso (giros) da catraca."""
+        return await self.load_objects(
+            "access_events", where={"id": {">": last_processed_id}}, order=["id", "descending"], limit=100,
+        )
+
+    async def move_user_to_group(self, user_id: int, new_group_id: int, original_group_id: Optional[int] = None) -> bool:
+        """Move usuário para um grupo específico."""
+        started = time.perf_counter()
+        where = {"user_id": user_id, "group_id": original_group_id} if original_group_id else None
+        success = await self.modify_objects("user_groups", {"user_id": user_id, "group_id": new_group_id}, where)
+        group_move_seconds.observe(time.perf_counter() - started, result='ok' if success else 'error')
+        if success:
+            logger.info(f"Usuário {user_id} movido para grupo {new_group_id} em {self.name}")
+        return success
+
+
+class ConcurrentDevicePoller:
+    """
+    Busca logs de vários dispositivos em paralelo, com prazo por dispositivo.
+
+    As sessões obtidas ficam guardadas por dispositivo e são reaproveitadas
+    nos ciclos seguintes (o login só é refeito quando a catraca responde 401).
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.session_tokens: Dict[int, str] = {}
+
+    def get_deadline(self, device) -> float:
+        if self.deadline is not None:
+            return self.deadline
+        return getattr(settings, 'DEVICE_POLL_DEADLINE_SECONDS', None) or device.request_timeout
+
+    async def _fetch(self, http: httpx.AsyncClient, device, last_processed_id: int, limit: Optional[int]) -> List[Dict]:
+        client = AsyncDeviceClient(device, http=http, session_token=self.session_tokens.get(device.id))
+        try:
+            if limit:
+                return await client.get_access_logs_after(last_processed_id, limit, raise_errors=True)
+            return await client.get_access_logs(last_processed_id, raise_errors=True)
+        finally:
+            if client.session_token:
+                self.session_tokens[device.id] = client.session_token
+            else:
+                self.session_tokens.pop(device.id, None)
+
+    async def _poll_device(self, http: httpx.AsyncClient, device, last_processed_id: int,
+                           limit: Optional[int] = None) -> Dict:
+        started = time.perf_counter()
+        deadline = self.get_deadline(device)
+        result = {'device': device, 'success': False, 'logs': [], 'error': None}
+        try:
+            result['logs'] = await asyncio.wait_for(
+                self._fetch(http, device, last_processed_id, limit), timeout=deadline,
+            )
+            result['success'] = True
+        except asyncio.TimeoutError:
+            result['error'] = f'Prazo de {deadline:.0f}s excedido'
+        except Exception as e:
+            result['error'] = str(e) or e.__class__.__name__
+        result['elapsed'] = time.perf_counter() - started
+        return result
+
+    async def poll(self, devices: Iterable, last_processed_ids: Optional[Dict[int, int]] = None,
+                   limit: Optional[int] = None) -> List[Dict]:
+        """
+        Busca os logs de todos os dispositivos em paralelo.
+        
+        Sem limit, traz a janela de logs recentes de cada dispositivo; com limit,
+        trata last_processed_ids como cursores e traz os próximos `limit` logs
+        em ordem crescente (ingestão sem lacunas).
+
+        Returns:
+            List[Dict]: um resultado por dispositivo, na ordem recebida
+                (device, success, logs, error, elapsed)
+        """
+        devices = list(devices)
+        if not devices:
+            return []
+        last_processed_ids = last_processed_ids or {}
+        async with build_http_client(max_connections=max(len(devices) * 2, 10)) as http:
+            return await asyncio.gather(*(
+                self._poll_device(http, device, last_processed_ids.get(device.id, 0), limit) for device in devices
+            ))
+
+    async def head_log_id(self, device) -> int:
+        """Maior ID de log do dispositivo (reaproveita a sessão do poller)."""
+        async with AsyncDeviceClient(device, session_token=self.session_tokens.get(device.id)) as client:
+            try:
+                return await client.get_head_log_id(raise_errors=True)
+            finally:
+                if client.session_token:
+                    self.session_tokens[device.id] = client.session_token
+
+    def head_log_id_sync(self, device) -> int:
+        """Executa head_log_id() a partir de código síncrono."""
+        return asyncio.run(self.head_log_id(device))
+
+    def poll_sync(self, devices: Iterable, last_processed_ids: Optional[Dict[int, int]] = None,
+                  limit: Optional[int] = None) -> List[Dict]:
+        """Executa poll() a partir de código síncrono (threads do runtime, Celery)."""
+        # QuerySets são avaliados aqui: o ORM não pode ser usado dentro do event loop
+        return asyncio.run(self.poll(list(devices), last_processed_ids, limit))
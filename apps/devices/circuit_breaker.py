@@ -0,0 +1,177 @@
+"""
+Circuit breaker por dispositivo.
+
+Substitui a reconexão com time.sleep() feita dentro de is_connected(): com a
+catraca fora do ar, quem chama (worker, comandos, views) recebe a falha na
+hora em vez de ficar parado no backoff.
+
+    closed     → requisições liberadas; falhas consecutivas são contadas
+    open       → falha rápida; após o atraso de backoff uma sonda (login) é
+                 agendada em uma thread de fundo
+    half_open  → sonda em andamento; sucesso fecha o circuito, falha reabre
+                 com o próximo atraso (BASE_RECONNECTION_DELAY dobrando até
+                 MAX_RECONNECTION_DELAY, com jitter)
+
+Os breakers são compartilhados por endereço do dispositivo, então todas as
+instâncias de DeviceClient do processo enxergam o mesmo estado.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+from django.conf import settings
+from apps.core.registry import service_registry
+from apps.logs.metrics import device_circuit_state
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Valor exportado na métrica device_circuit_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Circuit breaker de um dispositivo."""
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or getattr(settings, 'DEVICE_CIRCUIT_FAILURE_THRESHOLD', 3)
+        self.base_delay = base_delay if base_delay is not None else getattr(settings, 'BASE_RECONNECTION_DELAY', 2)
+        self.max_delay = max_delay if max_delay is not None else getattr(settings, 'MAX_RECONNECTION_DELAY', 60)
+
+        self.state = CLOSED
+        self.failures = 0
+        self.open_count = 0
+        self.opened_at: Optional[float] = None
+        self.retry_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        device_circuit_state.set(STATE_VALUES[CLOSED], device=name)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.info(f"Circuito do dispositivo {self.name}: {self.state} → {state}")
+        self.state = state
+        device_circuit_state.set(STATE_VALUES[state], device=self.name)
+
+    def _next_delay(self) -> float:
+        """Backoff exponencial com jitter (mesma fórmula da reconexão antiga)."""
+        delay = min(self.base_delay * (2 ** max(self.open_count - 1, 0)), self.max_delay)
+        return delay + random.uniform(0.1, 0.5) * delay
+
+    def _open(self, error: Optional[str] = None):
+        self.open_count += 1
+        self.opened_at = time.monotonic()
+        self.retry_at = self.opened_at + self._next_delay()
+        if error:
+            self.last_error = error
+        self._set_state(OPEN)
+
+    def allow_request(self) -> bool:
+        """Requisição pode ser feita agora? Nunca bloqueia."""
+        with self._lock:
+            return self.state == CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_count = 0
+            self.retry_at = None
+            self.last_error = None
+            self._set_state(CLOSED)
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self.failures += 1
+            if error:
+                self.last_error = error
+            if self.state == CLOSED and self.failures >= self.failure_threshold:
+                logger.warning(
+                    f"Dispositivo {self.name} com {self.failures} falhas consecutivas - circuito aberto"
+                )
+                self._open(error)
+
+    def schedule_probe(self, probe: Callable[[], bool]) -> bool:
+        """
+        Com o circuito aberto e o atraso vencido, executa a sonda em segundo plano.
+
+        Returns:
+            bool: True se uma sonda foi agendada agora
+        """
+        with self._lock:
+            if self.state != OPEN or time.monotonic() < (self.retry_at or 0):
+                return False
+            self._set_state(HALF_OPEN)
+
+        threading.Thread(
+            target=self._run_probe, args=(probe,), name=f'circuit-probe-{self.name}', daemon=True,
+        ).start()
+        return True
+
+    def _run_probe(self, probe: Callable[[], bool]):
+        try:
+            success = probe()
+            error = None if success else 'Sonda de reconexão falhou'
+        except Exception as e:
+            success, error = False, str(e)
+
+        if success:
+            logger.info(f"Dispositivo {self.name} respondeu - circuito fechado")
+            self.record_success()
+            return
+        with self._lock:
+            self._open(error)
+            logger.warning(
+                f"Dispositivo {self.name} ainda indisponível - nova tentativa em "
+                f"{self.retry_at - time.monotonic():.1f}s"
+            )
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'open_count': self.open_count,
+                'open_seconds': round(now - self.opened_at, 1) if self.state != CLOSED and self.opened_at else 0,
+                'retry_in_seconds': round(max(self.retry_at - now, 0), 1) if self.state == OPEN and self.retry_at else None,
+                'last_error': self.last_error,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Breakers do processo, um por dispositivo."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name)
+            return breaker
+
+    def reset(self, name: Optional[str] = None):
+        """Fecha o circuito de um dispositivo (ou de todos)."""
+        with self._lock:
+            breakers = [self._breakers[name]] if name in self._breakers else (
+                [] if name else list(self._breakers.values())
+            )
+        for breaker in breakers:
+            breaker.record_success()
+
+    def get_status(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.get_status() for name, breaker in sorted(breakers.items())}
+
+
+# Instância global dos breakers
+circuit_breakers = service_registry.register('devices.circuit_breakers', CircuitBreakerRegistry)
@@ -8,6 +8,8 @@ from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from django.conf import settings
 import json
+from apps.logs.metrics import device_fetch_errors, device_fetch_seconds, group_move_seconds
+from .circuit_breaker import circuit_breakers
 
 logger = logging.getLogger(__name__)
 
@@ -38,12 +40,6 @@ class DeviceClient:
         self.connection_timeout = getattr(settings, 'DEVICE_CONNECTION_TIMEOUT', 15)
         self.request_timeout = getattr(settings, 'DEVICE_REQUEST_TIMEOUT', 10)
         
-        # Sistema de reconexão
-        self.reconnection_attempts = 0
-        self.max_reconnection_attempts = getattr(settings, 'MAX_RECONNECTION_ATTEMPTS', 10)
-        self.base_reconnection_delay = getattr(settings, 'BASE_RECONNECTION_DELAY', 2)
-        self.max_reconnection_delay = getattr(settings, 'MAX_RECONNECTION_DELAY', 60)
-        
         # Controle de erros 401
         self.error_401_count = 0
         self.last_401_time = None
@@ -68,12 +64,42 @@ class DeviceClient:
             use_https = settings.PRIMARY_DEVICE_USE_HTTPS
             protocol = "https" if use_https else "http"
             self.base_url = f"{protocol}://{self.device_ip}:{self.port}"
+        
+        # Circuit breaker compartilhado pelos clientes do mesmo dispositivo
+        self.circuit = circuit_breakers.get(self.base_url)
+    
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        """
+        POST no dispositivo passando pelo circuit breaker.
+        
+        Com o circuito aberto falha na hora (ConnectionError), sem esperar o
+        timeout da catraca; a reconexão é tentada em segundo plano.
+        """
+        if not self.circuit.allow_request():
+            self.circuit.schedule_probe(self._login)
+            raise ConnectionError(f"Circuito aberto para {self.base_url}")
+        
+        try:
+            response = self.session.post(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.circuit.record_failure(str(e))
+            raise
+        
+        if response.status_code >= 500:
+            self.circuit.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.circuit.record_success()
+        return response
     
     def is_connected(self) -> bool:
-        """Verifica se está conectado ao dispositivo."""
+        """Verifica se está conectado ao dispositivo (não bloqueia com o circuito aberto)."""
+        if not self.circuit.allow_request():
+            self.circuit.schedule_probe(self._login)
+            return False
+        
         # Se não tem token, tentar fazer login
         if not self.session_token:
-            return self.attempt_smart_reconnection()
+            return self.login()
         
         # Verificar a cada 60 segundos
         if (self.last_connection_check and 
@@ -86,19 +112,33 @@ class DeviceClient:
             self.last_connection_check = datetime.utcnow()
             
             if response.status_code == 200:
-                self.reconnection_attempts = 0
+                self.circuit.record_success()
                 return True
             else:
                 self.session_token = None
-                return self.attempt_smart_reconnection()
+                return self.login()
                 
         except Exception as e:
             logger.debug(f"Teste de conexão falhou: {e}")
+            self.circuit.record_failure(str(e))
             self.session_token = None
-            return self.attempt_smart_reconnection()
+            return self.login()
     
     def login(self) -> bool:
-        """Faz login no dispositivo."""
+        """Faz login no dispositivo (falha na hora se o circuito estiver aberto)."""
+        if not self.circuit.allow_request():
+            self.circuit.schedule_probe(self._login)
+            logger.debug(f"Circuito aberto para {self.base_url} - login adiado para a sonda")
+            return False
+        
+        if self._login():
+            self.circuit.record_success()
+            return True
+        self.circuit.record_failure('Falha no login')
+        return False
+    
+    def _login(self) -> bool:
+        """Requisição de login (também usada como sonda do circuit breaker)."""
         try:
             url = f"{self.base_url}/login.fcgi"
             data = {"login": self.username, "password": self.password}
@@ -126,14 +166,19 @@ class DeviceClient:
             logger.error(f"Erro ao fazer login: {e}")
             return False
     
-    def get_users(self) -> List[Dict]:
-        """Carrega lista de usuários."""
+    def get_users(self, raise_errors: bool = False) -> List[Dict]:
+        """
+        Carrega lista de usuários.
+
+        Com raise_errors=True, falhas de rede/HTTP são propagadas em vez de
+        retornar lista vazia (a sincronização não confunde erro com "nenhum").
+        """
         try:
             url = f"{self.base_url}/load_objects.fcgi?session={self.session_token}"
             data = {"object": "users"}
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
+            response = self._post(
                 url, 
                 json=data, 
                 headers=headers, 
@@ -146,25 +191,33 @@ class DeviceClient:
             elif response.status_code == 401:
                 if self.handle_401_error():
                     raise Exception("RESTART_REQUIRED")
+                if raise_errors:
+                    raise ConnectionError("HTTP 401")
                 return []
             else:
+                if raise_errors:
+                    raise ConnectionError(f"HTTP {response.status_code}")
                 logger.error(f"Erro ao carregar usuários: {response.status_code}")
                 return []
                 
         except Exception as e:
-            if "RESTART_REQUIRED" in str(e):
+            if raise_errors or "RESTART_REQUIRED" in str(e):
                 raise e
             logger.error(f"Erro ao carregar usuários: {e}")
             return []
     
-    def get_groups(self) -> List[Dict]:
-        """Carrega lista de todos os grupos."""
+    def get_groups(self, raise_errors: bool = False) -> List[Dict]:
+        """
+        Carrega lista de todos os grupos.
+
+        Com raise_errors=True, falhas são propagadas (ver get_users).
+        """
         try:
             url = f"{self.base_url}/load_objects.fcgi?session={self.session_token}"
             data = {"object": "groups"}
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
+            response = self._post(
                 url, 
                 json=data, 
                 headers=headers, 
@@ -177,13 +230,17 @@ class DeviceClient:
             elif response.status_code == 401:
                 if self.handle_401_error():
                     raise Exception("RESTART_REQUIRED")
+                if raise_errors:
+                    raise ConnectionError("HTTP 401")
                 return []
             else:
+                if raise_errors:
+                    raise ConnectionError(f"HTTP {response.status_code}")
                 logger.error(f"Erro ao carregar grupos: {response.status_code}")
                 return []
                 
         except Exception as e:
-            if "RESTART_REQUIRED" in str(e):
+            if raise_errors or "RESTART_REQUIRED" in str(e):
                 raise e
             logger.error(f"Erro ao carregar grupos: {e}")
             return []
@@ -198,7 +255,7 @@ class DeviceClient:
             }
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
+            response = self._post(
                 url, 
                 json=data, 
                 headers=headers, 
@@ -221,7 +278,46 @@ class DeviceClient:
                 raise e
             logger.error(f"Erro ao carregar grupos do usuário {user_id}: {e}")
             return []
-    
+
+    def get_all_user_groups(self, raise_errors: bool = False) -> List[Dict]:
+        """
+        Carrega a tabela completa de vínculos usuário/grupo em uma única chamada.
+
+        Com raise_errors=True, falhas são propagadas (ver get_users).
+        """
+        try:
+            url = f"{self.base_url}/load_objects.fcgi?session={self.session_token}"
+            data = {"object": "user_groups"}
+            headers = {"Content-Type": "application/json"}
+
+            response = self._post(
+                url,
+                json=data,
+                headers=headers,
+                timeout=self.request_timeout
+            )
+
+            if response.status_code == 200:
+                result = response.json()
+                return result.get("user_groups", [])
+            elif response.status_code == 401:
+                if self.handle_401_error():
+                    raise Exception("RESTART_REQUIRED")
+                if raise_errors:
+                    raise ConnectionError("HTTP 401")
+                return []
+            else:
+                if raise_errors:
+                    raise ConnectionError(f"HTTP {response.status_code}")
+                logger.error(f"Erro ao carregar vínculos de grupos: {response.status_code}")
+                return []
+
+        except Exception as e:
+            if raise_errors or "RESTART_REQUIRED" in str(e):
+                raise e
+            logger.error(f"Erro ao carregar vínculos de grupos: {e}")
+            return []
+
     def get_access_logs(self, last_processed_id: int = 0) -> List[Dict]:
         """Carrega logs de acesso recentes."""
         try:
@@ -257,12 +353,13 @@ class DeviceClient:
             }
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
-                url, 
-                json=data, 
-                headers=headers, 
-                timeout=self.request_timeout
-            )
+            with device_fetch_seconds.time(operation='recent_access_logs'):
+                response = self._post(
+                    url, 
+                    json=data, 
+                    headers=headers, 
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -275,12 +372,14 @@ class DeviceClient:
                     raise Exception("RESTART_REQUIRED")
                 return []
             else:
+                device_fetch_errors.inc(operation='recent_access_logs')
                 logger.error(f"Erro ao carregar logs recentes: {response.status_code}")
                 return []
                 
         except Exception as e:
             if "RESTART_REQUIRED" in str(e):
                 raise e
+            device_fetch_errors.inc(operation='recent_access_logs')
             logger.error(f"Erro ao carregar logs recentes: {e}")
             return []
     
@@ -298,12 +397,13 @@ class DeviceClient:
             }
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
-                url, 
-                json=data, 
-                headers=headers, 
-                timeout=self.request_timeout
-            )
+            with device_fetch_seconds.time(operation='access_logs_from_id'):
+                response = self._post(
+                    url, 
+                    json=data, 
+                    headers=headers, 
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -315,12 +415,14 @@ class DeviceClient:
                     raise Exception("RESTART_REQUIRED")
                 return []
             else:
+                device_fetch_errors.inc(operation='access_logs_from_id')
                 logger.error(f"Erro ao carregar logs a partir do ID {start_id}: {response.status_code}")
                 return []
                 
         except Exception as e:
             if "RESTART_REQUIRED" in str(e):
                 raise e
+            device_fetch_errors.inc(operation='access_logs_from_id')
             logger.error(f"Erro ao carregar logs a partir do ID {start_id}: {e}")
             return []
     
@@ -330,7 +432,7 @@ class DeviceClient:
             url = f"{self.base_url}/get_configuration.fcgi?session={self.session_token}"
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
+            response = self._post(
                 url, 
                 json={}, 
                 headers=headers, 
@@ -385,7 +487,7 @@ class DeviceClient:
             }
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
+            response = self._post(
                 url, 
                 json=data, 
                 headers=headers, 
@@ -436,61 +538,12 @@ class DeviceClient:
         """Reseta o contador de erros 401."""
         self.error_401_count = 0
         self.last_401_time = None
-        self.reconnection_attempts = 0
         logger.info("Contador de erros 401 resetado - Conexão restaurada")
     
-    def calculate_reconnection_delay(self) -> float:
-        """Calcula o delay para próxima tentativa de reconexão usando backoff exponencial."""
-        if self.reconnection_attempts == 0:
-            return 0
-        
-        # Backoff exponencial com jitter
-        import random
-        delay = min(
-            self.base_reconnection_delay * (2 ** (self.reconnection_attempts - 1)),
-            self.max_reconnection_delay
-        )
-        
-        # Adicionar jitter para evitar thundering herd
-        jitter = random.uniform(0.1, 0.5) * delay
-        return delay + jitter
-    
-    def should_attempt_reconnection(self) -> bool:
-        """Determina se deve tentar reconectar baseado no número de tentativas."""
-        if self.reconnection_attempts >= self.max_reconnection_attempts:
-            logger.error(f"Máximo de tentativas de reconexão atingido ({self.max_reconnection_attempts})")
-            return False
-        
-        return True
-    
-    def attempt_smart_reconnection(self) -> bool:
-        """Tenta reconectar com backoff exponencial e retry inteligente."""
-        if not self.should_attempt_reconnection():
-            return False
-        
-        self.reconnection_attempts += 1
-        delay = self.calculate_reconnection_delay()
-        
-        if delay > 0:
-            logger.info(f"Tentativa de reconexão {self.reconnection_attempts}/{self.max_reconnection_attempts} em {delay:.1f}s")
-            time.sleep(delay)
-        
-        try:
-            # Tentar login
-            if self.login():
-                logger.info(f"Reconexão bem-sucedida na tentativa {self.reconnection_attempts}")
-                self.reconnection_attempts = 0
-                return True
-            else:
-                logger.warning(f"Falha na reconexão - tentativa {self.reconnection_attempts}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Erro durante reconexão - tentativa {self.reconnection_attempts}: {e}")
-            return False
-    
     def move_user_to_group(self, user_id: int, new_group_id: int, original_group_id: Optional[int] = None) -> bool:
         """Move usuário para um grupo específico."""
+        started = time.perf_counter()
+        result = 'error'
         try:
             url = f"{self.base_url}/modify_objects.fcgi?session={self.session_token}"
             
@@ -519,7 +572,7 @@ class DeviceClient:
             
             headers = {"Content-Type": "application/json"}
             
-            response = self.session.post(
+            response = self._post(
                 url, 
                 json=data, 
                 headers=headers, 
@@ -527,6 +580,7 @@ class DeviceClient:
             )
             
             if response.status_code == 200:
+                result = 'ok'
                 logger.info(f"Usuário {user_id} movido para grupo {new_group_id}")
                 return True
             elif response.status_code == 401:
@@ -542,3 +596,5 @@ class DeviceClient:
                 raise e
             logger.error(f"Erro ao mover usuário {user_id}: {e}")
             return False
+        finally:
+            group_move_seconds.observe(time.perf_counter() - started, result=result)
@@ -0,0 +1,155 @@
+"""
+Comando para executar o simulador local da catraca IDFace.
+"""
+import json
+import signal
+import threading
+from django.core.management.base import BaseCommand, CommandError
+from apps.devices.simulator import (
+    DeviceSimulator, ScenarioPlayer, SimulatorConfig, shift_change_burst, steady_traffic,
+)
+
+
+class Command(BaseCommand):
+    help = 'Executa um simulador da catraca IDFace (login/load/modify/get_configuration) para testes e carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Endereço (padrão: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8081, help='Porta (padrão: 8081)')
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=200,
+            help='Quantidade de usuários sintéticos (padrão: 200)',
+        )
+        parser.add_argument(
+            '--from-db',
+            action='store_true',
+            help='Carrega usuários, grupos e vínculos do banco local em vez de usuários sintéticos',
+        )
+        parser.add_argument('--latency-ms', type=float, default=0, help='Latência média por requisição')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Variação (+/-) da latência')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Probabilidade de erro 500 (0-1)')
+        parser.add_argument('--timeout-rate', type=float, default=0, help='Probabilidade de timeout (0-1)')
+        parser.add_argument('--session-drop-rate', type=float, default=0, help='Probabilidade de 401 espontâneo (0-1)')
+        parser.add_argument(
+            '--session-ttl',
+            type=float,
+            default=600,
+            help='Segundos de inatividade até a sessão expirar (padrão: 600)',
+        )
+        parser.add_argument(
+            '--scenario',
+            choices=['none', 'shift-change', 'steady'],
+            default='none',
+            help='Fluxo de eventos a reproduzir',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=600,
+            help='Duração do cenário em segundos (padrão: 600)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=30,
+            help='Passagens por minuto no cenário steady (padrão: 30)',
+        )
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help='Aceleração do cenário (ex: 10 reproduz 10 minutos em 1)',
+        )
+        parser.add_argument('--seed', type=int, help='Semente aleatória do cenário')
+        parser.add_argument(
+            '--push-url',
+            default='',
+            help='Envia notificações do monitor online (ex: http://127.0.0.1:8000/api/v1/logs/push)',
+        )
+        parser.add_argument(
+            '--push-token',
+            default='',
+            help='DEVICE_PUSH_TOKEN enviado no header Authorization das notificações',
+        )
+
+    def handle(self, *args, **options):
+        config = SimulatorConfig(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            failure_rate=options['failure_rate'],
+            timeout_rate=options['timeout_rate'],
+            session_drop_rate=options['session_drop_rate'],
+            session_ttl=options['session_ttl'],
+            push_url=options['push_url'],
+            push_token=options['push_token'],
+        )
+        try:
+            simulator = DeviceSimulator(config, host=options['host'], port=options['port'])
+        except OSError as e:
+            raise CommandError(f"Não foi possível abrir {options['host']}:{options['port']}: {e}")
+
+        if options['from_db']:
+            simulator.state.seed_from_database()
+        else:
+            simulator.state.seed_users(options['users'])
+        counts = simulator.state.counts()
+
+        self.stdout.write(self.style.SUCCESS(f'🚀 Simulador IDFace em {simulator.base_url}'))
+        self.stdout.write(f'   👥 Usuários: {counts["users"]} | Grupos: {counts["groups"]}')
+        self.stdout.write(f'   🔑 Login: {config.login}/{config.password} (sessão expira após {config.session_ttl:.0f}s)')
+        if config.push_url:
+            self.stdout.write(f'   📡 Notificações push para {config.push_url}')
+        if config.latency_ms or config.failure_rate or config.timeout_rate or config.session_drop_rate:
+            self.stdout.write(
+                f'   ⚠️ Latência {config.latency_ms:.0f}±{config.jitter_ms:.0f}ms, '
+                f'erros {config.failure_rate:.1%}, timeouts {config.timeout_rate:.1%}, '
+                f'401 {config.session_drop_rate:.1%}'
+            )
+
+        player = self.start_scenario(simulator, options)
+
+        done = threading.Event()
+
+        def _shutdown(signum, frame):
+            done.set()
+
+        signal.signal(signal.SIGINT, _shutdown)
+        signal.signal(signal.SIGTERM, _shutdown)
+
+        simulator.start()
+        self.stdout.write('   ⏳ Aguardando requisições (Ctrl+C para sair)...')
+        done.wait()
+
+        self.stdout.write('🛑 Finalizando simulador...')
+        if player:
+            player.stop()
+        simulator.stop()
+        self.stdout.write(json.dumps(simulator.get_status()['objects']))
+        self.stdout.write(self.style.SUCCESS('✅ Simulador finalizado'))
+
+    def start_scenario(self, simulator, options):
+        """Inicia a reprodução do cenário escolhido."""
+        scenario = options['scenario']
+        if scenario == 'none':
+            return None
+
+        user_ids = [row['id'] for row in simulator.state.tables['users']]
+        if not user_ids:
+            raise CommandError('Nenhum usuário no simulador para gerar o cenário')
+
+        if scenario == 'shift-change':
+            # Metade dos usuários sai e a outra metade entra
+            middle = len(user_ids) // 2
+            events = shift_change_burst(
+                user_ids[middle:], duration=options['duration'], exits=user_ids[:middle], seed=options['seed'],
+            )
+        else:
+            events = steady_traffic(user_ids, options['rate'], options['duration'], seed=options['seed'])
+
+        self.stdout.write(
+            f'   🎬 Cenário {scenario}: {len(events)} passagens em {options["duration"]:.0f}s '
+            f'(velocidade {options["speed"]}x)'
+        )
+        return ScenarioPlayer(simulator.state, simulator.config, events, speed=options['speed']).start()
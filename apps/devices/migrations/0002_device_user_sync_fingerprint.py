@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='last_user_sync',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última Sincronização de Usuários'),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='user_sync_fingerprint',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Fingerprint da Sincronização de Usuários'),
+        ),
+    ]
@@ -46,6 +46,10 @@ class Device(models.Model):
     error_count = models.IntegerField(default=0, verbose_name="Contador de Erros")
     success_count = models.IntegerField(default=0, verbose_name="Contador de Sucessos")
     
+    # Sincronização de usuários
+    user_sync_fingerprint = models.JSONField(default=dict, blank=True, verbose_name="Fingerprint da Sincronização de Usuários")
+    last_user_sync = models.DateTimeField(null=True, blank=True, verbose_name="Última Sincronização de Usuários")
+    
     # Metadados
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
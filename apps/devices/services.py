@@ -8,7 +8,9 @@ from django.conf import settings
 from django.core.cache import cache
 from .models import Device, DeviceLog, DeviceSession
 from .device_client import DeviceClient
+from .async_client import ConcurrentDevicePoller
 from apps.core.utils import TimezoneUtils, CacheUtils
+from apps.core.registry import service_registry
 import json
 import time
 
@@ -58,19 +60,22 @@ class DeviceConnectionService:
                 
                 return True, "Conexão estabelecida com sucesso", client.session_token
             else:
+                circuit = client.circuit.get_status()
+                error = "Falha na conexão" if circuit['state'] == 'closed' else "Dispositivo indisponível (circuito aberto)"
+                
                 # Atualizar status do dispositivo
-                device.update_connection_status(success=False, error_message="Falha na conexão")
+                device.update_connection_status(success=False, error_message=error)
                 
                 # Log de erro
                 DeviceLog.objects.create(
                     device=device,
                     log_type='connection',
                     level='ERROR',
-                    message=f"Falha na conexão",
-                    details={'error': 'Falha na conexão'}
+                    message=error,
+                    details={'error': error, 'circuit': circuit}
                 )
                 
-                return False, "Falha na conexão", None
+                return False, error, None
                 
         except Exception as e:
             logger.error(f"Erro ao conectar ao dispositivo {device.name}: {e}")
@@ -471,6 +476,7 @@ class DeviceMonitoringService:
     
     def __init__(self):
         self.data_service = DeviceDataService()
+        self.poller = ConcurrentDevicePoller()
         self.is_monitoring = False
     
     def start_monitoring(self):
@@ -487,6 +493,10 @@ class DeviceMonitoringService:
         """
         Monitora todos os dispositivos ativos.
         
+        Os dispositivos são consultados em paralelo (ConcurrentDevicePoller),
+        cada um com o seu prazo; o registro dos resultados no banco é feito
+        depois, em sequência.
+        
         Returns:
             Dict: Estatísticas do monitoramento
         """
@@ -506,26 +516,48 @@ class DeviceMonitoringService:
                 'devices_connected': 0,
                 'devices_error': 0,
                 'total_logs_fetched': 0,
+                'cycle_seconds': 0.0,
+                'slowest_device_seconds': 0.0,
                 'errors': []
             }
             
-            for device in active_devices:
+            started = time.perf_counter()
+            results = self.poller.poll_sync(active_devices)
+            stats['cycle_seconds'] = round(time.perf_counter() - started, 3)
+            
+            for result in results:
+                device = result['device']
                 stats['devices_checked'] += 1
+                stats['slowest_device_seconds'] = max(stats['slowest_device_seconds'], round(result['elapsed'], 3))
                 
                 try:
-                    # Buscar logs do dispositivo
-                    success, message, logs = self.data_service.get_device_logs(device)
-                    
-                    if success:
+                    if result['success']:
+                        logs = result['logs']
                         stats['devices_connected'] += 1
                         stats['total_logs_fetched'] += len(logs)
+                        device.update_connection_status(success=True)
+                        DeviceLog.objects.create(
+                            device=device,
+                            log_type='data_fetch',
+                            level='INFO',
+                            message=f"Logs obtidos com sucesso: {len(logs)} registros",
+                            details={'count': len(logs), 'elapsed': round(result['elapsed'], 3)}
+                        )
                         
                         # Processar logs (será implementado no app de logs)
                         if logs:
                             self._process_device_logs(device, logs)
                     else:
                         stats['devices_error'] += 1
-                        stats['errors'].append(f"{device.name}: {message}")
+                        stats['errors'].append(f"{device.name}: {result['error']}")
+                        device.update_connection_status(success=False, error_message=result['error'])
+                        DeviceLog.objects.create(
+                            device=device,
+                            log_type='data_fetch',
+                            level='ERROR',
+                            message=f"Erro ao buscar logs: {result['error']}",
+                            details={'error': result['error'], 'elapsed': round(result['elapsed'], 3)}
+                        )
                         
                 except Exception as e:
                     stats['devices_error'] += 1
@@ -568,6 +600,6 @@ class DeviceMonitoringService:
 
 
 # Instâncias globais dos serviços
-device_connection_service = DeviceConnectionService()
-device_data_service = DeviceDataService()
-device_monitoring_service = DeviceMonitoringService()
+device_connection_service = service_registry.register('devices.device_connection_service', DeviceConnectionService)
+device_data_service = service_registry.register('devices.device_data_service', DeviceDataService)
+device_monitoring_service = service_registry.register('devices.device_monitoring_service', DeviceMonitoringService)
@@ -0,0 +1,726 @@
+"""
+Simulador local de uma catraca Control iD IDFace.
+
+Servidor HTTP (biblioteca padrão) que implementa os endpoints usados pelo
+DeviceClient, com a mesma semântica do equipamento:
+
+- `login.fcgi`, `logout.fcgi`, `session_is_valid.fcgi`: sessões com expiração
+  por inatividade (requisições com sessão inválida/expirada recebem 401);
+- `load_objects.fcgi`: `where` (igualdade e operadores =, !=, <, <=, >, >=,
+  IN, NOT IN, LIKE), `order` (campos + "descending"), `limit`, `offset` e
+  `fields` sobre `access_logs`, `access_events`, `users`, `groups` e
+  `user_groups`;
+- `create_objects.fcgi`, `modify_objects.fcgi`, `destroy_objects.fcgi`: sem
+  `where`, a alteração vale para todas as linhas do objeto (como no
+  equipamento);
+- `get_configuration.fcgi`: seções/chaves pedidas (ou tudo);
+- monitor online: com `push_url`, cada passagem é notificada por POST em
+  `<push_url>/dao` (access_log inserido) e `<push_url>/catra_event` (giro),
+  com `Authorization: Bearer <push_token>` quando houver token.
+
+Latência (média + jitter), erros 500, timeouts, 401 espontâneos e
+indisponibilidade são configuráveis e podem ser alterados em execução via
+`POST /simulator/config`. Fluxos de eventos (ex: troca de turno) são gerados
+por `shift_change_burst`/`steady_traffic` e reproduzidos por `ScenarioPlayer`.
+
+Uso em processo (benchmarks/testes de integração):
+
+    simulator = DeviceSimulator(SimulatorConfig(latency_ms=20))
+    simulator.state.seed_users(500)
+    simulator.start()            # simulator.host / simulator.port
+    ...
+    simulator.stop()
+
+Ou pelo comando `python manage.py run_device_simulator`.
+"""
+import bisect
+import fnmatch
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+OBJECTS = ('access_logs', 'access_events', 'users', 'groups', 'user_groups')
+
+# Códigos de evento do access_logs
+EVENT_AUTHORIZED = 7
+EVENT_NOT_IDENTIFIED = 3
+EVENT_DENIED = 6
+EVENT_GIVE_UP = 13
+
+PORTAL_ENTRY = 1
+PORTAL_EXIT = 2
+
+
+@dataclass
+class SimulatorConfig:
+    """Comportamento do simulador (alterável em execução)."""
+
+    login: str = 'admin'
+    password: str = 'admin'
+    session_ttl: float = 600.0          # segundos de inatividade até a sessão expirar
+    latency_ms: float = 0.0             # latência média por requisição
+    jitter_ms: float = 0.0              # variação uniforme (+/-) da latência
+    failure_rate: float = 0.0           # probabilidade de responder 500
+    timeout_rate: float = 0.0           # probabilidade de "travar" por timeout_seconds
+    timeout_seconds: float = 30.0
+    session_drop_rate: float = 0.0      # probabilidade de invalidar a sessão (401)
+    down: bool = False                  # responde 503 a tudo (exceto /simulator/*)
+    time_offset_seconds: int = -10800   # relógio local do equipamento (UTC-3) em epoch
+    device_id: int = 1
+    catra_role: str = '1'
+    push_url: str = ''                  # monitor online (ex: http://127.0.0.1:8000/api/v1/logs/push)
+    push_token: str = ''                # DEVICE_PUSH_TOKEN, enviado no header Authorization
+
+    def update(self, values: Dict):
+        for key, value in values.items():
+            if not hasattr(self, key):
+                raise ValueError(f"Configuração desconhecida: {key}")
+            current = getattr(self, key)
+            setattr(self, key, type(current)(value) if current is not None else value)
+
+
+class DeviceState:
+    """Tabelas em memória do equipamento."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, List[Dict]] = {name: [] for name in OBJECTS}
+        self.next_ids: Dict[str, int] = {name: 1 for name in OBJECTS}
+        self.sessions: Dict[str, float] = {}
+        # Alterações feitas via create/modify/destroy_objects (com horário), para medições
+        self.journal = deque(maxlen=100000)
+        self.configuration: Dict[str, Dict] = {
+            'general': {'online': '0', 'local_identification': '1', 'language': 'pt_BR'},
+            'catra': {'anti_passback': '0', 'daily_reset': '0', 'gateway': 'clockwise'},
+            'sec_box': {'catra_role': '1'},
+        }
+
+    # ------------------------------------------------------------------
+    # Dados
+    # ------------------------------------------------------------------
+
+    def insert(self, name: str, values: Dict) -> int:
+        with self.lock:
+            row = dict(values)
+            if name != 'user_groups':
+                row['id'] = row.get('id') or self.next_ids[name]
+                self.next_ids[name] = max(self.next_ids[name], row['id'] + 1)
+                table = self.tables[name]
+                if table and table[-1]['id'] > row['id']:
+                    # Mantém a tabela ordenada por id (busca binária em load_objects)
+                    ids = [item['id'] for item in table]
+                    table.insert(bisect.bisect_left(ids, row['id']), row)
+                else:
+                    table.append(row)
+                return row['id']
+            self.tables[name].append(row)
+            return 0
+
+    def seed_groups(self, groups: Iterable[Dict]):
+        for group in groups:
+            self.insert('groups', group)
+
+    def seed_users(self, count: int, group_id: Optional[int] = 1, first_id: int = 1):
+        """Cria usuários sintéticos (e o vínculo com group_id)."""
+        if group_id and not any(g['id'] == group_id for g in self.tables['groups']):
+            self.insert('groups', {'id': group_id, 'name': f'Grupo {group_id}'})
+        for user_id in range(first_id, first_id + count):
+            self.insert('users', {
+                'id': user_id, 'name': f'Usuário Simulado {user_id}',
+                'registration': str(user_id), 'password': '', 'salt': '',
+            })
+            if group_id:
+                self.insert('user_groups', {'user_id': user_id, 'group_id': group_id})
+
+    def seed_from_database(self):
+        """Copia funcionários, grupos e vínculos do banco local."""
+        from apps.employees.models import Employee, EmployeeGroup
+
+        for group in EmployeeGroup.objects.filter(device_group_id__isnull=False):
+            self.insert('groups', {'id': group.device_group_id, 'name': group.name})
+        for employee in Employee.objects.select_related('group').iterator():
+            self.insert('users', {
+                'id': employee.device_id, 'name': employee.name,
+                'registration': employee.employee_code or '', 'password': '', 'salt': '',
+            })
+            if employee.group and employee.group.device_group_id:
+                self.insert('user_groups', {
+                    'user_id': employee.device_id, 'group_id': employee.group.device_group_id,
+                })
+
+    def record_change(self, action: str, name: str, values, conditions: Dict, changes: int):
+        self.journal.append({
+            'at': time.time(), 'action': action, 'object': name,
+            'values': values, 'where': conditions, 'changes': changes,
+        })
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            return {name: len(rows) for name, rows in self.tables.items()}
+
+    # ------------------------------------------------------------------
+    # Sessões
+    # ------------------------------------------------------------------
+
+    def create_session(self) -> str:
+        token = secrets.token_hex(12)
+        with self.lock:
+            self.sessions[token] = time.monotonic()
+        return token
+
+    def touch_session(self, token: Optional[str], ttl: float) -> bool:
+        """Valida a sessão e renova o prazo de inatividade."""
+        now = time.monotonic()
+        with self.lock:
+            last = self.sessions.get(token)
+            if last is None:
+                return False
+            if now - last > ttl:
+                del self.sessions[token]
+                return False
+            self.sessions[token] = now
+            return True
+
+    def drop_session(self, token: Optional[str]):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+    def expire_sessions(self) -> int:
+        with self.lock:
+            count = len(self.sessions)
+            self.sessions.clear()
+            return count
+
+
+# ----------------------------------------------------------------------
+# Consultas (where / order / limit)
+# ----------------------------------------------------------------------
+
+def _compare(value, condition) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for operator, expected in condition.items():
+        op = operator.upper()
+        if op == '=' and not value == expected:
+            return False
+        if op == '!=' and not value != expected:
+            return False
+        if op in ('<', '<=', '>', '>='):
+            if value is None:
+                return False
+            if op == '<' and not value < expected:
+                return False
+            if op == '<=' and not value <= expected:
+                return False
+            if op == '>' and not value > expected:
+                return False
+            if op == '>=' and not value >= expected:
+                return False
+        if op == 'IN' and value not in expected:
+            return False
+        if op == 'NOT IN' and value in expected:
+            return False
+        if op == 'LIKE' and not fnmatch.fnmatchcase(str(value), str(expected).replace('%', '*').replace('_', '?')):
+            return False
+    return True
+
+
+def _matches(row: Dict, conditions: Dict) -> bool:
+    return all(_compare(row.get(key), condition) for key, condition in conditions.items())
+
+
+def _id_range_start(rows: List[Dict], conditions: Dict) -> int:
+    """Posição inicial pela condição de id (tabelas ordenadas por id)."""
+    condition = conditions.get('id')
+    if not isinstance(condition, dict) or not rows or 'id' not in rows[0]:
+        return 0
+    ids = [row['id'] for row in rows]
+    if '>' in condition:
+        return bisect.bisect_right(ids, condition['>'])
+    if '>=' in condition:
+        return bisect.bisect_left(ids, condition['>='])
+    return 0
+
+
+def select(state: DeviceState, name: str, request: Dict) -> List[Dict]:
+    conditions = (request.get('where') or {}).get(name, {})
+    with state.lock:
+        rows = state.tables[name]
+        rows = rows[_id_range_start(rows, conditions):]
+        result = [dict(row) for row in rows if _matches(row, conditions)]
+
+    order = request.get('order') or []
+    if isinstance(order, str):
+        order = [order]
+    descending = any(str(item).lower() == 'descending' for item in order)
+    keys = [item for item in order if str(item).lower() not in ('descending', 'ascending')]
+    if keys:
+        result.sort(
+            key=lambda row: tuple((row.get(key) is None, row.get(key) or 0) for key in keys),
+            reverse=descending,
+        )
+    elif descending:
+        result.reverse()
+
+    offset = int(request.get('offset') or 0)
+    limit = request.get('limit')
+    result = result[offset:offset + int(limit)] if limit is not None else result[offset:]
+
+    fields = request.get('fields')
+    if fields:
+        result = [{key: row.get(key) for key in fields} for row in result]
+    return result
+
+
+# ----------------------------------------------------------------------
+# Fluxos de eventos
+# ----------------------------------------------------------------------
+
+@dataclass(order=True)
+class ScriptedEvent:
+    """Passagem na catraca agendada (offset em segundos desde o início)."""
+
+    offset: float
+    user_id: int = field(compare=False)
+    portal_id: int = field(compare=False, default=PORTAL_ENTRY)
+    event: int = field(compare=False, default=EVENT_AUTHORIZED)
+    turn: bool = field(compare=False, default=True)
+
+
+def shift_change_burst(user_ids: List[int], start: float = 0.0, duration: float = 600.0,
+                       exits: Optional[List[int]] = None, denied_rate: float = 0.02,
+                       give_up_rate: float = 0.01, unknown_rate: float = 0.01,
+                       seed: Optional[int] = None) -> List[ScriptedEvent]:
+    """
+    Troca de turno: o turno que sai (exits) passa pelo portal de saída e o que
+    entra (user_ids) pelo de entrada, com chegadas concentradas no meio da
+    janela (distribuição triangular), algumas negações, desistências e faces
+    não identificadas.
+    """
+    rng = random.Random(seed)
+    events = []
+
+    def arrivals(users, portal):
+        for user_id in users:
+            offset = start + rng.triangular(0, duration, duration / 2)
+            roll = rng.random()
+            if roll < unknown_rate:
+                events.append(ScriptedEvent(offset, 0, portal, EVENT_NOT_IDENTIFIED, turn=False))
+                continue
+            if roll < unknown_rate + denied_rate:
+                events.append(ScriptedEvent(offset, user_id, portal, EVENT_DENIED, turn=False))
+                continue
+            if roll < unknown_rate + denied_rate + give_up_rate:
+                events.append(ScriptedEvent(offset, user_id, portal, EVENT_GIVE_UP, turn=False))
+                continue
+            events.append(ScriptedEvent(offset, user_id, portal))
+
+    arrivals(exits or [], PORTAL_EXIT)
+    arrivals(user_ids, PORTAL_ENTRY)
+    return sorted(events)
+
+
+def steady_traffic(user_ids: List[int], rate_per_minute: float, duration: float,
+                   start: float = 0.0, seed: Optional[int] = None) -> List[ScriptedEvent]:
+    """Tráfego constante (chegadas de Poisson) alternando entrada/saída por usuário."""
+    rng = random.Random(seed)
+    inside = set()
+    events = []
+    offset = start
+    rate = rate_per_minute / 60.0
+    while rate > 0:
+        offset += rng.expovariate(rate)
+        if offset > start + duration:
+            break
+        user_id = rng.choice(user_ids)
+        portal = PORTAL_EXIT if user_id in inside else PORTAL_ENTRY
+        inside.symmetric_difference_update({user_id})
+        events.append(ScriptedEvent(offset, user_id, portal))
+    return events
+
+
+def record_passage(state: DeviceState, config: SimulatorConfig, event: ScriptedEvent,
+                   at: Optional[float] = None) -> int:
+    """Grava o access_log (e o giro em access_events) de uma passagem."""
+    now = int((at if at is not None else time.time()) + config.time_offset_seconds)
+    log_id = state.insert('access_logs', {
+        'time': now,
+        'event': event.event,
+        'device_id': config.device_id,
+        'identifier_id': 0,
+        'user_id': event.user_id,
+        'portal_id': event.portal_id,
+        'identification_rule_id': 0,
+        'card_value': 0,
+        'qrcode_value': '',
+        'pin_value': '',
+        'confidence': 1800 if event.user_id else 0,
+        'mask': 0,
+        'log_type_id': -1,
+    })
+    turn_type = 'TURN_RIGHT' if event.portal_id == PORTAL_ENTRY else 'TURN_LEFT'
+    if event.turn:
+        state.insert('access_events', {
+            'event': 'catra',
+            'type': turn_type,
+            'identifier': str(event.user_id),
+            'device_id': config.device_id,
+            'uuid': secrets.token_hex(8),
+            'timestamp': now + 1,
+        })
+
+    if config.push_url:
+        row = next(row for row in reversed(state.tables['access_logs']) if row['id'] == log_id)
+        notifications = [('dao', {
+            'object_changes': [{
+                'object': 'access_logs', 'type': 'inserted',
+                # O equipamento envia os valores como texto
+                'values': {key: str(value) for key, value in row.items()},
+            }],
+            'device_id': config.device_id,
+        })]
+        if event.turn:
+            notifications.append(('catra_event', {
+                'event': {'type': 8 if turn_type == 'TURN_RIGHT' else 7,
+                          'name': turn_type.replace('_', ' '), 'time': now + 1},
+                'device_id': config.device_id,
+            }))
+        threading.Thread(
+            target=push_notifications, args=(config.push_url, notifications, config.push_token), daemon=True,
+        ).start()
+    return log_id
+
+
+def push_notifications(push_url: str, notifications: List, push_token: str = ''):
+    """Envia notificações do monitor online, em ordem."""
+    headers = {'Content-Type': 'application/json'}
+    if push_token:
+        headers['Authorization'] = f'Bearer {push_token}'
+    for notification, payload in notifications:
+        request = urllib.request.Request(
+            f"{push_url.rstrip('/')}/{notification}", data=json.dumps(payload).encode(),
+            headers=headers, method='POST',
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            logger.warning(f"Falha ao enviar notificação {notification} para {push_url}: {e}")
+
+
+class ScenarioPlayer:
+    """Reproduz eventos agendados em tempo real (ou acelerado por speed)."""
+
+    def __init__(self, state: DeviceState, config: SimulatorConfig, events: List[ScriptedEvent],
+                 speed: float = 1.0):
+        self.state = state
+        self.config = config
+        self.events = sorted(events)
+        self.speed = max(speed, 0.001)
+        self.played = 0
+        self.emitted: Dict[int, float] = {}     # id do access_log -> horário real da passagem
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        started = time.monotonic()
+        for event in self.events:
+            delay = event.offset / self.speed - (time.monotonic() - started)
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+            if self._stop_event.is_set():
+                break
+            log_id = record_passage(self.state, self.config, event)
+            self.emitted[log_id] = time.time()
+            self.played += 1
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    @property
+    def finished(self) -> bool:
+        return self.played >= len(self.events)
+
+
+# ----------------------------------------------------------------------
+# Servidor HTTP
+# ----------------------------------------------------------------------
+
+class DeviceRequestHandler(BaseHTTPRequestHandler):
+    """Endpoints .fcgi do equipamento e de controle do simulador."""
+
+    server_version = 'IDFaceSimulator/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def simulator(self) -> 'DeviceSimulator':
+        return self.server.simulator
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    # ------------------------------------------------------------------
+
+    def _send(self, status: int, payload=None):
+        body = json.dumps(payload if payload is not None else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _inject_faults(self) -> bool:
+        """Latência e falhas configuradas. Retorna True se já respondeu."""
+        config = self.simulator.config
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+        if config.down:
+            self._send(503, {'error': 'Device unavailable'})
+            return True
+        if config.timeout_rate and random.random() < config.timeout_rate:
+            time.sleep(config.timeout_seconds)
+        if config.failure_rate and random.random() < config.failure_rate:
+            self._send(500, {'error': 'Internal error (simulated)'})
+            return True
+        return False
+
+    def _session_valid(self, token) -> bool:
+        config = self.simulator.config
+        if config.session_drop_rate and random.random() < config.session_drop_rate:
+            self.simulator.state.drop_session(token)
+            return False
+        return self.simulator.state.touch_session(token, config.session_ttl)
+
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/simulator/state':
+            self._send(200, self.simulator.get_status())
+        elif path == '/':
+            if self.simulator.config.down:
+                self._send(503, {'error': 'Device unavailable'})
+            else:
+                self._send(200, {'device': 'IDFace simulator'})
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        with self.simulator.state.lock:
+            self.simulator.requests += 1
+        try:
+            body = self._read_json()
+        except ValueError:
+            self._send(400, {'error': 'Invalid JSON'})
+            return
+
+        if path.startswith('/simulator/'):
+            self._handle_control(path, body)
+            return
+
+        if self._inject_faults():
+            return
+
+        if path == '/login.fcgi':
+            config = self.simulator.config
+            if body.get('login') == config.login and body.get('password') == config.password:
+                self._send(200, {'session': self.simulator.state.create_session()})
+            else:
+                self._send(401, {'error': 'Invalid login or password', 'code': 1})
+            return
+
+        token = parse_qs(parsed.query).get('session', [None])[0]
+        if path == '/session_is_valid.fcgi':
+            self._send(200, {'session_is_valid': self._session_valid(token)})
+            return
+        if not self._session_valid(token):
+            self._send(401, {'error': 'Session is not valid', 'code': 1})
+            return
+
+        handlers = {
+            '/logout.fcgi': self._logout,
+            '/load_objects.fcgi': self._load_objects,
+            '/create_objects.fcgi': self._create_objects,
+            '/modify_objects.fcgi': self._modify_objects,
+            '/destroy_objects.fcgi': self._destroy_objects,
+            '/get_configuration.fcgi': self._get_configuration,
+        }
+        handler = handlers.get(path)
+        if handler is None:
+            self._send(404, {'error': 'Not found'})
+            return
+        try:
+            status, payload = handler(token, body)
+        except (KeyError, TypeError, ValueError) as e:
+            status, payload = 400, {'error': str(e)}
+        self._send(status, payload)
+
+    # ------------------------------------------------------------------
+    # Endpoints do equipamento
+    # ------------------------------------------------------------------
+
+    def _object_name(self, body):
+        name = body.get('object')
+        if name not in OBJECTS:
+            raise ValueError(f"Objeto inválido: {name}")
+        return name
+
+    def _logout(self, token, body):
+        self.simulator.state.drop_session(token)
+        return 200, {}
+
+    def _load_objects(self, token, body):
+        name = self._object_name(body)
+        return 200, {name: select(self.simulator.state, name, body)}
+
+    def _create_objects(self, token, body):
+        name = self._object_name(body)
+        values = body.get('values') or []
+        if isinstance(values, dict):
+            values = [values]
+        ids = [self.simulator.state.insert(name, value) for value in values]
+        self.simulator.state.record_change('create', name, values, {}, len(ids))
+        return 200, {'ids': ids}
+
+    def _modify_objects(self, token, body):
+        name = self._object_name(body)
+        values = body.get('values') or {}
+        conditions = (body.get('where') or {}).get(name, {})
+        state = self.simulator.state
+        changes = 0
+        with state.lock:
+            for row in state.tables[name]:
+                if _matches(row, conditions):
+                    row.update(values)
+                    changes += 1
+            state.record_change('modify', name, values, conditions, changes)
+        return 200, {'changes': changes}
+
+    def _destroy_objects(self, token, body):
+        name = self._object_name(body)
+        conditions = (body.get('where') or {}).get(name, {})
+        state = self.simulator.state
+        with state.lock:
+            before = len(state.tables[name])
+            state.tables[name] = [row for row in state.tables[name] if not _matches(row, conditions)]
+            changes = before - len(state.tables[name])
+            state.record_change('destroy', name, None, conditions, changes)
+        return 200, {'changes': changes}
+
+    def _get_configuration(self, token, body):
+        configuration = self.simulator.state.configuration
+        configuration['sec_box']['catra_role'] = self.simulator.config.catra_role
+        if not body:
+            return 200, configuration
+        result = {}
+        for section, keys in body.items():
+            values = configuration.get(section, {})
+            result[section] = {key: values[key] for key in keys if key in values} if keys else dict(values)
+        return 200, result
+
+    # ------------------------------------------------------------------
+    # Controle do simulador
+    # ------------------------------------------------------------------
+
+    def _handle_control(self, path, body):
+        simulator = self.simulator
+        try:
+            if path == '/simulator/config':
+                simulator.config.update(body)
+                self._send(200, asdict(simulator.config))
+            elif path == '/simulator/events':
+                events = body.get('events') or [body]
+                ids = [
+                    record_passage(simulator.state, simulator.config, ScriptedEvent(
+                        0, int(item['user_id']), int(item.get('portal_id', PORTAL_ENTRY)),
+                        int(item.get('event', EVENT_AUTHORIZED)), bool(item.get('turn', True)),
+                    ))
+                    for item in events
+                ]
+                self._send(200, {'ids': ids})
+            elif path == '/simulator/expire_sessions':
+                self._send(200, {'expired': simulator.state.expire_sessions()})
+            else:
+                self._send(404, {'error': 'Not found'})
+        except (KeyError, TypeError, ValueError) as e:
+            self._send(400, {'error': str(e)})
+
+
+class DeviceSimulator:
+    """Servidor do simulador (em thread própria ou bloqueante)."""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, state: Optional[DeviceState] = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.config = config or SimulatorConfig()
+        self.state = state or DeviceState()
+        self.requests = 0
+        self.started_at = None
+        self.server = ThreadingHTTPServer((host, port), DeviceRequestHandler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self.server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> 'DeviceSimulator':
+        """Inicia o servidor em uma thread daemon."""
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.started_at = time.time()
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def get_status(self) -> Dict:
+        return {
+            'base_url': self.base_url,
+            'requests': self.requests,
+            'sessions': len(self.state.sessions),
+            'objects': self.state.counts(),
+            'config': asdict(self.config),
+        }
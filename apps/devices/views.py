@@ -10,6 +10,7 @@ from django.core.cache import cache
 from .models import Device, DeviceLog, DeviceSession
 from .serializers import DeviceSerializer, DeviceLogSerializer, DeviceSessionSerializer
 from .services import device_connection_service, device_data_service, device_monitoring_service
+from .circuit_breaker import circuit_breakers
 from apps.core.utils import CacheUtils
 import logging
 
@@ -435,6 +436,7 @@ def get_all_devices_status(request):
     try:
         devices = Device.objects.all()
         devices_status = []
+        circuits = circuit_breakers.get_status()
         
         for device in devices:
             # Verificar se dispositivo está conectado
@@ -460,6 +462,8 @@ def get_all_devices_status(request):
                 'error_count': device.error_count,
                 'success_count': device.success_count,
                 'connection_success_rate': device.connection_success_rate,
+                # Estado do circuit breaker neste processo (None se ainda não houve chamada)
+                'circuit': circuits.get(device.base_url),
                 'active_session': {
                     'id': active_session.id if active_session else None,
                     'started_at': active_session.started_at.isoformat() if active_session else None,
@@ -4,7 +4,8 @@ Admin para sessões de funcionários.
 from django.contrib import admin
 from django.utils.html import format_html
 from django import forms
-from .models import EmployeeSession
+from .models import EmployeeSession, SessionHistory
+from .history import session_history
 from apps.core.utils import TimezoneUtils
 from apps.core.models import SystemConfiguration
 
@@ -108,6 +109,19 @@ class EmployeeSessionAdmin(admin.ModelAdmin):
             # Mostrar todas as sessões incluindo concluídas
             return qs
     
+    def delete_model(self, request, obj):
+        """Registra a sessão removida no histórico como descartada."""
+        if obj.state != 'completed':
+            session_history.record(obj, outcome='discarded')
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        """Registra as sessões removidas em lote no histórico como descartadas."""
+        session_history.record_many(
+            queryset.exclude(state='completed').select_related('employee'), outcome='discarded'
+        )
+        super().delete_queryset(request, queryset)
+    
     def changelist_view(self, request, extra_context=None):
         """Adiciona contexto para mostrar opção de visualizar concluídas."""
         extra_context = extra_context or {}
@@ -213,4 +227,37 @@ class EmployeeSessionAdmin(admin.ModelAdmin):
         if obj.block_start:
             return TimezoneUtils.format_datetime(obj.block_start)
         return '-'
-    block_start_display.short_description = 'Início do Bloqueio'
\ No newline at end of file
+    block_start_display.short_description = 'Início do Bloqueio'
+
+
+@admin.register(SessionHistory)
+class SessionHistoryAdmin(admin.ModelAdmin):
+    """Histórico de sessões encerradas (somente leitura)."""
+    list_display = [
+        'id', 'user_id', 'employee', 'outcome', 'first_access_display',
+        'block_start_display', 'closed_at_display', 'work_duration_minutes', 'rest_duration_minutes'
+    ]
+    list_filter = ['outcome', 'first_access']
+    search_fields = ['employee__name', 'user_id']
+    date_hierarchy = 'first_access'
+    list_select_related = ['employee']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def first_access_display(self, obj):
+        return TimezoneUtils.format_datetime(obj.first_access)
+    first_access_display.short_description = 'Primeiro Acesso'
+    
+    def block_start_display(self, obj):
+        if obj.block_start:
+            return TimezoneUtils.format_datetime(obj.block_start)
+        return '-'
+    block_start_display.short_description = 'Início do Bloqueio'
+    
+    def closed_at_display(self, obj):
+        return TimezoneUtils.format_datetime(obj.closed_at)
+    closed_at_display.short_description = 'Encerrada em'
@@ -0,0 +1,90 @@
+"""
+Gravação do histórico de sessões encerradas (SessionHistory).
+
+As sessões finalizadas são removidas de EmployeeSession; antes disso o
+serviço registra uma linha compacta no histórico. Dentro de
+`session_history.batch()` (ex: um ciclo de enforce_session_timeouts) os
+registros ficam num buffer da thread e são gravados com um único
+bulk_create no fim do bloco; fora dele cada registro é gravado na hora.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterable
+from apps.core.registry import service_registry
+from apps.core.utils import TimezoneUtils
+from .models import SessionHistory
+
+logger = logging.getLogger(__name__)
+
+
+class SessionHistoryRecorder:
+    """Acumula sessões encerradas e grava o histórico em lotes."""
+
+    def __init__(self):
+        self.batch_size = 500
+        self._local = threading.local()
+
+    def _state(self):
+        if not hasattr(self._local, 'buffer'):
+            self._local.buffer = []
+            self._local.depth = 0
+        return self._local
+
+    @contextmanager
+    def batch(self):
+        """Agrupa os registros do bloco em um único bulk_create."""
+        state = self._state()
+        state.depth += 1
+        try:
+            yield self
+        finally:
+            state.depth -= 1
+            if state.depth == 0:
+                self.flush()
+
+    def entry_for(self, session, outcome: str = 'completed', closed_at=None) -> SessionHistory:
+        """Linha de histórico para uma EmployeeSession (não gravada)."""
+        return SessionHistory(
+            employee_id=session.employee_id,
+            user_id=session.employee.device_id,
+            first_access=session.first_access,
+            block_start=session.block_start,
+            return_time=session.return_time,
+            closed_at=closed_at or TimezoneUtils.get_utc_now(),
+            work_duration_minutes=session.work_duration_minutes,
+            rest_duration_minutes=session.rest_duration_minutes,
+            outcome=outcome,
+        )
+
+    def record(self, session, outcome: str = 'completed', closed_at=None):
+        """Registra uma sessão encerrada (gravada no fim do lote, se houver)."""
+        self.record_many([session], outcome, closed_at)
+
+    def record_many(self, sessions: Iterable, outcome: str = 'completed', closed_at=None):
+        state = self._state()
+        state.buffer.extend(self.entry_for(session, outcome, closed_at) for session in sessions)
+        if state.depth == 0 or len(state.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Grava o buffer da thread. Falhas são registradas sem interromper o processamento."""
+        state = self._state()
+        entries, state.buffer = state.buffer, []
+        if not entries:
+            return 0
+        try:
+            SessionHistory.objects.bulk_create(entries, batch_size=self.batch_size)
+        except Exception as e:
+            logger.error(f"Erro ao gravar {len(entries)} sessões no histórico: {e}")
+            return 0
+        logger.debug(f"{len(entries)} sessões gravadas no histórico")
+        return len(entries)
+
+    def pending(self) -> int:
+        """Registros aguardando gravação na thread atual."""
+        return len(self._state().buffer)
+
+
+# Instância global do serviço
+session_history = service_registry.register('employee_sessions.session_history', SessionHistoryRecorder)
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_employee_alert_type'),
+        ('employee_sessions', '0004_alter_employeesession_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField(verbose_name='ID do Usuário')),
+                ('first_access', models.DateTimeField(verbose_name='Primeiro Acesso')),
+                ('block_start', models.DateTimeField(blank=True, null=True, verbose_name='Início do Bloqueio')),
+                ('return_time', models.DateTimeField(blank=True, null=True, verbose_name='Horário de Retorno')),
+                ('closed_at', models.DateTimeField(verbose_name='Encerrada em')),
+                ('work_duration_minutes', models.PositiveIntegerField(verbose_name='Duração de Trabalho (min)')),
+                ('rest_duration_minutes', models.PositiveIntegerField(verbose_name='Duração de Interjornada (min)')),
+                ('outcome', models.CharField(choices=[('completed', 'Interjornada Cumprida'), ('ended', 'Encerrada Manualmente'), ('discarded', 'Descartada')], max_length=10, verbose_name='Resultado')),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='session_history', to='employees.employee', verbose_name='Funcionário')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Sessão',
+                'verbose_name_plural': 'Histórico de Sessões',
+                'ordering': ['-first_access'],
+                'indexes': [models.Index(fields=['employee', 'first_access'], name='employee_se_employe_67d695_idx'), models.Index(fields=['user_id', 'first_access'], name='employee_se_user_id_0c3874_idx'), models.Index(fields=['first_access'], name='employee_se_first_a_7befc8_idx'), models.Index(fields=['closed_at'], name='employee_se_closed__9646ff_idx'), models.Index(fields=['outcome', 'first_access'], name='employee_se_outcome_310745_idx')],
+            },
+        ),
+    ]
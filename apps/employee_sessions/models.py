@@ -2,6 +2,7 @@
 Modelos para sessões de funcionários.
 """
 import logging
+from datetime import timedelta
 from django.db import models
 from apps.employees.models import Employee
 from apps.core.utils import TimezoneUtils
@@ -93,7 +94,33 @@ class EmployeeSession(models.Model):
         if self.return_time:
             return TimezoneUtils.format_datetime(self.return_time)
         return None
-    
+
+    @classmethod
+    def time_limit_filters(cls, now):
+        """
+        Filtros das sessões abertas cujo tempo já terminou até `now`.
+
+        Cada sessão guarda as próprias durações efetivas, mas são poucos os
+        valores distintos (um por regra): uma única consulta lista as
+        combinações e o corte sobre first_access é montado em SQL para cada
+        uma, sem carregar as sessões ainda dentro do prazo. Mesmo critério de
+        apps.interjornada.rules.is_work_over.
+
+        Returns:
+            tuple: (Q do fim do trabalho, Q do fim de trabalho + descanso)
+        """
+        work_over = rest_over = models.Q(pk__in=[])
+        durations = cls.objects.filter(state__in=['active', 'pending_rest']).order_by().values_list(
+            'work_duration_minutes', 'rest_duration_minutes'
+        ).distinct()
+        for work, rest in durations:
+            work_over |= models.Q(work_duration_minutes=work, first_access__lte=now - timedelta(minutes=work))
+            rest_over |= models.Q(
+                work_duration_minutes=work, rest_duration_minutes=rest,
+                first_access__lte=now - timedelta(minutes=work + rest),
+            )
+        return work_over, rest_over
+
     def can_access(self):
         """
         Verifica se o funcionário pode acessar.
@@ -174,6 +201,10 @@ class EmployeeSession(models.Model):
             
             logger.info(f"Iniciando limpeza da sessão {self.id} do funcionário {self.employee.name}")
             
+            # Registrar no histórico antes de limpar os campos da interjornada
+            from .history import session_history
+            session_history.record(self, outcome='ended')
+            
             # Se o funcionário está em interjornada (blacklist), remover da blacklist
             if group_service.is_in_blacklist(self.employee):
                 logger.info(f"Funcionário {self.employee.name} está na blacklist - removendo...")
@@ -252,4 +283,65 @@ class EmployeeSession(models.Model):
     def end_session(self):
         """Finaliza a sessão."""
         self.state = 'completed'
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class SessionHistory(models.Model):
+    """
+    Sessão encerrada (histórico append-only, uma linha por sessão).
+    
+    Gravada em lote pelo SessionHistoryRecorder quando a sessão é finalizada
+    (fim da interjornada, conclusão manual ou descarte), no lugar de
+    reconstruir o histórico a partir dos logs ou de SystemLog.details.
+    """
+    
+    OUTCOME_CHOICES = [
+        ('completed', 'Interjornada Cumprida'),
+        ('ended', 'Encerrada Manualmente'),
+        ('discarded', 'Descartada'),
+    ]
+    
+    employee = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='session_history', verbose_name="Funcionário",
+    )
+    # ID na catraca no momento do encerramento (permanece se o funcionário for removido)
+    user_id = models.IntegerField(verbose_name="ID do Usuário")
+    
+    first_access = models.DateTimeField(verbose_name="Primeiro Acesso")
+    block_start = models.DateTimeField(null=True, blank=True, verbose_name="Início do Bloqueio")
+    return_time = models.DateTimeField(null=True, blank=True, verbose_name="Horário de Retorno")
+    closed_at = models.DateTimeField(verbose_name="Encerrada em")
+    
+    work_duration_minutes = models.PositiveIntegerField(verbose_name="Duração de Trabalho (min)")
+    rest_duration_minutes = models.PositiveIntegerField(verbose_name="Duração de Interjornada (min)")
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES, verbose_name="Resultado")
+    
+    class Meta:
+        verbose_name = "Histórico de Sessão"
+        verbose_name_plural = "Histórico de Sessões"
+        ordering = ['-first_access']
+        indexes = [
+            models.Index(fields=['employee', 'first_access']),
+            models.Index(fields=['user_id', 'first_access']),
+            models.Index(fields=['first_access']),
+            models.Index(fields=['closed_at']),
+            models.Index(fields=['outcome', 'first_access']),
+        ]
+    
+    def __str__(self):
+        return f"Histórico {self.user_id} - {TimezoneUtils.format_datetime(self.first_access)} ({self.get_outcome_display()})"
+    
+    @property
+    def worked_minutes(self):
+        """Minutos entre o primeiro acesso e o início da interjornada."""
+        if not self.block_start:
+            return None
+        return (self.block_start - self.first_access).total_seconds() / 60
+    
+    @property
+    def rested_minutes(self):
+        """Minutos entre o início da interjornada e o encerramento."""
+        if not self.block_start:
+            return None
+        return (self.closed_at - self.block_start).total_seconds() / 60
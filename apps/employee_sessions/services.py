@@ -4,15 +4,20 @@ Serviços para gerenciamento de sessões de funcionários.
 import logging
 from typing import Dict, List, Optional
 from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from django.conf import settings
 from datetime import datetime, timedelta
 
 from .models import EmployeeSession
+from .history import session_history
 from apps.employees.models import Employee
 from apps.employees.group_service import group_service
 from apps.core.models import SystemConfiguration
+from apps.interjornada import rules
+from apps.interjornada.policy import policy_index
 from apps.logs.models import SystemLog
+from apps.core.registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -81,16 +86,16 @@ class SessionService:
             logger.info(f"Funcionário {employee.name} já tem sessão ativa - Reutilizando sessão existente")
             return existing_session
         
-        # Obter configurações do sistema
-        config = self.get_system_config()
+        # Durações efetivas (funcionário > grupo > regra > configuração)
+        policy = policy_index.resolve(employee)
         
         # Criar nova sessão
         session = EmployeeSession.objects.create(
             employee=employee,
             state='active',
             first_access=access_time,
-            work_duration_minutes=config.liberado_minutes,
-            rest_duration_minutes=config.bloqueado_minutes,
+            work_duration_minutes=policy.work_minutes,
+            rest_duration_minutes=policy.rest_minutes,
             created_at=access_time,
             updated_at=access_time
         )
@@ -116,15 +121,12 @@ class SessionService:
                 logger.warning(f"Funcionário {employee.name} não tem sessão ativa")
                 return False
             
-            # Verificar se já atingiu tempo mínimo de trabalho
-            config = self.get_system_config()
+            # Verificar se já atingiu tempo mínimo de trabalho (durações da sessão)
             current_time = timezone.now()
-            session_age = current_time - session.first_access
-            work_duration = timedelta(minutes=config.liberado_minutes)
-            
-            if session_age < work_duration:
-                remaining_time = work_duration - session_age
-                remaining_minutes = remaining_time.total_seconds() / 60
+            remaining_minutes = rules.remaining_work_minutes(
+                session.first_access, session.work_duration_minutes, current_time,
+            )
+            if remaining_minutes is not None:
                 logger.warning(f"Funcionário {employee.name} tentou sair antes do tempo mínimo - Ainda faltam {remaining_minutes:.1f} minutos")
                 return False
             
@@ -133,8 +135,7 @@ class SessionService:
                 block_start_time = current_time
             
             # Calcular horário de retorno
-            rest_duration = timedelta(minutes=config.bloqueado_minutes)
-            return_time = block_start_time + rest_duration
+            return_time = rules.rest_return_time(block_start_time, session.rest_duration_minutes)
             
             # Atualizar sessão
             session.state = 'blocked'
@@ -179,7 +180,8 @@ class SessionService:
                 logger.warning(f"Falha ao restaurar {employee.name} do blacklist - Continuando com liberação local")
                 # Continuar mesmo se falhar no grupo - a liberação local é mais importante
             
-            # Remover sessão (interjornada finalizada)
+            # Registrar no histórico e remover sessão (interjornada finalizada)
+            session_history.record(session)
             session.delete()
             
             # Emitir evento de interjornada finalizada
@@ -213,26 +215,29 @@ class SessionService:
             ).select_related('employee')
             
             count = 0
-            for session in expired_sessions:
-                try:
-                    logger.info(f"Sessão expirada detectada para {session.employee.name} - removendo automaticamente")
-                    SystemLog.objects.create(
-                        level='INFO',
-                        category='interjornada',
-                        message=f'Sessão de interjornada finalizada automaticamente - {session.employee.name}',
-                        user_id=session.employee.device_id,
-                        user_name=session.employee.name,
-                        details={
-                            'session_id': session.id,
-                            'work_duration': session.work_duration_minutes,
-                            'rest_duration': session.rest_duration_minutes,
-                            'finalized_at': now.isoformat()
-                        }
-                    )
-                    session.delete()
-                    count += 1
-                except Exception as e:
-                    logger.error(f"Erro ao remover sessão expirada de {session.employee.name}: {e}")
+            # Histórico das sessões finalizadas gravado num único lote
+            with session_history.batch():
+                for session in expired_sessions:
+                    try:
+                        logger.info(f"Sessão expirada detectada para {session.employee.name} - removendo automaticamente")
+                        SystemLog.objects.create(
+                            level='INFO',
+                            category='interjornada',
+                            message=f'Sessão de interjornada finalizada automaticamente - {session.employee.name}',
+                            user_id=session.employee.device_id,
+                            user_name=session.employee.name,
+                            details={
+                                'session_id': session.id,
+                                'work_duration': session.work_duration_minutes,
+                                'rest_duration': session.rest_duration_minutes,
+                                'finalized_at': now.isoformat()
+                            }
+                        )
+                        session_history.record(session, closed_at=now)
+                        session.delete()
+                        count += 1
+                    except Exception as e:
+                        logger.error(f"Erro ao remover sessão expirada de {session.employee.name}: {e}")
             
             return count
             
@@ -251,45 +256,48 @@ class SessionService:
                 return_time__lte=now
             ).select_related('employee')
             
-            for session in expired_sessions:
-                try:
-                    logger.info(f"Sessão expirada detectada para {session.employee.name} - liberando automaticamente")
-                    
-                    # CRÍTICO: Restaurar do blacklist antes de deletar a sessão
-                    from apps.employees.group_service import group_service
-                    blacklist_success = group_service.restore_from_blacklist(session.employee)
-                    
-                    SystemLog.objects.create(
-                        level='INFO',
-                        category='interjornada',
-                        message=f'Sessão de interjornada finalizada automaticamente - {session.employee.name}',
-                        user_id=session.employee.device_id,
-                        user_name=session.employee.name,
-                        details={
-                            'session_id': session.id,
-                            'work_duration': session.work_duration_minutes,
-                            'rest_duration': session.rest_duration_minutes,
-                            'finalized_at': now.isoformat(),
-                            'blacklist_restored': blacklist_success
-                        }
-                    )
-                    
-                    # Deletar sessão após restaurar do blacklist
-                    session.delete()
-                    
-                    if blacklist_success:
-                        logger.info(f"Funcionário {session.employee.name} restaurado do blacklist automaticamente")
-                    else:
-                        logger.warning(f"Falha ao restaurar {session.employee.name} do blacklist automaticamente")
+            # Histórico das sessões finalizadas gravado num único lote
+            with session_history.batch():
+                for session in expired_sessions:
+                    try:
+                        logger.info(f"Sessão expirada detectada para {session.employee.name} - liberando automaticamente")
                         
-                except Exception as e:
-                    logger.error(f"Erro ao remover sessão expirada de {session.employee.name}: {e}")
+                        # CRÍTICO: Restaurar do blacklist antes de deletar a sessão
+                        from apps.employees.group_service import group_service
+                        blacklist_success = group_service.restore_from_blacklist(session.employee)
+                        
+                        SystemLog.objects.create(
+                            level='INFO',
+                            category='interjornada',
+                            message=f'Sessão de interjornada finalizada automaticamente - {session.employee.name}',
+                            user_id=session.employee.device_id,
+                            user_name=session.employee.name,
+                            details={
+                                'session_id': session.id,
+                                'work_duration': session.work_duration_minutes,
+                                'rest_duration': session.rest_duration_minutes,
+                                'finalized_at': now.isoformat(),
+                                'blacklist_restored': blacklist_success
+                            }
+                        )
+                        
+                        # Registrar no histórico e deletar sessão após restaurar do blacklist
+                        session_history.record(session, closed_at=now)
+                        session.delete()
+                        
+                        if blacklist_success:
+                            logger.info(f"Funcionário {session.employee.name} restaurado do blacklist automaticamente")
+                        else:
+                            logger.warning(f"Falha ao restaurar {session.employee.name} do blacklist automaticamente")
+                            
+                    except Exception as e:
+                        logger.error(f"Erro ao remover sessão expirada de {session.employee.name}: {e}")
             
             # Verificar sessões ativas que excederam o tempo de acesso livre
-            config = self.get_system_config()
+            # (cada sessão guarda as próprias durações efetivas)
+            work_over, rest_over = EmployeeSession.time_limit_filters(now)
             sessions_pending_exit = EmployeeSession.objects.filter(
-                state='active',
-                first_access__lte=now - timedelta(minutes=config.liberado_minutes)
+                work_over, state='active'
             ).select_related('employee')
             
             for session in sessions_pending_exit:
@@ -304,8 +312,7 @@ class SessionService:
             
             # Verificar sessões pending_rest que excederam o tempo total de trabalho
             sessions_pending_block = EmployeeSession.objects.filter(
-                state='pending_rest',
-                first_access__lte=now - timedelta(minutes=config.liberado_minutes + config.bloqueado_minutes)
+                rest_over, state='pending_rest'
             ).select_related('employee')
             
             for session in sessions_pending_block:
@@ -319,7 +326,7 @@ class SessionService:
                     # Atualizar sessão para bloqueada
                     session.state = 'blocked'
                     session.block_start = now
-                    session.return_time = now + timedelta(minutes=config.bloqueado_minutes)
+                    session.return_time = now + timedelta(minutes=session.rest_duration_minutes)
                     session.save(update_fields=['state', 'block_start', 'return_time'])
                     
                     logger.info(f"Usuário {session.employee.name} bloqueado automaticamente (blacklist: {blacklist_success})")
@@ -327,15 +334,16 @@ class SessionService:
                     logger.error(f"Erro ao bloquear sessão de {session.employee.name}: {e}")
             
             # Garantir que sessões ativas tenham last_access atualizado
-            active_sessions = EmployeeSession.objects.filter(state='active').select_related('employee')
+            active_sessions = EmployeeSession.objects.filter(state='active').filter(
+                Q(last_access__isnull=True) | Q(last_access__lt=F('first_access'))
+            )
             for session in active_sessions:
-                if session.last_access is None or session.last_access < session.first_access:
-                    session.last_access = session.first_access
-                    session.save(update_fields=['last_access'])
+                session.last_access = session.first_access
+                session.save(update_fields=['last_access'])
                     
         except Exception as e:
             logger.error(f"Erro ao aplicar regras de tempo para sessões: {e}")
 
 
 # Instância global do serviço
-session_service = SessionService()
+session_service = service_registry.register('employee_sessions.session_service', SessionService)
@@ -1,3 +1,70 @@
+"""
+Testes do app de sessões de funcionários.
+"""
+from datetime import timedelta
+from unittest import mock
 from django.test import TestCase
+from django.utils import timezone
+from apps.employees.group_service import GroupService
+from apps.employees.models import Employee
+from apps.logs.services import log_monitor_service
+from .models import EmployeeSession
+from .services import session_service
 
-# Create your tests here.
+
+class SessionTimeoutTests(TestCase):
+    """Regras de tempo com as durações gravadas em cada sessão."""
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def session(self, device_id, state, minutes_ago, work, rest=660):
+        employee = Employee.objects.create(device_id=device_id, name=f'Func {device_id}', employee_code=str(device_id))
+        return EmployeeSession.objects.create(
+            employee=employee, state=state, first_access=self.now - timedelta(minutes=minutes_ago),
+            work_duration_minutes=work, rest_duration_minutes=rest,
+        )
+
+    def test_time_limit_filters_use_each_session_duration(self):
+        expired = self.session(1, 'active', minutes_ago=61, work=60)
+        self.session(2, 'active', minutes_ago=61, work=480)
+        at_limit = self.session(3, 'active', minutes_ago=480, work=480)
+        rest_over = self.session(4, 'pending_rest', minutes_ago=120, work=60, rest=60)
+        waiting = self.session(5, 'pending_rest', minutes_ago=120, work=60, rest=61)
+
+        with self.assertNumQueries(1):
+            work_over, total_over = EmployeeSession.time_limit_filters(self.now)
+
+        self.assertEqual(
+            set(EmployeeSession.objects.filter(work_over)), {expired, at_limit, rest_over, waiting},
+        )
+        self.assertEqual(list(EmployeeSession.objects.filter(total_over)), [rest_over])
+
+    def test_enforce_moves_only_expired_sessions_to_pending_rest(self):
+        for service in (log_monitor_service, session_service):
+            with self.subTest(service=type(service).__name__):
+                EmployeeSession.objects.all().delete()
+                Employee.objects.all().delete()
+                expired = self.session(1, 'active', minutes_ago=90, work=60)
+                running = self.session(2, 'active', minutes_ago=90, work=480)
+
+                service.enforce_session_timeouts()
+
+                expired.refresh_from_db()
+                running.refresh_from_db()
+                self.assertEqual(expired.state, 'pending_rest')
+                self.assertEqual(running.state, 'active')
+                self.assertEqual(running.last_access, running.first_access)
+
+    def test_session_service_blocks_after_work_and_rest(self):
+        session = self.session(1, 'pending_rest', minutes_ago=130, work=60, rest=60)
+        waiting = self.session(2, 'pending_rest', minutes_ago=100, work=60, rest=60)
+
+        with mock.patch.object(GroupService, 'move_to_blacklist', return_value=True):
+            session_service.enforce_session_timeouts()
+
+        session.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertEqual(session.state, 'blocked')
+        self.assertEqual(session.return_time - session.block_start, timedelta(minutes=60))
+        self.assertEqual(waiting.state, 'pending_rest')
@@ -39,7 +39,7 @@ def api_sessoes_publicas(request):
         # Buscar todas as sessões ativas
         sessoes = EmployeeSession.objects.filter(
             state__in=['active', 'blocked', 'pending_rest']
-        ).select_related('employee').order_by('-created_at')
+        ).select_related('employee__group', 'employee__original_group').order_by('-created_at')
         
         # Converter para formato JSON
         sessoes_data = []
@@ -192,7 +192,7 @@ def api_sessoes_ativas(request):
         # Buscar todas as sessões ativas
         sessoes = EmployeeSession.objects.filter(
             state__in=['active', 'blocked', 'pending_rest']
-        ).select_related('employee').order_by('-created_at')
+        ).select_related('employee__group', 'employee__original_group').order_by('-created_at')
         
         # Converter para formato JSON
         sessoes_data = []
@@ -3,6 +3,7 @@ Admin para o app employees.
 """
 from django.contrib import admin
 from .models import Employee, EmployeeGroup
+from .membership_service import membership_service
 
 
 @admin.register(Employee)
@@ -41,6 +42,10 @@ class EmployeeGroupAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     readonly_fields = ['created_at', 'updated_at', 'employee_count']
     
+    def get_queryset(self, request):
+        """Anota employee_count na listagem (uma consulta para todos os grupos)."""
+        return membership_service.with_employee_count(super().get_queryset(request))
+    
     fieldsets = (
         ('Informações do Grupo', {
             'fields': ('name', 'description', 'is_exemption_group')
@@ -7,6 +7,7 @@ from django.db import transaction
 from django.utils import timezone
 from .models import Employee, EmployeeGroup
 from apps.logs.models import SystemLog
+from apps.core.registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -307,20 +308,18 @@ class GroupService:
     def sync_groups_with_system_state(self) -> int:
         """Sincroniza os grupos com o estado do sistema - CRÍTICO para evitar usuários travados."""
         try:
+            from apps.employee_sessions.models import EmployeeSession
             corrected_count = 0
             
             # 1. Verificar usuários que estão na blacklist mas NÃO deveriam estar
             blacklist_users = self.get_blacklist_users()
+            blocked_employee_ids = set(
+                EmployeeSession.objects.filter(state='blocked').values_list('employee_id', flat=True)
+            )
             
             for employee in blacklist_users:
                 # Verificar se o funcionário realmente deveria estar bloqueado
-                from apps.employee_sessions.models import EmployeeSession
-                session = EmployeeSession.objects.filter(
-                    employee=employee,
-                    state='blocked'
-                ).first()
-                
-                if not session:
+                if employee.id not in blocked_employee_ids:
                     # Funcionário está na blacklist mas não deveria estar - CORRIGIR
                     logger.warning(f"Funcionário {employee.name} está na blacklist mas não está bloqueado no sistema - Corrigindo")
                     
@@ -332,8 +331,7 @@ class GroupService:
                         logger.warning(f"Falha ao remover {employee.name} da blacklist")
             
             # 2. Verificar usuários que estão bloqueados no sistema mas NÃO estão na blacklist
-            from apps.employee_sessions.models import EmployeeSession
-            blocked_sessions = EmployeeSession.objects.filter(state='blocked').select_related('employee')
+            blocked_sessions = EmployeeSession.objects.filter(state='blocked').select_related('employee__group')
             
             for session in blocked_sessions:
                 if not self.is_in_blacklist(session.employee):
@@ -370,4 +368,4 @@ class GroupService:
 
 
 # Instância global do serviço
-group_service = GroupService()
+group_service = service_registry.register('employees.group_service', GroupService)
@@ -0,0 +1,296 @@
+"""
+Importação em massa de funcionários e matrículas a partir de CSV.
+
+O arquivo é lido em streaming e processado em lotes: cada lote é validado em
+memória (IDs, matrículas e grupos resolvidos a partir de um mapa nome→grupo
+carregado uma única vez) e gravado com um único
+bulk_create(update_conflicts=True) por device_id. Linhas inválidas não
+interrompem a importação; elas são devolvidas num relatório por linha.
+
+Formato esperado (o mesmo da exportação de funcionários):
+    ID_Dispositivo,Nome,Matricula,Status,Grupos
+"""
+import csv
+import io
+import logging
+from typing import Dict, Iterable, List, Optional
+from django.db import transaction
+from .models import Employee, EmployeeGroup
+from .membership_service import membership_service
+
+logger = logging.getLogger(__name__)
+
+IMPORT_COLUMNS = ['ID_Dispositivo', 'Nome', 'Matricula', 'Status', 'Grupos']
+IMPORT_UPDATE_FIELDS = ['name', 'employee_code', 'is_active', 'groups', 'updated_at']
+ACTIVE_VALUES = {'ativo', 'active', 'sim', 'true', '1', ''}
+INACTIVE_VALUES = {'inativo', 'inactive', 'nao', 'não', 'false', '0'}
+NO_GROUPS_VALUES = {'', 'sem grupos'}
+
+
+class ImportResult:
+    """Resultado de uma importação."""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.groups_created = 0
+        self.errors: List[Dict] = []
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    def add_error(self, line, device_id, message):
+        self.errors.append({'line': line, 'device_id': device_id, 'error': message})
+
+    def summary(self) -> Dict:
+        return {
+            'total_rows': self.total_rows,
+            'created': self.created,
+            'updated': self.updated,
+            'groups_created': self.groups_created,
+            'error_count': len(self.errors),
+        }
+
+    def write_errors(self, fileobj):
+        """Grava o relatório de erros por linha em CSV."""
+        writer = csv.writer(fileobj)
+        writer.writerow(['Linha', 'ID_Dispositivo', 'Erro'])
+        for error in self.errors:
+            writer.writerow([error['line'], error['device_id'], error['error']])
+
+
+class EmployeeImportService:
+    """Serviço de importação de funcionários em lotes."""
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------------
+    # Grupos
+    # ------------------------------------------------------------------
+
+    def _load_groups(self) -> Dict[str, EmployeeGroup]:
+        """Mapa nome (minúsculo) → EmployeeGroup, carregado uma única vez."""
+        group_map = {group.name.lower(): group for group in EmployeeGroup.objects.all()}
+        # Na catraca o grupo de blacklist costuma se chamar apenas "blacklist"
+        for group in list(group_map.values()):
+            if group.is_blacklist:
+                group_map.setdefault('blacklist', group)
+        return group_map
+
+    def _resolve_groups(self, value, group_map, create_groups, result, dry_run):
+        """
+        Resolve a coluna Grupos em nomes canônicos.
+
+        Returns:
+            tuple: (lista de nomes, nome desconhecido ou None)
+        """
+        if value.strip().lower() in NO_GROUPS_VALUES:
+            return [], None
+
+        names = []
+        for raw_name in value.split(','):
+            name = raw_name.strip()
+            if not name:
+                continue
+            group = group_map.get(name.lower())
+            if group is None:
+                if not create_groups:
+                    return [], name
+                group = EmployeeGroup(name=name, description='Grupo criado na importação de CSV')
+                if not dry_run:
+                    group.save()
+                group_map[name.lower()] = group
+                result.groups_created += 1
+            if group.name not in names:
+                names.append(group.name)
+        return names, None
+
+    # ------------------------------------------------------------------
+    # Validação
+    # ------------------------------------------------------------------
+
+    def _parse_row(self, line, row, group_map, create_groups, result, dry_run) -> Optional[Employee]:
+        """Valida uma linha. Retorna o Employee (não salvo) ou None com erro registrado."""
+        raw_id = (row.get('ID_Dispositivo') or '').strip()
+        try:
+            device_id = int(raw_id)
+        except ValueError:
+            result.add_error(line, raw_id, 'ID_Dispositivo inválido')
+            return None
+        if device_id <= 0:
+            result.add_error(line, raw_id, 'ID_Dispositivo deve ser positivo')
+            return None
+
+        name = (row.get('Nome') or '').strip()
+        if not name:
+            result.add_error(line, device_id, 'Nome vazio')
+            return None
+        if len(name) > 255:
+            result.add_error(line, device_id, 'Nome excede 255 caracteres')
+            return None
+
+        code = (row.get('Matricula') or '').strip() or None
+        if code and len(code) > 50:
+            result.add_error(line, device_id, 'Matrícula excede 50 caracteres')
+            return None
+
+        status = (row.get('Status') or '').strip().lower()
+        if status in ACTIVE_VALUES:
+            is_active = True
+        elif status in INACTIVE_VALUES:
+            is_active = False
+        else:
+            result.add_error(line, device_id, f"Status inválido: {row.get('Status')}")
+            return None
+
+        groups, unknown = self._resolve_groups(
+            row.get('Grupos') or '', group_map, create_groups, result, dry_run
+        )
+        if unknown:
+            result.add_error(line, device_id, f'Grupo não encontrado: {unknown}')
+            return None
+
+        return Employee(
+            device_id=device_id,
+            name=name,
+            employee_code=code,
+            is_active=is_active,
+            groups=groups,
+        )
+
+    def _process_chunk(self, chunk, result, dry_run, seen_ids, seen_codes):
+        """Valida conflitos do lote contra o banco e grava com um único upsert."""
+        codes = [employee.employee_code for _, employee in chunk if employee.employee_code]
+        ids = [employee.device_id for _, employee in chunk]
+
+        code_owners = dict(
+            Employee.objects.filter(employee_code__in=codes).values_list('employee_code', 'device_id')
+        ) if codes else {}
+        existing_ids = set(
+            Employee.objects.filter(device_id__in=ids).values_list('device_id', flat=True)
+        )
+
+        valid = []
+        for line, employee in chunk:
+            if employee.device_id in seen_ids:
+                result.add_error(line, employee.device_id, f'ID_Dispositivo repetido (linha {seen_ids[employee.device_id]})')
+                continue
+            code = employee.employee_code
+            if code:
+                owner = code_owners.get(code)
+                if code in seen_codes and seen_codes[code] != employee.device_id:
+                    result.add_error(line, employee.device_id, f'Matrícula {code} repetida no arquivo')
+                    continue
+                if owner is not None and owner != employee.device_id:
+                    result.add_error(line, employee.device_id, f'Matrícula {code} já pertence ao dispositivo {owner}')
+                    continue
+                seen_codes[code] = employee.device_id
+            seen_ids[employee.device_id] = line
+            valid.append(employee)
+
+        if valid and not dry_run:
+            with transaction.atomic():
+                Employee.objects.bulk_create(
+                    valid,
+                    update_conflicts=True,
+                    unique_fields=['device_id'],
+                    update_fields=IMPORT_UPDATE_FIELDS,
+                )
+                membership_service.sync_employees(valid)
+
+        for employee in valid:
+            if employee.device_id in existing_ids:
+                result.updated += 1
+            else:
+                result.created += 1
+
+    # ------------------------------------------------------------------
+    # Importação
+    # ------------------------------------------------------------------
+
+    def import_rows(self, rows: Iterable[Dict], dry_run=False, create_groups=False,
+                    first_line=2) -> ImportResult:
+        """
+        Importa linhas já lidas (dicts com as colunas de IMPORT_COLUMNS).
+
+        Args:
+            rows: iterável de dicts (ex: csv.DictReader)
+            dry_run: valida sem gravar
+            create_groups: cria grupos desconhecidos em vez de rejeitar a linha
+            first_line: número da primeira linha de dados (para o relatório)
+
+        Returns:
+            ImportResult
+        """
+        result = ImportResult()
+        group_map = self._load_groups()
+        seen_ids: Dict[int, int] = {}
+        seen_codes: Dict[str, int] = {}
+        chunk = []
+
+        for line, row in enumerate(rows, start=first_line):
+            result.total_rows += 1
+            employee = self._parse_row(line, row, group_map, create_groups, result, dry_run)
+            if employee is not None:
+                chunk.append((line, employee))
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk, result, dry_run, seen_ids, seen_codes)
+                chunk = []
+
+        if chunk:
+            self._process_chunk(chunk, result, dry_run, seen_ids, seen_codes)
+
+        result.errors.sort(key=lambda error: error['line'])
+        return result
+
+    def import_file(self, fileobj, dry_run=False, create_groups=False, encoding='utf-8-sig',
+                    source=None) -> ImportResult:
+        """
+        Importa um arquivo CSV (texto ou binário, ex: upload do admin).
+
+        Raises:
+            ValueError: se o cabeçalho não tiver as colunas obrigatórias
+        """
+        if not isinstance(fileobj, io.TextIOBase):
+            fileobj = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+
+        sample = fileobj.readline()
+        delimiter = ';' if sample.count(';') > sample.count(',') else ','
+        reader = csv.DictReader(
+            _prepend(sample, fileobj), delimiter=delimiter
+        )
+        missing = [column for column in ('ID_Dispositivo', 'Nome') if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+
+        result = self.import_rows(reader, dry_run=dry_run, create_groups=create_groups)
+        if not dry_run:
+            self._audit(result, source)
+        logger.info(f"Importação de funcionários: {result.summary()}")
+        return result
+
+    def _audit(self, result, source=None):
+        """Grava uma única entrada de auditoria com o resumo da importação."""
+        from apps.logs.models import SystemLog
+
+        SystemLog.log_info(
+            message=(
+                f"Importação de funcionários concluída: {result.created} novos, "
+                f"{result.updated} atualizados, {len(result.errors)} erros"
+            ),
+            category='employee',
+            details={**result.summary(), 'source': source, 'errors': result.errors[:100]},
+        )
+
+
+def _prepend(first_line, fileobj):
+    """Reinsere a linha de cabeçalho já lida antes do restante do arquivo."""
+    yield first_line
+    yield from fileobj
+
+
+# Instância global do serviço
+employee_import_service = EmployeeImportService()
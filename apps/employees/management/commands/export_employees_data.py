@@ -1,22 +1,31 @@
 """
-Comando Django para exportar dados de funcionários (ID e matrícula) em CSV.
+Comando Django para exportar dados de funcionários (ID e matrícula) em CSV/XLSX.
 """
 import csv
 import os
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from apps.employees.models import Employee
+from django.db.models import Count
+from apps.core.export_service import export_service, EXPORT_FORMATS
+from apps.employees.models import EmployeeGroupMembership
 
 
 class Command(BaseCommand):
-    help = 'Exporta dados de funcionários (ID e matrícula) para CSV'
+    help = 'Exporta dados de funcionários (ID e matrícula) para CSV ou XLSX'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--output',
             type=str,
             default='funcionarios_export.csv',
-            help='Nome do arquivo de saída (padrão: funcionarios_export.csv)',
+            help='Arquivo de saída; caminhos relativos partem de BASE_DIR (padrão: funcionarios_export.csv)',
+        )
+        parser.add_argument(
+            '--format',
+            type=str,
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='Formato de saída (padrão: csv)',
         )
         parser.add_argument(
             '--active-only',
@@ -32,86 +41,65 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write("📊 Exportando dados de funcionários...")
         
-        # Filtrar funcionários
-        employees = Employee.objects.all()
+        fmt = options['format']
+        params = {}
         
         if options['active_only']:
-            employees = employees.filter(is_active=True)
+            params['active_only'] = '1'
             self.stdout.write("🔍 Filtrando apenas funcionários ativos...")
         
         if options['group']:
-            # SQLite não suporta contains, então vamos usar uma abordagem diferente
-            filtered_employees = []
-            for employee in employees:
-                if options['group'] in employee.groups:
-                    filtered_employees.append(employee)
-            employees = filtered_employees
+            params['group'] = options['group']
             self.stdout.write(f"🔍 Filtrando por grupo: {options['group']}")
         
         # Caminho do arquivo
         output_file = options['output']
-        if not output_file.endswith('.csv'):
-            output_file += '.csv'
+        if not output_file.endswith(f'.{fmt}'):
+            output_file = f"{os.path.splitext(output_file)[0]}.{fmt}"
         
         # Caminho completo
-        output_path = os.path.join(settings.BASE_DIR, output_file)
+        output_path = output_file if os.path.isabs(output_file) else os.path.join(settings.BASE_DIR, output_file)
         
-        # Escrever CSV
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['ID_Dispositivo', 'Nome', 'Matricula', 'Status', 'Grupos']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            # Escrever cabeçalho
-            writer.writeheader()
-            
-            # Escrever dados
-            for employee in employees:
-                groups_str = ", ".join(employee.groups) if employee.groups else "Sem grupos"
-                status = "Ativo" if employee.is_active else "Inativo"
-                
-                writer.writerow({
-                    'ID_Dispositivo': employee.device_id,
-                    'Nome': employee.name,
-                    'Matricula': employee.employee_code,
-                    'Status': status,
-                    'Grupos': groups_str
-                })
+        # Exportação em streaming (memória constante)
+        try:
+            total = export_service.export_to_file('employees', output_path, fmt, params)
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
         
         self.stdout.write(
             self.style.SUCCESS(
                 f"✅ Exportação concluída!\n"
                 f"📁 Arquivo: {output_path}\n"
-                f"📊 {len(employees)} funcionários exportados"
+                f"📊 {total} funcionários exportados"
             )
         )
         
-        # Mostrar estatísticas
-        self.stdout.write("\n📈 ESTATÍSTICAS:")
-        self.stdout.write(f"  👥 Total de funcionários: {len(employees)}")
+        # Estatísticas calculadas no banco (contagens e join nas associações de grupos)
+        employees = export_service.get_dataset('employees').build_queryset(params)
+        active_count = employees.filter(is_active=True).count()
+        group_counts = dict(
+            EmployeeGroupMembership.objects.filter(
+                kind=EmployeeGroupMembership.KIND_MEMBER, employee__in=employees.order_by(),
+            ).values_list('group__name').annotate(total=Count('employee_id', distinct=True)).order_by('group__name')
+        )
         
-        # Contar por status
-        active_count = sum(1 for emp in employees if emp.is_active)
-        inactive_count = len(employees) - active_count
+        self.stdout.write("\n📈 ESTATÍSTICAS:")
+        self.stdout.write(f"  👥 Total de funcionários: {total}")
         self.stdout.write(f"  ✅ Ativos: {active_count}")
-        self.stdout.write(f"  ❌ Inativos: {inactive_count}")
-        
-        # Contar por grupos
-        group_counts = {}
-        for employee in employees:
-            for group in employee.groups:
-                group_counts[group] = group_counts.get(group, 0) + 1
+        self.stdout.write(f"  ❌ Inativos: {total - active_count}")
         
         if group_counts:
             self.stdout.write("  🏷️ Por grupos:")
             for group, count in group_counts.items():
                 self.stdout.write(f"    - {group}: {count}")
         
-        # Mostrar primeiras linhas do arquivo
-        self.stdout.write(f"\n📋 Primeiras 5 linhas do arquivo:")
-        with open(output_path, 'r', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            for i, row in enumerate(reader):
-                if i < 6:  # Cabeçalho + 5 linhas
-                    self.stdout.write(f"  {i}: {', '.join(row)}")
-                else:
-                    break
+        # Mostrar primeiras linhas do arquivo (apenas CSV)
+        if fmt == 'csv':
+            self.stdout.write(f"\n📋 Primeiras 5 linhas do arquivo:")
+            with open(output_path, 'r', encoding='utf-8') as csvfile:
+                reader = csv.reader(csvfile)
+                for i, row in enumerate(reader):
+                    if i < 6:  # Cabeçalho + 5 linhas
+                        self.stdout.write(f"  {i}: {', '.join(row)}")
+                    else:
+                        break
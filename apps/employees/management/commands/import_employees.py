@@ -0,0 +1,92 @@
+"""
+Comando Django para importar funcionários e matrículas de um arquivo CSV.
+"""
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.employees.import_service import employee_import_service, IMPORT_COLUMNS
+
+
+class Command(BaseCommand):
+    help = f"Importa funcionários de um CSV ({','.join(IMPORT_COLUMNS)}) com upsert por device_id"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_file',
+            type=str,
+            help='Arquivo CSV (ex: funcionarios_com_matriculas.csv)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=employee_import_service.chunk_size,
+            help=f'Linhas por lote (padrão: {employee_import_service.chunk_size})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valida o arquivo sem gravar no banco de dados',
+        )
+        parser.add_argument(
+            '--create-groups',
+            action='store_true',
+            help='Cria grupos desconhecidos em vez de rejeitar a linha',
+        )
+        parser.add_argument(
+            '--encoding',
+            type=str,
+            default='utf-8-sig',
+            help='Codificação do arquivo (padrão: utf-8-sig)',
+        )
+        parser.add_argument(
+            '--errors-output',
+            type=str,
+            help='Arquivo CSV para o relatório de erros por linha',
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options['csv_file']
+        if not os.path.isabs(csv_path) and not os.path.exists(csv_path):
+            csv_path = os.path.join(settings.BASE_DIR, csv_path)
+        if not os.path.exists(csv_path):
+            raise CommandError(f'Arquivo não encontrado: {options["csv_file"]}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🧪 Modo dry-run: Nenhuma alteração será feita'))
+
+        self.stdout.write(f'📥 Importando funcionários de {csv_path}...')
+        employee_import_service.chunk_size = max(1, options['chunk_size'])
+        started = time.monotonic()
+
+        try:
+            with open(csv_path, 'r', encoding=options['encoding'], newline='') as csvfile:
+                result = employee_import_service.import_file(
+                    csvfile,
+                    dry_run=options['dry_run'],
+                    create_groups=options['create_groups'],
+                    source=os.path.basename(csv_path),
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f'Erro ao ler o arquivo: {e}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'✅ Importação concluída em {elapsed:.2f}s'))
+        self.stdout.write(f'   📄 Linhas: {result.total_rows}')
+        self.stdout.write(f'   ✅ Criados: {result.created}')
+        self.stdout.write(f'   🔄 Atualizados: {result.updated}')
+        if result.groups_created:
+            self.stdout.write(f'   🏷️ Grupos criados: {result.groups_created}')
+        self.stdout.write(f'   ❌ Erros: {len(result.errors)}')
+
+        for error in result.errors[:20]:
+            self.stdout.write(self.style.ERROR(
+                f"   Linha {error['line']} (ID {error['device_id']}): {error['error']}"
+            ))
+        if len(result.errors) > 20:
+            self.stdout.write(f'   ... mais {len(result.errors) - 20} erros')
+
+        if options['errors_output'] and result.errors:
+            with open(options['errors_output'], 'w', encoding='utf-8', newline='') as errors_file:
+                result.write_errors(errors_file)
+            self.stdout.write(f"📁 Relatório de erros: {os.path.abspath(options['errors_output'])}")
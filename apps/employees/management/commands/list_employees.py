@@ -2,7 +2,8 @@
 Comando Django para listar funcionários do banco de dados.
 """
 from django.core.management.base import BaseCommand
-from apps.employees.models import Employee, EmployeeGroup
+from apps.employees.models import Employee, EmployeeGroupMembership
+from apps.employees.membership_service import membership_service
 from django.db.models import Count
 
 
@@ -50,7 +51,10 @@ class Command(BaseCommand):
             self.stdout.write('✅ Mostrando apenas funcionários ativos')
         
         if options['group']:
-            queryset = queryset.filter(groups__name__icontains=options['group'])
+            queryset = queryset.filter(
+                group_memberships__group__name__icontains=options['group'],
+                group_memberships__kind=EmployeeGroupMembership.KIND_MEMBER,
+            ).distinct()
             self.stdout.write(f'🏷️ Filtrando por grupo: "{options["group"]}"')
 
         # Aplicar limite
@@ -92,20 +96,14 @@ class Command(BaseCommand):
         self.stdout.write('📊 ESTATÍSTICAS DE GRUPOS')
         self.stdout.write('='*50)
 
-        groups = EmployeeGroup.objects.all().order_by('name')
+        groups = membership_service.with_employee_count().order_by('name')
 
         if not groups.exists():
             self.stdout.write('⚠️ Nenhum grupo encontrado')
             return
 
         for group in groups:
-            # Contar funcionários no grupo usando o campo groups JSON
-            # SQLite não suporta contains, então vamos usar uma abordagem diferente
-            employee_count = 0
-            for employee in Employee.objects.all():
-                if group.name in employee.groups:
-                    employee_count += 1
-            self.stdout.write(f'🏷️ {group.name}: {employee_count} funcionários')
+            self.stdout.write(f'🏷️ {group.name}: {group.employee_count} funcionários')
 
         # Estatísticas gerais
         total_employees = Employee.objects.count()
@@ -0,0 +1,122 @@
+"""
+Sincronização da tabela EmployeeGroupMembership com as listas de grupos.
+
+As listas JSON (Employee.groups / exemption_groups) continuam sendo o formato
+trocado com a catraca e com a API; toda gravação delas passa por aqui para
+que contagens e filtros por grupo usem a tabela indexada.
+"""
+import logging
+from typing import Iterable
+from django.db.models import Count, Q
+from apps.core.registry import service_registry
+from .models import Employee, EmployeeGroup, EmployeeGroupMembership
+
+logger = logging.getLogger(__name__)
+
+KIND_FIELDS = (
+    (EmployeeGroupMembership.KIND_MEMBER, 'groups'),
+    (EmployeeGroupMembership.KIND_EXEMPTION, 'exemption_groups'),
+)
+
+
+class MembershipService:
+    """Mantém as associações funcionário ↔ grupo alinhadas às listas JSON."""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+
+    def _desired(self, employee_id, groups, exemption_groups, group_ids):
+        names = {'groups': groups or [], 'exemption_groups': exemption_groups or []}
+        return {
+            (employee_id, group_ids[name], kind)
+            for kind, field in KIND_FIELDS
+            for name in names[field]
+            if name in group_ids
+        }
+
+    def _apply(self, scope, desired) -> int:
+        """Insere as associações faltantes e remove as que saíram (apenas dentro de `scope`)."""
+        existing = {
+            (employee_id, group_id, kind): pk
+            for pk, employee_id, group_id, kind in scope.values_list('id', 'employee_id', 'group_id', 'kind')
+        }
+        stale = [pk for key, pk in existing.items() if key not in desired]
+        missing = [
+            EmployeeGroupMembership(employee_id=employee_id, group_id=group_id, kind=kind)
+            for employee_id, group_id, kind in desired - existing.keys()
+        ]
+        if stale:
+            EmployeeGroupMembership.objects.filter(id__in=stale).delete()
+        if missing:
+            EmployeeGroupMembership.objects.bulk_create(missing, batch_size=self.batch_size, ignore_conflicts=True)
+        return len(missing) + len(stale)
+
+    def sync_employees(self, employees: Iterable[Employee]) -> int:
+        """
+        Sincroniza as associações dos funcionários informados.
+
+        Os IDs são resolvidos por device_id (bulk_create com update_conflicts
+        não preenche a chave primária). Retorna o número de linhas alteradas.
+        """
+        lists = {employee.device_id: (employee.groups, employee.exemption_groups) for employee in employees}
+        if not lists:
+            return 0
+        group_ids = dict(EmployeeGroup.objects.values_list('name', 'id'))
+        device_ids = list(lists)
+        changed = 0
+        for start in range(0, len(device_ids), self.batch_size):
+            ids = dict(
+                Employee.objects.filter(device_id__in=device_ids[start:start + self.batch_size])
+                .values_list('device_id', 'id')
+            )
+            desired = set()
+            for device_id, employee_id in ids.items():
+                desired |= self._desired(employee_id, *lists[device_id], group_ids)
+            changed += self._apply(
+                EmployeeGroupMembership.objects.filter(employee_id__in=list(ids.values())), desired,
+            )
+        return changed
+
+    def sync_group(self, group: EmployeeGroup) -> int:
+        """Reassocia os funcionários que citam o grupo pelo nome (grupo criado ou renomeado)."""
+        # JSON contains não existe no SQLite: leitura em blocos só das listas (evento raro)
+        candidates = Employee.objects.values_list('id', 'groups', 'exemption_groups')
+        desired = set()
+        for employee_id, groups, exemption_groups in candidates.iterator(chunk_size=self.batch_size):
+            desired |= self._desired(employee_id, groups, exemption_groups, {group.name: group.id})
+        return self._apply(EmployeeGroupMembership.objects.filter(group=group), desired)
+
+    def rebuild(self) -> int:
+        """Reconstrói todas as associações a partir das listas JSON."""
+        group_ids = dict(EmployeeGroup.objects.values_list('name', 'id'))
+        changed = 0
+        rows = Employee.objects.values_list('id', 'groups', 'exemption_groups').order_by('id')
+        batch = []
+        for row in rows.iterator(chunk_size=self.batch_size):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                changed += self._apply_rows(batch, group_ids)
+                batch = []
+        if batch:
+            changed += self._apply_rows(batch, group_ids)
+        logger.info(f"Associações de grupos reconstruídas: {changed} linhas alteradas")
+        return changed
+
+    def _apply_rows(self, rows, group_ids) -> int:
+        desired = set()
+        for employee_id, groups, exemption_groups in rows:
+            desired |= self._desired(employee_id, groups, exemption_groups, group_ids)
+        return self._apply(
+            EmployeeGroupMembership.objects.filter(employee_id__in=[row[0] for row in rows]), desired,
+        )
+
+    def with_employee_count(self, queryset=None):
+        """Grupos anotados com member_count (lido por EmployeeGroup.employee_count)."""
+        queryset = queryset if queryset is not None else EmployeeGroup.objects.all()
+        return queryset.annotate(member_count=Count(
+            'memberships', filter=Q(memberships__kind=EmployeeGroupMembership.KIND_MEMBER),
+        ))
+
+
+# Instância global do serviço
+membership_service = service_registry.register('employees.membership_service', MembershipService)
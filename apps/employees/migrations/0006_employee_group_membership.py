@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_employee_alert_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeGroupMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('member', 'Membro'), ('exemption', 'Isenção')], default='member', max_length=10, verbose_name='Tipo')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_memberships', to='employees.employee', verbose_name='Funcionário')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='employees.employeegroup', verbose_name='Grupo')),
+            ],
+            options={
+                'verbose_name': 'Associação a Grupo',
+                'verbose_name_plural': 'Associações a Grupos',
+                'indexes': [models.Index(fields=['group', 'kind'], name='employees_e_group_i_9e0bb4_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='employeegroupmembership',
+            constraint=models.UniqueConstraint(fields=('employee', 'group', 'kind'), name='unique_employee_group_kind'),
+        ),
+    ]
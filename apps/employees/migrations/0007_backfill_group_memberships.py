@@ -0,0 +1,43 @@
+"""
+Preenche EmployeeGroupMembership a partir das listas JSON
+Employee.groups / Employee.exemption_groups.
+"""
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_memberships(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    EmployeeGroup = apps.get_model('employees', 'EmployeeGroup')
+    EmployeeGroupMembership = apps.get_model('employees', 'EmployeeGroupMembership')
+
+    group_ids = dict(EmployeeGroup.objects.values_list('name', 'id'))
+    if not group_ids:
+        return
+
+    memberships = []
+    rows = Employee.objects.values_list('id', 'groups', 'exemption_groups').order_by('id')
+    for employee_id, groups, exemption_groups in rows.iterator(chunk_size=BATCH_SIZE):
+        for kind, names in (('member', groups), ('exemption', exemption_groups)):
+            for name in set(names or []):
+                if name in group_ids:
+                    memberships.append(EmployeeGroupMembership(
+                        employee_id=employee_id, group_id=group_ids[name], kind=kind,
+                    ))
+        if len(memberships) >= BATCH_SIZE:
+            EmployeeGroupMembership.objects.bulk_create(memberships, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            memberships = []
+    if memberships:
+        EmployeeGroupMembership.objects.bulk_create(memberships, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_employee_group_membership'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
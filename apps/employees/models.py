@@ -69,6 +69,15 @@ class Employee(models.Model):
     def __str__(self):
         return f"{self.name} (ID: {self.device_id})"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        # Manter a tabela de associações em sincronia com as listas de grupos
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'groups', 'exemption_groups'} & set(update_fields):
+            from .membership_service import membership_service
+            membership_service.sync_employees([self])
+    
     @property
     def display_name(self):
         """Nome para exibição."""
@@ -160,10 +169,24 @@ class EmployeeGroup(models.Model):
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        previous_name = None
+        if self.pk:
+            previous_name = EmployeeGroup.objects.filter(pk=self.pk).values_list('name', flat=True).first()
+        super().save(*args, **kwargs)
+        
+        # Grupo novo ou renomeado: associar os funcionários que já o citam pelo nome
+        if previous_name != self.name:
+            from .membership_service import membership_service
+            membership_service.sync_group(self)
+    
     @property
     def employee_count(self):
-        """Número de funcionários no grupo."""
-        return Employee.objects.filter(groups__contains=[self.name]).count()
+        """Número de funcionários no grupo (anotado pela listagem ou consulta indexada)."""
+        annotated = getattr(self, 'member_count', None)
+        if annotated is not None:
+            return annotated
+        return self.memberships.filter(kind=EmployeeGroupMembership.KIND_MEMBER).count()
     
     @property
     def effective_work_duration(self):
@@ -176,3 +199,38 @@ class EmployeeGroup(models.Model):
         """Duração efetiva de interjornada do grupo."""
         from django.conf import settings
         return self.rest_duration_minutes or settings.REST_DURATION_MINUTES
+
+
+class EmployeeGroupMembership(models.Model):
+    """
+    Associação funcionário ↔ grupo (tabela normalizada e indexada).
+    
+    Espelha as listas Employee.groups (kind='member') e
+    Employee.exemption_groups (kind='exemption') para que contagens e filtros
+    por grupo sejam joins no banco. Nomes sem EmployeeGroup correspondente
+    permanecem apenas na lista JSON.
+    """
+    
+    KIND_MEMBER = 'member'
+    KIND_EXEMPTION = 'exemption'
+    KIND_CHOICES = [
+        (KIND_MEMBER, 'Membro'),
+        (KIND_EXEMPTION, 'Isenção'),
+    ]
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='group_memberships', verbose_name="Funcionário")
+    group = models.ForeignKey(EmployeeGroup, on_delete=models.CASCADE, related_name='memberships', verbose_name="Grupo")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_MEMBER, verbose_name="Tipo")
+    
+    class Meta:
+        verbose_name = "Associação a Grupo"
+        verbose_name_plural = "Associações a Grupos"
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'group', 'kind'], name='unique_employee_group_kind'),
+        ]
+        indexes = [
+            models.Index(fields=['group', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee_id} → {self.group_id} ({self.kind})"
@@ -0,0 +1,433 @@
+"""
+Sincronização incremental (diff) de funcionários e grupos a partir do dispositivo.
+
+O estado do dispositivo é baixado em três chamadas (users, groups e a tabela
+completa user_groups), comparado em memória com o banco e aplicado com
+bulk_create/bulk_update numa única transação. Funcionários que saíram do
+dispositivo são desativados, nunca removidos.
+
+Cada dispositivo guarda um fingerprint da última sincronização (quantidade,
+maior ID e um hash de conteúdo por usuário). Numa sincronização periódica, se
+o fingerprint não mudou nada é comparado nem gravado; caso contrário apenas os
+usuários com hash diferente (ou removidos) são carregados do banco. Se alguma
+das três chamadas falhar, a sincronização é interrompida sem alterar o banco
+nem o fingerprint.
+"""
+import hashlib
+import logging
+from typing import Dict, List, Optional, Set
+from django.db import transaction
+from apps.core.utils import TimezoneUtils
+from .models import Employee, EmployeeGroup
+from .membership_service import membership_service
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_SYNC_FIELDS = ['name', 'employee_code', 'groups', 'is_active']
+
+
+class SyncPlan:
+    """Conjunto de alterações calculado pelo diff."""
+
+    def __init__(self):
+        self.groups_to_create: List[EmployeeGroup] = []
+        self.groups_to_update: List[EmployeeGroup] = []
+        self.to_create: List[Employee] = []
+        self.to_update: List[Employee] = []
+        self.to_deactivate: List[Employee] = []
+        self.unchanged = 0
+        self.device_users = 0
+        self.fingerprint_match = False
+
+    @property
+    def has_changes(self):
+        return bool(
+            self.groups_to_create or self.groups_to_update or
+            self.to_create or self.to_update or self.to_deactivate
+        )
+
+    def summary(self) -> Dict:
+        return {
+            'device_users': self.device_users,
+            'groups_created': len(self.groups_to_create),
+            'groups_updated': len(self.groups_to_update),
+            'created': len(self.to_create),
+            'updated': len(self.to_update),
+            'deactivated': len(self.to_deactivate),
+            'unchanged': self.unchanged,
+            'fingerprint_match': self.fingerprint_match,
+        }
+
+
+class EmployeeSyncService:
+    """Serviço de sincronização de funcionários por diff."""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+
+    def fetch_snapshot(self, client) -> Dict:
+        """
+        Baixa usuários, grupos e vínculos do dispositivo (três chamadas).
+
+        Raises:
+            RuntimeError: se qualquer uma das chamadas falhar. Uma lista vazia
+                por erro de rede seria aplicada como estado real (grupos
+                apagados) e gravada no fingerprint.
+        """
+        snapshot = {}
+        for key, fetch in (
+            ('users', client.get_users),
+            ('groups', client.get_groups),
+            ('user_groups', client.get_all_user_groups),
+        ):
+            try:
+                snapshot[key] = fetch(raise_errors=True)
+            except Exception as e:
+                raise RuntimeError(f'Falha ao baixar {key} do dispositivo: {e}') from e
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # Fingerprint
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _digest(value: str) -> str:
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+    @staticmethod
+    def _group_names(device_groups) -> Dict[int, str]:
+        """Mapeia {device_group_id: nome} a partir dos grupos do dispositivo."""
+        return {
+            g['id']: g.get('name') or f"Grupo {g['id']}"
+            for g in device_groups if g.get('id') is not None
+        }
+
+    @staticmethod
+    def _memberships(group_names, user_groups) -> Dict[int, List[str]]:
+        """Mapeia {user_id: [nomes de grupos]} a partir da tabela user_groups."""
+        memberships: Dict[int, List[str]] = {}
+        for link in user_groups:
+            name = group_names.get(link.get('group_id'))
+            if name:
+                memberships.setdefault(link.get('user_id'), []).append(name)
+        return memberships
+
+    def compute_fingerprint(self, users, groups, user_groups) -> Dict:
+        """
+        Calcula o fingerprint do estado do dispositivo.
+
+        Returns:
+            dict: count, max_id, groups (hash dos grupos), digest (hash global)
+            e users ({id: hash do conteúdo do usuário})
+        """
+        group_names = self._group_names(groups)
+        memberships = self._memberships(group_names, user_groups)
+
+        user_hashes = {}
+        for user_data in users:
+            device_id = user_data.get('id')
+            if not device_id:
+                continue
+            user_hashes[str(device_id)] = self._digest('|'.join([
+                str(device_id),
+                user_data.get('name') or '',
+                str(user_data.get('registration') or ''),
+                ','.join(sorted(memberships.get(device_id, []))),
+            ]))
+
+        groups_hash = self._digest(repr(sorted(group_names.items())))
+        digest = self._digest(groups_hash + ''.join(
+            f'{key}:{value};' for key, value in sorted(user_hashes.items())
+        ))
+        return {
+            'count': len(user_hashes),
+            'max_id': max((int(key) for key in user_hashes), default=0),
+            'groups': groups_hash,
+            'digest': digest,
+            'users': user_hashes,
+        }
+
+    def changed_since(self, previous: Dict, current: Dict):
+        """
+        Compara dois fingerprints.
+
+        Returns:
+            tuple: (changed_ids, removed_ids), ou (set(), set()) se nada mudou
+        """
+        if all(previous.get(key) == current[key] for key in ('count', 'max_id', 'digest')):
+            return set(), set()
+
+        previous_users = previous.get('users', {})
+        changed = {
+            int(key) for key, value in current['users'].items()
+            if previous_users.get(key) != value
+        }
+        removed = {int(key) for key in previous_users if key not in current['users']}
+        return changed, removed
+
+    # ------------------------------------------------------------------
+    # Diff
+    # ------------------------------------------------------------------
+
+    def _plan_groups(self, plan: SyncPlan, device_groups) -> Dict[int, str]:
+        """Calcula criação/atualização de grupos. Retorna {device_group_id: nome}."""
+        existing = list(EmployeeGroup.objects.all())
+        by_device_id = {g.device_group_id: g for g in existing if g.device_group_id is not None}
+        by_name = {g.name: g for g in existing}
+        names_by_device_id = self._group_names(device_groups)
+
+        for group_id, name in names_by_device_id.items():
+            group = by_device_id.get(group_id)
+            if group is None:
+                # Grupo criado localmente com o mesmo nome (ex: blacklist) recebe o ID do dispositivo
+                group = by_name.get(name)
+                if group is not None and group.device_group_id is None:
+                    group.device_group_id = group_id
+                    plan.groups_to_update.append(group)
+                    continue
+                if group is None:
+                    group = EmployeeGroup(
+                        device_group_id=group_id,
+                        name=name,
+                        description='Grupo sincronizado da catraca',
+                    )
+                    plan.groups_to_create.append(group)
+                    by_name[name] = group
+                continue
+
+            if group.name != name and name not in by_name:
+                by_name.pop(group.name, None)
+                group.name = name
+                by_name[name] = group
+                plan.groups_to_update.append(group)
+
+        return names_by_device_id
+
+    def compute_diff(self, users, groups=None, user_groups=None, deactivate_missing=True,
+                     changed_ids: Optional[Set[int]] = None,
+                     removed_ids: Optional[Set[int]] = None) -> SyncPlan:
+        """
+        Compara o estado do dispositivo com o banco.
+
+        Args:
+            users: lista de usuários do dispositivo
+            groups/user_groups: listas do dispositivo; None mantém os grupos atuais
+            deactivate_missing: desativar funcionários que não existem mais no dispositivo
+            changed_ids/removed_ids: resultado de changed_since; quando informados,
+                apenas esses usuários são carregados e comparados
+
+        Returns:
+            SyncPlan
+        """
+        plan = SyncPlan()
+        sync_groups = groups is not None and user_groups is not None
+        incremental = changed_ids is not None
+
+        group_names = self._plan_groups(plan, groups) if sync_groups else {}
+        memberships = self._memberships(group_names, user_groups) if sync_groups else {}
+
+        if incremental:
+            removed_ids = removed_ids or set()
+            employees = Employee.objects.filter(device_id__in=changed_ids | removed_ids)
+            used_codes = set(
+                Employee.objects.exclude(employee_code='').values_list('employee_code', flat=True)
+            ) if changed_ids else set()
+        else:
+            employees = Employee.objects.all()
+            used_codes = None
+
+        existing = {e.device_id: e for e in employees}
+        if used_codes is None:
+            used_codes = {e.employee_code for e in existing.values() if e.employee_code}
+        seen = set()
+
+        for user_data in users:
+            device_id = user_data.get('id')
+            # Pular usuário 0 (sistema)
+            if not device_id:
+                continue
+            seen.add(device_id)
+            plan.device_users += 1
+
+            if incremental and device_id not in changed_ids:
+                plan.unchanged += 1
+                continue
+
+            name = user_data.get('name') or f'Usuário {device_id}'
+            employee = existing.get(device_id)
+
+            # Usar registration como matrícula (employee_code), sem colisões
+            registration = str(user_data.get('registration') or '') or f'ID_{device_id}'
+            if employee is not None and employee.employee_code and (
+                employee.employee_code == registration or employee.employee_code.startswith(f'{registration}_')
+            ):
+                code = employee.employee_code
+            else:
+                code = registration
+                counter = 1
+                while code in used_codes:
+                    code = f'{registration}_{counter}'
+                    counter += 1
+                used_codes.add(code)
+
+            if employee is None:
+                plan.to_create.append(Employee(
+                    device_id=device_id,
+                    name=name,
+                    employee_code=code,
+                    is_active=True,
+                    is_exempt=False,
+                    groups=memberships.get(device_id, []),
+                ))
+                continue
+
+            target = {
+                'name': name,
+                'employee_code': code,
+                'groups': memberships.get(device_id, []) if sync_groups else employee.groups,
+                'is_active': True,
+            }
+            if any(getattr(employee, field) != value for field, value in target.items()):
+                for field, value in target.items():
+                    setattr(employee, field, value)
+                plan.to_update.append(employee)
+            else:
+                plan.unchanged += 1
+
+        if incremental:
+            for device_id in removed_ids:
+                employee = existing.get(device_id)
+                if employee is not None and device_id not in seen and employee.is_active:
+                    employee.is_active = False
+                    plan.to_deactivate.append(employee)
+        elif deactivate_missing:
+            for device_id, employee in existing.items():
+                if device_id not in seen and employee.is_active:
+                    employee.is_active = False
+                    plan.to_deactivate.append(employee)
+
+        return plan
+
+    # ------------------------------------------------------------------
+    # Aplicação
+    # ------------------------------------------------------------------
+
+    @transaction.atomic
+    def apply(self, plan: SyncPlan):
+        """Aplica o plano numa única transação com operações em lote."""
+        if plan.groups_to_create:
+            EmployeeGroup.objects.bulk_create(plan.groups_to_create, batch_size=self.batch_size)
+        if plan.groups_to_update:
+            EmployeeGroup.objects.bulk_update(
+                plan.groups_to_update, ['name', 'device_group_id'], batch_size=self.batch_size
+            )
+        if plan.to_create:
+            Employee.objects.bulk_create(plan.to_create, batch_size=self.batch_size)
+        if plan.to_update:
+            Employee.objects.bulk_update(plan.to_update, EMPLOYEE_SYNC_FIELDS, batch_size=self.batch_size)
+        if plan.to_deactivate:
+            Employee.objects.filter(
+                id__in=[e.id for e in plan.to_deactivate]
+            ).update(is_active=False)
+
+        # Associações indexadas: grupos novos/renomeados afetam funcionários não alterados
+        if plan.groups_to_create or plan.groups_to_update:
+            membership_service.rebuild()
+            # Operações em lote não disparam signals: invalidar o índice de políticas
+            from apps.interjornada.policy import policy_index
+            transaction.on_commit(policy_index.invalidate)
+        elif plan.to_create or plan.to_update:
+            membership_service.sync_employees(plan.to_create + plan.to_update)
+
+    def _audit(self, summary, device=None):
+        """Grava uma única entrada de auditoria com o resumo da sincronização."""
+        from apps.logs.models import SystemLog
+
+        SystemLog.log_info(
+            message=(
+                f"Sincronização de funcionários concluída: {summary['created']} novos, "
+                f"{summary['updated']} atualizados, {summary['deactivated']} desativados"
+            ),
+            category='employee',
+            device_id=device.id if device else None,
+            device_name=device.name if device else None,
+            details=summary,
+        )
+
+    def _save_fingerprint(self, device, fingerprint):
+        device.user_sync_fingerprint = fingerprint
+        device.last_user_sync = TimezoneUtils.get_utc_now()
+        device.save(update_fields=['user_sync_fingerprint', 'last_user_sync'])
+
+    def sync(self, client, device=None, dry_run=False, full=False) -> Dict:
+        """
+        Executa a sincronização a partir do dispositivo.
+
+        Args:
+            client: DeviceClient autenticado
+            device: Device (guarda o fingerprint e identifica a auditoria)
+            dry_run: calcula o diff sem gravar
+            full: ignora o fingerprint e compara todos os funcionários
+
+        Returns:
+            dict: resumo (e o plano em 'plan')
+
+        Raises:
+            RuntimeError: falha ao baixar o estado do dispositivo (nada é gravado)
+        """
+        snapshot = self.fetch_snapshot(client)
+        if not snapshot['users']:
+            raise RuntimeError('Nenhum usuário retornado pelo dispositivo')
+
+        fingerprint = self.compute_fingerprint(
+            snapshot['users'], snapshot['groups'], snapshot['user_groups']
+        )
+        previous = (device.user_sync_fingerprint or {}) if device is not None else {}
+
+        if previous and not full:
+            changed_ids, removed_ids = self.changed_since(previous, fingerprint)
+            if not changed_ids and not removed_ids and previous.get('groups') == fingerprint['groups']:
+                plan = SyncPlan()
+                plan.device_users = plan.unchanged = fingerprint['count']
+                plan.fingerprint_match = True
+                summary = plan.summary()
+                logger.debug(f"Sincronização de funcionários: fingerprint inalterado ({fingerprint['count']} usuários)")
+                return {**summary, 'dry_run': dry_run, 'plan': plan}
+            plan = self.compute_diff(
+                snapshot['users'], snapshot['groups'], snapshot['user_groups'],
+                changed_ids=changed_ids, removed_ids=removed_ids,
+            )
+        else:
+            plan = self.compute_diff(snapshot['users'], snapshot['groups'], snapshot['user_groups'])
+        summary = plan.summary()
+
+        if not dry_run:
+            if plan.has_changes:
+                self.apply(plan)
+            if device is not None:
+                self._save_fingerprint(device, fingerprint)
+            self._audit(summary, device)
+
+        logger.info(f"Sincronização de funcionários: {summary}")
+        return {**summary, 'dry_run': dry_run, 'plan': plan}
+
+    def sync_users(self, users, device=None) -> Dict:
+        """
+        Sincroniza apenas nomes/matrículas a partir de uma lista de usuários já baixada.
+
+        Grupos são preservados e ninguém é desativado, pois a lista pode ser parcial.
+        """
+        plan = self.compute_diff(users, deactivate_missing=False)
+        if plan.has_changes:
+            self.apply(plan)
+        summary = plan.summary()
+        self._audit(summary, device)
+        return summary
+
+
+# Instância global do serviço
+employee_sync_service = EmployeeSyncService()
@@ -12,79 +12,37 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, name='apps.employees.tasks.sync_employees_from_device_task')
-def sync_employees_from_device_task(self, device_id, users_data):
+def sync_employees_from_device_task(self, device_id, users_data=None):
     """
     Tarefa para sincronizar funcionários de um dispositivo.
+    
+    Sem users_data baixa o estado completo do dispositivo (usuários, grupos e
+    vínculos) e aplica o diff; com users_data atualiza apenas nomes/matrículas
+    da lista recebida. Em ambos os casos grava uma única entrada de auditoria.
     """
     try:
         from apps.devices.models import Device
+        from apps.devices.device_client import DeviceClient
+        from .sync_service import employee_sync_service
         device = Device.objects.get(id=device_id)
         
-        synced_count = 0
-        updated_count = 0
-        error_count = 0
-        
-        for user_data in users_data:
-            try:
-                device_user_id = user_data.get('id')
-                user_name = user_data.get('name', f'Usuário {device_user_id}')
-                
-                if not device_user_id:
-                    continue
-                
-                # Buscar ou criar funcionário
-                employee, created = Employee.objects.get_or_create(
-                    device_id=device_user_id,
-                    defaults={
-                        'name': user_name,
-                        'is_active': True,
-                        'is_exempt': False,
-                        'groups': [],
-                        'exemption_groups': []
-                    }
-                )
-                
-                if created:
-                    synced_count += 1
-                    SystemLog.log_info(
-                        message=f"Funcionário sincronizado: {user_name} (ID: {device_user_id})",
-                        category='employee',
-                        user_id=device_user_id,
-                        user_name=user_name,
-                        device_id=device_id,
-                        device_name=device.name
-                    )
-                else:
-                    # Atualizar nome se mudou
-                    if employee.name != user_name:
-                        employee.name = user_name
-                        employee.save(update_fields=['name'])
-                        updated_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                logger.error(f"Erro ao sincronizar usuário {user_data}: {e}")
-        
-        SystemLog.log_info(
-            message=f"Sincronização de funcionários concluída: {synced_count} novos, {updated_count} atualizados, {error_count} erros",
-            category='employee',
-            device_id=device_id,
-            device_name=device.name,
-            details={
-                'synced_count': synced_count,
-                'updated_count': updated_count,
-                'error_count': error_count,
-                'total_users': len(users_data)
-            }
-        )
+        if users_data is None:
+            client = DeviceClient(device)
+            if not client.is_connected():
+                raise RuntimeError('Não foi possível conectar ao dispositivo')
+            summary = employee_sync_service.sync(client, device=device)
+            summary.pop('plan', None)
+        else:
+            summary = employee_sync_service.sync_users(users_data, device=device)
         
         return {
             'status': 'success',
             'message': 'Sincronização concluída',
-            'synced_count': synced_count,
-            'updated_count': updated_count,
-            'error_count': error_count,
-            'total_users': len(users_data)
+            'synced_count': summary['created'],
+            'updated_count': summary['updated'],
+            'error_count': 0,
+            'total_users': summary['device_users'],
+            **summary
         }
         
     except Exception as e:
@@ -98,6 +56,47 @@ def sync_employees_from_device_task(self, device_id, users_data):
         raise
 
 
+@shared_task(bind=True, name='apps.employees.tasks.periodic_employee_sync_task')
+def periodic_employee_sync_task(self):
+    """
+    Tarefa periódica de sincronização de funcionários dos dispositivos primários.
+    
+    Usa o fingerprint de cada dispositivo: quando nada mudou, apenas o download
+    é feito e nenhum funcionário é comparado ou gravado. Se o download falhar
+    (usuários, grupos ou vínculos), o dispositivo fica para o próximo ciclo sem
+    alterar funcionários nem o fingerprint.
+    """
+    if not getattr(settings, 'EMPLOYEE_SYNC_ENABLED', True):
+        return {'status': 'disabled'}
+    
+    from apps.devices.models import Device
+    from apps.devices.device_client import DeviceClient
+    from .sync_service import employee_sync_service
+    
+    results = {}
+    for device in Device.objects.filter(device_type='primary', is_enabled=True):
+        try:
+            client = DeviceClient(device)
+            if not client.is_connected():
+                results[device.id] = {'status': 'offline'}
+                continue
+            summary = employee_sync_service.sync(client, device=device)
+            summary.pop('plan', None)
+            results[device.id] = {'status': 'success', **summary}
+        except Exception as e:
+            logger.error(f"Erro na sincronização periódica de funcionários ({device.name}): {e}")
+            SystemLog.log_warning(
+                message=f"Sincronização periódica de funcionários não aplicada: {e}",
+                category='employee',
+                device_id=device.id,
+                device_name=device.name,
+                details={'error': str(e)},
+            )
+            results[device.id] = {'status': 'error', 'error': str(e)}
+    
+    return {'status': 'success', 'devices': results}
+
+
 @shared_task(bind=True, name='apps.employees.tasks.cleanup_old_sessions_task')
 def cleanup_old_sessions_task(self, days=30):
     """
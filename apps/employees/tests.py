@@ -0,0 +1,192 @@
+"""
+Testes do app de funcionários.
+"""
+import io
+from unittest import mock
+from django.test import TestCase, override_settings
+from apps.devices.models import Device
+from apps.logs.models import SystemLog
+from .import_service import EmployeeImportService
+from .models import Employee, EmployeeGroup
+from .sync_service import employee_sync_service
+from .tasks import periodic_employee_sync_task
+
+DEVICE_USERS = [
+    {'id': 1, 'name': 'Ana', 'registration': '100'},
+    {'id': 2, 'name': 'Bruno', 'registration': '200'},
+]
+DEVICE_GROUPS = [{'id': 1, 'name': 'Funcionários'}, {'id': 5, 'name': 'Manutenção'}]
+DEVICE_USER_GROUPS = [
+    {'user_id': 1, 'group_id': 1},
+    {'user_id': 2, 'group_id': 1},
+    {'user_id': 2, 'group_id': 5},
+]
+
+
+class FakeDeviceClient:
+    """DeviceClient em memória; as tabelas em `fail` respondem com erro."""
+
+    def __init__(self, users=None, groups=None, user_groups=None, fail=()):
+        self.tables = {
+            'users': DEVICE_USERS if users is None else users,
+            'groups': DEVICE_GROUPS if groups is None else groups,
+            'user_groups': DEVICE_USER_GROUPS if user_groups is None else user_groups,
+        }
+        self.fail = set(fail)
+
+    def _load(self, table, raise_errors):
+        if table in self.fail:
+            if raise_errors:
+                raise ConnectionError('HTTP 500')
+            return []
+        return [dict(row) for row in self.tables[table]]
+
+    def is_connected(self):
+        return True
+
+    def get_users(self, raise_errors=False):
+        return self._load('users', raise_errors)
+
+    def get_groups(self, raise_errors=False):
+        return self._load('groups', raise_errors)
+
+    def get_all_user_groups(self, raise_errors=False):
+        return self._load('user_groups', raise_errors)
+
+
+class EmployeeSyncTests(TestCase):
+    """Sincronização por diff a partir do dispositivo."""
+
+    def setUp(self):
+        self.device = Device.objects.create(
+            name='Catraca Teste', device_type='primary', ip_address='127.0.0.1', port=8081,
+            username='admin', password='admin',
+        )
+        employee_sync_service.sync(FakeDeviceClient(), device=self.device)
+        self.device.refresh_from_db()
+        self.fingerprint = self.device.user_sync_fingerprint
+
+    def groups_by_user(self):
+        return dict(Employee.objects.values_list('device_id', 'groups'))
+
+    def test_initial_sync_creates_employees_and_groups(self):
+        self.assertEqual(self.groups_by_user(), {1: ['Funcionários'], 2: ['Funcionários', 'Manutenção']})
+        self.assertEqual(
+            set(EmployeeGroup.objects.values_list('device_group_id', flat=True)), {1, 5},
+        )
+        self.assertEqual(self.fingerprint['count'], 2)
+
+    def test_unchanged_device_matches_fingerprint(self):
+        result = employee_sync_service.sync(FakeDeviceClient(), device=self.device)
+        self.assertTrue(result['fingerprint_match'])
+        self.assertEqual(result['updated'], 0)
+
+    def test_membership_change_updates_only_that_employee(self):
+        user_groups = [link for link in DEVICE_USER_GROUPS if link != {'user_id': 2, 'group_id': 5}]
+        result = employee_sync_service.sync(FakeDeviceClient(user_groups=user_groups), device=self.device)
+
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(self.groups_by_user()[2], ['Funcionários'])
+
+    def test_failed_fetch_keeps_groups_and_fingerprint(self):
+        for table in ('groups', 'user_groups', 'users'):
+            with self.subTest(table=table):
+                with self.assertRaises(RuntimeError):
+                    employee_sync_service.sync(FakeDeviceClient(fail=[table]), device=self.device)
+
+                self.assertEqual(self.groups_by_user(), {1: ['Funcionários'], 2: ['Funcionários', 'Manutenção']})
+                self.assertEqual(Employee.objects.filter(is_active=True).count(), 2)
+                self.device.refresh_from_db()
+                self.assertEqual(self.device.user_sync_fingerprint, self.fingerprint)
+
+        # Com o dispositivo de volta, nada precisa ser reparado
+        result = employee_sync_service.sync(FakeDeviceClient(), device=self.device)
+        self.assertTrue(result['fingerprint_match'])
+
+
+@override_settings(EMPLOYEE_SYNC_ENABLED=True)
+class PeriodicEmployeeSyncTests(TestCase):
+    """Sincronização periódica (celery beat 'sync-employees')."""
+
+    def setUp(self):
+        self.device = Device.objects.create(
+            name='Catraca Teste', device_type='primary', ip_address='127.0.0.1', port=8081,
+            username='admin', password='admin',
+        )
+
+    def run_task(self, client):
+        with mock.patch('apps.devices.device_client.DeviceClient', return_value=client):
+            return periodic_employee_sync_task()['devices'][self.device.id]
+
+    def test_failed_groups_fetch_is_not_saved(self):
+        self.assertEqual(self.run_task(FakeDeviceClient())['status'], 'success')
+        self.device.refresh_from_db()
+        fingerprint = self.device.user_sync_fingerprint
+
+        result = self.run_task(FakeDeviceClient(fail=['groups']))
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(Employee.objects.get(device_id=2).groups, ['Funcionários', 'Manutenção'])
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.user_sync_fingerprint, fingerprint)
+        self.assertTrue(SystemLog.objects.filter(category='employee', level='WARNING').exists())
+
+        # O ciclo seguinte, com a catraca respondendo, não encontra nada a reparar
+        self.assertTrue(self.run_task(FakeDeviceClient())['fingerprint_match'])
+
+
+class EmployeeImportTests(TestCase):
+    """Importação de CSV em lotes com upsert por device_id."""
+
+    def setUp(self):
+        EmployeeGroup.objects.create(name='Funcionários')
+        Employee.objects.create(device_id=1, name='Ana', employee_code='100', groups=['Funcionários'])
+
+    def import_csv(self, text, **kwargs):
+        service = EmployeeImportService(chunk_size=2)
+        return service.import_file(io.BytesIO(text.encode('utf-8')), **kwargs)
+
+    def test_upsert_creates_and_updates_by_device_id(self):
+        result = self.import_csv(
+            'ID_Dispositivo,Nome,Matricula,Status,Grupos\n'
+            '1,Ana Souza,100,Inativo,Sem grupos\n'
+            '2,Bruno,200,Ativo,funcionários\n'
+            '3,Carla,,Ativo,\n'
+        )
+
+        self.assertEqual((result.created, result.updated, result.errors), (2, 1, []))
+        ana = Employee.objects.get(device_id=1)
+        self.assertEqual((ana.name, ana.is_active, ana.groups), ('Ana Souza', False, []))
+        self.assertEqual(Employee.objects.get(device_id=2).groups, ['Funcionários'])
+        self.assertEqual(Employee.objects.count(), 3)
+        self.assertTrue(SystemLog.objects.filter(category='employee').exists())
+
+    def test_invalid_rows_are_reported_without_stopping_the_import(self):
+        result = self.import_csv(
+            'ID_Dispositivo;Nome;Matricula;Status;Grupos\n'
+            'x;Sem ID;;Ativo;\n'
+            '2;Bruno;100;Ativo;\n'
+            '3;Carla;300;Ativo;Inexistente\n'
+            '4;Davi;400;Ativo;\n'
+            '4;Davi de novo;401;Ativo;\n'
+        )
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([error['line'] for error in result.errors], [2, 3, 4, 6])
+        self.assertIn('já pertence ao dispositivo 1', result.errors[1]['error'])
+        self.assertEqual(set(Employee.objects.values_list('device_id', flat=True)), {1, 4})
+
+    def test_dry_run_and_group_creation(self):
+        text = 'ID_Dispositivo,Nome,Matricula,Status,Grupos\n2,Bruno,200,Ativo,"Manutenção, Funcionários"\n'
+
+        preview = self.import_csv(text, dry_run=True, create_groups=True)
+        self.assertEqual((preview.created, preview.groups_created), (1, 1))
+        self.assertFalse(Employee.objects.filter(device_id=2).exists())
+        self.assertFalse(EmployeeGroup.objects.filter(name='Manutenção').exists())
+
+        self.import_csv(text, create_groups=True)
+        self.assertEqual(Employee.objects.get(device_id=2).groups, ['Manutenção', 'Funcionários'])
+
+    def test_missing_required_columns(self):
+        with self.assertRaises(ValueError):
+            self.import_csv('Nome,Matricula\nAna,100\n')
@@ -7,7 +7,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from .models import Employee, EmployeeGroup
+from .models import Employee, EmployeeGroup, EmployeeGroupMembership
+from .membership_service import membership_service
 from .serializers import (
     EmployeeSerializer, EmployeeGroupSerializer, EmployeeAccessCheckSerializer, EmployeeAccessResponseSerializer
 )
@@ -53,6 +54,14 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
         if is_exempt is not None:
             queryset = queryset.filter(is_exempt=is_exempt.lower() == 'true')
         
+        # Filtro por grupo (join na tabela de associações)
+        group = self.request.query_params.get('group')
+        if group:
+            queryset = queryset.filter(
+                group_memberships__group__name=group,
+                group_memberships__kind=EmployeeGroupMembership.KIND_MEMBER,
+            )
+        
         return queryset.order_by('name')
     
     def perform_create(self, serializer):
@@ -80,7 +89,8 @@ class EmployeeGroupListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filtra grupos baseado nos parâmetros."""
-        queryset = EmployeeGroup.objects.all()
+        # employee_count anotado numa única consulta (sem uma contagem por grupo)
+        queryset = membership_service.with_employee_count()
         
         # Filtro por nome
         name = self.request.query_params.get('name')
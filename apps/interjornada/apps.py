@@ -0,0 +1,15 @@
+"""
+Configuração da aplicação de interjornada.
+"""
+from django.apps import AppConfig
+
+
+class InterjornadaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.interjornada'
+    verbose_name = 'Interjornada'
+
+    def ready(self):
+        """Conecta a invalidação do índice de políticas."""
+        from .policy import connect_policy_signals
+        connect_policy_signals()
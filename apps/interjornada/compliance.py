@@ -0,0 +1,373 @@
+"""
+Relatório vetorizado de conformidade de interjornada sobre o histórico de AccessLog.
+
+Os eventos autorizados (user_id, timestamp, portal, event_type) são lidos em
+streaming para arrays NumPy, ordenados por (usuário, horário) e agrupados em
+jornadas: uma nova jornada começa quando o evento anterior do mesmo usuário foi
+uma saída há pelo menos break_minutes (ou, sem saída registrada, quando o
+intervalo passa de MAX_SPAN_GAP_HOURS). Para cada jornada calcula-se
+a duração de trabalho (primeiro evento até a última saída) e, entre jornadas
+consecutivas, o descanso (última saída até a próxima entrada). Descansos menores
+que o tempo de interjornada do funcionário são violações.
+
+Intervalos grandes são divididos por faixas de usuário entre processos, para que
+nenhuma jornada seja cortada na fronteira de uma partição. Limites e isenções de
+cada funcionário vêm do PolicyIndex, o mesmo usado no controle de acesso.
+"""
+import logging
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, time as dt_time, timedelta
+import multiprocessing
+import numpy as np
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Evento "7" = acesso autorizado; portal 2 = saída, demais portais = entrada
+AUTHORIZED_EVENT = 7
+EXIT_PORTAL = 2
+
+# Sem saída registrada, um intervalo maior que este sempre separa jornadas
+MAX_SPAN_GAP_HOURS = 16
+
+
+def _day_bounds(date_from, date_to):
+    """Converte datas locais (inclusivas) em limites aware [início, fim)."""
+    start = timezone.make_aware(datetime.combine(date_from, dt_time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), dt_time.min))
+    return start, end
+
+
+def load_event_arrays(date_from, date_to, partitions=1, partition=0, chunk_size=20000):
+    """
+    Lê os eventos autorizados do período em arrays NumPy.
+
+    Args:
+        partitions/partition: seleciona apenas user_id % partitions == partition
+
+    Returns:
+        tuple: (user_ids int64, timestamps int64 em segundos, is_exit bool)
+    """
+    from apps.logs.models import AccessLog
+
+    start, end = _day_bounds(date_from, date_to)
+    queryset = AccessLog.objects.filter(
+        event_type=AUTHORIZED_EVENT,
+        device_timestamp__gte=start,
+        device_timestamp__lt=end,
+    )
+    if partitions > 1:
+        queryset = queryset.annotate(bucket=F('user_id') % partitions).filter(bucket=partition)
+
+    users = array('q')
+    stamps = array('q')
+    exits = array('b')
+
+    rows = queryset.values_list('user_id', 'device_timestamp', 'portal_id').iterator(chunk_size=chunk_size)
+    for user_id, device_timestamp, portal_id in rows:
+        users.append(user_id)
+        stamps.append(int(device_timestamp.timestamp()))
+        exits.append(1 if portal_id == EXIT_PORTAL else 0)
+
+    return (
+        np.frombuffer(users, dtype=np.int64) if users else np.empty(0, dtype=np.int64),
+        np.frombuffer(stamps, dtype=np.int64) if stamps else np.empty(0, dtype=np.int64),
+        np.frombuffer(exits, dtype=np.int8).astype(bool) if exits else np.empty(0, dtype=bool),
+    )
+
+
+def compute_spans(user_ids, timestamps, is_exit, break_seconds):
+    """
+    Agrupa eventos em jornadas e calcula trabalho/descanso de forma vetorizada.
+
+    Returns:
+        dict de arrays por jornada: user, start, end, work, rest_before
+        (rest_before = -1 na primeira jornada de cada usuário)
+    """
+    if user_ids.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return {'user': empty, 'start': empty, 'end': empty, 'work': empty, 'rest_before': empty}
+
+    order = np.lexsort((timestamps, user_ids))
+    users = user_ids[order]
+    stamps = timestamps[order]
+    exits = is_exit[order]
+
+    # Início de jornada: primeiro evento do usuário, saída seguida de intervalo
+    # >= break, ou intervalo longo demais mesmo sem saída registrada
+    new_user = np.empty(users.size, dtype=bool)
+    new_user[0] = True
+    new_user[1:] = users[1:] != users[:-1]
+    gap = np.zeros(stamps.size, dtype=np.int64)
+    gap[1:] = stamps[1:] - stamps[:-1]
+    prev_exit = np.zeros(exits.size, dtype=bool)
+    prev_exit[1:] = exits[:-1]
+    hard_break = max(break_seconds, MAX_SPAN_GAP_HOURS * 3600)
+    span_start_mask = new_user | (prev_exit & (gap >= break_seconds)) | (gap >= hard_break)
+    starts_idx = np.flatnonzero(span_start_mask)
+
+    span_user = users[starts_idx]
+    span_start = stamps[starts_idx]
+
+    # Fim da jornada: última saída dentro dela (ou último evento, se não houver saída)
+    last_event = np.maximum.reduceat(stamps, starts_idx)
+    exit_stamps = np.where(exits, stamps, np.iinfo(np.int64).min)
+    last_exit = np.maximum.reduceat(exit_stamps, starts_idx)
+    span_end = np.where(last_exit > np.iinfo(np.int64).min, last_exit, last_event)
+
+    work = span_end - span_start
+
+    # Descanso: início desta jornada - fim da jornada anterior do mesmo usuário
+    rest_before = np.full(span_start.size, -1, dtype=np.int64)
+    same_user = np.empty(span_user.size, dtype=bool)
+    same_user[0] = False
+    same_user[1:] = span_user[1:] == span_user[:-1]
+    prev_end = np.empty_like(span_end)
+    prev_end[0] = 0
+    prev_end[1:] = span_end[:-1]
+    rest_before[same_user] = (span_start - prev_end)[same_user]
+
+    return {
+        'user': span_user,
+        'start': span_start,
+        'end': span_end,
+        'work': work,
+        'rest_before': rest_before,
+    }
+
+
+def summarize_spans(spans, rest_limits, work_limits, default_rest, default_work, exempt_users):
+    """
+    Resume as jornadas por funcionário com operações agrupadas.
+
+    Args:
+        rest_limits/work_limits: {user_id: minutos} individuais
+        default_rest/default_work: minutos padrão da configuração
+        exempt_users: conjunto de user_ids isentos (sem violações)
+
+    Returns:
+        dict: {user_id: {...métricas...}}
+    """
+    users = spans['user']
+    if users.size == 0:
+        return {}
+
+    unique_users, inverse = np.unique(users, return_inverse=True)
+    rest_limit = np.array([rest_limits.get(int(u), default_rest) for u in unique_users], dtype=np.int64) * 60
+    work_limit = np.array([work_limits.get(int(u), default_work) for u in unique_users], dtype=np.int64) * 60
+    exempt = np.array([int(u) in exempt_users for u in unique_users], dtype=bool)
+
+    rest = spans['rest_before']
+    work = spans['work']
+    has_rest = rest >= 0
+
+    span_rest_limit = rest_limit[inverse]
+    violation = has_rest & (rest < span_rest_limit) & ~exempt[inverse]
+    overtime = work > work_limit[inverse]
+    shortfall = np.where(violation, span_rest_limit - rest, 0)
+
+    n = unique_users.size
+    span_count = np.bincount(inverse, minlength=n)
+    work_total = np.bincount(inverse, weights=work, minlength=n)
+    rest_count = np.bincount(inverse, weights=has_rest, minlength=n)
+    rest_total = np.bincount(inverse, weights=np.where(has_rest, rest, 0), minlength=n)
+    violations = np.bincount(inverse, weights=violation, minlength=n)
+    overtime_count = np.bincount(inverse, weights=overtime, minlength=n)
+    shortfall_total = np.bincount(inverse, weights=shortfall, minlength=n)
+
+    rest_for_min = np.where(has_rest, rest, np.iinfo(np.int64).max)
+    min_rest = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(min_rest, inverse, rest_for_min)
+
+    summary = {}
+    for i, user_id in enumerate(unique_users.tolist()):
+        rests = int(rest_count[i])
+        summary[user_id] = {
+            'user_id': user_id,
+            'spans': int(span_count[i]),
+            'work_minutes_total': float(round(work_total[i] / 60, 1)),
+            'work_minutes_avg': float(round(work_total[i] / 60 / span_count[i], 1)),
+            'overtime_spans': int(overtime_count[i]),
+            'rest_gaps': rests,
+            'rest_minutes_avg': float(round(rest_total[i] / 60 / rests, 1)) if rests else None,
+            'rest_minutes_min': float(round(min_rest[i] / 60, 1)) if rests else None,
+            'rest_limit_minutes': int(rest_limit[i] // 60),
+            'violations': int(violations[i]),
+            'shortfall_minutes_total': float(round(shortfall_total[i] / 60, 1)),
+            'exempt': bool(exempt[i]),
+        }
+    return summary
+
+
+def _init_spawned_worker():
+    """Processos 'spawn' (Windows) não herdam o Django configurado do processo pai."""
+    import django
+    django.setup()
+
+
+def _process_context():
+    """
+    Contexto dos processos filhos: fork onde existir (Linux), spawn nos demais.
+
+    Returns:
+        tuple: (contexto multiprocessing, initializer dos processos ou None)
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork'), None
+    return multiprocessing.get_context('spawn'), _init_spawned_worker
+
+
+def _partition_worker(args):
+    """Executado em processo separado: carrega e calcula uma partição de usuários."""
+    date_from, date_to, partitions, partition, break_seconds = args
+    user_ids, timestamps, is_exit = load_event_arrays(date_from, date_to, partitions, partition)
+    spans = compute_spans(user_ids, timestamps, is_exit, break_seconds)
+    connections.close_all()
+    return spans, int(user_ids.size)
+
+
+class ComplianceReportService:
+    """Serviço do relatório de conformidade de interjornada."""
+
+    def __init__(self, break_minutes=180, parallel_threshold_days=62):
+        self.break_minutes = break_minutes
+        self.parallel_threshold_days = parallel_threshold_days
+
+    def _collect_spans(self, date_from, date_to, break_seconds, workers):
+        """Calcula as jornadas, em paralelo por faixas de usuário se necessário."""
+        days = (date_to - date_from).days + 1
+        if workers <= 1 or days < self.parallel_threshold_days:
+            return self._collect_spans_serial(date_from, date_to, break_seconds)
+
+        # Conexões abertas não podem ser compartilhadas com os processos filhos
+        connections.close_all()
+        tasks = [(date_from, date_to, workers, p, break_seconds) for p in range(workers)]
+        context, initializer = _process_context()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer) as pool:
+                results = list(pool.map(_partition_worker, tasks))
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Processos paralelos indisponíveis ({e}) - calculando o relatório em série")
+            return self._collect_spans_serial(date_from, date_to, break_seconds)
+
+        merged = {
+            key: np.concatenate([spans[key] for spans, _ in results])
+            for key in ('user', 'start', 'end', 'work', 'rest_before')
+        }
+        return merged, sum(count for _, count in results)
+
+    def _collect_spans_serial(self, date_from, date_to, break_seconds):
+        user_ids, timestamps, is_exit = load_event_arrays(date_from, date_to)
+        return compute_spans(user_ids, timestamps, is_exit, break_seconds), int(user_ids.size)
+
+    def _employee_context(self):
+        """
+        Carrega limites, isenções, nomes e grupos dos funcionários.
+
+        Durações e isenção vêm de policy_index.resolve (funcionário > grupo >
+        regra > configuração; is_exempt e grupos de isenção), como no controle
+        de acesso. Com device_id repetido vale o funcionário ativo, como na
+        busca do monitoramento.
+        """
+        from apps.employees.models import Employee
+        from .policy import policy_index
+
+        rest_limits, work_limits, exempt, info = {}, {}, set(), {}
+        employees = Employee.objects.only(
+            'device_id', 'name', 'groups', 'exemption_groups', 'is_exempt', 'is_active',
+            'work_duration_minutes', 'rest_duration_minutes',
+        ).order_by('-is_active', 'id')
+        for employee in employees.iterator():
+            if employee.device_id in info:
+                continue
+            policy = policy_index.resolve(employee)
+            info[employee.device_id] = {'name': employee.name, 'groups': employee.groups or []}
+            rest_limits[employee.device_id] = policy.rest_minutes
+            work_limits[employee.device_id] = policy.work_minutes
+            if policy.exempt:
+                exempt.add(employee.device_id)
+        return rest_limits, work_limits, exempt, info
+
+    def build_report(self, date_from, date_to, break_minutes=None, workers=1):
+        """
+        Gera o relatório de conformidade do período.
+
+        Args:
+            date_from/date_to: datas locais (inclusivas)
+            break_minutes: intervalo mínimo que separa duas jornadas
+            workers: número de processos para períodos longos
+
+        Returns:
+            dict: {'period', 'totals', 'employees', 'groups', 'elapsed_seconds'}
+        """
+        from apps.core.models import SystemConfiguration
+
+        started = time.monotonic()
+        break_minutes = break_minutes or self.break_minutes
+        config = SystemConfiguration.get_active_config()
+
+        spans, event_count = self._collect_spans(date_from, date_to, break_minutes * 60, workers)
+        rest_limits, work_limits, exempt, info = self._employee_context()
+
+        employees = summarize_spans(
+            spans, rest_limits, work_limits,
+            default_rest=config.bloqueado_minutes,
+            default_work=config.liberado_minutes,
+            exempt_users=exempt,
+        )
+
+        groups = {}
+        for user_id, entry in employees.items():
+            details = info.get(user_id, {'name': None, 'groups': []})
+            entry['name'] = details['name']
+            entry['groups'] = details['groups']
+            for group in details['groups'] or ['Sem grupo']:
+                summary = groups.setdefault(group, {
+                    'group': group, 'employees': 0, 'spans': 0, 'rest_gaps': 0,
+                    'violations': 0, 'employees_with_violations': 0, 'overtime_spans': 0,
+                })
+                summary['employees'] += 1
+                summary['spans'] += entry['spans']
+                summary['rest_gaps'] += entry['rest_gaps']
+                summary['violations'] += entry['violations']
+                summary['overtime_spans'] += entry['overtime_spans']
+                if entry['violations']:
+                    summary['employees_with_violations'] += 1
+
+        for summary in groups.values():
+            summary['violation_rate'] = (
+                round(summary['violations'] / summary['rest_gaps'] * 100, 2) if summary['rest_gaps'] else 0
+            )
+
+        total_rests = sum(e['rest_gaps'] for e in employees.values())
+        total_violations = sum(e['violations'] for e in employees.values())
+
+        return {
+            'period': {'from': date_from.isoformat(), 'to': date_to.isoformat()},
+            'parameters': {
+                'break_minutes': break_minutes,
+                'default_rest_minutes': config.bloqueado_minutes,
+                'default_work_minutes': config.liberado_minutes,
+                'workers': workers,
+            },
+            'totals': {
+                'events': event_count,
+                'employees': len(employees),
+                'spans': int(spans['user'].size),
+                'rest_gaps': total_rests,
+                'violations': total_violations,
+                'violation_rate': round(total_violations / total_rests * 100, 2) if total_rests else 0,
+            },
+            'employees': sorted(employees.values(), key=lambda e: (-e['violations'], e['user_id'])),
+            'groups': sorted(groups.values(), key=lambda g: -g['violations']),
+            'elapsed_seconds': round(time.monotonic() - started, 3),
+        }
+
+
+# Instância global do serviço
+compliance_report_service = ComplianceReportService()
@@ -0,0 +1,111 @@
+"""
+Comando para gerar o relatório de conformidade de interjornada sobre o histórico de logs.
+"""
+import csv
+import json
+import os
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from apps.interjornada.compliance import compliance_report_service
+
+
+class Command(BaseCommand):
+    help = 'Relatório vetorizado de conformidade de interjornada (descansos x tempo de interjornada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=str,
+            help='Data inicial AAAA-MM-DD (padrão: 30 dias atrás)',
+        )
+        parser.add_argument(
+            '--date-to',
+            type=str,
+            help='Data final AAAA-MM-DD (padrão: hoje)',
+        )
+        parser.add_argument(
+            '--break-minutes',
+            type=int,
+            default=compliance_report_service.break_minutes,
+            help=f'Intervalo mínimo entre jornadas (padrão: {compliance_report_service.break_minutes})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processos para períodos longos (padrão: número de CPUs)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Arquivo de saída (.json com o relatório completo ou .csv por funcionário)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Quantidade de funcionários exibidos no resumo (padrão: 10)',
+        )
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Data inválida: {value} (use AAAA-MM-DD)")
+
+    def handle(self, *args, **options):
+        date_to = self._parse_date(options['date_to']) if options['date_to'] else date.today()
+        date_from = self._parse_date(options['date_from']) if options['date_from'] else date_to - timedelta(days=30)
+
+        if date_from > date_to:
+            raise CommandError("--date-from deve ser anterior a --date-to")
+
+        self.stdout.write(f"📊 Gerando relatório de conformidade de {date_from} a {date_to}...")
+        report = compliance_report_service.build_report(
+            date_from, date_to,
+            break_minutes=options['break_minutes'],
+            workers=max(1, options['workers']),
+        )
+
+        totals = report['totals']
+        self.stdout.write(self.style.SUCCESS(f"✅ Relatório gerado em {report['elapsed_seconds']}s"))
+        self.stdout.write(f"   📥 Eventos: {totals['events']}")
+        self.stdout.write(f"   👥 Funcionários: {totals['employees']}")
+        self.stdout.write(f"   🕐 Jornadas: {totals['spans']}")
+        self.stdout.write(f"   😴 Descansos: {totals['rest_gaps']}")
+        self.stdout.write(f"   🚨 Violações: {totals['violations']} ({totals['violation_rate']}%)")
+
+        if report['groups']:
+            self.stdout.write("\n🏷️ POR GRUPO:")
+            for group in report['groups']:
+                self.stdout.write(
+                    f"   {group['group']}: {group['employees']} funcionários, "
+                    f"{group['violations']} violações ({group['violation_rate']}%)"
+                )
+
+        offenders = [e for e in report['employees'] if e['violations']][:options['top']]
+        if offenders:
+            self.stdout.write("\n🚨 FUNCIONÁRIOS COM MAIS VIOLAÇÕES:")
+            for entry in offenders:
+                self.stdout.write(
+                    f"   {entry['user_id']} - {entry['name'] or 'Desconhecido'}: {entry['violations']} violações, "
+                    f"menor descanso {entry['rest_minutes_min']} min (limite {entry['rest_limit_minutes']} min)"
+                )
+
+        output = options['output']
+        if output:
+            if output.endswith('.csv'):
+                fields = [
+                    'user_id', 'name', 'spans', 'work_minutes_total', 'work_minutes_avg', 'overtime_spans',
+                    'rest_gaps', 'rest_minutes_avg', 'rest_minutes_min', 'rest_limit_minutes',
+                    'violations', 'shortfall_minutes_total', 'exempt', 'groups',
+                ]
+                with open(output, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.DictWriter(csvfile, fieldnames=fields, extrasaction='ignore')
+                    writer.writeheader()
+                    for entry in report['employees']:
+                        writer.writerow({**entry, 'groups': ', '.join(entry['groups'])})
+            else:
+                with open(output, 'w', encoding='utf-8') as jsonfile:
+                    json.dump(report, jsonfile, ensure_ascii=False, indent=2, default=float)
+            self.stdout.write(f"\n📁 Arquivo: {os.path.abspath(output)}")
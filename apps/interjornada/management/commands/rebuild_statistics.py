@@ -0,0 +1,62 @@
+"""
+Comando para recalcular estatísticas diárias de interjornada por intervalo de datas.
+"""
+import time
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from apps.interjornada.statistics import statistics_service
+
+
+class Command(BaseCommand):
+    help = 'Recalcula estatísticas diárias de interjornada (agregação agrupada + gravação em lote)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=str,
+            help='Data inicial AAAA-MM-DD',
+        )
+        parser.add_argument(
+            '--date-to',
+            type=str,
+            help='Data final AAAA-MM-DD (padrão: hoje)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Recalcular os últimos N dias (alternativa a --date-from)',
+        )
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Data inválida: {value} (use AAAA-MM-DD)")
+
+    def handle(self, *args, **options):
+        date_to = self._parse_date(options['date_to']) if options['date_to'] else date.today()
+
+        if options['date_from']:
+            date_from = self._parse_date(options['date_from'])
+        elif options['days']:
+            date_from = date_to - timedelta(days=options['days'] - 1)
+        else:
+            date_from = date_to
+
+        if date_from > date_to:
+            raise CommandError("--date-from deve ser anterior a --date-to")
+
+        self.stdout.write(f"📊 Recalculando estatísticas de {date_from} a {date_to}...")
+        started = time.monotonic()
+        result = statistics_service.rebuild(date_from, date_to)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Concluído em {elapsed:.2f}s\n"
+                f"   🆕 Criadas: {result['created']}\n"
+                f"   🔄 Atualizadas: {result['updated']}\n"
+                f"   0️⃣ Zeradas: {result['zeroed']}\n"
+                f"   📅 Janelas: {result['windows']}"
+            )
+        )
@@ -344,3 +344,37 @@ class InterjornadaStatistics(models.Model):
         hours = self.total_rest_time_minutes // 60
         minutes = self.total_rest_time_minutes % 60
         return f"{hours}h {minutes}min"
+
+
+class PolicyVersion(models.Model):
+    """
+    Versão do índice de políticas compartilhada entre processos (linha única).
+    
+    Incrementada a cada alteração de regras, grupos ou configuração; os
+    processos (web, runtime, workers) comparam a versão periodicamente e
+    recompilam o índice quando ela muda.
+    """
+    
+    version = models.BigIntegerField(default=0, verbose_name="Versão")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+    
+    class Meta:
+        verbose_name = "Versão das Políticas"
+        verbose_name_plural = "Versão das Políticas"
+    
+    def __str__(self):
+        return f"Políticas v{self.version}"
+    
+    @classmethod
+    def current(cls) -> int:
+        """Versão atual (0 se nunca houve alteração)."""
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+    
+    @classmethod
+    def bump(cls) -> None:
+        """Incrementa a versão de forma atômica (cria a linha se necessário)."""
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1):
+            obj, created = cls.objects.get_or_create(pk=1, defaults={'version': 1})
+            if not created:
+                cls.objects.filter(pk=1).update(version=models.F('version') + 1)
+
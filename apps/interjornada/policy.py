@@ -0,0 +1,247 @@
+"""
+Índice compilado de políticas de interjornada.
+
+Resolve, para cada funcionário, a regra aplicável e as durações efetivas de
+trabalho/interjornada a partir de:
+    1. override individual do funcionário
+    2. override do primeiro grupo do funcionário que defina a duração
+    3. regra de interjornada aplicável
+    4. configuração do sistema (liberado_minutes / bloqueado_minutes)
+
+As regras, grupos e a configuração são compilados uma única vez em estruturas
+em memória; a resolução por funcionário é memoizada pela combinação de grupos e
+overrides, de modo que cada consulta é O(1) após a primeira. Alterações em
+regras, grupos ou configuração invalidam o índice (signals), e a versão
+gravada no banco (PolicyVersion, linha única) propaga a invalidação para os
+outros processos, verificada no máximo a cada
+POLICY_INDEX_VERSION_CHECK_SECONDS. Alterações
+de funcionários não precisam de invalidação: grupos e overrides fazem parte da
+chave de memoização, então um funcionário alterado cai numa nova entrada.
+"""
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+class EffectivePolicy(NamedTuple):
+    """Política efetiva de um funcionário."""
+    work_minutes: int
+    rest_minutes: int
+    rule_id: Optional[int]
+    exempt: bool
+    work_source: str
+    rest_source: str
+
+
+class PolicyIndex:
+    """Índice compilado de regras, grupos e configuração."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._compiled = None
+        self._memo = {}
+        self._version = None
+        self._last_version_check = 0.0
+        self.version_check_interval = getattr(settings, 'POLICY_INDEX_VERSION_CHECK_SECONDS', 5)
+
+    # ------------------------------------------------------------------
+    # Compilação
+    # ------------------------------------------------------------------
+
+    def _compile(self):
+        """Carrega regras, grupos e configuração em estruturas de consulta."""
+        from apps.core.models import SystemConfiguration
+        from apps.employees.models import EmployeeGroup
+        from .models import InterjornadaRule
+
+        config = SystemConfiguration.objects.filter(id=1).first() or SystemConfiguration.objects.first()
+        default_work = config.liberado_minutes if config else 480
+        default_rest = config.bloqueado_minutes if config else 672
+        exemption_group_name = (
+            getattr(config, 'exemption_group_name', None) or settings.EXEMPTION_GROUP_NAME
+        )
+
+        # Mesma ordem de avaliação da busca original (mais recente primeiro)
+        rules = [
+            {
+                'id': rule.id,
+                'work': rule.work_duration_minutes,
+                'rest': rule.rest_duration_minutes,
+                'apply_to_all': rule.apply_to_all,
+                'groups': frozenset(rule.employee_groups or []),
+                'exempt_groups': frozenset(rule.exempt_employee_groups or []),
+            }
+            for rule in InterjornadaRule.objects.filter(is_active=True).order_by('-created_at')
+        ]
+
+        groups = {}
+        exemption_groups = {exemption_group_name}
+        for group in EmployeeGroup.objects.filter(is_active=True):
+            if group.is_exemption_group:
+                exemption_groups.add(group.name)
+            if group.is_blacklist:
+                continue
+            groups[group.name] = (group.work_duration_minutes, group.rest_duration_minutes)
+
+        return {
+            'default_work': default_work,
+            'default_rest': default_rest,
+            'rules': rules,
+            'groups': groups,
+            'exemption_groups': frozenset(exemption_groups),
+        }
+
+    def _current_version(self):
+        from .models import PolicyVersion
+        return PolicyVersion.current()
+
+    def _ensure_compiled(self):
+        """Compila o índice se necessário, verificando a versão compartilhada periodicamente."""
+        now = time.monotonic()
+        if self._compiled is not None and now - self._last_version_check < self.version_check_interval:
+            return self._compiled
+
+        with self._lock:
+            version = self._current_version()
+            self._last_version_check = now
+            if self._compiled is None or version != self._version:
+                self._compiled = self._compile()
+                self._memo = {}
+                self._version = version
+                logger.debug(
+                    f"Índice de políticas compilado: {len(self._compiled['rules'])} regras, "
+                    f"{len(self._compiled['groups'])} grupos"
+                )
+            return self._compiled
+
+    def invalidate(self):
+        """Descarta o índice local e incrementa a versão compartilhada (banco)."""
+        from .models import PolicyVersion
+
+        with self._lock:
+            self._compiled = None
+            self._memo = {}
+        try:
+            PolicyVersion.bump()
+        except Exception as e:
+            logger.error(f"Erro ao incrementar a versão das políticas: {e}")
+
+    # ------------------------------------------------------------------
+    # Resolução
+    # ------------------------------------------------------------------
+
+    def _resolve_rule(self, compiled, employee_groups):
+        """Primeira regra aplicável (mesma semântica de get_applicable_rule)."""
+        for rule in compiled['rules']:
+            if rule['apply_to_all']:
+                return rule
+            if rule['groups'] & employee_groups:
+                return rule
+            if not (rule['exempt_groups'] & employee_groups):
+                return rule
+        return None
+
+    def resolve(self, employee) -> EffectivePolicy:
+        """
+        Resolve a política efetiva de um funcionário.
+
+        Args:
+            employee: instância de Employee
+
+        Returns:
+            EffectivePolicy
+        """
+        compiled = self._ensure_compiled()
+        groups = tuple(employee.groups or [])
+        exemption = tuple(employee.exemption_groups or [])
+        key = (
+            groups, exemption, employee.is_exempt,
+            employee.work_duration_minutes, employee.rest_duration_minutes,
+        )
+
+        policy = self._memo.get(key)
+        if policy is not None:
+            return policy
+
+        group_set = frozenset(groups)
+        rule = self._resolve_rule(compiled, group_set)
+
+        work, work_source = employee.work_duration_minutes, 'employee'
+        rest, rest_source = employee.rest_duration_minutes, 'employee'
+
+        for name in groups:
+            group_work, group_rest = compiled['groups'].get(name, (None, None))
+            if not work and group_work:
+                work, work_source = group_work, f'group:{name}'
+            if not rest and group_rest:
+                rest, rest_source = group_rest, f'group:{name}'
+
+        if not work and rule:
+            work, work_source = rule['work'], f"rule:{rule['id']}"
+        if not rest and rule:
+            rest, rest_source = rule['rest'], f"rule:{rule['id']}"
+
+        if not work:
+            work, work_source = compiled['default_work'], 'config'
+        if not rest:
+            rest, rest_source = compiled['default_rest'], 'config'
+
+        exempt = bool(
+            employee.is_exempt
+            or compiled['exemption_groups'] & (group_set | frozenset(exemption))
+        )
+
+        policy = EffectivePolicy(
+            work_minutes=work,
+            rest_minutes=rest,
+            rule_id=rule['id'] if rule else None,
+            exempt=exempt,
+            work_source=work_source,
+            rest_source=rest_source,
+        )
+        self._memo[key] = policy
+        return policy
+
+    def get_rule(self, employee):
+        """Obtém a InterjornadaRule aplicável (ou None)."""
+        from .models import InterjornadaRule
+
+        rule_id = self.resolve(employee).rule_id
+        if rule_id is None:
+            return None
+        return InterjornadaRule.objects.filter(id=rule_id).first()
+
+    def get_status(self):
+        """Status do índice para diagnóstico."""
+        compiled = self._compiled or {}
+        return {
+            'compiled': self._compiled is not None,
+            'version': self._version,
+            'rules': len(compiled.get('rules', [])),
+            'groups': len(compiled.get('groups', {})),
+            'memoized_policies': len(self._memo),
+        }
+
+
+def _invalidate_policy_index(sender, **kwargs):
+    policy_index.invalidate()
+
+
+def connect_policy_signals():
+    """Conecta a invalidação do índice às alterações de regras, grupos e configuração."""
+    from django.db.models.signals import post_save, post_delete
+    from apps.core.models import SystemConfiguration
+    from apps.employees.models import EmployeeGroup
+    from .models import InterjornadaRule
+
+    for model in (InterjornadaRule, EmployeeGroup, SystemConfiguration):
+        uid = f'policy_index_{model._meta.label_lower}'
+        post_save.connect(_invalidate_policy_index, sender=model, dispatch_uid=f'{uid}_save')
+        post_delete.connect(_invalidate_policy_index, sender=model, dispatch_uid=f'{uid}_delete')
+
+
+# Instância global do índice
+policy_index = PolicyIndex()
@@ -0,0 +1,52 @@
+"""
+Regras de decisão de sessão/interjornada, sem I/O.
+
+Funções puras sobre o estado da sessão e o relógio ("agora") informados pelo
+chamador. São usadas pelo processamento ao vivo (InterjornadaService), com o
+relógio de parede, e pelo replay (apps.logs.replay), com o relógio virtual,
+para que as duas pontas decidam da mesma forma. enforce_session_timeouts
+aplica o mesmo corte de is_work_over em SQL (EmployeeSession.time_limit_filters).
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Estados em que a saída (evento 2) pode iniciar a interjornada
+EXIT_STATES = ('active', 'pending_rest')
+
+
+def work_limit(first_access: datetime, work_minutes: int) -> datetime:
+    """Horário em que termina o tempo de trabalho da sessão."""
+    return first_access + timedelta(minutes=work_minutes)
+
+
+def rest_return_time(block_start: datetime, rest_minutes: int) -> datetime:
+    """Horário de retorno de uma interjornada iniciada em `block_start`."""
+    return block_start + timedelta(minutes=rest_minutes)
+
+
+def can_exit(state: Optional[str]) -> bool:
+    """Se uma sessão no estado informado pode sair para a interjornada."""
+    return state in EXIT_STATES
+
+
+def remaining_work_minutes(first_access: datetime, work_minutes: int, now: datetime) -> Optional[float]:
+    """Minutos de trabalho que ainda faltam para a saída; None se o tempo já foi cumprido."""
+    remaining = work_limit(first_access, work_minutes) - now
+    if remaining > timedelta(0):
+        return remaining.total_seconds() / 60
+    return None
+
+
+def early_exit_message(remaining_minutes: float) -> str:
+    """Mensagem da saída negada antes do fim do tempo de trabalho."""
+    return f'Ainda faltam {remaining_minutes:.1f} minutos de trabalho'
+
+
+def is_work_over(first_access: datetime, work_minutes: int, now: datetime) -> bool:
+    """Sessão ativa que já deve passar para 'pending_rest' (aguardando saída)."""
+    return work_limit(first_access, work_minutes) <= now
+
+
+def is_rest_over(return_time: datetime, now: datetime) -> bool:
+    """Sessão bloqueada cuja interjornada já terminou."""
+    return return_time <= now
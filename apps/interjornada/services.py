@@ -6,13 +6,17 @@ from typing import Dict, List, Optional, Tuple
 from django.db import transaction
 from django.core.cache import cache
 from .models import InterjornadaRule, InterjornadaCycle, InterjornadaViolation, InterjornadaStatistics
+from .policy import policy_index
+from . import rules
 from apps.employees.models import Employee
 from apps.employee_sessions.models import EmployeeSession
+from apps.employee_sessions.history import session_history
 from apps.employee_sessions.services import session_service
 from apps.logs.models import SystemLog
 from apps.core.models import SystemConfiguration
 from apps.core.utils import TimezoneUtils, CacheUtils
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
+from apps.core.registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -61,16 +65,16 @@ class InterjornadaService:
             logger.info(f"Funcionário {employee.name} já tem sessão ativa - Reutilizando sessão existente")
             return existing_session
         
-        # Obter configurações do sistema
-        config = self.get_system_config()
+        # Durações efetivas (funcionário > grupo > regra > configuração)
+        policy = policy_index.resolve(employee)
         
         # Criar nova sessão
         session = EmployeeSession.objects.create(
             employee=employee,
             state='active',
             first_access=access_time,
-            work_duration_minutes=config.liberado_minutes,
-            rest_duration_minutes=config.bloqueado_minutes
+            work_duration_minutes=policy.work_minutes,
+            rest_duration_minutes=policy.rest_minutes
         )
         
         logger.info(f"Sessão criada para {employee.name} - ID: {session.id}")
@@ -85,14 +89,11 @@ class InterjornadaService:
                 return False
             
             # Verificar se já atingiu tempo mínimo de trabalho
-            config = self.get_system_config()
             current_time = TimezoneUtils.get_utc_now()
-            session_age = current_time - session.first_access
-            work_duration = timedelta(minutes=config.liberado_minutes)
-            
-            if session_age < work_duration:
-                remaining_time = work_duration - session_age
-                remaining_minutes = remaining_time.total_seconds() / 60
+            remaining_minutes = rules.remaining_work_minutes(
+                session.first_access, session.work_duration_minutes, current_time,
+            )
+            if remaining_minutes is not None:
                 logger.warning(f"Funcionário {employee.name} tentou sair antes do tempo mínimo - Ainda faltam {remaining_minutes:.1f} minutos")
                 return False
             
@@ -101,8 +102,7 @@ class InterjornadaService:
                 block_start_time = current_time
             
             # Calcular horário de retorno
-            rest_duration = timedelta(minutes=config.bloqueado_minutes)
-            return_time = block_start_time + rest_duration
+            return_time = rules.rest_return_time(block_start_time, session.rest_duration_minutes)
             
             # Atualizar sessão
             session.state = 'blocked'
@@ -136,7 +136,8 @@ class InterjornadaService:
                 logger.warning(f"Funcionário {employee.name} ainda não pode sair da interjornada - {remaining_minutes:.1f} minutos restantes")
                 return False
             
-            # Remover sessão (finalizar interjornada)
+            # Registrar no histórico e remover sessão (finalizar interjornada)
+            session_history.record(session, closed_at=current_time)
             session.delete()
             
             # TODO: Implementar remoção do blacklist no IDFace
@@ -160,25 +161,8 @@ class InterjornadaService:
             InterjornadaRule ou None
         """
         try:
-            # Buscar regra específica para o funcionário
-            rules = InterjornadaRule.objects.filter(
-                is_active=True
-            ).order_by('-created_at')
-            
-            for rule in rules:
-                # Verificar se aplica a todos
-                if rule.apply_to_all:
-                    return rule
-                
-                # Verificar grupos do funcionário
-                if any(group in rule.employee_groups for group in employee.groups):
-                    return rule
-                
-                # Verificar se funcionário não está em grupo isento
-                if not any(group in rule.exempt_employee_groups for group in employee.groups):
-                    return rule
-            
-            return None
+            # Índice compilado: regras avaliadas uma vez por combinação de grupos
+            return policy_index.get_rule(employee)
             
         except Exception as e:
             logger.error(f"Erro ao obter regra aplicável para {employee.name}: {e}")
@@ -264,7 +248,7 @@ class InterjornadaService:
             if session and session.state == 'blocked':
                 # Verificar se já pode sair da interjornada
                 current_time = TimezoneUtils.get_utc_now()
-                if current_time >= session.return_time:
+                if rules.is_rest_over(session.return_time, current_time):
                     # Liberar da interjornada usando o session_service que tem a implementação correta
                     session_service.unblock_user_from_interjornada(employee)
                     logger.info(f"Usuário {employee.name} liberado da interjornada - Acesso permitido")
@@ -580,7 +564,7 @@ class InterjornadaService:
         try:
             # Verificar se tem sessão ativa ou aguardando saída
             session = session_service.get_user_session(employee)
-            if not session or session.state not in ['active', 'pending_rest']:
+            if not session or not rules.can_exit(session.state):
                 return {
                     'success': False,
                     'message': 'Funcionário não tem sessão ativa ou aguardando saída',
@@ -588,17 +572,13 @@ class InterjornadaService:
                 }
             
             # Verificar se pode entrar em interjornada
-            config = self.get_system_config()
-            current_time = TimezoneUtils.get_utc_now()
-            session_age = current_time - session.first_access
-            work_duration = timedelta(minutes=config.liberado_minutes)
-            
-            if session_age < work_duration:
-                remaining_time = work_duration - session_age
-                remaining_minutes = remaining_time.total_seconds() / 60
+            remaining_minutes = rules.remaining_work_minutes(
+                session.first_access, session.work_duration_minutes, TimezoneUtils.get_utc_now(),
+            )
+            if remaining_minutes is not None:
                 return {
                     'success': False,
-                    'message': f'Ainda faltam {remaining_minutes:.1f} minutos de trabalho',
+                    'message': rules.early_exit_message(remaining_minutes),
                     'action': 'deny'
                 }
             
@@ -1048,5 +1028,7 @@ class InterjornadaMonitoringService:
 
 
 # Instâncias globais dos serviços
-interjornada_service = InterjornadaService()
-interjornada_monitoring_service = InterjornadaMonitoringService()
+interjornada_service = service_registry.register('interjornada.interjornada_service', InterjornadaService)
+interjornada_monitoring_service = service_registry.register(
+    'interjornada.interjornada_monitoring_service', InterjornadaMonitoringService
+)
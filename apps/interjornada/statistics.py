@@ -0,0 +1,191 @@
+"""
+Cálculo de estatísticas diárias de interjornada por agregação agrupada.
+
+Cada intervalo de datas é resolvido com uma consulta agrupada por tabela de
+origem (ciclos e violações), combinada em memória e gravada com
+bulk_create/bulk_update, independente do número de funcionários.
+"""
+import logging
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncDate
+from .models import InterjornadaCycle, InterjornadaViolation, InterjornadaStatistics
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = [
+    'total_cycles',
+    'completed_cycles',
+    'cancelled_cycles',
+    'total_work_time_minutes',
+    'total_rest_time_minutes',
+    'average_work_time_minutes',
+    'average_rest_time_minutes',
+    'total_violations',
+    'resolved_violations',
+    'critical_violations',
+]
+
+
+class StatisticsService:
+    """Serviço de (re)cálculo incremental das estatísticas diárias."""
+
+    def __init__(self, window_days=31, batch_size=500):
+        self.window_days = window_days
+        self.batch_size = batch_size
+
+    def _empty_stats(self):
+        return {field: 0 for field in STAT_FIELDS}
+
+    def _aggregate_cycles(self, date_from, date_to):
+        """Uma consulta: ciclos agrupados por (funcionário, dia)."""
+        return (
+            InterjornadaCycle.objects
+            .filter(cycle_start__date__gte=date_from, cycle_start__date__lte=date_to)
+            .annotate(day=TruncDate('cycle_start'))
+            .values('employee_id', 'day')
+            .annotate(
+                total_cycles=Count('id'),
+                completed_cycles=Count('id', filter=Q(current_state='completed')),
+                cancelled_cycles=Count('id', filter=Q(current_state='cancelled')),
+                total_work_time_minutes=Sum('actual_work_duration_minutes'),
+                total_rest_time_minutes=Sum('actual_rest_duration_minutes'),
+            )
+            .order_by()
+        )
+
+    def _aggregate_violations(self, date_from, date_to):
+        """Uma consulta: violações agrupadas por (funcionário, dia)."""
+        return (
+            InterjornadaViolation.objects
+            .filter(violation_time__date__gte=date_from, violation_time__date__lte=date_to)
+            .annotate(day=TruncDate('violation_time'))
+            .values('cycle__employee_id', 'day')
+            .annotate(
+                total_violations=Count('id'),
+                resolved_violations=Count('id', filter=Q(resolved=True)),
+                critical_violations=Count('id', filter=Q(severity='critical')),
+            )
+            .order_by()
+        )
+
+    def compute(self, date_from, date_to):
+        """
+        Calcula as estatísticas do intervalo (inclusivo) em memória.
+
+        Returns:
+            dict: {(employee_id, date): {campo: valor}}
+        """
+        stats = {}
+
+        for row in self._aggregate_cycles(date_from, date_to):
+            entry = stats.setdefault((row['employee_id'], row['day']), self._empty_stats())
+            entry['total_cycles'] = row['total_cycles']
+            entry['completed_cycles'] = row['completed_cycles']
+            entry['cancelled_cycles'] = row['cancelled_cycles']
+            entry['total_work_time_minutes'] = row['total_work_time_minutes'] or 0
+            entry['total_rest_time_minutes'] = row['total_rest_time_minutes'] or 0
+
+        for row in self._aggregate_violations(date_from, date_to):
+            entry = stats.setdefault((row['cycle__employee_id'], row['day']), self._empty_stats())
+            entry['total_violations'] = row['total_violations']
+            entry['resolved_violations'] = row['resolved_violations']
+            entry['critical_violations'] = row['critical_violations']
+
+        # Médias (mesma regra usada até aqui: total / número de ciclos)
+        for entry in stats.values():
+            if entry['total_cycles'] > 0:
+                entry['average_work_time_minutes'] = entry['total_work_time_minutes'] / entry['total_cycles']
+                entry['average_rest_time_minutes'] = entry['total_rest_time_minutes'] / entry['total_cycles']
+
+        return stats
+
+    def _write_window(self, date_from, date_to):
+        """Calcula e grava uma janela de datas. Retorna contadores."""
+        computed = self.compute(date_from, date_to)
+
+        existing = {
+            (stat.employee_id, stat.date): stat
+            for stat in InterjornadaStatistics.objects.filter(date__gte=date_from, date__lte=date_to)
+        }
+
+        to_create = []
+        to_update = []
+        for key, values in computed.items():
+            stat = existing.pop(key, None)
+            if stat is None:
+                to_create.append(InterjornadaStatistics(employee_id=key[0], date=key[1], **values))
+                continue
+            if any(getattr(stat, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(stat, field, value)
+                to_update.append(stat)
+
+        # Linhas sem dados de origem restantes no intervalo ficam zeradas
+        stale_ids = [
+            stat.id for stat in existing.values()
+            if any(getattr(stat, field) for field in STAT_FIELDS)
+        ]
+
+        with transaction.atomic():
+            if to_create:
+                InterjornadaStatistics.objects.bulk_create(to_create, batch_size=self.batch_size)
+            if to_update:
+                InterjornadaStatistics.objects.bulk_update(to_update, STAT_FIELDS, batch_size=self.batch_size)
+            if stale_ids:
+                InterjornadaStatistics.objects.filter(id__in=stale_ids).update(**self._empty_stats())
+
+        return {
+            'created': len(to_create),
+            'updated': len(to_update),
+            'zeroed': len(stale_ids),
+            'rows': len(computed),
+        }
+
+    def rebuild(self, date_from=None, date_to=None):
+        """
+        Recalcula as estatísticas de um intervalo de datas (padrão: hoje).
+
+        O intervalo é processado em janelas de window_days dias para manter a
+        memória limitada em backfills longos.
+
+        Returns:
+            dict: totais de linhas criadas/atualizadas/zeradas
+        """
+        date_to = date_to or date.today()
+        date_from = date_from or date_to
+
+        totals = {'created': 0, 'updated': 0, 'zeroed': 0, 'rows': 0, 'windows': 0}
+        window_start = date_from
+        while window_start <= date_to:
+            window_end = min(window_start + timedelta(days=self.window_days - 1), date_to)
+            result = self._write_window(window_start, window_end)
+            for key, value in result.items():
+                totals[key] += value
+            totals['windows'] += 1
+            window_start = window_end + timedelta(days=1)
+
+        logger.info(
+            f"Estatísticas recalculadas de {date_from} a {date_to}: "
+            f"{totals['created']} criadas, {totals['updated']} atualizadas"
+        )
+        return totals
+
+    def day_summary(self, day):
+        """Totais gerais do dia (uma consulta por tabela)."""
+        cycles = InterjornadaCycle.objects.filter(cycle_start__date=day).aggregate(
+            total_cycles=Count('id'),
+            completed_cycles=Count('id', filter=Q(current_state='completed')),
+            active_cycles=Count('id', filter=Q(current_state__in=['work', 'rest'])),
+        )
+        violations = InterjornadaViolation.objects.filter(violation_time__date=day).aggregate(
+            total_violations=Count('id'),
+            critical_violations=Count('id', filter=Q(severity='critical')),
+            resolved_violations=Count('id', filter=Q(resolved=True)),
+        )
+        return {**cycles, **violations}
+
+
+# Instância global do serviço
+statistics_service = StatisticsService()
@@ -194,105 +194,50 @@ def complete_cycle_task(self, employee_id):
 
 
 @shared_task(bind=True, name='apps.interjornada.tasks.update_daily_statistics_task')
-def update_daily_statistics_task(self):
+def update_daily_statistics_task(self, date_from=None, date_to=None):
     """
     Tarefa para atualizar estatísticas diárias.
+    
+    Sem argumentos recalcula o dia corrente; com date_from/date_to (ISO)
+    recalcula o intervalo inteiro de forma incremental.
     """
     try:
-        from datetime import date, timedelta
-        from django.db.models import Count, Sum, Avg
+        from datetime import date
+        from .statistics import statistics_service
         
         today = date.today()
-        
-        # Buscar ciclos do dia
-        today_cycles = InterjornadaCycle.objects.filter(
-            cycle_start__date=today
-        )
-        
-        # Estatísticas gerais do dia
-        total_cycles = today_cycles.count()
-        completed_cycles = today_cycles.filter(current_state='completed').count()
-        active_cycles = today_cycles.filter(current_state__in=['work', 'rest']).count()
-        
-        # Violações do dia
-        today_violations = InterjornadaViolation.objects.filter(
-            violation_time__date=today
-        )
-        
-        total_violations = today_violations.count()
-        critical_violations = today_violations.filter(severity='critical').count()
-        resolved_violations = today_violations.filter(resolved=True).count()
-        
-        # Atualizar estatísticas por funcionário
-        employees_with_cycles = today_cycles.values('employee').distinct()
-        
-        for employee_data in employees_with_cycles:
-            employee_id = employee_data['employee']
-            
-            # Buscar ou criar estatística do dia
-            stats, created = InterjornadaStatistics.objects.get_or_create(
-                employee_id=employee_id,
-                date=today,
-                defaults={
-                    'total_cycles': 0,
-                    'completed_cycles': 0,
-                    'total_work_time_minutes': 0,
-                    'total_rest_time_minutes': 0,
-                    'total_violations': 0,
-                }
-            )
-            
-            # Calcular estatísticas do funcionário
-            employee_cycles = today_cycles.filter(employee_id=employee_id)
-            employee_violations = today_violations.filter(cycle__employee_id=employee_id)
-            
-            stats.total_cycles = employee_cycles.count()
-            stats.completed_cycles = employee_cycles.filter(current_state='completed').count()
-            stats.total_violations = employee_violations.count()
-            stats.resolved_violations = employee_violations.filter(resolved=True).count()
-            stats.critical_violations = employee_violations.filter(severity='critical').count()
-            
-            # Calcular tempos
-            work_times = employee_cycles.exclude(actual_work_duration_minutes__isnull=True).values_list('actual_work_duration_minutes', flat=True)
-            rest_times = employee_cycles.exclude(actual_rest_duration_minutes__isnull=True).values_list('actual_rest_duration_minutes', flat=True)
-            
-            stats.total_work_time_minutes = sum(work_times) if work_times else 0
-            stats.total_rest_time_minutes = sum(rest_times) if rest_times else 0
-            
-            # Calcular médias
-            if stats.total_cycles > 0:
-                stats.average_work_time_minutes = stats.total_work_time_minutes / stats.total_cycles
-                stats.average_rest_time_minutes = stats.total_rest_time_minutes / stats.total_cycles
-            
-            stats.save()
+        if isinstance(date_from, str):
+            date_from = date.fromisoformat(date_from)
+        if isinstance(date_to, str):
+            date_to = date.fromisoformat(date_to)
+        date_to = date_to or today
+        date_from = date_from or date_to
+        
+        # Uma consulta agrupada por tabela de origem + gravação em lote
+        result = statistics_service.rebuild(date_from, date_to)
+        summary = statistics_service.day_summary(date_to)
+        
+        details = {
+            'date': date_to.isoformat(),
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            **summary,
+            'employees_updated': result['rows'],
+            'created': result['created'],
+            'updated': result['updated'],
+        }
         
         # Log de atualização
         SystemLog.log_info(
-            message=f"Estatísticas diárias atualizadas: {total_cycles} ciclos, {total_violations} violações",
+            message=f"Estatísticas diárias atualizadas: {summary['total_cycles']} ciclos, {summary['total_violations']} violações",
             category='interjornada',
-            details={
-                'date': today.isoformat(),
-                'total_cycles': total_cycles,
-                'completed_cycles': completed_cycles,
-                'active_cycles': active_cycles,
-                'total_violations': total_violations,
-                'critical_violations': critical_violations,
-                'resolved_violations': resolved_violations,
-                'employees_updated': len(employees_with_cycles)
-            }
+            details=details
         )
         
         return {
             'status': 'success',
             'message': 'Estatísticas atualizadas com sucesso',
-            'date': today.isoformat(),
-            'total_cycles': total_cycles,
-            'completed_cycles': completed_cycles,
-            'active_cycles': active_cycles,
-            'total_violations': total_violations,
-            'critical_violations': critical_violations,
-            'resolved_violations': resolved_violations,
-            'employees_updated': len(employees_with_cycles)
+            **details
         }
         
     except Exception as e:
@@ -0,0 +1,191 @@
+"""
+Testes do app de interjornada.
+"""
+import multiprocessing
+from datetime import date, datetime, timedelta
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from apps.employees.models import Employee, EmployeeGroup
+from apps.logs.models import AccessLog
+from . import compliance
+from .compliance import ComplianceReportService
+from .models import InterjornadaCycle, InterjornadaRule, InterjornadaStatistics, InterjornadaViolation, PolicyVersion
+from .policy import PolicyIndex, policy_index
+from .statistics import StatisticsService
+
+REPORT_DAY = date(2026, 3, 2)
+
+
+def access_log(log_id, user_id, moment, portal_id):
+    return AccessLog(
+        device_log_id=log_id, user_id=user_id, user_name=f'Usuário {user_id}', event_type=7,
+        portal_id=portal_id, device_timestamp=moment, created_at=moment, updated_at=moment,
+    )
+
+
+class ComplianceReportTests(TestCase):
+    """Relatório de conformidade com as mesmas políticas do controle de acesso."""
+
+    def setUp(self):
+        policy_index.invalidate()
+        EmployeeGroup.objects.create(name='whitelist', is_exemption_group=True)
+        EmployeeGroup.objects.create(name='Plantão', rest_duration_minutes=60)
+        Employee.objects.create(device_id=1, name='Regular', employee_code='R1')
+        Employee.objects.create(device_id=2, name='Isento', employee_code='I2', groups=['whitelist'])
+        Employee.objects.create(device_id=3, name='Plantonista', employee_code='P3', groups=['Plantão'])
+
+        # Jornada 08:00-16:00 e nova entrada às 18:00 (2h de descanso) para todos
+        start = timezone.make_aware(datetime.combine(REPORT_DAY, datetime.min.time())) + timedelta(hours=8)
+        logs = []
+        for user_id in (1, 2, 3):
+            logs += [
+                access_log(len(logs) + 1, user_id, start, 1),
+                access_log(len(logs) + 2, user_id, start + timedelta(hours=8), 2),
+                access_log(len(logs) + 3, user_id, start + timedelta(hours=10), 1),
+            ]
+        AccessLog.objects.bulk_create(logs)
+
+    def build(self, **kwargs):
+        report = ComplianceReportService().build_report(REPORT_DAY, REPORT_DAY, break_minutes=60, **kwargs)
+        return {entry['user_id']: entry for entry in report['employees']}
+
+    def test_violations_follow_the_effective_policy(self):
+        employees = self.build()
+
+        self.assertEqual(employees[1]['violations'], 1)
+        # Grupo de isenção (não apenas is_exempt) e descanso do grupo, como no PolicyIndex
+        self.assertTrue(employees[2]['exempt'])
+        self.assertEqual(employees[2]['violations'], 0)
+        self.assertEqual(employees[3]['rest_limit_minutes'], 60)
+        self.assertEqual(employees[3]['violations'], 0)
+
+    def test_spawn_context_when_fork_is_unavailable(self):
+        with mock.patch.object(multiprocessing, 'get_all_start_methods', return_value=['spawn']):
+            context, initializer = compliance._process_context()
+
+        self.assertEqual(context.get_start_method(), 'spawn')
+        self.assertIs(initializer, compliance._init_spawned_worker)
+
+    def test_falls_back_to_serial_without_worker_processes(self):
+        service = ComplianceReportService(parallel_threshold_days=1)
+        with mock.patch.object(compliance, 'ProcessPoolExecutor', side_effect=OSError('sem processos')):
+            report = service.build_report(REPORT_DAY, REPORT_DAY, break_minutes=60, workers=4)
+
+        self.assertEqual(report['totals']['events'], 9)
+        self.assertEqual(report['totals']['violations'], 1)
+
+
+class StatisticsServiceTests(TestCase):
+    """Estatísticas diárias por agregação agrupada e gravação em lote."""
+
+    def setUp(self):
+        self.rule = InterjornadaRule.objects.create(name='Padrão', work_duration_minutes=480, rest_duration_minutes=660)
+        self.ana = Employee.objects.create(device_id=1, name='Ana', employee_code='A1')
+        self.bruno = Employee.objects.create(device_id=2, name='Bruno', employee_code='B2')
+        self.noon = timezone.make_aware(datetime.combine(REPORT_DAY, datetime.min.time())) + timedelta(hours=12)
+
+    def cycle(self, employee, state, work, rest, day_offset=0):
+        start = self.noon + timedelta(days=day_offset)
+        return InterjornadaCycle.objects.create(
+            employee=employee, rule=self.rule, current_state=state, cycle_start=start, work_start=start,
+            actual_work_duration_minutes=work, actual_rest_duration_minutes=rest,
+        )
+
+    def stats(self):
+        return {
+            (stat.employee_id, stat.date): stat
+            for stat in InterjornadaStatistics.objects.all()
+        }
+
+    def test_rebuild_aggregates_cycles_and_violations_per_day(self):
+        first = self.cycle(self.ana, 'completed', 480, 660)
+        self.cycle(self.ana, 'cancelled', 60, None)
+        self.cycle(self.bruno, 'completed', 400, 700, day_offset=1)
+        InterjornadaViolation.objects.create(
+            cycle=first, violation_type='insufficient_rest', severity='critical',
+            description='Retorno antecipado', violation_time=self.noon,
+        )
+
+        result = StatisticsService().rebuild(REPORT_DAY, REPORT_DAY + timedelta(days=1))
+
+        self.assertEqual(result['created'], 2)
+        stats = self.stats()
+        ana = stats[(self.ana.id, REPORT_DAY)]
+        self.assertEqual((ana.total_cycles, ana.completed_cycles, ana.cancelled_cycles), (2, 1, 1))
+        self.assertEqual(ana.total_work_time_minutes, 540)
+        self.assertEqual(ana.average_work_time_minutes, 270)
+        self.assertEqual((ana.total_violations, ana.critical_violations), (1, 1))
+        self.assertEqual(stats[(self.bruno.id, REPORT_DAY + timedelta(days=1))].total_rest_time_minutes, 700)
+
+    def test_rebuild_updates_only_changed_rows_and_zeroes_stale_ones(self):
+        changed = self.cycle(self.ana, 'work', None, None)
+        removed = self.cycle(self.bruno, 'completed', 480, 660)
+        service = StatisticsService()
+        service.rebuild(REPORT_DAY, REPORT_DAY)
+
+        unchanged = service.rebuild(REPORT_DAY, REPORT_DAY)
+        self.assertEqual((unchanged['created'], unchanged['updated'], unchanged['zeroed']), (0, 0, 0))
+
+        InterjornadaCycle.objects.filter(id=changed.id).update(
+            current_state='completed', actual_work_duration_minutes=480, actual_rest_duration_minutes=660,
+        )
+        removed.delete()
+        result = service.rebuild(REPORT_DAY, REPORT_DAY)
+
+        self.assertEqual((result['created'], result['updated'], result['zeroed']), (0, 1, 1))
+        stats = self.stats()
+        self.assertEqual(stats[(self.ana.id, REPORT_DAY)].completed_cycles, 1)
+        self.assertEqual(stats[(self.bruno.id, REPORT_DAY)].total_cycles, 0)
+        self.assertEqual(InterjornadaStatistics.objects.count(), 2)
+
+    def test_rebuild_splits_long_ranges_into_windows(self):
+        self.cycle(self.ana, 'completed', 480, 660)
+        self.cycle(self.ana, 'completed', 480, 660, day_offset=10)
+
+        result = StatisticsService(window_days=7).rebuild(REPORT_DAY, REPORT_DAY + timedelta(days=13))
+
+        self.assertEqual(result['windows'], 2)
+        self.assertEqual(result['created'], 2)
+
+
+class PolicyIndexInvalidationTests(TestCase):
+    """Recompilação do índice de políticas após alterações."""
+
+    def setUp(self):
+        policy_index.invalidate()
+        self.group = EmployeeGroup.objects.create(name='Plantão', rest_duration_minutes=60)
+        self.employee = Employee.objects.create(device_id=1, name='Plantonista', employee_code='P1', groups=['Plantão'])
+
+    def test_group_change_is_seen_in_the_same_process(self):
+        self.assertEqual(policy_index.resolve(self.employee).rest_minutes, 60)
+
+        self.group.rest_duration_minutes = 90
+        self.group.save()
+
+        policy = policy_index.resolve(self.employee)
+        self.assertEqual(policy.rest_minutes, 90)
+        self.assertEqual(policy.rest_source, 'group:Plantão')
+
+    def test_other_processes_recompile_when_the_version_changes(self):
+        index = PolicyIndex()
+        index.version_check_interval = 3600
+        self.assertEqual(index.resolve(self.employee).rest_minutes, 60)
+
+        # Alteração feita por outro processo: só a versão compartilhada muda aqui
+        EmployeeGroup.objects.filter(id=self.group.id).update(rest_duration_minutes=90)
+        PolicyVersion.bump()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(index.resolve(self.employee).rest_minutes, 60)
+
+        index.version_check_interval = 0
+        self.assertEqual(index.resolve(self.employee).rest_minutes, 90)
+
+    def test_unchanged_version_keeps_the_compiled_index(self):
+        index = PolicyIndex()
+        index.version_check_interval = 0
+        index.resolve(self.employee)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(index.resolve(self.employee).rest_minutes, 60)
@@ -27,7 +27,7 @@ class AccessLogAdmin(admin.ModelAdmin):
     ]
     search_fields = ['user_name', 'user_id', 'device_log_id', 'event_description']
     readonly_fields = [
-        'device_log_id', 'user_id', 'user_name', 'event_type', 'event_description',
+        'device_log_id', 'log_epoch', 'user_id', 'user_name', 'event_type', 'event_description',
         'device_id', 'device_name', 'portal_id', 'device_timestamp', 
         'received_timestamp', 'processed_timestamp', 'raw_data_display',
         'created_at', 'updated_at'
@@ -37,7 +37,7 @@ class AccessLogAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Informações do Log', {
-            'fields': ('device_log_id', 'user_id', 'user_name')
+            'fields': ('device_log_id', 'log_epoch', 'user_id', 'user_name')
         }),
         ('Evento', {
             'fields': ('event_type', 'event_description')
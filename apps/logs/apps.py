@@ -13,31 +13,23 @@ class LogsConfig(AppConfig):
     verbose_name = 'Logs de Acesso'
 
     def ready(self):
-        """Inicializa os serviços automáticos quando o Django estiver pronto."""
-        # Importar aqui para evitar import circular
-        from .services import log_monitor_service
-        from .workers import access_log_worker
+        """
+        Não inicia threads.
         
-        # Verificar se estamos em modo de desenvolvimento ou produção
+        A ingestão da catraca e o processamento de sessões rodam apenas no
+        processo dedicado `manage.py run_background_runtime` (iniciado também
+        pelos scripts start_system.py / quick_start.py), que detém o lease do
+        dispositivo.
+        """
         import os
         from django.conf import settings
         
-        # Só iniciar os serviços se não estiver em modo de teste
-        if not os.environ.get('DJANGO_TESTING') and not os.environ.get('TESTING'):
-            try:
-                # Iniciar AccessLogWorker para sincronização da catraca
-                if access_log_worker.start_worker():
-                    logger.info("✅ AccessLogWorker iniciado com sucesso!")
-                else:
-                    logger.warning("⚠️ Falha ao iniciar AccessLogWorker")
-                
-                # Iniciar monitoramento automático de sessões
-                if log_monitor_service.start_monitoring():
-                    logger.info("✅ Monitoramento automático de sessões iniciado com sucesso!")
-                else:
-                    logger.warning("⚠️ Falha ao iniciar monitoramento automático de sessões")
-                    
-            except Exception as e:
-                logger.error(f"❌ Erro ao inicializar serviços automáticos: {e}")
-        else:
+        if os.environ.get('DJANGO_TESTING') or os.environ.get('TESTING'):
             logger.info("🔍 Serviços automáticos desabilitados - modo de teste")
+            return
+        
+        if getattr(settings, 'LOG_MONITOR_AUTO_START', False):
+            logger.warning(
+                "LOG_MONITOR_AUTO_START não inicia mais o runtime nos processos Django - "
+                "execute `python manage.py run_background_runtime` (ou start_system.py)"
+            )
@@ -0,0 +1,345 @@
+"""
+Backfill de logs históricos, separado da sincronização ao vivo.
+
+Depois de uma queda do servidor ou da rede, o AccessLogWorker não recupera o
+atraso no ritmo do tail (LOG_SYNC_BATCH_SIZE a cada LOG_SYNC_INTERVAL): quando
+o cursor de um dispositivo fica mais de LOG_BACKFILL_THRESHOLD IDs atrás da
+catraca, o intervalo atrasado vira um LogBackfill e o cursor salta para perto
+do fim, de modo que os eventos novos continuam com a latência normal.
+
+O BackfillEngine lê o intervalo em páginas crescentes de LOG_BACKFILL_PAGE_SIZE
+logs e grava cada página com bulk insert; a busca da página seguinte acontece
+enquanto a atual é gravada. O checkpoint é salvo na transação de cada página,
+então uma carga interrompida (queda, Ctrl+C, catraca fora do ar) é retomada
+do último ID gravado.
+
+Os jobs criados pelo tail (atraso de uma queda) seguem para o processamento
+de sessões normal (LOG_BACKFILL_TAIL_PROCESS_SESSIONS, padrão True): os eventos
+da queda abrem, bloqueiam e liberam sessões como antes. As cargas explícitas
+(backfill_logs, load_initial_logs, reset_logs_fresh_start) gravam por padrão
+os logs já marcados como processados (apenas histórico); com process_sessions
+eles também seguem para as sessões.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connections, transaction
+from django.db.models import Q
+from apps.core.registry import service_registry
+from apps.core.utils import TimezoneUtils
+from apps.devices.async_client import AsyncDeviceClient
+from apps.devices.circuit_breaker import circuit_breakers
+from .metrics import backfill_logs_written, backfill_remaining_ids
+from .models import AccessLog, DeviceLogCursor, LogBackfill, SystemLog
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[LogBackfill], None]
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Tempo restante legível (ex: 3m20s)."""
+    if seconds is None:
+        return '--'
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BackfillEngine:
+    """Executa os LogBackfill pendentes (em thread própria ou no processo do comando)."""
+
+    def __init__(self):
+        self.page_size = min(getattr(settings, 'LOG_BACKFILL_PAGE_SIZE', 1000), 1000)
+        self.threshold = getattr(settings, 'LOG_BACKFILL_THRESHOLD', 1000)
+        self.pause_seconds = getattr(settings, 'LOG_BACKFILL_PAUSE_SECONDS', 0.05)
+        self.stale_seconds = getattr(settings, 'LOG_BACKFILL_STALE_SECONDS', 120)
+        self.retry_seconds = getattr(settings, 'LOG_BACKFILL_RETRY_SECONDS', 30)
+        self.tail_process_sessions = getattr(settings, 'LOG_BACKFILL_TAIL_PROCESS_SESSIONS', True)
+        self.progress_seconds = 10
+        self.running = False
+        self.current: Optional[LogBackfill] = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def create_job(self, device, after_id: int = 0, end_id: Optional[int] = None, since=None,
+                   process_sessions: bool = False, origin: str = 'command') -> LogBackfill:
+        """Cria um backfill do intervalo (after_id, end_id]; sem end_id, até o fim atual da catraca."""
+        job = LogBackfill.objects.create(
+            device=device, after_id=after_id, end_id=end_id, checkpoint_id=after_id, since=since,
+            process_sessions=process_sessions, origin=origin,
+        )
+        logger.info(f"Backfill {job.id} criado: {device.name} ({after_id}, {end_id or 'fim'}]")
+        return job
+
+    def claimable(self):
+        """Jobs que podem ser executados agora (pendentes ou abandonados em execução)."""
+        stale = TimezoneUtils.get_utc_now() - timedelta(seconds=self.stale_seconds)
+        return LogBackfill.objects.filter(
+            Q(status='pending') | Q(status='running', updated_at__lt=stale)
+        ).select_related('device').order_by('created_at')
+
+    def claim(self, job: LogBackfill, resume_paused: bool = False) -> bool:
+        """Marca o job como em execução, se nenhum outro processo o estiver executando."""
+        stale = TimezoneUtils.get_utc_now() - timedelta(seconds=self.stale_seconds)
+        statuses = ['pending', 'paused'] if resume_paused else ['pending']
+        claimed = LogBackfill.objects.filter(
+            Q(status__in=statuses) | Q(status='running', updated_at__lt=stale), pk=job.pk,
+        ).update(status='running', updated_at=TimezoneUtils.get_utc_now())
+        if not claimed:
+            return False
+        job.refresh_from_db()
+        if not job.started_at:
+            job.set_status('running')
+        return True
+
+    # ------------------------------------------------------------------
+    # Execução em segundo plano
+    # ------------------------------------------------------------------
+
+    def start(self) -> bool:
+        """Executa os backfills pendentes numa thread (se ainda não estiver rodando)."""
+        if self.running:
+            return False
+        self.running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='log-backfill', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 10):
+        """Interrompe após a página em andamento (o job fica pausado no checkpoint)."""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def _run_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                job = self.claimable().first()
+                if job is None:
+                    break
+                if not circuit_breakers.get(job.device.base_url).allow_request():
+                    # A sonda do circuito cuida da reconexão; o backfill espera
+                    self._stop_event.wait(self.retry_seconds)
+                    continue
+                self.run_job(job)
+                if job.status == 'pending' and job.last_error:
+                    self._stop_event.wait(self.retry_seconds)
+        except Exception as e:
+            logger.error(f"Erro no loop do backfill: {e}")
+        finally:
+            self.running = False
+            close_old_connections()
+
+    # ------------------------------------------------------------------
+    # Execução de um job
+    # ------------------------------------------------------------------
+
+    def run_job(self, job: LogBackfill, progress: Optional[ProgressCallback] = None,
+                resume_paused: bool = False) -> LogBackfill:
+        """
+        Executa (ou retoma) um backfill até o fim do intervalo ou até stop().
+
+        Em caso de erro o job volta a pendente com o erro registrado; o
+        checkpoint garante que a próxima execução continua da última página.
+        """
+        if not self.claim(job, resume_paused=resume_paused):
+            logger.info(f"Backfill {job.id} já está em execução ou finalizado ({job.status})")
+            return job
+
+        self.current = job
+        device = job.device  # carregado aqui: o ORM não pode ser usado dentro do event loop
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-backfill-writer')
+        try:
+            asyncio.run(self._pipeline(job, device, writer, progress))
+            if self._stop_event.is_set() and job.remaining_ids:
+                # Os do tail voltam a pendentes e são retomados com o runtime
+                job.set_status('paused' if job.origin == 'command' else 'pending')
+                logger.info(f"Backfill {job.id} interrompido no ID {job.checkpoint_id}")
+            else:
+                job.set_status('completed')
+                logger.info(
+                    f"Backfill {job.id} concluído: {job.logs_written} logs gravados em "
+                    f"{job.elapsed_seconds:.1f}s ({job.rate:.0f} IDs/s)"
+                )
+                SystemLog.log_info(
+                    f"Backfill de logs concluído: {job.logs_written} logs de {job.device.name}",
+                    category='system', device_id=job.device_id, device_name=job.device.name,
+                    details=job.get_summary(),
+                )
+        except Exception as e:
+            logger.error(f"Erro no backfill {job.id} (checkpoint {job.checkpoint_id}): {e}")
+            job.set_status('pending', error=e)
+        finally:
+            writer.submit(connections.close_all).result()
+            writer.shutdown(wait=True)
+            self.current = None
+            backfill_remaining_ids.set(0)
+        return job
+
+    async def _pipeline(self, job: LogBackfill, device, writer: ThreadPoolExecutor,
+                        progress: Optional[ProgressCallback]):
+        """Busca a próxima página enquanto a atual é gravada (uma gravação por vez)."""
+        loop = asyncio.get_running_loop()
+
+        async with AsyncDeviceClient(device) as client:
+            if job.end_id is None:
+                end_id = await client.get_head_log_id(raise_errors=True)
+                await loop.run_in_executor(writer, self._set_end_id, job, end_id)
+
+            position = max(job.checkpoint_id, job.after_id)
+            if position >= job.end_id:
+                return
+
+            last_report = started = time.perf_counter()
+            fetch = asyncio.ensure_future(self._fetch_page(client, position))
+            while True:
+                logs = [log for log in await fetch if (log.get('id') or 0) <= job.end_id]
+                fetched_ids = [log.get('id') or 0 for log in logs]
+                position = max(fetched_ids) if fetched_ids else job.end_id
+                done = position >= job.end_id or not fetched_ids
+
+                # Próxima página em paralelo com a gravação desta
+                if not done and not self._stop_event.is_set():
+                    fetch = asyncio.ensure_future(self._fetch_page(client, position))
+
+                await loop.run_in_executor(writer, self._write_page, job, logs, position, time.perf_counter() - started)
+                started = time.perf_counter()
+                backfill_remaining_ids.set(job.remaining_ids or 0)
+
+                if progress:
+                    progress(job)
+                elif time.perf_counter() - last_report >= self.progress_seconds:
+                    last_report = time.perf_counter()
+                    logger.info(
+                        f"Backfill {job.id}: {job.progress * 100:.1f}% (ID {job.checkpoint_id}/{job.end_id}, "
+                        f"{job.logs_written} gravados, {job.rate:.0f} IDs/s, ETA {format_eta(job.eta_seconds)})"
+                    )
+
+                if done or self._stop_event.is_set():
+                    break
+                if self.pause_seconds:
+                    # Folga para a gravação do tail (SQLite permite um único escritor)
+                    await asyncio.sleep(self.pause_seconds)
+
+    async def _fetch_page(self, client: AsyncDeviceClient, after_id: int) -> List[Dict]:
+        return await client.get_access_logs_after(after_id, self.page_size, raise_errors=True)
+
+    @staticmethod
+    def _set_end_id(job: LogBackfill, end_id: int):
+        job.end_id = end_id
+        job.save(update_fields=['end_id', 'updated_at'])
+        logger.info(f"Backfill {job.id}: intervalo ({job.after_id}, {end_id}]")
+
+    def _write_page(self, job: LogBackfill, logs: List[Dict], checkpoint_id: int, elapsed: float) -> int:
+        """Grava uma página com bulk insert e salva o checkpoint na mesma transação."""
+        from .workers import access_log_worker
+
+        device = job.device
+        logs = [log for log in logs if (log.get('id') or 0) > 0]
+        fields = {}
+        if not job.process_sessions:
+            now = TimezoneUtils.get_utc_now()
+            fields = {
+                'processing_status': 'processed',
+                'processed_timestamp': now,
+                'session_processed': True,
+                'session_processed_at': now,
+                'processed_data': {'session': {'reason': 'backfill', 'backfill_id': job.id}},
+            }
+
+        # O intervalo é da numeração atual da catraca (geração do cursor)
+        fields['log_epoch'] = DeviceLogCursor.for_device(device).log_epoch
+        names = access_log_worker.resolve_user_names(log.get('user_id', 0) for log in logs)
+        access_logs = [
+            access_log_worker.build_access_log(log, device, names[log.get('user_id', 0)], **fields)
+            for log in logs
+        ]
+        if job.since:
+            access_logs = [access_log for access_log in access_logs if access_log.device_timestamp >= job.since]
+
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    written = self._bulk_insert(device, access_logs)
+                    job.save_checkpoint(checkpoint_id, fetched=len(logs), written=written, elapsed=elapsed)
+                break
+            except OperationalError as e:
+                if "database is locked" not in str(e) or attempt == 2:
+                    raise
+                time.sleep(0.2 * (attempt + 1))
+
+        backfill_logs_written.inc(written)
+        return written
+
+    @staticmethod
+    def _bulk_insert(device, access_logs: List[AccessLog]) -> int:
+        """Insere os logs ainda inexistentes; retorna quantos foram gravados."""
+        if not access_logs:
+            return 0
+        log_ids = [access_log.device_log_id for access_log in access_logs]
+        existing = set(
+            AccessLog.objects.filter(
+                device_id=device.id, log_epoch=access_logs[0].log_epoch,
+                device_log_id__gte=min(log_ids), device_log_id__lte=max(log_ids),
+            ).values_list('device_log_id', flat=True)
+        )
+        new_logs = [access_log for access_log in access_logs if access_log.device_log_id not in existing]
+        # ignore_conflicts cobre um log gravado pelo tail/push entre a consulta e o insert
+        AccessLog.objects.bulk_create(new_logs, batch_size=500, ignore_conflicts=True)
+        return len(new_logs)
+
+    # ------------------------------------------------------------------
+    # Integração com o tail
+    # ------------------------------------------------------------------
+
+    def hand_off(self, device, cursor, head_id: int, keep: int) -> Optional[LogBackfill]:
+        """
+        Transfere o atraso do tail para um backfill.
+
+        O intervalo (cursor, head_id - keep] vira um LogBackfill e o cursor do
+        tail salta para head_id - keep, na mesma transação. Os logs do atraso
+        são processados para sessões (LOG_BACKFILL_TAIL_PROCESS_SESSIONS).
+        """
+        end_id = head_id - keep
+        if end_id - cursor.last_log_id < self.threshold:
+            return None
+        with transaction.atomic():
+            job = self.create_job(
+                device, after_id=cursor.last_log_id, end_id=end_id,
+                process_sessions=self.tail_process_sessions, origin='tail',
+            )
+            cursor.advance(end_id)
+        logger.warning(
+            f"{device.name}: {end_id - job.after_id} logs atrasados transferidos para o backfill {job.id}; "
+            f"o tail continua a partir do ID {end_id}"
+        )
+        self.start()
+        return job
+
+    def get_status(self) -> Dict:
+        jobs = LogBackfill.objects.filter(status__in=['pending', 'running', 'paused']).order_by('created_at')
+        return {
+            'running': self.running,
+            'current': self.current.get_summary() if self.current else None,
+            'active_jobs': [job.get_summary() for job in jobs],
+            'page_size': self.page_size,
+            'threshold': self.threshold,
+        }
+
+
+# Instância global do backfill
+backfill_engine = service_registry.register('logs.backfill_engine', BackfillEngine)
@@ -0,0 +1,276 @@
+"""
+Benchmark de ponta a ponta da troca de turno.
+
+Executa o pipeline real (AccessLogWorker → LogMonitorService → GroupService)
+contra o simulador da catraca, num banco de dados de teste descartável:
+
+1. cria funcionários no banco e na catraca simulada; quem sai do turno já
+   tem sessão ativa com o tempo de trabalho cumprido;
+2. reproduz a troca de turno (entradas pelo portal 1, saídas pelo portal 2,
+   giros, negações e desistências) com `shift_change_burst`;
+3. inicia o worker e o monitoramento como o runtime faz e espera o pipeline
+   esvaziar.
+
+Latências medidas a partir do horário da passagem na catraca:
+- sessão: até o commit do processamento do log (AccessLog.session_processed_at);
+- blacklist: até a catraca receber a mudança do usuário para o grupo de blacklist.
+"""
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional
+from django.db import connection
+from django.test.utils import override_settings
+from apps.core.utils import TimezoneUtils
+from apps.devices.simulator import (
+    EVENT_AUTHORIZED, PORTAL_EXIT, DeviceSimulator, ScenarioPlayer, SimulatorConfig, shift_change_burst,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP_DEVICE_ID = 1
+BLACKLIST_GROUP_DEVICE_ID = 1000
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil com interpolação linear (q entre 0 e 100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_stats(values: List[float]) -> Dict:
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None,
+    }
+
+
+@contextmanager
+def isolated_database():
+    """Banco de teste descartável (o banco configurado não é alterado)."""
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_name = test_settings.get('NAME')
+    temp_dir = None
+    if connection.vendor == 'sqlite':
+        # Arquivo (e não memória) para o worker e o monitor usarem conexões próprias
+        temp_dir = tempfile.mkdtemp(prefix='benchmark_')
+        test_settings['NAME'] = os.path.join(temp_dir, 'benchmark.sqlite3')
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = previous_name
+        if temp_dir:
+            try:
+                os.rmdir(temp_dir)
+            except OSError:
+                pass
+
+
+class ShiftChangeBenchmark:
+    """Troca de turno sintética pelo pipeline completo."""
+
+    def __init__(self, employees=500, exiting=None, window=900.0, speed=10.0, latency_ms=5.0,
+                 jitter_ms=2.0, failure_rate=0.0, seed=42, timeout=None, settle_seconds=None):
+        self.employees = employees
+        self.exiting = employees if exiting is None else exiting
+        self.window = window
+        self.speed = speed
+        self.seed = seed
+        self.config = SimulatorConfig(latency_ms=latency_ms, jitter_ms=jitter_ms, failure_rate=failure_rate)
+        self.timeout = timeout or (window / speed) * 3 + 120
+        self.settle_seconds = settle_seconds
+
+    # ------------------------------------------------------------------
+    # Preparação
+    # ------------------------------------------------------------------
+
+    def _seed(self, simulator):
+        """Funcionários no banco e na catraca; quem sai já cumpriu a jornada."""
+        from apps.employee_sessions.models import EmployeeSession
+        from apps.employees.models import Employee, EmployeeGroup
+
+        default_group = EmployeeGroup.objects.create(name='Funcionários', device_group_id=DEFAULT_GROUP_DEVICE_ID)
+        EmployeeGroup.objects.update_or_create(
+            name='BLACKLIST_INTERJORNADA',
+            defaults={'device_group_id': BLACKLIST_GROUP_DEVICE_ID, 'is_blacklist': True, 'is_active': True},
+        )
+
+        total = self.exiting + self.employees
+        Employee.objects.bulk_create([
+            Employee(device_id=device_id, name=f'Funcionário {device_id}', group=default_group)
+            for device_id in range(1, total + 1)
+        ])
+
+        simulator.state.seed_groups([
+            {'id': DEFAULT_GROUP_DEVICE_ID, 'name': 'Funcionários'},
+            {'id': BLACKLIST_GROUP_DEVICE_ID, 'name': 'BLACKLIST_INTERJORNADA'},
+        ])
+        simulator.state.seed_users(total, group_id=DEFAULT_GROUP_DEVICE_ID)
+
+        first_access = TimezoneUtils.get_utc_now() - timedelta(minutes=8 * 60 + 5)
+        EmployeeSession.objects.bulk_create([
+            EmployeeSession(
+                employee=employee, state='active', first_access=first_access,
+                work_duration_minutes=8 * 60, rest_duration_minutes=11 * 60,
+            )
+            for employee in Employee.objects.filter(device_id__lte=self.exiting)
+        ])
+
+        exiting_ids = list(range(1, self.exiting + 1))
+        entering_ids = list(range(self.exiting + 1, total + 1))
+        return shift_change_burst(entering_ids, duration=self.window, exits=exiting_ids, seed=self.seed)
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def _progress(self, player, worker, monitor):
+        from apps.employee_sessions.models import EmployeeSession
+        from .models import AccessLog
+
+        return (
+            player.played,
+            AccessLog.objects.filter(session_processed=True).count(),
+            EmployeeSession.objects.filter(state='blocked').count(),
+            len(player.state.journal),
+            worker.last_synced_id,
+            monitor.last_processed_id,
+        )
+
+    def _wait_drained(self, player, worker, monitor, started):
+        """Espera o cenário terminar e o pipeline ficar estável."""
+        # Com o intervalo adaptativo um loop ocioso pode aguardar até o máximo configurado
+        settle = self.settle_seconds or max(worker.schedule.max_interval, monitor.schedule.max_interval) * 2
+        last_state, stable_since = None, None
+        while time.monotonic() - started < self.timeout:
+            time.sleep(0.5)
+            state = self._progress(player, worker, monitor)
+            if not player.finished or state != last_state:
+                last_state, stable_since = state, time.monotonic()
+                continue
+            if time.monotonic() - stable_since >= settle:
+                return True
+        return False
+
+    def run(self) -> Dict:
+        with isolated_database():
+            simulator = DeviceSimulator(self.config).start()
+            try:
+                with override_settings(
+                    PRIMARY_DEVICE_IP=simulator.host,
+                    PRIMARY_DEVICE_PORT=simulator.port,
+                    PRIMARY_DEVICE_USE_HTTPS=False,
+                    PRIMARY_DEVICE_USERNAME=self.config.login,
+                    PRIMARY_DEVICE_PASSWORD=self.config.password,
+                    LOG_PROCESSING_MODE='thread',
+                ):
+                    return self._run(simulator)
+            finally:
+                simulator.stop()
+
+    def _run(self, simulator) -> Dict:
+        from apps.core.metrics import metrics
+        from apps.employees.group_service import group_service
+        from apps.employees.models import EmployeeGroup
+        from .services import log_monitor_service
+        from .workers import access_log_worker
+
+        events = self._seed(simulator)
+        group_service.blacklist_group = EmployeeGroup.objects.get(is_blacklist=True)
+        metrics.reset()
+
+        if not access_log_worker.start_worker():
+            raise RuntimeError('Falha ao iniciar o AccessLogWorker contra o simulador')
+        log_monitor_service.start_monitoring()
+
+        player = ScenarioPlayer(simulator.state, simulator.config, events, speed=self.speed)
+        started = time.monotonic()
+        player.start()
+        try:
+            drained = self._wait_drained(player, access_log_worker, log_monitor_service, started)
+        finally:
+            player.stop()
+            access_log_worker.stop_worker()
+            log_monitor_service.stop_monitoring()
+        elapsed = time.monotonic() - started
+
+        result = self._collect(simulator, player)
+        result.update({'drained': drained, 'elapsed_seconds': elapsed})
+        return result
+
+    # ------------------------------------------------------------------
+    # Resultados
+    # ------------------------------------------------------------------
+
+    def _collect(self, simulator, player) -> Dict:
+        from apps.employee_sessions.models import EmployeeSession
+        from .metrics import summary
+        from apps.core.metrics import metrics
+        from .models import AccessLog
+
+        device_logs = {row['id']: row for row in simulator.state.tables['access_logs']}
+        authorized = {log_id for log_id, row in device_logs.items() if row['event'] == EVENT_AUTHORIZED}
+        rows = {
+            row['device_log_id']: row
+            for row in AccessLog.objects.filter(device_log_id__in=list(player.emitted)).values(
+                'device_log_id', 'event_type', 'session_processed_at',
+            )
+        }
+
+        session_latencies = []
+        commits = []
+        for log_id in authorized:
+            row = rows.get(log_id)
+            if row and row['session_processed_at']:
+                committed = row['session_processed_at'].timestamp()
+                commits.append(committed)
+                session_latencies.append(committed - player.emitted[log_id])
+
+        exits = {
+            device_logs[log_id]['user_id']: player.emitted[log_id]
+            for log_id in authorized if device_logs[log_id]['portal_id'] == PORTAL_EXIT
+        }
+        moves = {}
+        for change in simulator.state.journal:
+            values = change['values'] or {}
+            if (change['action'] == 'modify' and change['object'] == 'user_groups'
+                    and values.get('group_id') == BLACKLIST_GROUP_DEVICE_ID):
+                moves.setdefault(values.get('user_id'), change['at'])
+        move_latencies = [at - exits[user_id] for user_id, at in moves.items() if user_id in exits]
+
+        emitted_times = list(player.emitted.values())
+        first_emit = min(emitted_times) if emitted_times else None
+        span = (max(commits) - first_emit) if commits and first_emit else None
+        emit_span = (max(emitted_times) - first_emit) if emitted_times else None
+
+        return {
+            'employees_entering': self.employees,
+            'employees_exiting': self.exiting,
+            'events_emitted': len(player.emitted),
+            'authorized_events': len(authorized),
+            'events_ingested': len(rows),
+            'events_lost': len(authorized - set(rows)),
+            'sessions_committed': len(session_latencies),
+            'sessions_blocked': EmployeeSession.objects.filter(state='blocked').count(),
+            'blacklist_moves': len(moves),
+            'offered_events_per_second': (len(player.emitted) / emit_span) if emit_span else None,
+            'events_per_second': (len(session_latencies) / span) if span else None,
+            'session_latency': latency_stats(session_latencies),
+            'blacklist_latency': latency_stats(move_latencies),
+            'device_requests': simulator.requests,
+            'stages': summary(metrics.snapshot())['histograms'],
+        }
@@ -0,0 +1,221 @@
+"""
+Processamento distribuído de logs de acesso via Celery.
+
+Com LOG_PROCESSING_MODE='celery', a ingestão cria uma entrada em
+LogProcessingQueue por log e envia uma tarefa para a fila do particionamento
+do funcionário (`logs.p<n>`, n = hash(user_id) % LOG_PROCESSING_PARTITIONS).
+Cada fila de partição deve ser consumida por um único worker com
+concorrência 1, o que preserva a ordem dos eventos de cada funcionário e
+permite escalar horizontalmente adicionando partições/hosts:
+
+    celery -A interjornada_system worker -Q logs.p0 -c 1 -n logs-p0@%h
+
+Cada tarefa processa o backlog do funcionário em ordem (a partir da entrada
+mais antiga não concluída), parando na primeira falha. Entradas com falha
+usam os campos de backoff da fila (attempts, next_retry) e são reenviadas pela
+varredura periódica (retry_failed_logs_task); esgotadas as tentativas o log é
+marcado com erro e o backlog segue.
+"""
+import logging
+import zlib
+from datetime import timedelta
+from typing import Dict, Iterable, List
+from django.conf import settings
+from django.db.models import F, Min, Q
+from apps.core.registry import service_registry
+from apps.core.utils import TimezoneUtils
+from .models import AccessLog, LogProcessingQueue
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED_STATUSES = ('pending', 'retry', 'processing')
+
+
+def is_distributed() -> bool:
+    """Indica se o processamento de logs está no modo Celery distribuído."""
+    return getattr(settings, 'LOG_PROCESSING_MODE', 'thread') == 'celery'
+
+
+def partition_for(user_id, partitions=None) -> int:
+    """Partição estável de um funcionário."""
+    partitions = partitions or getattr(settings, 'LOG_PROCESSING_PARTITIONS', 4)
+    return zlib.crc32(str(user_id).encode()) % partitions
+
+
+def queue_for(user_id) -> str:
+    """Nome da fila Celery da partição do funcionário."""
+    return f'logs.p{partition_for(user_id)}'
+
+
+class LogDispatcher:
+    """Enfileira, processa e reenvia entradas da fila de processamento."""
+
+    def __init__(self):
+        self.max_attempts = getattr(settings, 'LOG_PROCESSING_MAX_ATTEMPTS', 5)
+        self.stale_seconds = getattr(settings, 'LOG_PROCESSING_STALE_SECONDS', 60)
+        self.max_entries_per_task = getattr(settings, 'LOG_PROCESSING_MAX_ENTRIES_PER_TASK', 200)
+
+    # ------------------------------------------------------------------
+    # Envio
+    # ------------------------------------------------------------------
+
+    def _send(self, entry_id, user_id):
+        """Envia a tarefa para a fila da partição. Falhas do broker ficam para a varredura."""
+        from .tasks import process_log_entry_task
+
+        try:
+            process_log_entry_task.apply_async(args=[entry_id], queue=queue_for(user_id))
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao enviar entrada {entry_id} para {queue_for(user_id)}: {e}")
+            return False
+
+    def enqueue(self, access_logs: Iterable[AccessLog]) -> List[LogProcessingQueue]:
+        """Cria as entradas da fila e envia uma tarefa por log."""
+        access_logs = [log for log in access_logs if not log.session_processed]
+        if not access_logs:
+            return []
+
+        entries = LogProcessingQueue.objects.bulk_create([
+            LogProcessingQueue(access_log=log, status='pending', max_attempts=self.max_attempts)
+            for log in access_logs
+        ])
+        for entry, log in zip(entries, access_logs):
+            self._send(entry.id, log.user_id)
+        return entries
+
+    def enqueue_unqueued(self, limit=500) -> int:
+        """Enfileira logs ainda não processados que nunca entraram na fila (ex: logs manuais)."""
+        logs = list(
+            AccessLog.objects.filter(session_processed=False, queue_entries__isnull=True)
+            .order_by('device_timestamp', 'device_log_id')[:limit]
+        )
+        return len(self.enqueue(logs))
+
+    # ------------------------------------------------------------------
+    # Processamento
+    # ------------------------------------------------------------------
+
+    def _claim(self, entry, now) -> bool:
+        """Marca a entrada como em processamento se ninguém a pegou antes."""
+        claimed = LogProcessingQueue.objects.filter(id=entry.id, status=entry.status).update(
+            status='processing', attempts=F('attempts') + 1, last_attempt=now,
+        )
+        if claimed:
+            entry.status = 'processing'
+            entry.attempts += 1
+            entry.last_attempt = now
+        return bool(claimed)
+
+    def process_entry(self, entry_id) -> Dict:
+        """
+        Processa, em ordem, o backlog do funcionário dono da entrada.
+
+        Returns:
+            dict: processed, failed, skipped e o motivo da parada (stopped)
+        """
+        from .reprocess import employee_reprocessor
+        from .services import log_monitor_service
+
+        stats = {'processed': 0, 'failed': 0, 'skipped': 0, 'stopped': None}
+        entry = LogProcessingQueue.objects.select_related('access_log').filter(id=entry_id).first()
+        if entry is None:
+            stats['stopped'] = 'missing'
+            return stats
+
+        if entry.access_log.user_id in employee_reprocessor.paused_user_ids():
+            # As entradas continuam pendentes e são reenviadas pela varredura
+            stats['stopped'] = 'reprocessing'
+            return stats
+
+        backlog = (
+            LogProcessingQueue.objects.select_related('access_log')
+            .filter(access_log__user_id=entry.access_log.user_id, status__in=UNFINISHED_STATUSES)
+            .order_by('access_log__device_timestamp', 'access_log__device_log_id', 'id')
+        )[:self.max_entries_per_task]
+
+        for item in backlog:
+            now = TimezoneUtils.get_utc_now()
+            if item.status == 'retry' and item.next_retry and item.next_retry > now:
+                stats['stopped'] = 'waiting_retry'
+                break
+
+            if (item.status == 'processing' and item.last_attempt
+                    and item.last_attempt > now - timedelta(seconds=self.stale_seconds)):
+                stats['stopped'] = 'in_progress'
+                break
+
+            if item.access_log.session_processed:
+                item.mark_as_completed()
+                stats['skipped'] += 1
+                continue
+
+            if not self._claim(item, now):
+                stats['stopped'] = 'claimed_elsewhere'
+                break
+
+            try:
+                log_monitor_service.process_access_log(item.access_log, raise_errors=True)
+                item.mark_as_completed()
+                stats['processed'] += 1
+            except Exception as e:
+                item.mark_as_failed(str(e), {'device_log_id': item.access_log.device_log_id})
+                stats['failed'] += 1
+                if item.status == 'retry':
+                    # Mantém a ordem: o restante do backlog espera o retry
+                    stats['stopped'] = 'retry_scheduled'
+                    break
+                logger.error(
+                    f"Log {item.access_log.device_log_id} falhou após {item.attempts} tentativas: {e}"
+                )
+                item.access_log.mark_session_error(str(e), {'attempts': item.attempts})
+
+        return stats
+
+    # ------------------------------------------------------------------
+    # Varredura
+    # ------------------------------------------------------------------
+
+    def sweep(self, limit=200) -> Dict:
+        """
+        Reenvia o início do backlog dos funcionários com entradas prontas.
+
+        Recupera entradas em retry vencidas, entradas pendentes cujo envio se
+        perdeu e entradas presas em 'processing' (worker interrompido).
+        """
+        now = TimezoneUtils.get_utc_now()
+        stale = now - timedelta(seconds=self.stale_seconds)
+
+        recovered = LogProcessingQueue.objects.filter(
+            status='processing', last_attempt__lt=stale,
+        ).update(status='retry', next_retry=now)
+
+        ready = LogProcessingQueue.objects.filter(
+            Q(status='retry', next_retry__lte=now)
+            | Q(status='retry', next_retry__isnull=True)
+            | Q(status='pending', created_at__lt=stale)
+        )
+        heads = list(
+            ready.values('access_log__user_id').annotate(first_id=Min('id'))
+            .order_by('first_id')[:limit]
+        )
+        sent = sum(1 for head in heads if self._send(head['first_id'], head['access_log__user_id']))
+
+        return {'recovered': recovered, 'users': len(heads), 'sent': sent}
+
+    def get_status(self) -> Dict:
+        """Contagem da fila por status."""
+        from django.db.models import Count
+
+        counts = dict(
+            LogProcessingQueue.objects.values_list('status').annotate(total=Count('id'))
+        )
+        return {
+            'mode': getattr(settings, 'LOG_PROCESSING_MODE', 'thread'),
+            'partitions': getattr(settings, 'LOG_PROCESSING_PARTITIONS', 4),
+            'queue': counts,
+        }
+
+
+# Instância global do dispatcher
+log_dispatcher = service_registry.register('logs.log_dispatcher', LogDispatcher)
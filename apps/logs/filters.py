@@ -0,0 +1,71 @@
+"""
+Filtros reutilizáveis para consultas de logs de acesso.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import Q
+from django.utils import timezone
+from .models import AccessLog
+
+
+def parse_date_param(value):
+    """Converte 'YYYY-MM-DD' em date, retornando None se inválido."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def local_day_start(day):
+    """Início do dia (00:00) no timezone corrente, como datetime aware."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_access_logs(params, queryset=None):
+    """
+    Aplica os filtros do histórico de acessos a um queryset de AccessLog.
+
+    Os mesmos parâmetros da página de histórico são aceitos (search, event_type,
+    portal_id, user_id, date_from, date_to). As datas viram intervalos sobre
+    device_timestamp para que o índice da coluna seja usado.
+
+    Args:
+        params: dict ou QueryDict com os parâmetros de filtro
+        queryset: queryset base (opcional, padrão AccessLog.objects.all())
+
+    Returns:
+        QuerySet filtrado
+    """
+    logs = queryset if queryset is not None else AccessLog.objects.all()
+
+    search = params.get('search', '')
+    event_type = params.get('event_type', '')
+    portal_id = params.get('portal_id', '')
+    user_id = params.get('user_id', '')
+
+    if search:
+        logs = logs.filter(
+            Q(user_name__icontains=search) |
+            Q(user_id__icontains=search) |
+            Q(device_log_id__icontains=search)
+        )
+
+    if event_type:
+        logs = logs.filter(event_type=event_type)
+
+    if portal_id:
+        logs = logs.filter(portal_id=portal_id)
+
+    if user_id:
+        logs = logs.filter(user_id=user_id)
+
+    date_from = parse_date_param(params.get('date_from', ''))
+    if date_from:
+        logs = logs.filter(device_timestamp__gte=local_day_start(date_from))
+
+    date_to = parse_date_param(params.get('date_to', ''))
+    if date_to:
+        logs = logs.filter(device_timestamp__lt=local_day_start(date_to + timedelta(days=1)))
+
+    return logs
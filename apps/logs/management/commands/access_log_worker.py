@@ -53,6 +53,12 @@ class Command(BaseCommand):
         self.stdout.write(f'   Intervalo de sync: {status["sync_interval"]}s')
         self.stdout.write(f'   Tamanho do lote: {status["batch_size"]}')
         self.stdout.write(f'   Conectado à catraca: {status["connected"]}')
+        for device in status.get('devices', []):
+            self.stdout.write(
+                f'   Dispositivo {device["device_id"]}: cursor {device["last_log_id"]}, '
+                f'{device["logs_synced"]} logs sincronizados'
+                + (f' (último erro: {device["last_error"]})' if device["last_error"] else '')
+            )
 
     def restart_worker(self):
         """Reinicia o worker."""
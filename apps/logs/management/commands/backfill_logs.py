@@ -0,0 +1,161 @@
+"""
+Comando para carregar intervalos históricos de logs da catraca (backfill).
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.utils import TimezoneUtils
+from apps.devices.models import Device
+from apps.logs.backfill import backfill_engine, format_eta
+from apps.logs.models import LogBackfill
+
+
+class Command(BaseCommand):
+    help = 'Carrega logs históricos em páginas grandes com bulk insert, com checkpoint (run, resume, status)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            nargs='?',
+            default='run',
+            choices=['run', 'resume', 'status'],
+            help='Ação a executar (padrão: run)',
+        )
+        parser.add_argument(
+            '--device',
+            type=int,
+            help='ID do Device (padrão: primeiro dispositivo habilitado)',
+        )
+        parser.add_argument(
+            '--from-id',
+            type=int,
+            default=0,
+            help='Carregar logs com ID maior que este (padrão: 0)',
+        )
+        parser.add_argument(
+            '--to-id',
+            type=int,
+            help='Último ID a carregar (padrão: último log atual da catraca)',
+        )
+        parser.add_argument(
+            '--hours',
+            type=int,
+            help='Ignorar logs mais antigos que N horas',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            help='Logs por página (máximo 1000, padrão: LOG_BACKFILL_PAGE_SIZE)',
+        )
+        parser.add_argument(
+            '--process-sessions',
+            action='store_true',
+            help='Enviar os logs carregados ao processamento de sessões (padrão: apenas histórico)',
+        )
+        parser.add_argument(
+            '--job',
+            type=int,
+            help='ID do backfill a retomar (resume; padrão: todos os pendentes/pausados)',
+        )
+
+    def handle(self, *args, **options):
+        if options['page_size']:
+            backfill_engine.page_size = max(1, min(options['page_size'], 1000))
+
+        action = options['action']
+        if action == 'status':
+            self.show_status()
+        elif action == 'resume':
+            self.resume(options['job'])
+        else:
+            self.run(options)
+
+    def get_device(self, device_id):
+        if device_id:
+            device = Device.objects.filter(pk=device_id).first()
+            if not device:
+                raise CommandError(f"Dispositivo {device_id} não encontrado")
+            return device
+
+        from apps.logs.workers import access_log_worker
+
+        devices = access_log_worker.load_devices()
+        if not devices:
+            raise CommandError("Nenhum dispositivo habilitado")
+        return devices[0]
+
+    def run(self, options):
+        device = self.get_device(options['device'])
+        since = None
+        if options['hours']:
+            since = TimezoneUtils.get_utc_now() - timedelta(hours=options['hours'])
+
+        job = backfill_engine.create_job(
+            device,
+            after_id=options['from_id'],
+            end_id=options['to_id'],
+            since=since,
+            process_sessions=options['process_sessions'],
+        )
+        self.stdout.write(f"🔄 Backfill {job.id}: {device.name}, logs após o ID {job.after_id}")
+        if since:
+            self.stdout.write(f"📅 Ignorando logs anteriores a {TimezoneUtils.format_datetime(since)}")
+        self.execute_job(job)
+
+    def resume(self, job_id):
+        jobs = LogBackfill.objects.filter(status__in=['pending', 'running', 'paused']).select_related('device')
+        if job_id:
+            jobs = jobs.filter(pk=job_id)
+        jobs = list(jobs.order_by('created_at'))
+        if not jobs:
+            self.stdout.write("📋 Nenhum backfill pendente")
+            return
+        for job in jobs:
+            self.stdout.write(f"🔄 Retomando backfill {job.id} a partir do ID {job.checkpoint_id}")
+            if not self.execute_job(job, resume_paused=True):
+                break
+
+    def execute_job(self, job, resume_paused=False):
+        """Executa o job mostrando o progresso; Ctrl+C pausa no último checkpoint."""
+        try:
+            backfill_engine.run_job(job, progress=self.show_progress, resume_paused=resume_paused)
+        except KeyboardInterrupt:
+            job.set_status('paused')
+            self.stdout.write(self.style.WARNING(
+                f"\n⏸️ Backfill {job.id} pausado no ID {job.checkpoint_id} "
+                f"(retome com: manage.py backfill_logs resume --job {job.id})"
+            ))
+            return False
+
+        if job.status == 'completed':
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Backfill {job.id} concluído: {job.logs_written} logs gravados "
+                f"({job.logs_fetched} lidos) em {job.elapsed_seconds:.1f}s"
+            ))
+            return True
+        if job.status == 'running':
+            self.stdout.write(self.style.WARNING(f"⚠️ Backfill {job.id} já está em execução em outro processo"))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"❌ Backfill {job.id} interrompido no ID {job.checkpoint_id}: {job.last_error or job.status}"
+            ))
+        return False
+
+    def show_progress(self, job):
+        self.stdout.write(
+            f"   📊 {job.progress * 100:5.1f}% | ID {job.checkpoint_id}/{job.end_id} | "
+            f"{job.logs_written} gravados | {job.rate:.0f} IDs/s | ETA {format_eta(job.eta_seconds)}"
+        )
+
+    def show_status(self):
+        self.stdout.write('📊 BACKFILLS DE LOGS:')
+        jobs = LogBackfill.objects.select_related('device').order_by('-created_at')[:10]
+        if not jobs:
+            self.stdout.write('   Nenhum backfill registrado')
+            return
+        for job in jobs:
+            summary = job.get_summary()
+            self.stdout.write(
+                f"   #{job.id} {job.device.name} [{job.get_status_display()}] ({job.after_id}, {job.end_id or '...'}] "
+                f"{summary['progress']}% - {job.logs_written} gravados, ETA {format_eta(job.eta_seconds)}"
+                + (f" - erro: {job.last_error}" if job.last_error and job.is_active else '')
+            )
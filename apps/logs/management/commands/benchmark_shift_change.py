@@ -0,0 +1,122 @@
+"""
+Comando para o benchmark de troca de turno (pipeline completo contra o
+simulador da catraca, em banco de teste descartável).
+"""
+import json
+import logging
+from django.core.management.base import BaseCommand, CommandError
+from apps.logs.benchmark import ShiftChangeBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Mede latência (p50/p95/p99) e vazão do pipeline durante uma troca de turno sintética'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=500,
+            help='Funcionários que entram no turno (padrão: 500)',
+        )
+        parser.add_argument(
+            '--exiting',
+            type=int,
+            help='Funcionários que saem do turno (padrão: igual a --employees)',
+        )
+        parser.add_argument(
+            '--window',
+            type=float,
+            default=900,
+            help='Duração da troca de turno em segundos (padrão: 900 = 15 minutos)',
+        )
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=10,
+            help='Aceleração do cenário (padrão: 10, ou seja 15 minutos em 90s)',
+        )
+        parser.add_argument('--latency-ms', type=float, default=5, help='Latência da catraca simulada')
+        parser.add_argument('--jitter-ms', type=float, default=2, help='Variação (+/-) da latência')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Probabilidade de erro 500 (0-1)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do cenário')
+        parser.add_argument('--timeout', type=float, help='Tempo máximo de execução em segundos')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON')
+
+    def handle(self, *args, **options):
+        benchmark = ShiftChangeBenchmark(
+            employees=options['employees'],
+            exiting=options['exiting'],
+            window=options['window'],
+            speed=options['speed'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            failure_rate=options['failure_rate'],
+            seed=options['seed'],
+            timeout=options['timeout'],
+        )
+
+        if not options['json']:
+            self.stdout.write(
+                f'🏁 Troca de turno: {benchmark.employees} entradas + {benchmark.exiting} saídas '
+                f'em {benchmark.window:.0f}s (velocidade {benchmark.speed}x, banco de teste descartável)...'
+            )
+
+        # Os logs do pipeline (vários por evento) distorcem a medição e a saída
+        if options['verbosity'] < 2:
+            logging.disable(logging.WARNING)
+        try:
+            result = benchmark.run()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2, default=str))
+            return
+        self.print_result(result)
+
+    @staticmethod
+    def _ms(value):
+        return '-' if value is None else f'{value * 1000:.0f}ms'
+
+    def _latency_line(self, label, stats):
+        self.stdout.write(
+            f'   {label}: p50 {self._ms(stats["p50"])} | p95 {self._ms(stats["p95"])} | '
+            f'p99 {self._ms(stats["p99"])} | máx {self._ms(stats["max"])} (n={stats["count"]})'
+        )
+
+    def print_result(self, result):
+        self.stdout.write('\n📊 RESULTADO:')
+        self.stdout.write(
+            f'   Eventos: {result["events_emitted"]} emitidos, {result["events_ingested"]} gravados, '
+            f'{result["sessions_committed"]} processados (autorizados: {result["authorized_events"]})'
+        )
+        if result['events_lost']:
+            self.stdout.write(self.style.ERROR(f'   ❌ Eventos autorizados perdidos na ingestão: {result["events_lost"]}'))
+        self.stdout.write(
+            f'   Bloqueios: {result["sessions_blocked"]} sessões, {result["blacklist_moves"]} movimentações na catraca'
+        )
+
+        offered = result['offered_events_per_second']
+        sustained = result['events_per_second']
+        self.stdout.write(
+            f'   Vazão: {sustained or 0:.2f} eventos/s processados '
+            f'(oferta: {offered or 0:.2f} eventos/s)'
+        )
+        self._latency_line('⏱️ Catraca → sessão', result['session_latency'])
+        self._latency_line('⏱️ Catraca → blacklist', result['blacklist_latency'])
+
+        stages = result['stages']
+        if stages:
+            self.stdout.write('   Etapas (p95):')
+            for name, stats in sorted(stages.items()):
+                value = stats['p95']
+                shown = f'{value:.0f}' if name == 'ingest_batch_size' and value is not None else self._ms(value)
+                self.stdout.write(f'      {name}: {shown} (n={stats["count"]})')
+
+        self.stdout.write(f'   Requisições à catraca: {result["device_requests"]} | Duração: {result["elapsed_seconds"]:.1f}s')
+        if result['drained']:
+            self.stdout.write(self.style.SUCCESS('✅ Pipeline esvaziado'))
+        else:
+            self.stdout.write(self.style.WARNING('⚠️ Tempo esgotado antes do pipeline esvaziar'))
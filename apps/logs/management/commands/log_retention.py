@@ -0,0 +1,128 @@
+"""
+Comando para retenção, arquivamento, consulta e restauração de logs.
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.logs.retention import log_retention_service
+
+
+class Command(BaseCommand):
+    help = 'Retenção de logs em chunks com arquivamento JSONL.gz (purge, query, restore, compact, segments)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['purge', 'query', 'restore', 'compact', 'segments'],
+            help='Ação a executar',
+        )
+        parser.add_argument(
+            '--dataset',
+            type=str,
+            default='access_logs',
+            help='Conjunto: access_logs, system_logs, processing_queue (padrão: access_logs)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Dias de retenção/compactação (padrão: configuração)',
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Remover sem arquivar (purge)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Aplicar purge em todos os conjuntos',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas contar o que seria removido (purge)',
+        )
+        parser.add_argument(
+            '--date-from',
+            type=str,
+            help='Data inicial AAAA-MM-DD (query/restore/segments)',
+        )
+        parser.add_argument(
+            '--date-to',
+            type=str,
+            help='Data final AAAA-MM-DD (query/restore/segments)',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Filtrar por user_id (query)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Máximo de registros exibidos (query, padrão: 50)',
+        )
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Data inválida: {value} (use AAAA-MM-DD)")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        dataset = options['dataset']
+        date_from = self._parse_date(options['date_from'])
+        date_to = self._parse_date(options['date_to'])
+
+        if dataset not in log_retention_service.policies:
+            raise CommandError(f"Conjunto desconhecido: {dataset}")
+
+        if action == 'purge':
+            datasets = None if options['all'] else [dataset]
+            self.stdout.write('🧹 Aplicando retenção de logs...')
+            result = log_retention_service.run_retention(
+                days=options['days'],
+                archive=not options['no_archive'],
+                datasets=datasets,
+                dry_run=options['dry_run'],
+            )
+            self.stdout.write(f"   Corte: {result['cutoff']} ({result['days']} dias)")
+            for name, stats in result['results'].items():
+                if options['dry_run']:
+                    self.stdout.write(f"   🔍 {name}: {stats['would_delete']} registros seriam removidos")
+                else:
+                    self.stdout.write(
+                        f"   ✅ {name}: {stats['deleted']} removidos, {stats['archived']} arquivados "
+                        f"em {len(stats['segments'])} segmentos ({stats['chunks']} chunks)"
+                    )
+
+        elif action == 'compact':
+            self.stdout.write('🗜️ Compactando raw_data de logs já processados...')
+            compacted = log_retention_service.compact_raw_data(days=options['days'])
+            self.stdout.write(self.style.SUCCESS(f"✅ {compacted} logs compactados"))
+
+        elif action == 'segments':
+            segments = log_retention_service.list_segments(dataset, date_from, date_to)
+            self.stdout.write(f"📦 {len(segments)} segmentos de {dataset}:")
+            for path in segments:
+                self.stdout.write(f"   {path} ({path.stat().st_size} bytes)")
+
+        elif action == 'query':
+            filters = {}
+            if options['user_id'] is not None:
+                filters['user_id'] = options['user_id']
+            shown = 0
+            for row in log_retention_service.query_archive(dataset, date_from, date_to, **filters):
+                self.stdout.write(f"   {row}")
+                shown += 1
+                if shown >= options['limit']:
+                    break
+            self.stdout.write(f"📋 {shown} registros exibidos")
+
+        elif action == 'restore':
+            self.stdout.write(f'♻️ Restaurando {dataset} do arquivo...')
+            restored = log_retention_service.restore(dataset, date_from, date_to)
+            self.stdout.write(self.style.SUCCESS(f"✅ {restored} registros restaurados (existentes ignorados)"))
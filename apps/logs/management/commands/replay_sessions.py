@@ -0,0 +1,240 @@
+"""
+Comando para reprocessar o histórico de logs em memória (replay de sessões).
+"""
+import json
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.utils import TimezoneUtils
+from apps.logs.replay import (
+    ReplayEngine, apply_sessions, compare_runs, compare_with_stored, decision_as_dict, load_logs,
+    parse_local_datetime,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Reexecuta as regras de sessão/interjornada sobre um intervalo de logs em memória, '
+        'com relógio virtual e sem efeitos na catraca'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Início do intervalo (horário local, "dd/mm/aaaa hh:mm")',
+        )
+        parser.add_argument(
+            '--until',
+            help='Fim do intervalo (horário local, "dd/mm/aaaa hh:mm"; padrão: agora)',
+        )
+        parser.add_argument(
+            '--hours',
+            type=int,
+            help='Reprocessar as últimas N horas (alternativa a --since)',
+        )
+        parser.add_argument(
+            '--from-id',
+            type=int,
+            help='Primeiro AccessLog (id do banco) do intervalo',
+        )
+        parser.add_argument(
+            '--to-id',
+            type=int,
+            help='Último AccessLog (id do banco) do intervalo',
+        )
+        parser.add_argument(
+            '--device',
+            type=int,
+            help='Apenas logs deste Device (id)',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='Apenas logs deste usuário da catraca (pode repetir)',
+        )
+        parser.add_argument(
+            '--work-minutes',
+            type=int,
+            help='Backtest: duração de trabalho para todos (compara com a configuração atual)',
+        )
+        parser.add_argument(
+            '--rest-minutes',
+            type=int,
+            help='Backtest: duração de interjornada para todos (compara com a configuração atual)',
+        )
+        parser.add_argument(
+            '--lag-seconds',
+            type=float,
+            default=0.0,
+            help='Atraso simulado entre o log e o processamento (padrão: 0)',
+        )
+        parser.add_argument(
+            '--compare-stored',
+            action='store_true',
+            help='Comparar as decisões com as gravadas pelo monitoramento',
+        )
+        parser.add_argument(
+            '--decisions',
+            help='Arquivo JSONL com a decisão de cada log',
+        )
+        parser.add_argument(
+            '--sessions',
+            help='Arquivo JSON com o resumo e as sessões (abertas e finalizadas)',
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Substituir as sessões abertas do banco pelas do replay',
+        )
+        parser.add_argument(
+            '--no-input',
+            action='store_true',
+            help='Não pedir confirmação para --apply',
+        )
+
+    def handle(self, *args, **options):
+        since, until = self.get_interval(options)
+        backtest = options['work_minutes'] is not None or options['rest_minutes'] is not None
+        if backtest and options['apply']:
+            raise CommandError("--apply não pode ser usado com --work-minutes/--rest-minutes")
+        if options['device'] and options['apply']:
+            raise CommandError("--apply precisa dos logs de todas as catracas (não use --device)")
+
+        self.stdout.write("🔄 Carregando logs do intervalo...")
+        started = time.perf_counter()
+        rows = list(load_logs(
+            since=since, until=until, from_id=options['from_id'], to_id=options['to_id'],
+            device_id=options['device'], user_ids=options['users'],
+        ))
+        load_seconds = time.perf_counter() - started
+        if not rows:
+            self.stdout.write("📋 Nenhum log no intervalo")
+            return
+        self.stdout.write(
+            f"📋 {len(rows)} logs de {TimezoneUtils.format_datetime(rows[0][-1])} "
+            f"a {TimezoneUtils.format_datetime(rows[-1][-1])} (leitura em {load_seconds:.2f}s)"
+        )
+
+        keep_decisions = bool(options['decisions'] or options['compare_stored'] or backtest)
+        engine = ReplayEngine(
+            work_minutes=options['work_minutes'],
+            rest_minutes=options['rest_minutes'],
+            lag_seconds=options['lag_seconds'],
+            keep_decisions=keep_decisions,
+        )
+        # As regras de tempo vencem até o fim do intervalo (padrão: agora)
+        until = until or TimezoneUtils.get_utc_now()
+        engine.run(rows).finish(until)
+        self.show_summary(engine)
+
+        if backtest:
+            baseline = ReplayEngine(
+                lag_seconds=options['lag_seconds'], keep_decisions=True, employees=engine.employees,
+            )
+            baseline.run(rows).finish(until)
+            self.show_backtest(baseline, engine)
+
+        if options['compare_stored']:
+            self.show_stored_comparison(engine)
+
+        if options['decisions']:
+            with open(options['decisions'], 'w', encoding='utf-8') as output:
+                for decision in engine.decisions:
+                    output.write(json.dumps(decision_as_dict(decision), ensure_ascii=False) + '\n')
+            self.stdout.write(f"💾 Decisões salvas em {options['decisions']}")
+
+        if options['sessions']:
+            with open(options['sessions'], 'w', encoding='utf-8') as output:
+                json.dump({
+                    'summary': engine.get_summary(),
+                    'open_sessions': [session.as_dict() for session in engine.open_sessions()],
+                    'closed_sessions': [session.as_dict() for session in engine.closed],
+                }, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f"💾 Sessões salvas em {options['sessions']}")
+
+        if options['apply']:
+            self.apply(engine, options['users'], options['no_input'])
+
+    def get_interval(self, options):
+        since = until = None
+        if options['since']:
+            since = self.parse_datetime(options['since'])
+        elif options['hours']:
+            since = TimezoneUtils.get_utc_now() - timedelta(hours=options['hours'])
+        if options['until']:
+            until = self.parse_datetime(options['until'])
+        return since, until
+
+    def parse_datetime(self, value):
+        parsed = parse_local_datetime(value)
+        if parsed:
+            return parsed
+        raise CommandError(f"Data inválida: {value} (use dd/mm/aaaa hh:mm)")
+
+    def show_summary(self, engine):
+        summary = engine.get_summary()
+        self.stdout.write(f"\n📊 RESUMO DO REPLAY:")
+        self.stdout.write(
+            f"   ⚡ {summary['logs']} logs em {summary['elapsed_seconds']:.2f}s "
+            f"({(summary['logs_per_second'] or 0) * 60:,.0f} logs/min)"
+        )
+        for outcome, count in summary['outcomes'].items():
+            self.stdout.write(f"   • {outcome}: {count}")
+        open_sessions = summary['open_sessions']
+        self.stdout.write(
+            f"   👥 Sessões abertas: {sum(open_sessions.values())} "
+            f"(ativas {open_sessions.get('active', 0)}, aguardando saída {open_sessions.get('pending_rest', 0)}, "
+            f"bloqueadas {open_sessions.get('blocked', 0)}) - finalizadas: {summary['closed_sessions']}"
+        )
+        side_effects = summary['side_effects']
+        self.stdout.write(
+            f"   🚫 Efeitos na catraca (não executados): {side_effects.get('move_to_blacklist', 0)} para a blacklist, "
+            f"{side_effects.get('restore_from_blacklist', 0)} restaurados"
+        )
+
+    def show_backtest(self, baseline, candidate):
+        changes = compare_runs(baseline.decisions, candidate.decisions)
+        self.stdout.write(
+            f"\n🧪 BACKTEST (trabalho {candidate.work_minutes or 'atual'} min, "
+            f"interjornada {candidate.rest_minutes or 'atual'} min):"
+        )
+        self.stdout.write(f"   📋 Decisões alteradas: {len(changes)} de {len(candidate.decisions)}")
+        for key in ('allow', 'deny', 'blacklist_blocked'):
+            before, after = baseline.outcomes.get(key, 0), candidate.outcomes.get(key, 0)
+            self.stdout.write(f"   • {key}: {before} → {after} ({after - before:+d})")
+        self.stdout.write(
+            f"   🔒 Bloqueios: {baseline.side_effects.get('move_to_blacklist', 0)} → "
+            f"{candidate.side_effects.get('move_to_blacklist', 0)}"
+        )
+        for change in changes[:10]:
+            self.stdout.write(
+                f"   ↪ Log {change['log_id']} (usuário {change['user_id']}, {change['timestamp']}): "
+                f"{change['baseline_outcome']}/{change['baseline_state'] or '-'} → {change['outcome']}/{change['state'] or '-'}"
+            )
+
+    def show_stored_comparison(self, engine):
+        comparison = compare_with_stored(engine.decisions)
+        mismatches = comparison['mismatches']
+        self.stdout.write(
+            f"\n🔍 Comparação com o monitoramento: {comparison['compared']} logs comparados, "
+            f"{len(mismatches)} divergentes"
+        )
+        for mismatch in mismatches[:10]:
+            self.stdout.write(
+                f"   ↪ Log {mismatch['log_id']} (usuário {mismatch['user_id']}): gravado "
+                f"{mismatch['stored_status']}/{mismatch['stored_outcome']}, replay "
+                f"{mismatch['status']}/{mismatch['outcome']}"
+            )
+
+    def apply(self, engine, user_ids, no_input):
+        if not no_input:
+            response = input("Substituir as sessões abertas do banco pelas do replay? (s/N): ")
+            if response.lower() != 's':
+                self.stdout.write("❌ Operação cancelada")
+                return
+        count = apply_sessions(engine, user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {count} sessões abertas reconstruídas (a blacklist é conciliada no próximo ciclo do monitoramento)"
+        ))
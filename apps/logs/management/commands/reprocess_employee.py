@@ -0,0 +1,83 @@
+"""
+Comando para reprocessar um único funcionário a partir de um log ou horário.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.logs.replay import parse_local_datetime
+from apps.logs.reprocess import employee_reprocessor
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprocessa os logs de um funcionário a partir de um log ou horário, corrigindo apenas '
+        'a sessão e a blacklist dele (os demais continuam sendo processados)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_id',
+            type=int,
+            help='ID do usuário na catraca',
+        )
+        parser.add_argument(
+            '--from-log',
+            type=int,
+            help='Primeiro AccessLog (id do banco) a reprocessar',
+        )
+        parser.add_argument(
+            '--since',
+            help='Primeiro horário a reprocessar (horário local, "dd/mm/aaaa hh:mm")',
+        )
+        parser.add_argument(
+            '--lookback-hours',
+            type=int,
+            help='Horas antes do ponto de partida usadas para reconstruir a sessão (padrão: REPROCESS_LOOKBACK_HOURS)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostrar o resultado, sem gravar',
+        )
+
+    def handle(self, *args, **options):
+        if bool(options['from_log']) == bool(options['since']):
+            raise CommandError("Informe --from-log ou --since")
+
+        since = None
+        if options['since']:
+            since = parse_local_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Data inválida: {options['since']} (use dd/mm/aaaa hh:mm)")
+        if options['lookback_hours'] is not None:
+            employee_reprocessor.lookback_hours = options['lookback_hours']
+
+        user_id = options['user_id']
+        self.stdout.write(f"🔄 Reprocessando usuário {user_id}...")
+        if options['dry_run']:
+            self.stdout.write("⚠️ MODO DRY-RUN: Apenas simulando, não salvando no banco")
+
+        result = employee_reprocessor.reprocess(
+            user_id, from_log_id=options['from_log'], since=since, dry_run=options['dry_run'],
+        )
+        if not result['success']:
+            raise CommandError(result['message'])
+
+        self.stdout.write(f"\n📊 RESUMO DO REPROCESSAMENTO:")
+        self.stdout.write(f"   📋 Logs reprocessados: {result['logs']} (+{result['seed_logs']} anteriores para reconstruir a sessão)")
+        self.stdout.write(f"   ✏️ Decisões alteradas: {result['changed']}")
+        session = result['session']
+        if session:
+            self.stdout.write(
+                f"   👤 Sessão: {session['state']} desde {session['first_access']}"
+                + (f", retorno {session['return_time']}" if session['return_time'] else '')
+            )
+        else:
+            self.stdout.write("   👤 Sem sessão aberta")
+        if result['blacklist']:
+            self.stdout.write(f"   🚫 Blacklist: {result['blacklist']}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("⚠️ Nada foi gravado (dry-run)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Usuário {user_id} reprocessado em {result['elapsed_seconds']:.2f}s"
+            ))
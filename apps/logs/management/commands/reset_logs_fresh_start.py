@@ -3,10 +3,10 @@ Comando Django para resetar todos os logs e carregar os 1000 últimos corretos.
 """
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from apps.logs.models import AccessLog, SystemLog
-from apps.devices.device_client import DeviceClient
+from apps.logs.backfill import backfill_engine
+from apps.logs.models import AccessLog, DeviceLogCursor
 from apps.logs.services import log_monitor_service
-from datetime import datetime, timezone
+from apps.logs.workers import access_log_worker
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,83 +40,40 @@ class Command(BaseCommand):
                 AccessLog.objects.all().delete()
                 self.stdout.write(f"   ✅ {count} logs apagados")
             
-            # 3. Conectar à catraca
+            # 3. Identificar o último log da catraca
             self.stdout.write("\n3️⃣ Conectando à catraca...")
-            client = DeviceClient()
-            self.stdout.write("   ✅ Conectado à catraca")
-            
-            # 4. Buscar os 1000 últimos logs
-            self.stdout.write("\n4️⃣ Buscando 1000 últimos logs...")
-            logs = client.get_recent_access_logs(limit=1000)
-            self.stdout.write(f"   ✅ {len(logs)} logs encontrados")
-            
-            # 5. Processar e salvar logs
-            self.stdout.write("\n5️⃣ Processando e salvando logs...")
-            processed_count = 0
-            skipped_count = 0
-            last_log_id = 0
+            device = access_log_worker.load_devices()[0]
+            head_id = access_log_worker.poller.head_log_id_sync(device)
+            self.stdout.write(f"   ✅ Conectado à catraca (último log: {head_id})")
             
+            # 4. Carregar os 1000 últimos logs (backfill em página única, com bulk insert)
+            self.stdout.write("\n4️⃣ Carregando 1000 últimos logs...")
             with transaction.atomic():
-                for log_data in logs:
-                    log_id = log_data.get('id')
-                    user_id = log_data.get('user_id')
-                    
-                    # Pular logs de sistema (user_id = 0)
-                    if user_id == 0:
-                        skipped_count += 1
-                        continue
-                    
-                    # Verificar se já existe
-                    if AccessLog.objects.filter(device_log_id=log_id).exists():
-                        skipped_count += 1
-                        continue
-                    
-                    # Processar log
-                    try:
-                        event_type = self.map_event_type(log_data.get('event'))
-                        user_name = self.get_user_name(user_id)
-                        device_timestamp = self.parse_timestamp(log_data)
-                        
-                        AccessLog.objects.create(
-                            device_log_id=log_id,
-                            user_id=user_id,
-                            user_name=user_name,
-                            event_type=event_type,
-                            event_description=self.get_event_description(log_data.get('event')),
-                            device_id=1,
-                            device_name="Catraca Principal",
-                            portal_id=log_data.get('portal_id', 1),
-                            device_timestamp=device_timestamp,
-                            raw_data=log_data,
-                            processing_status='processed'
-                        )
-                        
-                        processed_count += 1
-                        last_log_id = max(last_log_id, log_id)
-                        
-                        if processed_count % 100 == 0:
-                            self.stdout.write(f"   📊 Processados: {processed_count}")
-                    
-                    except Exception as e:
-                        logger.error(f"Erro ao processar log {log_id}: {e}")
-                        skipped_count += 1
-            
-            self.stdout.write(f"   ✅ {processed_count} logs processados")
+                DeviceLogCursor.objects.filter(device=device).delete()
+                job = backfill_engine.create_job(device, after_id=max(head_id - 1000, 0), end_id=head_id)
+            backfill_engine.run_job(job)
+            if job.status != 'completed':
+                raise Exception(job.last_error or f"backfill {job.id} interrompido")
+            processed_count = job.logs_written
+            skipped_count = job.logs_fetched - job.logs_written
+            last_log_id = head_id
+            self.stdout.write(f"   ✅ {processed_count} logs salvos")
             self.stdout.write(f"   ⏭️  {skipped_count} logs pulados")
             
-            # 6. Atualizar monitor
-            self.stdout.write(f"\n6️⃣ Atualizando monitor...")
+            # 5. Cursor da sincronização continua após o último log carregado
+            self.stdout.write(f"\n5️⃣ Atualizando cursor e monitor...")
+            DeviceLogCursor.for_device(device).advance(last_log_id)
             log_monitor_service.last_processed_id = last_log_id
             self.stdout.write(f"   ✅ Último ID processado: {last_log_id}")
             
-            # 7. Reiniciar monitoramento
-            self.stdout.write(f"\n7️⃣ Reiniciando monitoramento...")
+            # 6. Reiniciar monitoramento
+            self.stdout.write(f"\n6️⃣ Reiniciando monitoramento...")
             if log_monitor_service.start_monitoring():
                 self.stdout.write("   ✅ Monitoramento reiniciado")
             else:
                 self.stdout.write("   ❌ Falha ao reiniciar monitoramento")
             
-            # 8. Resumo final
+            # 7. Resumo final
             self.stdout.write(f"\n📊 RESUMO FINAL:")
             self.stdout.write(f"   Logs processados: {processed_count}")
             self.stdout.write(f"   Logs pulados: {skipped_count}")
@@ -129,51 +86,3 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"❌ Erro durante reset: {e}"))
             logger.error(f"Erro durante reset: {e}")
-    
-    def map_event_type(self, event):
-        """Mapeia tipo de evento."""
-        event_map = {
-            1: 1,  # Entrada
-            2: 2,  # Saída
-            3: 3,  # Acesso Negado
-            4: 4,  # Erro
-            5: 5,  # Timeout
-            6: 6,  # Manutenção
-            7: 1,  # Autorizado (entrada)
-            8: 3,  # Bloqueado
-        }
-        return event_map.get(event, 1)
-    
-    def get_event_description(self, event):
-        """Obtém descrição do evento."""
-        descriptions = {
-            1: "Entrada",
-            2: "Saída", 
-            3: "Acesso Negado",
-            4: "Erro",
-            5: "Timeout",
-            6: "Manutenção",
-            7: "Entrada",
-            8: "Bloqueado",
-        }
-        return descriptions.get(event, "Entrada")
-    
-    def get_user_name(self, user_id):
-        """Obtém nome do usuário."""
-        try:
-            from apps.employees.models import Employee
-            employee = Employee.objects.filter(device_user_id=user_id).first()
-            return employee.name if employee else f"Usuário {user_id}"
-        except:
-            return f"Usuário {user_id}"
-    
-    def parse_timestamp(self, log_data):
-        """Converte timestamp Unix para datetime."""
-        try:
-            timestamp = log_data.get('time')
-            if timestamp:
-                return datetime.fromtimestamp(timestamp, tz=timezone.utc)
-            else:
-                return datetime.now(timezone.utc)
-        except:
-            return datetime.now(timezone.utc)
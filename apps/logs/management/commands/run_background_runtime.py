@@ -0,0 +1,78 @@
+"""
+Comando para executar o runtime em segundo plano (ingestão da catraca e
+processamento de sessões) com líder único por dispositivo.
+"""
+import signal
+from django.core.management.base import BaseCommand
+from apps.logs.models import RuntimeLease
+from apps.logs.runtime import BackgroundRuntime
+
+
+class Command(BaseCommand):
+    help = 'Executa o AccessLogWorker e o monitoramento de sessões com lease de líder único'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Apenas mostra os leases atuais e sai',
+        )
+        parser.add_argument(
+            '--ttl',
+            type=int,
+            help='Segundos sem heartbeat até outro processo assumir (padrão: RUNTIME_LEASE_TTL_SECONDS)',
+        )
+        parser.add_argument(
+            '--heartbeat',
+            type=int,
+            help='Intervalo do heartbeat em segundos (padrão: RUNTIME_HEARTBEAT_SECONDS)',
+        )
+        parser.add_argument(
+            '--device-id',
+            type=int,
+            help='ID do dispositivo (padrão: LOG_SYNC_DEVICE_ID)',
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.show_status()
+            return
+
+        runtime = BackgroundRuntime(
+            ttl_seconds=options['ttl'],
+            heartbeat_seconds=options['heartbeat'],
+            device_id=options['device_id'],
+        )
+        if runtime.heartbeat_seconds >= runtime.ttl_seconds:
+            self.stdout.write(self.style.WARNING(
+                '⚠️ O heartbeat deve ser menor que o TTL, senão o lease expira entre renovações'
+            ))
+
+        def _shutdown(signum, frame):
+            self.stdout.write('🛑 Sinal recebido, finalizando runtime...')
+            runtime.stop()
+
+        signal.signal(signal.SIGINT, _shutdown)
+        signal.signal(signal.SIGTERM, _shutdown)
+
+        self.stdout.write(self.style.SUCCESS(f'🚀 Runtime iniciado: {runtime.owner}'))
+        self.stdout.write(f'   🔒 Lease: {runtime.lease_name} (TTL {runtime.ttl_seconds}s, heartbeat {runtime.heartbeat_seconds}s)')
+        self.stdout.write('   ⏳ Aguardando liderança (Ctrl+C para sair)...')
+
+        runtime.run()
+        self.stdout.write(self.style.SUCCESS('✅ Runtime finalizado'))
+
+    def show_status(self):
+        """Mostra os leases registrados."""
+        self.stdout.write('📊 LEASES DO RUNTIME:')
+        leases = list(RuntimeLease.objects.all())
+        if not leases:
+            self.stdout.write('   Nenhum lease registrado')
+            return
+
+        for lease in leases:
+            state = '❌ expirado/livre' if lease.is_expired else '✅ ativo'
+            self.stdout.write(f'   {lease.name}: {state}')
+            self.stdout.write(f'      Dono: {lease.owner or "-"} (PID {lease.pid or "-"})')
+            self.stdout.write(f'      Adquirido em: {lease.acquired_at or "-"}')
+            self.stdout.write(f'      Último heartbeat: {lease.heartbeat_at or "-"}')
@@ -0,0 +1,290 @@
+"""
+Métricas do pipeline de logs (catraca → ingestão → sessões).
+
+As métricas ficam em memória no processo que executa cada etapa (runtime,
+workers Celery). Esses processos publicam periodicamente um snapshot em
+MetricsSnapshot, uma linha por papel estável do processo (host + comando ou
+nó Celery, não o PID): um processo reiniciado substitui o snapshot do anterior.
+O endpoint de métricas combina os snapshots recentes com as métricas do
+próprio processo; contadores e histogramas recebem o label `source`, de modo
+que cada processo é uma série monotônica própria para rate(). As posições
+(IDs) são por dispositivo e geração da numeração (log_epoch), e o atraso (lag)
+em IDs é calculado por dispositivo na geração mais recente:
+
+    ingest_lag_ids     = último ID na catraca − último ID sincronizado
+    processing_lag_ids = último ID sincronizado − último ID processado p/ sessões
+"""
+import logging
+import os
+import socket
+import sys
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+from django.conf import settings
+from apps.core.metrics import SIZE_BUCKETS, MetricsRegistry, metrics
+
+logger = logging.getLogger(__name__)
+
+# Catraca
+device_fetch_seconds = metrics.histogram(
+    'device_fetch_seconds', 'Latência das buscas de logs na catraca', ['operation'],
+)
+device_fetch_errors = metrics.counter(
+    'device_fetch_errors_total', 'Buscas de logs na catraca com erro', ['operation'],
+)
+group_move_seconds = metrics.histogram(
+    'device_group_move_seconds', 'Latência da movimentação de grupo na catraca', ['result'],
+)
+device_circuit_state = metrics.gauge(
+    'device_circuit_state', 'Circuito do dispositivo (0 = fechado, 1 = meio-aberto, 2 = aberto)', ['device'],
+)
+
+# Ingestão
+ingest_batch_size = metrics.histogram(
+    'ingest_batch_size', 'Logs recebidos por lote de ingestão', buckets=SIZE_BUCKETS,
+)
+ingest_batch_seconds = metrics.histogram(
+    'ingest_batch_seconds', 'Tempo de gravação de um lote de ingestão',
+)
+logs_ingested = metrics.counter(
+    'logs_ingested_total', 'Logs novos gravados no banco',
+)
+backfill_logs_written = metrics.counter(
+    'backfill_logs_written_total', 'Logs históricos gravados pelo backfill',
+)
+backfill_remaining_ids = metrics.gauge(
+    'backfill_remaining_ids', 'IDs ainda pendentes nos backfills em andamento',
+)
+
+# Processamento de sessões
+event_processing_seconds = metrics.histogram(
+    'event_processing_seconds', 'Tempo de processamento de um log para sessões', ['outcome'],
+)
+events_processed = metrics.counter(
+    'events_processed_total', 'Logs processados para sessões', ['outcome'],
+)
+
+# Posições (IDs da catraca), por dispositivo e geração da numeração
+POSITION_LABELS = ['device', 'epoch']
+device_head_log_id = metrics.gauge(
+    'device_head_log_id', 'Maior ID de log visto na catraca', POSITION_LABELS,
+)
+last_synced_log_id = metrics.gauge(
+    'last_synced_log_id', 'Último ID de log sincronizado', POSITION_LABELS,
+)
+last_session_processed_log_id = metrics.gauge(
+    'last_session_processed_log_id', 'Maior ID de log processado para sessões', POSITION_LABELS,
+)
+
+_last_publish = 0.0
+
+
+def position_labels(device_id, log_epoch=0) -> Dict:
+    """Labels das posições de um dispositivo (Device.id) numa geração da numeração."""
+    return {'device': device_id if device_id is not None else '', 'epoch': log_epoch or 0}
+
+
+def process_role() -> str:
+    """
+    Papel estável do processo: METRICS_ROLE, o nó e o slot do pool nos
+    workers Celery (ex: logs-p0:0) ou o comando do manage.py.
+    """
+    role = getattr(settings, 'METRICS_ROLE', '')
+    if role:
+        return role
+    try:
+        from billiard.process import current_process
+        from celery import current_task
+        if current_task and current_task.request.hostname:
+            node = current_task.request.hostname.split('@')[0]
+            return f"{node}:{getattr(current_process(), 'index', 0)}"
+    except ImportError:
+        pass
+    if len(sys.argv) > 1 and os.path.basename(sys.argv[0]) == 'manage.py':
+        return sys.argv[1]
+    return os.path.basename(sys.argv[0]) or 'python'
+
+
+def metrics_source() -> str:
+    """Chave do snapshot deste processo (host + papel)."""
+    return f'{socket.gethostname()}:{process_role()}'
+
+
+def publish_snapshot(force: bool = False) -> bool:
+    """
+    Grava o snapshot das métricas deste processo (no máximo a cada
+    METRICS_PUBLISH_SECONDS, exceto com force=True).
+    """
+    global _last_publish
+
+    interval = getattr(settings, 'METRICS_PUBLISH_SECONDS', 15)
+    now = time.monotonic()
+    if not force and now - _last_publish < interval:
+        return False
+    _last_publish = now
+
+    from apps.core.utils import TimezoneUtils
+    from .models import MetricsSnapshot
+
+    try:
+        MetricsSnapshot.objects.update_or_create(
+            source=metrics_source(),
+            defaults={
+                'hostname': socket.gethostname(),
+                'pid': os.getpid(),
+                'data': metrics.snapshot(),
+                'updated_at': TimezoneUtils.get_utc_now(),
+            },
+        )
+        return True
+    except Exception as e:
+        logger.debug(f"Não foi possível publicar métricas: {e}")
+        return False
+
+
+def _gauge(snapshot: Dict, name: str) -> Optional[float]:
+    data = snapshot.get(f'{metrics.prefix}{name}')
+    if not data or not data['samples']:
+        return None
+    return max(value for _, value in data['samples'])
+
+
+def _positions(snapshot: Dict, name: str) -> Dict[str, tuple]:
+    """Posição de cada dispositivo na geração mais recente: {device: (epoch, id)}."""
+    data = snapshot.get(f'{metrics.prefix}{name}')
+    positions = {}
+    for labels, value in (data or {}).get('samples', []):
+        if len(labels) != len(POSITION_LABELS):
+            continue
+        device, epoch = labels
+        position = (int(epoch or 0), value)
+        if position > positions.get(device, (-1, 0)):
+            positions[device] = position
+    return positions
+
+
+def _position(snapshot: Dict, name: str) -> Optional[float]:
+    """Maior posição atual entre os dispositivos (resumo)."""
+    return max((value for _, value in _positions(snapshot, name).values()), default=None)
+
+
+def _lags(ahead: Dict[str, tuple], behind: Dict[str, tuple]) -> Dict[str, float]:
+    """Atraso por dispositivo entre duas posições; uma geração nova começa do zero."""
+    lags = {}
+    for device, (epoch, value) in ahead.items():
+        if device not in behind:
+            continue
+        behind_epoch, behind_value = behind[device]
+        if behind_epoch == epoch:
+            lags[device] = max(value - behind_value, 0)
+        else:
+            lags[device] = value if behind_epoch < epoch else 0
+    return lags
+
+
+def _derived_gauge(name: str, documentation: str, value, labelnames=None) -> Dict:
+    """Gauge calculado; com labelnames, value é {label: valor}."""
+    if labelnames is None:
+        return {
+            'type': 'gauge', 'help': documentation, 'labelnames': [],
+            'samples': [[[], value]],
+        }
+    return {
+        'type': 'gauge', 'help': documentation, 'labelnames': labelnames,
+        'samples': [[[label], sample] for label, sample in sorted(value.items())],
+    }
+
+
+def _with_source(snapshot: Dict, source: str) -> Dict:
+    """Contadores e histogramas de um processo com o label `source` (gauges sem alteração)."""
+    labeled = {}
+    for name, data in snapshot.items():
+        if data['type'] == 'gauge':
+            labeled[name] = data
+            continue
+        labeled[name] = dict(
+            data,
+            labelnames=list(data['labelnames']) + ['source'],
+            samples=[[list(labels) + [source], value] for labels, value in data['samples']],
+        )
+    return labeled
+
+
+def collect() -> Dict[str, Dict]:
+    """Métricas combinadas (este processo + snapshots publicados) com os lags calculados."""
+    from apps.core.utils import TimezoneUtils
+    from .models import MetricsSnapshot
+
+    source = metrics_source()
+    snapshots = [_with_source(metrics.snapshot(), source)]
+    max_age = getattr(settings, 'METRICS_SNAPSHOT_MAX_AGE_SECONDS', 300)
+    try:
+        recent = MetricsSnapshot.objects.filter(
+            updated_at__gte=TimezoneUtils.get_utc_now() - timedelta(seconds=max_age),
+        ).exclude(source=source)
+        snapshots.extend(_with_source(snapshot.data, snapshot.source) for snapshot in recent)
+    except Exception as e:
+        logger.debug(f"Não foi possível ler snapshots de métricas: {e}")
+
+    merged = MetricsRegistry.merge(snapshots)
+    prefix = metrics.prefix
+    merged[f'{prefix}metrics_sources'] = _derived_gauge(
+        'metrics_sources', 'Processos com métricas combinadas', len(snapshots),
+    )
+
+    head = _positions(merged, 'device_head_log_id')
+    synced = _positions(merged, 'last_synced_log_id')
+    processed = _positions(merged, 'last_session_processed_log_id')
+    ingest_lags = _lags(head, synced)
+    if ingest_lags:
+        merged[f'{prefix}ingest_lag_ids'] = _derived_gauge(
+            'ingest_lag_ids', 'IDs na catraca ainda não sincronizados', ingest_lags, ['device'],
+        )
+    processing_lags = _lags(synced, processed)
+    if processing_lags:
+        merged[f'{prefix}processing_lag_ids'] = _derived_gauge(
+            'processing_lag_ids', 'IDs sincronizados ainda não processados para sessões',
+            processing_lags, ['device'],
+        )
+    return merged
+
+
+def summary(snapshot: Optional[Dict] = None) -> Dict:
+    """Resumo para o monitor do admin: posições, lags, totais e percentis."""
+    snapshot = snapshot if snapshot is not None else collect()
+    prefix = metrics.prefix
+
+    def total(name):
+        data = snapshot.get(f'{prefix}{name}')
+        return sum(value for _, value in data['samples']) if data else 0
+
+    histograms = {}
+    for name, data in snapshot.items():
+        if data['type'] != 'histogram':
+            continue
+        merged = {'counts': [0] * (len(data['buckets']) + 1), 'sum': 0.0, 'count': 0}
+        for _, value in data['samples']:
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], value['counts'])]
+            merged['sum'] += value['sum']
+            merged['count'] += value['count']
+        histograms[name[len(prefix):]] = {
+            'count': merged['count'],
+            'avg': merged['sum'] / merged['count'] if merged['count'] else None,
+            'p50': MetricsRegistry.quantile(data['buckets'], merged, 0.50),
+            'p95': MetricsRegistry.quantile(data['buckets'], merged, 0.95),
+            'p99': MetricsRegistry.quantile(data['buckets'], merged, 0.99),
+        }
+
+    return {
+        'device_head_log_id': _position(snapshot, 'device_head_log_id'),
+        'last_synced_log_id': _position(snapshot, 'last_synced_log_id'),
+        'last_session_processed_log_id': _position(snapshot, 'last_session_processed_log_id'),
+        'ingest_lag_ids': _gauge(snapshot, 'ingest_lag_ids'),
+        'processing_lag_ids': _gauge(snapshot, 'processing_lag_ids'),
+        'logs_ingested_total': total('logs_ingested_total'),
+        'events_processed_total': total('events_processed_total'),
+        'device_fetch_errors_total': total('device_fetch_errors_total'),
+        'sources': _gauge(snapshot, 'metrics_sources'),
+        'histograms': histograms,
+    }
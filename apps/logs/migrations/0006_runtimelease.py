@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0005_merge_20251018_1912'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuntimeLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nome')),
+                ('owner', models.CharField(blank=True, default='', max_length=255, verbose_name='Dono')),
+                ('hostname', models.CharField(blank=True, default='', max_length=255, verbose_name='Host')),
+                ('pid', models.IntegerField(blank=True, null=True, verbose_name='PID')),
+                ('acquired_at', models.DateTimeField(blank=True, null=True, verbose_name='Adquirido em')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Último Heartbeat')),
+                ('ttl_seconds', models.IntegerField(default=30, verbose_name='TTL (s)')),
+            ],
+            options={
+                'verbose_name': 'Lease do Runtime',
+                'verbose_name_plural': 'Leases do Runtime',
+                'ordering': ['name'],
+            },
+        ),
+    ]
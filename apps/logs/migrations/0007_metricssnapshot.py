@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0006_runtimelease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Origem')),
+                ('hostname', models.CharField(blank=True, default='', max_length=255, verbose_name='Host')),
+                ('pid', models.IntegerField(blank=True, null=True, verbose_name='PID')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Métricas')),
+                ('updated_at', models.DateTimeField(verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Métricas',
+                'verbose_name_plural': 'Snapshots de Métricas',
+                'ordering': ['source'],
+            },
+        ),
+    ]
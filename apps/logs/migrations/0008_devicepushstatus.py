@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0007_metricssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DevicePushStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.IntegerField(unique=True, verbose_name='ID do Dispositivo')),
+                ('last_push_at', models.DateTimeField(verbose_name='Última Notificação')),
+                ('last_notification', models.CharField(blank=True, default='', max_length=50, verbose_name='Tipo da Última Notificação')),
+                ('notifications_received', models.BigIntegerField(default=0, verbose_name='Notificações Recebidas')),
+                ('logs_received', models.BigIntegerField(default=0, verbose_name='Logs Recebidos')),
+            ],
+            options={
+                'verbose_name': 'Status do Push do Dispositivo',
+                'verbose_name_plural': 'Status do Push dos Dispositivos',
+                'ordering': ['device_id'],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0002_device_user_sync_fingerprint'),
+        ('logs', '0008_devicepushstatus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceLogCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_log_id', models.BigIntegerField(default=0, verbose_name='Último ID Sincronizado')),
+                ('last_log_at', models.DateTimeField(blank=True, null=True, verbose_name='Timestamp do Último Log')),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Sincronização')),
+                ('logs_synced', models.BigIntegerField(default=0, verbose_name='Logs Sincronizados')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último Erro')),
+                ('last_error_at', models.DateTimeField(blank=True, null=True, verbose_name='Último Erro em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Cursor de Logs do Dispositivo',
+                'verbose_name_plural': 'Cursores de Logs dos Dispositivos',
+                'ordering': ['device_id'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='accesslog',
+            name='device_log_id',
+            field=models.BigIntegerField(verbose_name='ID do Log no Dispositivo'),
+        ),
+        migrations.AddConstraint(
+            model_name='accesslog',
+            constraint=models.UniqueConstraint(fields=('device_id', 'device_log_id'), name='logs_accesslog_device_log_unique'),
+        ),
+        migrations.AddField(
+            model_name='devicelogcursor',
+            name='device',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='log_cursor', to='devices.device', verbose_name='Dispositivo'),
+        ),
+    ]
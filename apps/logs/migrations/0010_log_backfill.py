@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0002_device_user_sync_fingerprint'),
+        ('logs', '0009_device_log_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogBackfill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em execução'), ('paused', 'Pausado'), ('completed', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status')),
+                ('origin', models.CharField(choices=[('tail', 'Atraso da sincronização'), ('command', 'Comando')], default='command', max_length=20, verbose_name='Origem')),
+                ('after_id', models.BigIntegerField(default=0, verbose_name='Após o ID')),
+                ('end_id', models.BigIntegerField(blank=True, null=True, verbose_name='Até o ID')),
+                ('checkpoint_id', models.BigIntegerField(default=0, verbose_name='Checkpoint (último ID lido)')),
+                ('since', models.DateTimeField(blank=True, null=True, verbose_name='Ignorar logs anteriores a')),
+                ('process_sessions', models.BooleanField(default=False, verbose_name='Processar para Sessões')),
+                ('pages', models.IntegerField(default=0, verbose_name='Páginas')),
+                ('logs_fetched', models.BigIntegerField(default=0, verbose_name='Logs Lidos')),
+                ('logs_written', models.BigIntegerField(default=0, verbose_name='Logs Gravados')),
+                ('elapsed_seconds', models.FloatField(default=0, verbose_name='Tempo em Execução (s)')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_backfills', to='devices.device', verbose_name='Dispositivo')),
+            ],
+            options={
+                'verbose_name': 'Backfill de Logs',
+                'verbose_name_plural': 'Backfills de Logs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='logs_logbac_status_413f0c_idx')],
+            },
+        ),
+    ]
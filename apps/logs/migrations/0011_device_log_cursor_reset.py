@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0010_log_backfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devicelogcursor',
+            name='last_reset_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última Reinicialização'),
+        ),
+        migrations.AddField(
+            model_name='devicelogcursor',
+            name='reset_count',
+            field=models.IntegerField(default=0, verbose_name='Reinicializações Detectadas'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:18
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def restore_renumbered_logs(apps, schema_editor):
+    """
+    Desfaz a renumeração negativa das reinicializações anteriores.
+
+    Cada reinicialização movia os logs do dispositivo para uma faixa negativa
+    abaixo das anteriores, com deslocamento constante (ID gravado - ID
+    original em raw_data). Percorrendo os IDs negativos a partir de -1 (a
+    faixa mais antiga), cada mudança de deslocamento é uma nova geração: os logs voltam ao ID original
+    na geração correspondente e os atuais ficam na última. Logs sem dispositivo
+    duplicados (mesmo ID) são removidos antes da constraint, mantendo o primeiro.
+    """
+    AccessLog = apps.get_model('logs', 'AccessLog')
+    DeviceLogCursor = apps.get_model('logs', 'DeviceLogCursor')
+
+    device_logs = AccessLog.objects.filter(is_manual=False)
+    device_ids = device_logs.filter(device_log_id__lt=0).values_list('device_id', flat=True).distinct()
+    for device_id in list(device_ids):
+        renumbered = device_logs.filter(device_id=device_id, device_log_id__lt=0).order_by('-device_log_id')
+        restored = []
+        log_epoch, offset = -1, None
+        for log in renumbered.only('id', 'device_log_id', 'raw_data').iterator(chunk_size=BATCH_SIZE):
+            original_id = (log.raw_data or {}).get('id')
+            if not isinstance(original_id, int) or original_id <= 0:
+                continue
+            if log.device_log_id - original_id != offset:
+                log_epoch, offset = log_epoch + 1, log.device_log_id - original_id
+            log.device_log_id, log.log_epoch = original_id, log_epoch
+            restored.append(log)
+        if not restored:
+            continue
+
+        AccessLog.objects.bulk_update(restored, ['device_log_id', 'log_epoch'], batch_size=BATCH_SIZE)
+        device_logs.filter(device_id=device_id, device_log_id__gt=0).exclude(
+            id__in=[log.id for log in restored],
+        ).update(log_epoch=log_epoch + 1)
+        DeviceLogCursor.objects.filter(device_id=device_id).update(log_epoch=log_epoch + 1)
+
+    seen = set()
+    duplicates = []
+    legacy = device_logs.filter(device_id__isnull=True).order_by('id').values_list('id', 'device_log_id')
+    for log_id, device_log_id in legacy.iterator(chunk_size=BATCH_SIZE):
+        if device_log_id in seen:
+            duplicates.append(log_id)
+        seen.add(device_log_id)
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        AccessLog.objects.filter(id__in=duplicates[start:start + BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0011_device_log_cursor_reset'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='accesslog',
+            name='logs_accesslog_device_log_unique',
+        ),
+        migrations.AddField(
+            model_name='accesslog',
+            name='log_epoch',
+            field=models.PositiveIntegerField(default=0, verbose_name='Geração da Numeração'),
+        ),
+        migrations.AddField(
+            model_name='devicelogcursor',
+            name='log_epoch',
+            field=models.PositiveIntegerField(default=0, verbose_name='Geração da Numeração'),
+        ),
+        migrations.RunPython(restore_renumbered_logs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='accesslog',
+            constraint=models.UniqueConstraint(fields=('device_id', 'log_epoch', 'device_log_id'), name='logs_accesslog_device_log_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='accesslog',
+            constraint=models.UniqueConstraint(condition=models.Q(('device_id__isnull', True), ('is_manual', False)), fields=('log_epoch', 'device_log_id'), name='logs_accesslog_legacy_log_unique'),
+        ),
+    ]
@@ -31,8 +31,11 @@ class AccessLog(models.Model):
         ('ignored', 'Ignorado'),
     ]
     
-    # ID do log no dispositivo
-    device_log_id = models.BigIntegerField(unique=True, verbose_name="ID do Log no Dispositivo")
+    # ID do log no dispositivo (único por dispositivo: as catracas têm sequências próprias)
+    device_log_id = models.BigIntegerField(verbose_name="ID do Log no Dispositivo")
+    # Geração da numeração: incrementada quando a catraca reinicia os IDs
+    # (DeviceLogCursor.rewind_after_reset), para que um ID reutilizado não colida com o antigo
+    log_epoch = models.PositiveIntegerField(default=0, verbose_name="Geração da Numeração")
     
     # Flag para identificar logs manuais
     is_manual = models.BooleanField(default=False, verbose_name="Log Manual")
@@ -45,7 +48,7 @@ class AccessLog(models.Model):
     event_type = models.IntegerField(choices=EVENT_TYPES, verbose_name="Tipo de Evento")
     event_description = models.CharField(max_length=500, verbose_name="Descrição do Evento")
     
-    # Informações do dispositivo
+    # Informações do dispositivo (device_id = Device.id de origem do log)
     device_id = models.IntegerField(null=True, blank=True, verbose_name="ID do Dispositivo")
     device_name = models.CharField(max_length=100, null=True, blank=True, verbose_name="Nome do Dispositivo")
     portal_id = models.IntegerField(null=True, blank=True, verbose_name="ID do Portal")
@@ -90,6 +93,16 @@ class AccessLog(models.Model):
             models.Index(fields=['device_id']),
             models.Index(fields=['session_processed']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['device_id', 'log_epoch', 'device_log_id'], name='logs_accesslog_device_log_unique',
+            ),
+            # Logs sem dispositivo (anteriores aos cursores): NULL não colide na constraint acima
+            models.UniqueConstraint(
+                fields=['log_epoch', 'device_log_id'], condition=models.Q(device_id__isnull=True, is_manual=False),
+                name='logs_accesslog_legacy_log_unique',
+            ),
+        ]
     
     def __str__(self):
         return f"Log {self.device_log_id} - {self.user_name} - {self.get_event_type_display()}"
@@ -394,3 +407,426 @@ class LogProcessingQueue(models.Model):
             self.status = 'retry'
         
         self.save(update_fields=['status', 'error_message', 'error_details', 'next_retry'])
+
+
+class RuntimeLease(models.Model):
+    """
+    Lease de liderança do runtime em segundo plano.
+    
+    Garante que apenas um processo execute o loop de ingestão/processamento
+    por dispositivo. O dono renova o heartbeat periodicamente; um lease sem
+    heartbeat dentro do TTL pode ser assumido por outro processo.
+    Também usado para pausar o processamento de um funcionário durante o
+    reprocessamento dele (`reprocess-employee-<user_id>`).
+    """
+    
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nome")
+    owner = models.CharField(max_length=255, blank=True, default='', verbose_name="Dono")
+    hostname = models.CharField(max_length=255, blank=True, default='', verbose_name="Host")
+    pid = models.IntegerField(null=True, blank=True, verbose_name="PID")
+    acquired_at = models.DateTimeField(null=True, blank=True, verbose_name="Adquirido em")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Último Heartbeat")
+    ttl_seconds = models.IntegerField(default=30, verbose_name="TTL (s)")
+    
+    class Meta:
+        verbose_name = "Lease do Runtime"
+        verbose_name_plural = "Leases do Runtime"
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} - {self.owner or 'livre'}"
+    
+    @property
+    def is_expired(self):
+        """Verifica se o heartbeat expirou."""
+        if not self.owner or not self.heartbeat_at:
+            return True
+        from datetime import timedelta
+        return self.heartbeat_at + timedelta(seconds=self.ttl_seconds) < TimezoneUtils.get_utc_now()
+    
+    @classmethod
+    def acquire(cls, name, owner, ttl_seconds=30, hostname='', pid=None):
+        """
+        Tenta adquirir (ou manter) o lease.
+        
+        A troca de dono é feita com um UPDATE condicional, então dois
+        processos nunca adquirem o mesmo lease ao mesmo tempo.
+        
+        Returns:
+            bool: True se o processo é o líder
+        """
+        from datetime import timedelta
+        from django.db import IntegrityError, transaction
+        from django.db.models import Q
+        
+        now = TimezoneUtils.get_utc_now()
+        fields = {
+            'owner': owner,
+            'hostname': hostname,
+            'pid': pid,
+            'heartbeat_at': now,
+            'ttl_seconds': ttl_seconds,
+        }
+        
+        renewed = cls.objects.filter(name=name, owner=owner).update(**fields)
+        if renewed:
+            return True
+        
+        taken = cls.objects.filter(name=name).filter(
+            Q(owner='') | Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=now - timedelta(seconds=ttl_seconds))
+        ).update(acquired_at=now, **fields)
+        if taken:
+            return True
+        
+        if cls.objects.filter(name=name).exists():
+            return False
+        
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, acquired_at=now, **fields)
+            return True
+        except IntegrityError:
+            return False
+    
+    @classmethod
+    def renew(cls, name, owner):
+        """Renova o heartbeat. Retorna False se o lease foi perdido."""
+        return bool(cls.objects.filter(name=name, owner=owner).update(heartbeat_at=TimezoneUtils.get_utc_now()))
+    
+    @classmethod
+    def release(cls, name, owner):
+        """Libera o lease se ainda pertencer ao dono."""
+        cls.objects.filter(name=name, owner=owner).update(owner='', pid=None, heartbeat_at=None)
+
+
+class MetricsSnapshot(models.Model):
+    """
+    Último snapshot das métricas em memória de um processo.
+    
+    O runtime e os workers Celery publicam periodicamente suas métricas aqui
+    para que o endpoint de métricas (processo web) exponha o pipeline inteiro.
+    """
+    
+    source = models.CharField(max_length=255, unique=True, verbose_name="Origem")
+    hostname = models.CharField(max_length=255, blank=True, default='', verbose_name="Host")
+    pid = models.IntegerField(null=True, blank=True, verbose_name="PID")
+    data = models.JSONField(default=dict, blank=True, verbose_name="Métricas")
+    updated_at = models.DateTimeField(verbose_name="Atualizado em")
+    
+    class Meta:
+        verbose_name = "Snapshot de Métricas"
+        verbose_name_plural = "Snapshots de Métricas"
+        ordering = ['source']
+    
+    def __str__(self):
+        return f"{self.source} ({self.updated_at})"
+
+
+class DevicePushStatus(models.Model):
+    """
+    Recebimento de notificações push (monitor online) de um dispositivo.
+    
+    Atualizado pelo receptor a cada notificação. Enquanto houver notificações
+    recentes, o AccessLogWorker e a verificação de giros passam a consultar a
+    catraca apenas no intervalo de reconciliação.
+    """
+    
+    device_id = models.IntegerField(unique=True, verbose_name="ID do Dispositivo")
+    last_push_at = models.DateTimeField(verbose_name="Última Notificação")
+    last_notification = models.CharField(max_length=50, blank=True, default='', verbose_name="Tipo da Última Notificação")
+    notifications_received = models.BigIntegerField(default=0, verbose_name="Notificações Recebidas")
+    logs_received = models.BigIntegerField(default=0, verbose_name="Logs Recebidos")
+    
+    class Meta:
+        verbose_name = "Status do Push do Dispositivo"
+        verbose_name_plural = "Status do Push dos Dispositivos"
+        ordering = ['device_id']
+    
+    def __str__(self):
+        return f"Dispositivo {self.device_id} - {self.last_push_at}"
+    
+    @classmethod
+    def record(cls, device_id, notification, logs=0):
+        """Registra uma notificação recebida."""
+        from django.db.models import F
+        
+        now = TimezoneUtils.get_utc_now()
+        updated = cls.objects.filter(device_id=device_id).update(
+            last_push_at=now,
+            last_notification=notification,
+            notifications_received=F('notifications_received') + 1,
+            logs_received=F('logs_received') + logs,
+        )
+        if not updated:
+            from django.db import IntegrityError, transaction
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        device_id=device_id, last_push_at=now, last_notification=notification,
+                        notifications_received=1, logs_received=logs,
+                    )
+            except IntegrityError:
+                cls.record(device_id, notification, logs)
+    
+    @classmethod
+    def is_active(cls, stale_seconds, device_id=None):
+        """Verifica se houve notificações nos últimos stale_seconds (de um dispositivo ou de qualquer um)."""
+        from datetime import timedelta
+        recent = cls.objects.filter(
+            last_push_at__gte=TimezoneUtils.get_utc_now() - timedelta(seconds=stale_seconds),
+        )
+        if device_id is not None:
+            recent = recent.filter(device_id=device_id)
+        return recent.exists()
+
+
+class DeviceLogCursor(models.Model):
+    """
+    Posição da ingestão de logs em um dispositivo.
+    
+    O AccessLogWorker mantém um cursor por Device habilitado: busca os logs com
+    ID maior que last_log_id e avança o cursor na mesma transação em que os
+    grava, de modo que uma queda do processo retoma exatamente do ponto salvo.
+    """
+    
+    device = models.OneToOneField(
+        'devices.Device', on_delete=models.CASCADE, related_name='log_cursor', verbose_name="Dispositivo",
+    )
+    last_log_id = models.BigIntegerField(default=0, verbose_name="Último ID Sincronizado")
+    last_log_at = models.DateTimeField(null=True, blank=True, verbose_name="Timestamp do Último Log")
+    last_synced_at = models.DateTimeField(null=True, blank=True, verbose_name="Última Sincronização")
+    logs_synced = models.BigIntegerField(default=0, verbose_name="Logs Sincronizados")
+    last_error = models.TextField(blank=True, default='', verbose_name="Último Erro")
+    last_error_at = models.DateTimeField(null=True, blank=True, verbose_name="Último Erro em")
+    reset_count = models.IntegerField(default=0, verbose_name="Reinicializações Detectadas")
+    log_epoch = models.PositiveIntegerField(default=0, verbose_name="Geração da Numeração")
+    last_reset_at = models.DateTimeField(null=True, blank=True, verbose_name="Última Reinicialização")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+    
+    class Meta:
+        verbose_name = "Cursor de Logs do Dispositivo"
+        verbose_name_plural = "Cursores de Logs dos Dispositivos"
+        ordering = ['device_id']
+    
+    def __str__(self):
+        return f"{self.device} - ID {self.last_log_id}"
+    
+    @classmethod
+    def for_device(cls, device, claim_legacy=False):
+        """
+        Obtém (ou cria) o cursor do dispositivo.
+        
+        Um cursor novo começa na geração mais recente e no maior
+        device_log_id já gravado nela para o dispositivo. Com
+        claim_legacy=True, os logs gravados antes da ingestão por dispositivo
+        (device_id vazio) passam a pertencer a ele.
+        """
+        from django.db import transaction
+        from django.db.models import Max
+        
+        cursor = cls.objects.filter(device=device).first()
+        if cursor:
+            return cursor
+        
+        with transaction.atomic():
+            if claim_legacy:
+                AccessLog.objects.filter(device_id__isnull=True).update(device_id=device.id, device_name=device.name)
+            stored = AccessLog.objects.filter(device_id=device.id, is_manual=False)
+            log_epoch = stored.aggregate(last=Max('log_epoch'))['last'] or 0
+            last_log_id = stored.filter(log_epoch=log_epoch).aggregate(last=Max('device_log_id'))['last']
+            cursor, _ = cls.objects.get_or_create(
+                device=device, defaults={'last_log_id': max(last_log_id or 0, 0), 'log_epoch': log_epoch},
+            )
+        return cursor
+    
+    def advance(self, last_log_id, last_log_at=None, logs=0):
+        """Avança o cursor (nunca retrocede) e registra a sincronização."""
+        from django.db.models import F
+        
+        now = TimezoneUtils.get_utc_now()
+        DeviceLogCursor.objects.filter(pk=self.pk).update(
+            last_synced_at=now, logs_synced=F('logs_synced') + logs, last_error='',
+        )
+        if last_log_id > self.last_log_id:
+            DeviceLogCursor.objects.filter(pk=self.pk, last_log_id__lt=last_log_id).update(
+                last_log_id=last_log_id, last_log_at=last_log_at,
+            )
+            self.last_log_id = last_log_id
+            self.last_log_at = last_log_at or self.last_log_at
+        self.last_synced_at = now
+        self.logs_synced += logs
+        self.last_error = ''
+    
+    def record_error(self, error):
+        """Registra uma falha de sincronização (o cursor não se move)."""
+        self.last_error = str(error)[:1000]
+        self.last_error_at = TimezoneUtils.get_utc_now()
+        DeviceLogCursor.objects.filter(pk=self.pk).update(last_error=self.last_error, last_error_at=self.last_error_at)
+    
+    def rewind_after_reset(self, head_id) -> int:
+        """
+        A catraca reiniciou a numeração dos logs (tabela limpa ou reset de fábrica).
+        
+        Os logs já gravados mantêm os IDs originais; o cursor passa para uma
+        nova geração (log_epoch), na qual os IDs reutilizados pela catraca são
+        gravados sem colidir com os antigos, e volta para 0. A reinicialização
+        fica registrada.
+        
+        Returns:
+            int: a nova geração da numeração
+        """
+        from django.db.models import F
+        
+        now = TimezoneUtils.get_utc_now()
+        self.last_error = (
+            f"Reinicialização da catraca detectada: último ID sincronizado {self.last_log_id}, "
+            f"maior ID no dispositivo {head_id}"
+        )
+        self.last_error_at = now
+        self.last_log_id = 0
+        self.log_epoch += 1
+        self.reset_count += 1
+        self.last_reset_at = now
+        DeviceLogCursor.objects.filter(pk=self.pk).update(
+            last_log_id=0, log_epoch=F('log_epoch') + 1, last_error=self.last_error, last_error_at=now,
+            reset_count=F('reset_count') + 1, last_reset_at=now,
+        )
+        return self.log_epoch
+
+
+class LogBackfill(models.Model):
+    """
+    Carga de um intervalo histórico de logs de um dispositivo (backfill).
+    
+    O intervalo (after_id, end_id] é lido em páginas grandes e gravado com
+    bulk insert pelo BackfillEngine, fora do loop de sincronização ao vivo.
+    checkpoint_id é salvo na mesma transação de cada página: uma carga
+    interrompida é retomada de onde parou.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('running', 'Em execução'),
+        ('paused', 'Pausado'),
+        ('completed', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+    
+    ORIGIN_CHOICES = [
+        ('tail', 'Atraso da sincronização'),
+        ('command', 'Comando'),
+    ]
+    
+    device = models.ForeignKey(
+        'devices.Device', on_delete=models.CASCADE, related_name='log_backfills', verbose_name="Dispositivo",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Status")
+    origin = models.CharField(max_length=20, choices=ORIGIN_CHOICES, default='command', verbose_name="Origem")
+    after_id = models.BigIntegerField(default=0, verbose_name="Após o ID")
+    end_id = models.BigIntegerField(null=True, blank=True, verbose_name="Até o ID")
+    checkpoint_id = models.BigIntegerField(default=0, verbose_name="Checkpoint (último ID lido)")
+    since = models.DateTimeField(null=True, blank=True, verbose_name="Ignorar logs anteriores a")
+    process_sessions = models.BooleanField(default=False, verbose_name="Processar para Sessões")
+    pages = models.IntegerField(default=0, verbose_name="Páginas")
+    logs_fetched = models.BigIntegerField(default=0, verbose_name="Logs Lidos")
+    logs_written = models.BigIntegerField(default=0, verbose_name="Logs Gravados")
+    elapsed_seconds = models.FloatField(default=0, verbose_name="Tempo em Execução (s)")
+    last_error = models.TextField(blank=True, default='', verbose_name="Último Erro")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado em")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Finalizado em")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+    
+    class Meta:
+        verbose_name = "Backfill de Logs"
+        verbose_name_plural = "Backfills de Logs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status']),
+        ]
+    
+    def __str__(self):
+        return f"Backfill {self.device} ({self.after_id}, {self.end_id or '...'}] - {self.get_status_display()}"
+    
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running', 'paused')
+    
+    @property
+    def remaining_ids(self):
+        """IDs ainda não lidos (os IDs da catraca são sequenciais)."""
+        if self.end_id is None:
+            return None
+        return max(self.end_id - max(self.checkpoint_id, self.after_id), 0)
+    
+    @property
+    def progress(self):
+        """Fração do intervalo já lida (0 a 1)."""
+        if self.end_id is None or self.end_id <= self.after_id:
+            return 1.0 if self.status == 'completed' else 0.0
+        return min((max(self.checkpoint_id, self.after_id) - self.after_id) / (self.end_id - self.after_id), 1.0)
+    
+    @property
+    def rate(self):
+        """IDs lidos por segundo de execução."""
+        covered = max(self.checkpoint_id, self.after_id) - self.after_id
+        return covered / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+    
+    @property
+    def eta_seconds(self):
+        """Tempo estimado até o fim, pela taxa média das páginas já lidas."""
+        remaining = self.remaining_ids
+        if remaining is None or not self.rate:
+            return None
+        return remaining / self.rate
+    
+    def save_checkpoint(self, checkpoint_id, fetched=0, written=0, elapsed=0.0):
+        """Registra uma página lida (chamar na transação que gravou os logs)."""
+        from django.db.models import F
+        
+        LogBackfill.objects.filter(pk=self.pk).update(
+            checkpoint_id=checkpoint_id,
+            pages=F('pages') + 1,
+            logs_fetched=F('logs_fetched') + fetched,
+            logs_written=F('logs_written') + written,
+            elapsed_seconds=F('elapsed_seconds') + elapsed,
+            updated_at=TimezoneUtils.get_utc_now(),
+        )
+        self.checkpoint_id = checkpoint_id
+        self.pages += 1
+        self.logs_fetched += fetched
+        self.logs_written += written
+        self.elapsed_seconds += elapsed
+    
+    def set_status(self, status, error=None):
+        """Atualiza o status (e o horário de início/fim correspondente)."""
+        now = TimezoneUtils.get_utc_now()
+        self.status = status
+        update_fields = ['status', 'updated_at']
+        if status == 'running' and not self.started_at:
+            self.started_at = now
+            update_fields.append('started_at')
+        if status in ('completed', 'failed'):
+            self.finished_at = now
+            update_fields.append('finished_at')
+        if error is not None:
+            self.last_error = str(error)[:1000]
+            update_fields.append('last_error')
+        self.save(update_fields=update_fields)
+    
+    def get_summary(self):
+        eta = self.eta_seconds
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'status': self.status,
+            'origin': self.origin,
+            'after_id': self.after_id,
+            'end_id': self.end_id,
+            'checkpoint_id': self.checkpoint_id,
+            'progress': round(self.progress * 100, 1),
+            'logs_written': self.logs_written,
+            'rate_per_second': round(self.rate, 1),
+            'eta_seconds': round(eta) if eta is not None else None,
+            'last_error': self.last_error or None,
+        }
@@ -0,0 +1,137 @@
+"""
+Receptor das notificações push do IDFace (monitor online).
+
+Com o monitor configurado, a catraca envia um POST para
+`<caminho>/<notificação>` a cada alteração, por exemplo:
+
+    /dao           {"object_changes": [{"object": "access_logs", "type": "inserted",
+                    "values": {"id": "519", "time": "1532977090", "event": "7", ...}}],
+                    "device_id": 478435}
+    /catra_event   {"event": {"type": 8, "name": "TURN RIGHT", "time": 1484126902},
+                    "access_event_id": 15, "device_id": 478435}
+    /door, /operation_mode, /device_is_alive
+
+Os access_logs recebidos são gravados pelo mesmo caminho da ingestão por
+polling (AccessLogWorker.ingest_logs, no cursor do Device identificado pelo IP
+de origem) e os giros seguem para
+InterjornadaService.process_giro_event. Enquanto houver notificações recentes
+(DevicePushStatus), o polling da catraca cai para o intervalo de reconciliação
+(LOG_SYNC_RECONCILE_INTERVAL), apenas para recuperar notificações perdidas.
+"""
+import logging
+from typing import Dict, List, Optional
+from django.conf import settings
+from apps.core.registry import service_registry
+from .models import DevicePushStatus
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS = ('dao', 'catra_event', 'door', 'operation_mode', 'device_is_alive', 'secbox')
+
+# Campos numéricos dos access_logs (o monitor envia os valores como texto)
+INTEGER_FIELDS = (
+    'id', 'time', 'event', 'device_id', 'identifier_id', 'user_id', 'portal_id',
+    'identification_rule_id', 'log_type_id',
+)
+
+
+def push_enabled() -> bool:
+    return getattr(settings, 'DEVICE_PUSH_ENABLED', False)
+
+
+def push_active() -> bool:
+    """Push habilitado e com notificações recentes (o polling pode desacelerar)."""
+    if not push_enabled():
+        return False
+    try:
+        return DevicePushStatus.is_active(getattr(settings, 'DEVICE_PUSH_STALE_SECONDS', 90))
+    except Exception as e:
+        logger.debug(f"Não foi possível verificar o status do push: {e}")
+        return False
+
+
+class PushReceiver:
+    """Converte notificações do monitor nas mesmas chamadas usadas pelo polling."""
+
+    def handle(self, notification: str, payload: Dict, remote_addr: Optional[str] = None) -> Dict:
+        """
+        Processa uma notificação.
+        
+        Args:
+            remote_addr: IP de origem, usado para identificar o Device
+
+        Returns:
+            Dict: resumo do processamento (logs gravados, giros processados)
+        """
+        device_id = self._int(payload.get('device_id')) or 0
+        result = {'notification': notification, 'logs': 0, 'ingested': 0, 'turns': 0}
+
+        if notification == 'dao':
+            logs = self.extract_access_logs(payload)
+            result['logs'] = len(logs)
+            if logs:
+                from .workers import access_log_worker
+                device = self.resolve_device(remote_addr)
+                if device is not None:
+                    result['ingested'], _ = access_log_worker.ingest_logs(logs, device)
+                else:
+                    # Sem saber a catraca os IDs podem colidir com os de outra; o polling recupera esses logs
+                    logger.warning(f"Notificação de {remote_addr} sem dispositivo correspondente - logs ignorados")
+        elif notification == 'catra_event':
+            result['turns'] = int(self.handle_catra_event(payload, device_id))
+        else:
+            logger.debug(f"Notificação {notification} do dispositivo {device_id}: {payload}")
+
+        DevicePushStatus.record(device_id, notification, logs=result['logs'])
+        return result
+
+    @staticmethod
+    def resolve_device(remote_addr: Optional[str]):
+        """Device pelo IP de origem; sem correspondência, apenas se houver um único habilitado."""
+        from .workers import access_log_worker
+        
+        devices = access_log_worker.load_devices()
+        for device in devices:
+            if device.ip_address == remote_addr:
+                return device
+        return devices[0] if len(devices) == 1 else None
+    
+    @staticmethod
+    def _int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+
+    def extract_access_logs(self, payload: Dict) -> List[Dict]:
+        """access_logs inseridos, no formato retornado por load_objects."""
+        logs = []
+        for change in payload.get('object_changes') or []:
+            if change.get('object') != 'access_logs' or change.get('type') != 'inserted':
+                continue
+            values = dict(change.get('values') or {})
+            for field in INTEGER_FIELDS:
+                if field in values:
+                    values[field] = self._int(values[field])
+            logs.append(values)
+        return sorted(logs, key=lambda log: log.get('id') or 0)
+
+    def handle_catra_event(self, payload: Dict, device_id: int) -> bool:
+        """Giro da catraca: mesmo tratamento dos access_events obtidos por polling."""
+        event = payload.get('event') or {}
+        turn_type = str(event.get('name', '')).strip().upper().replace(' ', '_')
+        if turn_type not in ('TURN_LEFT', 'TURN_RIGHT'):
+            logger.debug(f"Evento de catraca ignorado: {event}")
+            return False
+
+        from .services import log_monitor_service
+        return log_monitor_service.interjornada_service.process_giro_event({
+            'event': 'catra',
+            'type': turn_type,
+            'timestamp': event.get('time', 0),
+            'device_id': device_id,
+        })
+
+
+# Instância global do receptor
+push_receiver = service_registry.register('logs.push_receiver', PushReceiver)
@@ -0,0 +1,459 @@
+"""
+Replay do processamento de sessões sobre o histórico de logs.
+
+Reexecuta as decisões do LogMonitorService/InterjornadaService sobre um
+intervalo de AccessLog já gravado, sem tocar no banco de sessões nem na
+catraca. As regras de tempo e de saída são as mesmas do processamento ao
+vivo (apps.interjornada.rules); muda o que está em volta delas:
+
+- estado em memória (uma sessão aberta por funcionário, mais as sessões
+  finalizadas) no lugar de EmployeeSession;
+- relógio virtual: o "agora" do processamento é o horário do log (mais um
+  atraso opcional), no lugar do relógio de parede;
+- efeitos na catraca (mover para a blacklist e restaurar o grupo) apenas
+  contados. A sincronização de grupos do monitoramento é considerada
+  imediata: quem tem sessão bloqueada está na blacklist;
+- regras de tempo (enforce_session_timeouts) aplicadas de forma preguiçosa,
+  por funcionário, no horário em que venceriam.
+
+Serve para reconstruir as sessões a partir do histórico, testar mudanças de
+configuração (durações de trabalho/descanso) antes de aplicá-las e medir o
+custo das regras de decisão sem I/O. Usado pelo comando
+`manage.py replay_sessions`.
+"""
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+from django.utils import timezone
+from apps.core.utils import TimezoneUtils
+from apps.interjornada import rules
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATES = ('active', 'blocked', 'pending_rest')
+
+# Colunas de AccessLog lidas pelo replay, na ordem de `ReplayEngine.process`
+LOG_FIELDS = (
+    'id', 'device_id', 'device_log_id', 'user_id', 'event_type',
+    'event_description', 'portal_id', 'device_timestamp',
+)
+
+# Decisões registradas pelo monitoramento como motivo (sem chamar process_access_event)
+REASON_OUTCOMES = ('maintenance_event', 'employee_not_found', 'blacklist_blocked')
+
+DECISION_FIELDS = (
+    'log_id', 'device_id', 'device_log_id', 'user_id', 'timestamp',
+    'event', 'status', 'outcome', 'state', 'message',
+)
+
+
+class VirtualClock:
+    """Relógio do replay: avança com os logs e nunca volta (como o relógio de parede)."""
+
+    def __init__(self, lag_seconds: float = 0.0):
+        self.lag = timedelta(seconds=lag_seconds)
+        self.now = None
+
+    def advance(self, moment):
+        moment = moment + self.lag
+        if self.now is None or moment > self.now:
+            self.now = moment
+        return self.now
+
+
+class ReplaySession:
+    """Sessão em memória com os campos de EmployeeSession usados pelas regras."""
+
+    __slots__ = (
+        'user_id', 'state', 'first_access', 'pending_rest_at', 'block_start',
+        'return_time', 'released_at', 'work_minutes', 'rest_minutes',
+    )
+
+    def __init__(self, user_id, first_access, work_minutes, rest_minutes):
+        self.user_id = user_id
+        self.state = 'active'
+        self.first_access = first_access
+        self.pending_rest_at = None
+        self.block_start = None
+        self.return_time = None
+        self.released_at = None
+        self.work_minutes = work_minutes
+        self.rest_minutes = rest_minutes
+
+    def as_dict(self) -> Dict:
+        return {
+            'user_id': self.user_id,
+            'state': self.state,
+            'first_access': _isoformat(self.first_access),
+            'pending_rest_at': _isoformat(self.pending_rest_at),
+            'block_start': _isoformat(self.block_start),
+            'return_time': _isoformat(self.return_time),
+            'released_at': _isoformat(self.released_at),
+            'work_duration_minutes': self.work_minutes,
+            'rest_duration_minutes': self.rest_minutes,
+        }
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def parse_local_datetime(value: str):
+    """Data/hora no horário local ("dd/mm/aaaa hh:mm[:ss]" ou "dd/mm/aaaa"); None se inválida."""
+    for format_str in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
+        try:
+            parsed = datetime.strptime(value.strip(), format_str)
+        except ValueError:
+            continue
+        return timezone.make_aware(parsed, TimezoneUtils.DISPLAY_TZ)
+    return None
+
+
+def decision_as_dict(decision) -> Dict:
+    """Converte a tupla de decisão do replay em dicionário (saída JSON)."""
+    data = dict(zip(DECISION_FIELDS, decision))
+    data['timestamp'] = _isoformat(data['timestamp'])
+    return data
+
+
+class ReplayEngine:
+    """
+    Motor de replay das regras de sessão.
+
+    Args:
+        work_minutes / rest_minutes: substituem as durações da política
+            efetiva de todos os funcionários (backtest de configuração)
+        lag_seconds: atraso simulado entre o log e o processamento
+        keep_decisions: guardar as decisões de cada log (desligar em
+            intervalos muito grandes quando só o resumo interessa)
+        employees: {device_id: (work_minutes, rest_minutes)}; padrão:
+            funcionários ativos do banco com a política atual
+    """
+
+    def __init__(self, work_minutes: Optional[int] = None, rest_minutes: Optional[int] = None,
+                 lag_seconds: float = 0.0, keep_decisions: bool = True,
+                 employees: Optional[Dict[int, tuple]] = None):
+        self.work_minutes = work_minutes
+        self.rest_minutes = rest_minutes
+        self.keep_decisions = keep_decisions
+        self.clock = VirtualClock(lag_seconds)
+        self.employees = self.load_employees() if employees is None else employees
+
+        self.sessions: Dict[int, ReplaySession] = {}
+        self.closed: List[ReplaySession] = []
+        self.decisions: List[tuple] = []
+        self.outcomes = Counter()
+        self.side_effects = Counter()
+        self.processed = 0
+        self.elapsed = 0.0
+        self._event_map = {}
+
+    # ------------------------------------------------------------------
+    # Preparação
+    # ------------------------------------------------------------------
+
+    def load_employees(self) -> Dict[int, tuple]:
+        """Funcionários ativos e suas durações efetivas (uma consulta, fora do laço)."""
+        from apps.employees.models import Employee
+        from apps.interjornada.policy import policy_index
+
+        employees = {}
+        for employee in Employee.objects.filter(is_active=True):
+            policy = policy_index.resolve(employee)
+            # A busca do monitoramento usa .first(): vale o primeiro por device_id
+            employees.setdefault(employee.device_id, (policy.work_minutes, policy.rest_minutes))
+        return employees
+
+    def map_event(self, event_type, description, portal_id):
+        """map_to_interjornada_event do monitoramento, memorizado por entrada."""
+        key = (event_type, description if event_type is None else None, portal_id)
+        try:
+            return self._event_map[key]
+        except KeyError:
+            from apps.logs.services import log_monitor_service
+
+            event = event_type if event_type is not None else description
+            mapped = self._event_map[key] = log_monitor_service.map_to_interjornada_event(event, portal_id)
+            return mapped
+
+    # ------------------------------------------------------------------
+    # Processamento
+    # ------------------------------------------------------------------
+
+    def run(self, rows: Iterable[tuple]) -> 'ReplayEngine':
+        """Processa as linhas (ver LOG_FIELDS) em ordem de device_timestamp."""
+        started = time.perf_counter()
+        process = self.process
+        for row in rows:
+            process(row)
+        self.elapsed += time.perf_counter() - started
+        return self
+
+    def process(self, row: tuple):
+        """Decide um log como LogMonitorService._process_access_log + process_access_event."""
+        log_id, device_id, device_log_id, user_id, event_type, description, portal_id, timestamp = row
+        now = self.clock.advance(timestamp)
+        self.processed += 1
+
+        event = self.map_event(event_type, description, portal_id or 1)
+        if user_id == 0 or not event:
+            return self._record(row, event, 'processed', 'maintenance_event')
+
+        policy = self.employees.get(user_id)
+        if policy is None:
+            return self._record(row, event, 'processed', 'employee_not_found')
+
+        session = self.sessions.get(user_id)
+        if session is not None:
+            session = self._apply_timeouts(session, now)
+
+        # Sessão bloqueada = funcionário na blacklist (sincronização de grupos)
+        if session is not None and session.state == 'blocked':
+            return self._record(row, event, 'processed', 'blacklist_blocked', message='Usuário está na blacklist')
+
+        if event == 'pending_validation':
+            # A validação pendente é criada e consumida pela própria entrada
+            if session is None:
+                session = self._open_session(user_id, timestamp, policy)
+                return self._record(row, event, 'processed', 'allow', session.state, 'Nova sessão criada - Acesso liberado')
+            if session.state == 'active':
+                return self._record(row, event, 'processed', 'allow', session.state, 'Funcionário já tem sessão ativa')
+            return self._record(row, event, 'processed', 'allow', session.state, 'Nova sessão criada - Acesso liberado')
+
+        if event == 'abandonment':
+            return self._record(row, event, 'processed', 'abandonment', message='Desistência registrada - Nenhuma validação pendente')
+
+        if event == 'unauthorized_access':
+            return self._record(row, event, 'error', 'deny', message='Acesso não autorizado')
+
+        if event == 1:
+            # Sem giro confirmado não existe validação pendente no cache
+            return self._record(
+                row, event, 'error', 'deny',
+                message='Entrada ignorada - Sem validação pendente (evento 7 + giro obrigatório)',
+            )
+
+        if event == 2:
+            return self._process_exit(row, event, session, timestamp, now)
+
+        return self._record(row, event, 'processed', 'allow', message='Evento processado')
+
+    def _process_exit(self, row, event, session, timestamp, now):
+        if session is None or not rules.can_exit(session.state):
+            return self._record(row, event, 'error', 'deny', message='Funcionário não tem sessão ativa ou aguardando saída')
+
+        remaining_minutes = rules.remaining_work_minutes(session.first_access, session.work_minutes, now)
+        if remaining_minutes is not None:
+            return self._record(row, event, 'error', 'deny', message=rules.early_exit_message(remaining_minutes))
+
+        session.state = 'blocked'
+        session.block_start = timestamp
+        session.return_time = rules.rest_return_time(timestamp, session.rest_minutes)
+        self.side_effects['move_to_blacklist'] += 1
+        return self._record(row, event, 'processed', 'allow', message='Funcionário colocado em interjornada')
+
+    def _open_session(self, user_id, timestamp, policy) -> ReplaySession:
+        work_minutes, rest_minutes = policy
+        session = ReplaySession(
+            user_id, timestamp,
+            self.work_minutes or work_minutes,
+            self.rest_minutes or rest_minutes,
+        )
+        self.sessions[user_id] = session
+        self.side_effects['session_created'] += 1
+        return session
+
+    def _apply_timeouts(self, session: ReplaySession, now) -> Optional[ReplaySession]:
+        """Regras de enforce_session_timeouts que já teriam vencido para a sessão."""
+        if session.state == 'blocked':
+            if rules.is_rest_over(session.return_time, now):
+                session.released_at = session.return_time
+                self.side_effects['restore_from_blacklist'] += 1
+                del self.sessions[session.user_id]
+                self.closed.append(session)
+                return None
+        elif session.state == 'active':
+            if rules.is_work_over(session.first_access, session.work_minutes, now):
+                session.state = 'pending_rest'
+                session.pending_rest_at = rules.work_limit(session.first_access, session.work_minutes)
+        return session
+
+    def _record(self, row, event, status, outcome, state=None, message=None):
+        self.outcomes[outcome] += 1
+        if self.keep_decisions:
+            self.decisions.append((row[0], row[1], row[2], row[3], row[7], event, status, outcome, state, message))
+
+    def finish(self, until=None) -> 'ReplayEngine':
+        """Aplica as regras de tempo a todas as sessões no fim do intervalo (ou em `until`)."""
+        now = self.clock.advance(until) if until is not None else self.clock.now
+        if now is not None:
+            for session in list(self.sessions.values()):
+                self._apply_timeouts(session, now)
+        return self
+
+    # ------------------------------------------------------------------
+    # Resultados
+    # ------------------------------------------------------------------
+
+    def open_sessions(self) -> List[ReplaySession]:
+        return sorted(self.sessions.values(), key=lambda session: session.user_id)
+
+    def get_summary(self) -> Dict:
+        states = Counter(session.state for session in self.sessions.values())
+        return {
+            'logs': self.processed,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'logs_per_second': round(self.processed / self.elapsed) if self.elapsed else None,
+            'clock': _isoformat(self.clock.now),
+            'outcomes': dict(self.outcomes.most_common()),
+            'open_sessions': dict(states),
+            'closed_sessions': len(self.closed),
+            'side_effects': dict(self.side_effects),
+            'overrides': {'work_minutes': self.work_minutes, 'rest_minutes': self.rest_minutes},
+        }
+
+
+def load_logs(since=None, until=None, from_id=None, to_id=None, device_id=None,
+              user_ids=None, chunk_size=5000) -> Iterator[tuple]:
+    """
+    Logs do intervalo como tuplas (LOG_FIELDS), na ordem do monitoramento
+    (device_timestamp, id), lidos em blocos.
+    """
+    from apps.logs.models import AccessLog
+
+    logs = AccessLog.objects.all()
+    if since is not None:
+        logs = logs.filter(device_timestamp__gte=since)
+    if until is not None:
+        logs = logs.filter(device_timestamp__lt=until)
+    if from_id is not None:
+        logs = logs.filter(id__gte=from_id)
+    if to_id is not None:
+        logs = logs.filter(id__lte=to_id)
+    if device_id is not None:
+        logs = logs.filter(device_id=device_id)
+    if user_ids:
+        logs = logs.filter(user_id__in=user_ids)
+    return logs.order_by('device_timestamp', 'id').values_list(*LOG_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def stored_outcome(processing_status, processed_data) -> tuple:
+    """(status, outcome) gravados pelo monitoramento para um log."""
+    session = (processed_data or {}).get('session') or {}
+    outcome = session.get('reason') or session.get('action') or (session.get('result') or {}).get('action')
+    return processing_status, outcome
+
+
+def session_data_for(decision) -> Dict:
+    """processed_data['session'] que o monitoramento gravaria para a decisão."""
+    status, outcome, state, message = decision[6:10]
+    if outcome in REASON_OUTCOMES:
+        data = {'reason': outcome}
+        if message:
+            data['message'] = message
+        return data
+    result = {'success': status == 'processed', 'message': message, 'action': outcome}
+    if state:
+        result['state'] = state
+    if status == 'error':
+        return {'result': result}
+    return {'result': result, 'action': outcome, 'state': state}
+
+
+def compare_with_stored(decisions: List[tuple], chunk_size=5000) -> Dict:
+    """
+    Compara as decisões do replay com as gravadas nos logs (processed_data).
+
+    Logs ainda não processados ou gravados apenas como histórico pelo
+    backfill não entram na comparação.
+    """
+    from apps.logs.models import AccessLog
+
+    compared = 0
+    mismatches = []
+    for start in range(0, len(decisions), chunk_size):
+        chunk = decisions[start:start + chunk_size]
+        stored = dict(
+            (log_id, (status, data))
+            for log_id, status, data in AccessLog.objects.filter(
+                id__in=[decision[0] for decision in chunk], session_processed=True,
+            ).values_list('id', 'processing_status', 'processed_data')
+        )
+        for decision in chunk:
+            if decision[0] not in stored:
+                continue
+            status, outcome = stored_outcome(*stored[decision[0]])
+            if outcome == 'backfill':
+                continue
+            compared += 1
+            if (status, outcome) != (decision[6], decision[7]):
+                mismatches.append({
+                    **decision_as_dict(decision),
+                    'stored_status': status,
+                    'stored_outcome': outcome,
+                })
+    return {'compared': compared, 'mismatches': mismatches}
+
+
+def compare_runs(baseline: List[tuple], candidate: List[tuple]) -> List[Dict]:
+    """Decisões que mudaram entre duas execuções sobre os mesmos logs."""
+    changes = []
+    for before, after in zip(baseline, candidate):
+        if before[6:9] != after[6:9]:
+            changes.append({
+                **decision_as_dict(after),
+                'baseline_status': before[6],
+                'baseline_outcome': before[7],
+                'baseline_state': before[8],
+            })
+    return changes
+
+
+def apply_sessions(engine: ReplayEngine, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Substitui as sessões abertas do banco pelas sessões abertas do replay
+    (apenas dos usuários informados, quando o replay foi filtrado por usuário).
+
+    As sessões substituídas são gravadas no histórico como 'discarded'. A
+    blacklist da catraca é conciliada pela sincronização de grupos do
+    monitoramento no ciclo seguinte.
+    """
+    from django.db import transaction
+    from apps.employee_sessions.history import session_history
+    from apps.employee_sessions.models import EmployeeSession
+    from apps.employees.models import Employee
+
+    # Mesmo critério do monitoramento (.first()) para device_id repetido
+    employees = {}
+    for device_id, employee_id in Employee.objects.filter(
+        is_active=True, device_id__in=list(engine.sessions),
+    ).values_list('device_id', 'id'):
+        employees.setdefault(device_id, employee_id)
+    if user_ids:
+        user_ids = set(user_ids)
+    sessions = [
+        EmployeeSession(
+            employee_id=employees[session.user_id],
+            state=session.state,
+            first_access=session.first_access,
+            last_access=session.first_access,
+            block_start=session.block_start,
+            return_time=session.return_time,
+            work_duration_minutes=session.work_minutes,
+            rest_duration_minutes=session.rest_minutes,
+        )
+        for session in engine.open_sessions()
+        if session.user_id in employees and (not user_ids or session.user_id in user_ids)
+    ]
+    stale = EmployeeSession.objects.filter(state__in=OPEN_STATES)
+    if user_ids:
+        stale = stale.filter(employee__device_id__in=user_ids)
+    with transaction.atomic():
+        # As sessões substituídas ficam no histórico como descartadas
+        session_history.record_many(stale.select_related('employee'), outcome='discarded')
+        stale.delete()
+        EmployeeSession.objects.bulk_create(sessions, batch_size=1000)
+    logger.info(f"Sessões reconstruídas pelo replay: {len(sessions)} sessões abertas")
+    return len(sessions)
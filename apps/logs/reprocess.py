@@ -0,0 +1,240 @@
+"""
+Reprocessamento incremental de um único funcionário.
+
+Corrige o estado derivado de um funcionário (decisões gravadas nos logs,
+sessão aberta e grupo na catraca) a partir de um log ou horário, sem parar o
+processamento dos demais:
+
+1. adquire o lease `reprocess-employee-<user_id>` (RuntimeLease). Enquanto ele
+   existir, o monitoramento e os workers Celery deixam os logs desse
+   funcionário para depois (checagem uma vez por lote/tarefa);
+2. reexecuta em memória (ReplayEngine) os logs do funcionário desde
+   REPROCESS_LOOKBACK_HOURS antes do ponto de partida (para reconstruir a
+   sessão naquele momento) até o último log;
+3. numa transação, regrava as decisões dos logs a partir do ponto de partida
+   e substitui a sessão aberta do funcionário. Se algum desses logs foi
+   processado por outro processo nesse meio tempo, o replay é refeito;
+4. aplica o estado da blacklist uma única vez, no fim.
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, Optional, Set
+from django.conf import settings
+from django.db import transaction
+from apps.core.registry import service_registry
+from apps.core.utils import TimezoneUtils
+from .models import AccessLog, RuntimeLease, SystemLog
+from .replay import ReplayEngine, apply_sessions, load_logs, session_data_for, stored_outcome
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = 'reprocess-employee-'
+
+
+class EmployeeReprocessor:
+    """Reprocessa os logs de um funcionário e corrige apenas o estado dele."""
+
+    def __init__(self):
+        self.lookback_hours = getattr(settings, 'REPROCESS_LOOKBACK_HOURS', 48)
+        self.lease_seconds = getattr(settings, 'REPROCESS_LEASE_SECONDS', 120)
+        self.max_attempts = 3
+        self.hostname = socket.gethostname()
+
+    # ------------------------------------------------------------------
+    # Lease por funcionário
+    # ------------------------------------------------------------------
+
+    def lease_name(self, user_id) -> str:
+        return f'{LEASE_PREFIX}{user_id}'
+
+    def paused_user_ids(self) -> Set[int]:
+        """Funcionários em reprocessamento (uma consulta; leases expirados não contam)."""
+        leases = RuntimeLease.objects.filter(name__startswith=LEASE_PREFIX).exclude(owner='')
+        return {
+            int(lease.name[len(LEASE_PREFIX):])
+            for lease in leases
+            if not lease.is_expired
+        }
+
+    # ------------------------------------------------------------------
+    # Reprocessamento
+    # ------------------------------------------------------------------
+
+    def reprocess(self, user_id: int, from_log_id: Optional[int] = None, since=None,
+                  dry_run: bool = False) -> Dict:
+        """
+        Reprocessa o funcionário a partir de um AccessLog (id do banco) ou horário.
+
+        Args:
+            user_id: ID do usuário na catraca (Employee.device_id)
+            from_log_id: primeiro log a reprocessar (inclusive)
+            since: alternativa a from_log_id; primeiro horário a reprocessar
+            dry_run: apenas calcular as decisões e a sessão resultante
+
+        Returns:
+            Dict: resultado (success, message, logs, changed, session, blacklist)
+        """
+        from apps.employees.models import Employee
+
+        if from_log_id is not None:
+            start_log = AccessLog.objects.filter(pk=from_log_id).values('user_id', 'device_timestamp').first()
+            if not start_log:
+                return {'success': False, 'message': f'Log {from_log_id} não encontrado'}
+            if start_log['user_id'] != user_id:
+                return {'success': False, 'message': f"Log {from_log_id} é do usuário {start_log['user_id']}"}
+            start = (start_log['device_timestamp'], from_log_id)
+        elif since is not None:
+            start = (since, 0)
+        else:
+            return {'success': False, 'message': 'Informe o log ou o horário de partida'}
+
+        employee = Employee.objects.filter(device_id=user_id, is_active=True).first()
+
+        owner = f'{self.hostname}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        lease_name = self.lease_name(user_id)
+        if not dry_run and not RuntimeLease.acquire(
+            lease_name, owner, ttl_seconds=self.lease_seconds, hostname=self.hostname, pid=os.getpid(),
+        ):
+            return {'success': False, 'message': f'Usuário {user_id} já está sendo reprocessado'}
+
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                engine, targets, previous, read_at = self._replay(user_id, employee, start)
+                if dry_run:
+                    result = self._result(user_id, engine, targets, previous, written=0)
+                    break
+                written = self._write(user_id, engine, targets, read_at)
+                if written is not None:
+                    result = self._result(user_id, engine, targets, previous, written)
+                    result['blacklist'] = self._apply_blacklist(employee, engine.sessions.get(user_id))
+                    break
+                logger.info(f"Logs do usuário {user_id} processados durante o reprocessamento - refazendo ({attempt})")
+                RuntimeLease.renew(lease_name, owner)
+            else:
+                return {'success': False, 'message': 'Logs alterados durante o reprocessamento, tente novamente'}
+        finally:
+            if not dry_run:
+                RuntimeLease.release(lease_name, owner)
+
+        result['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        result['dry_run'] = dry_run
+        if not dry_run:
+            SystemLog.log_info(
+                f"Reprocessamento do usuário {user_id}: {result['logs']} logs, {result['changed']} decisões alteradas",
+                category='interjornada',
+                user_id=user_id,
+                user_name=employee.name if employee else None,
+                details={key: value for key, value in result.items() if key != 'message'},
+            )
+        return result
+
+    def _replay(self, user_id, employee, start):
+        """
+        Replay dos logs do funcionário. Retorna o motor, as decisões a regravar,
+        as decisões gravadas antes ({log_id: (status, outcome)}) e o horário da leitura.
+        """
+        from apps.interjornada.policy import policy_index
+
+        start_time, start_id = start
+        employees = {}
+        if employee:
+            policy = policy_index.resolve(employee)
+            employees[user_id] = (policy.work_minutes, policy.rest_minutes)
+
+        read_at = TimezoneUtils.get_utc_now()
+        rows = list(load_logs(since=start_time - timedelta(hours=self.lookback_hours), user_ids=[user_id]))
+        first_target = next(
+            (index for index, row in enumerate(rows) if (row[-1], row[0]) >= (start_time, start_id)),
+            len(rows),
+        )
+
+        engine = ReplayEngine(employees=employees)
+        engine.run(rows[:first_target])
+        seed_decisions = len(engine.decisions)
+        engine.run(rows[first_target:]).finish(read_at)
+        targets = engine.decisions[seed_decisions:]
+
+        previous = {
+            log_id: stored_outcome(status, data)
+            for log_id, status, data in AccessLog.objects.filter(
+                pk__in=[decision[0] for decision in targets],
+            ).values_list('id', 'processing_status', 'processed_data')
+        }
+        return engine, targets, previous, read_at
+
+    def _write(self, user_id, engine, targets, read_at) -> Optional[int]:
+        """
+        Regrava decisões e sessão numa transação. Retorna None se outro processo
+        processou algum log do funcionário depois da leitura (o replay deve ser refeito).
+        """
+        now = TimezoneUtils.get_utc_now()
+        decisions = {decision[0]: decision for decision in targets}
+        with transaction.atomic():
+            if AccessLog.objects.filter(user_id=user_id, session_processed_at__gte=read_at).exists():
+                return None
+            logs = list(AccessLog.objects.select_for_update().filter(pk__in=list(decisions)))
+
+            for log in logs:
+                decision = decisions[log.pk]
+                status, message = decision[6], decision[9]
+                session_data = session_data_for(decision)
+                session_data['reprocessed_at'] = now.isoformat()
+                processed_data = log.processed_data or {}
+                processed_data['session'] = session_data
+
+                log.processed_data = processed_data
+                log.processing_status = status
+                log.processing_error = message if status == 'error' else None
+                log.session_processed = True
+                log.session_processed_at = now
+                log.session_processing_error = message if status == 'error' else None
+                log.processed_timestamp = now
+            AccessLog.objects.bulk_update(logs, [
+                'processed_data', 'processing_status', 'processing_error', 'session_processed',
+                'session_processed_at', 'session_processing_error', 'processed_timestamp',
+            ], batch_size=500)
+
+            apply_sessions(engine, [user_id])
+        return len(logs)
+
+    def _apply_blacklist(self, employee, session) -> Optional[str]:
+        """Move ou restaura o grupo na catraca uma única vez, conforme a sessão final."""
+        from apps.employees.group_service import group_service
+
+        if employee is None:
+            return None
+        employee.refresh_from_db()
+        blocked = session is not None and session.state == 'blocked'
+        in_blacklist = group_service.is_in_blacklist(employee)
+        if blocked and not in_blacklist:
+            return 'moved' if group_service.move_to_blacklist(employee) else 'move_failed'
+        if not blocked and in_blacklist:
+            return 'restored' if group_service.restore_from_blacklist(employee) else 'restore_failed'
+        return None
+
+    def _result(self, user_id, engine, targets, previous, written) -> Dict:
+        changed = [
+            decision for decision in targets
+            if previous.get(decision[0]) != (decision[6], decision[7])
+        ]
+        session = engine.sessions.get(user_id)
+        return {
+            'success': True,
+            'message': f'{len(targets)} logs reprocessados, {len(changed)} decisões alteradas',
+            'user_id': user_id,
+            'logs': len(targets),
+            'seed_logs': engine.processed - len(targets),
+            'written': written,
+            'changed': len(changed),
+            'session': session.as_dict() if session else None,
+            'blacklist': None,
+        }
+
+
+# Instância global do serviço
+employee_reprocessor = service_registry.register('logs.employee_reprocessor', EmployeeReprocessor)
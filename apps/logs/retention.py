@@ -0,0 +1,331 @@
+"""
+Retenção, arquivamento e compactação de logs.
+
+A limpeza é feita em janelas de id limitadas (chunk_size) com pausa entre elas,
+evitando que um único DELETE bloqueie o banco (SQLite) durante toda a execução.
+Antes de remover, os registros são gravados em segmentos JSONL comprimidos
+(gzip) particionados por data, que podem ser consultados ou restaurados depois.
+
+Layout do arquivo:
+    <LOG_ARCHIVE_DIR>/<conjunto>/<AAAA-MM-DD>/<conjunto>_<id_inicial>_<id_final>.jsonl.gz
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Min, Max
+from django.utils.dateparse import parse_datetime
+from apps.core.utils import TimezoneUtils
+from .models import AccessLog, SystemLog, LogProcessingQueue
+
+logger = logging.getLogger(__name__)
+
+# Chaves mantidas pela compactação: o ID original do log na catraca e a
+# decisão gravada da sessão (replay.stored_outcome, reprocessamento)
+COMPACT_RAW_KEYS = ('id',)
+COMPACT_PROCESSED_KEYS = ('session',)
+
+
+class RetentionPolicy:
+    """Política de retenção de um modelo de log."""
+
+    def __init__(self, name, model, time_field, archive=True, extra_filter=None):
+        self.name = name
+        self.model = model
+        self.time_field = time_field
+        self.archive = archive
+        self.extra_filter = extra_filter or {}
+
+    def aged_queryset(self, cutoff):
+        """Registros mais antigos que o corte."""
+        return self.model.objects.filter(
+            **{f'{self.time_field}__lt': cutoff},
+            **self.extra_filter
+        )
+
+
+class LogRetentionService:
+    """Serviço de retenção em chunks com arquivamento em segmentos JSONL.gz."""
+
+    def __init__(self):
+        self.archive_dir = Path(getattr(settings, 'LOG_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'logs'))
+        self.chunk_size = getattr(settings, 'LOG_RETENTION_CHUNK_SIZE', 1000)
+        self.pause_seconds = getattr(settings, 'LOG_RETENTION_PAUSE_SECONDS', 0.2)
+        self.policies = {}
+
+        self.register(RetentionPolicy('access_logs', AccessLog, 'device_timestamp'))
+        self.register(RetentionPolicy('system_logs', SystemLog, 'timestamp'))
+        self.register(RetentionPolicy(
+            'processing_queue', LogProcessingQueue, 'created_at',
+            archive=False,
+            extra_filter={'status__in': ['completed', 'failed']}
+        ))
+
+    def register(self, policy: RetentionPolicy):
+        """Registra uma política de retenção."""
+        self.policies[policy.name] = policy
+
+    def get_policy(self, name) -> RetentionPolicy:
+        """Obtém a política pelo nome."""
+        try:
+            return self.policies[name]
+        except KeyError:
+            raise ValueError(f"Conjunto de logs desconhecido: {name}")
+
+    # ------------------------------------------------------------------
+    # Retenção
+    # ------------------------------------------------------------------
+
+    def run_retention(self, days=None, archive=True, datasets=None, dry_run=False):
+        """
+        Aplica a retenção em todos os conjuntos (ou nos informados).
+
+        Args:
+            days: dias de retenção (padrão LOG_RETENTION_DAYS)
+            archive: arquivar antes de remover
+            datasets: lista de nomes de conjuntos (padrão: todos)
+            dry_run: apenas conta o que seria removido
+
+        Returns:
+            dict: estatísticas por conjunto e data de corte
+        """
+        days = days if days is not None else getattr(settings, 'LOG_RETENTION_DAYS', 30)
+        cutoff = TimezoneUtils.get_utc_now() - timedelta(days=days)
+        names = datasets or list(self.policies.keys())
+
+        # A fila referencia AccessLog (CASCADE); limpá-la primeiro mantém os
+        # deletes de AccessLog livres de cascata na maior parte dos casos
+        names = sorted(names, key=lambda n: 0 if n == 'processing_queue' else 1)
+
+        results = {}
+        for name in names:
+            policy = self.get_policy(name)
+            if dry_run:
+                results[name] = {'deleted': 0, 'archived': 0, 'would_delete': policy.aged_queryset(cutoff).count()}
+                continue
+            results[name] = self.purge(policy, cutoff, archive=archive and policy.archive)
+
+        return {'cutoff': cutoff.isoformat(), 'days': days, 'results': results}
+
+    def purge(self, policy: RetentionPolicy, cutoff, archive=True):
+        """
+        Remove os registros antigos de uma política em janelas de id.
+
+        Cada janela é arquivada (se habilitado) e removida numa transação curta,
+        seguida de uma pausa para liberar o banco a outros processos.
+        """
+        aged = policy.aged_queryset(cutoff)
+        bounds = aged.aggregate(min_id=Min('id'), max_id=Max('id'))
+        stats = {'deleted': 0, 'archived': 0, 'chunks': 0, 'segments': []}
+
+        if bounds['min_id'] is None:
+            return stats
+
+        start = bounds['min_id']
+        while start <= bounds['max_id']:
+            end = start + self.chunk_size
+            window = aged.filter(id__gte=start, id__lt=end)
+
+            with transaction.atomic():
+                if archive:
+                    rows = list(window.order_by('id').values())
+                    if rows:
+                        stats['segments'].extend(self.write_segments(policy, rows))
+                        stats['archived'] += len(rows)
+                deleted, _ = window.delete()
+
+            stats['deleted'] += deleted
+            stats['chunks'] += 1
+            start = end
+
+            if deleted and self.pause_seconds:
+                time.sleep(self.pause_seconds)
+
+        logger.info(f"Retenção {policy.name}: {stats['deleted']} removidos em {stats['chunks']} chunks")
+        return stats
+
+    # ------------------------------------------------------------------
+    # Arquivamento
+    # ------------------------------------------------------------------
+
+    def _partition_date(self, policy, row):
+        """Data (no timezone de exibição) usada para particionar o registro."""
+        value = row.get(policy.time_field)
+        if value is None:
+            return 'sem-data'
+        return TimezoneUtils.utc_to_display(value).date().isoformat()
+
+    def write_segments(self, policy: RetentionPolicy, rows):
+        """
+        Grava as linhas em segmentos gzip particionados por data.
+
+        O arquivo é escrito com sufixo .tmp e renomeado ao final, para que um
+        segmento parcial nunca seja lido como válido.
+
+        Returns:
+            list: caminhos dos segmentos gravados
+        """
+        partitions = {}
+        for row in rows:
+            partitions.setdefault(self._partition_date(policy, row), []).append(row)
+
+        paths = []
+        for day, day_rows in partitions.items():
+            directory = self.archive_dir / policy.name / day
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{policy.name}_{day_rows[0]['id']}_{day_rows[-1]['id']}.jsonl.gz"
+            tmp_path = path.with_name(path.name + '.tmp')
+
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as segment:
+                for row in day_rows:
+                    segment.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+                    segment.write('\n')
+            os.replace(tmp_path, path)
+            paths.append(str(path))
+
+        return paths
+
+    def list_segments(self, name, date_from=None, date_to=None):
+        """
+        Lista os segmentos de um conjunto dentro do intervalo de datas (inclusivo).
+
+        Args:
+            date_from/date_to: objetos date (opcionais)
+        """
+        self.get_policy(name)
+        base = self.archive_dir / name
+        if not base.exists():
+            return []
+
+        segments = []
+        for day_dir in sorted(p for p in base.iterdir() if p.is_dir()):
+            day = day_dir.name
+            if date_from and day < date_from.isoformat():
+                continue
+            if date_to and day > date_to.isoformat():
+                continue
+            segments.extend(sorted(day_dir.glob('*.jsonl.gz')))
+        return segments
+
+    def _deserialize(self, policy, row):
+        """Converte os valores de data/hora do JSON de volta para datetime."""
+        for field in policy.model._meta.concrete_fields:
+            if isinstance(field, models.DateTimeField) and isinstance(row.get(field.attname), str):
+                row[field.attname] = parse_datetime(row[field.attname])
+        return row
+
+    def query_archive(self, name, date_from=None, date_to=None, **filters):
+        """
+        Itera os registros arquivados de um conjunto num intervalo de datas.
+
+        Args:
+            filters: igualdade simples por campo (ex: user_id=10)
+
+        Yields:
+            dict: registro arquivado
+        """
+        policy = self.get_policy(name)
+        for path in self.list_segments(name, date_from, date_to):
+            with gzip.open(path, 'rt', encoding='utf-8') as segment:
+                for line in segment:
+                    row = json.loads(line)
+                    if any(row.get(key) != value for key, value in filters.items()):
+                        continue
+                    yield self._deserialize(policy, row)
+
+    def restore(self, name, date_from=None, date_to=None, batch_size=None):
+        """
+        Restaura registros arquivados para o banco.
+
+        Registros já existentes (mesmo id/chave única) são ignorados, então
+        restaurar o mesmo intervalo duas vezes é seguro.
+
+        Returns:
+            int: quantidade de registros enviados ao banco
+        """
+        policy = self.get_policy(name)
+        batch_size = batch_size or self.chunk_size
+        model = policy.model
+        field_names = {f.attname for f in model._meta.concrete_fields}
+
+        restored = 0
+        batch = []
+        for row in self.query_archive(name, date_from, date_to):
+            batch.append(model(**{k: v for k, v in row.items() if k in field_names}))
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                restored += len(batch)
+                batch = []
+
+        if batch:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            restored += len(batch)
+
+        logger.info(f"Restauração {name}: {restored} registros")
+        return restored
+
+    # ------------------------------------------------------------------
+    # Compactação
+    # ------------------------------------------------------------------
+
+    def compact_raw_data(self, days=None):
+        """
+        Reduz raw_data/processed_data de AccessLogs já processados.
+
+        Apenas logs com processamento e sessão concluídos e mais antigos que o
+        corte são compactados. Permanecem as colunas estruturadas, o ID
+        original do log na catraca (raw_data, ver COMPACT_RAW_KEYS) e a decisão
+        gravada da sessão (processed_data['session']), lida pelo replay e pelo
+        reprocessamento; o restante do payload é descartado e o registro fica
+        marcado com raw_data['compacted'].
+
+        Returns:
+            int: quantidade de registros compactados
+        """
+        days = days if days is not None else getattr(settings, 'LOG_COMPACT_AFTER_DAYS', 7)
+        cutoff = TimezoneUtils.get_utc_now() - timedelta(days=days)
+
+        candidates = AccessLog.objects.filter(
+            device_timestamp__lt=cutoff,
+            processing_status='processed',
+            session_processed=True,
+        ).exclude(raw_data__has_key='compacted').exclude(raw_data={}, processed_data={})
+
+        bounds = candidates.aggregate(min_id=Min('id'), max_id=Max('id'))
+        if bounds['min_id'] is None:
+            return 0
+
+        compacted = 0
+        start = bounds['min_id']
+        while start <= bounds['max_id']:
+            end = start + self.chunk_size
+            logs = list(candidates.filter(id__gte=start, id__lt=end).only('id', 'raw_data', 'processed_data'))
+            for log in logs:
+                log.raw_data, log.processed_data = compact_payload(log.raw_data, log.processed_data)
+            if logs:
+                AccessLog.objects.bulk_update(logs, ['raw_data', 'processed_data'])
+            compacted += len(logs)
+            start = end
+            if logs and self.pause_seconds:
+                time.sleep(self.pause_seconds)
+
+        logger.info(f"Compactação de AccessLog: {compacted} registros")
+        return compacted
+
+
+def compact_payload(raw_data, processed_data):
+    """(raw_data, processed_data) compactados, mantendo as chaves que outros módulos leem."""
+    raw = {key: value for key, value in (raw_data or {}).items() if key in COMPACT_RAW_KEYS}
+    raw['compacted'] = True
+    processed = {key: value for key, value in (processed_data or {}).items() if key in COMPACT_PROCESSED_KEYS}
+    return raw, processed
+
+
+# Instância global do serviço
+log_retention_service = LogRetentionService()
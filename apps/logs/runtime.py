@@ -0,0 +1,155 @@
+"""
+Runtime em segundo plano com líder único.
+
+O AccessLogWorker (ingestão da catraca) e o LogMonitorService (processamento de
+sessões) rodam apenas no processo que detém o lease do dispositivo
+(RuntimeLease). O runtime roda num processo dedicado (os processos web, os
+comandos de gerenciamento e os workers Celery não iniciam threads):
+
+    python manage.py run_background_runtime
+
+Os scripts start_system.py e quick_start.py iniciam esse processo junto com o
+servidor. Vários runtimes podem ser iniciados (hosts diferentes): apenas um
+vira líder, os demais ficam em espera e assumem se o heartbeat do líder
+expirar.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from django.conf import settings
+from django.db import close_old_connections
+from .metrics import publish_snapshot
+from .models import RuntimeLease, SystemLog
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRuntime:
+    """Executa os loops de ingestão/processamento enquanto detiver o lease."""
+
+    def __init__(self, ttl_seconds=None, heartbeat_seconds=None, device_id=None):
+        self.ttl_seconds = ttl_seconds or getattr(settings, 'RUNTIME_LEASE_TTL_SECONDS', 30)
+        self.heartbeat_seconds = heartbeat_seconds or getattr(settings, 'RUNTIME_HEARTBEAT_SECONDS', 10)
+        self.device_id = device_id or getattr(settings, 'LOG_SYNC_DEVICE_ID', 1)
+        self.lease_name = f'runtime-device-{self.device_id}'
+        self.hostname = socket.gethostname()
+        self.owner = f'{self.hostname}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Serviços
+    # ------------------------------------------------------------------
+
+    def _ensure_services(self):
+        """Inicia (ou reinicia) os serviços que não estiverem rodando."""
+        from .services import log_monitor_service
+        from .workers import access_log_worker
+
+        if not access_log_worker.running:
+            if access_log_worker.start_worker():
+                logger.info("✅ AccessLogWorker iniciado pelo runtime")
+            else:
+                logger.warning("⚠️ Falha ao iniciar AccessLogWorker, nova tentativa no próximo heartbeat")
+
+        if not log_monitor_service.running:
+            log_monitor_service.start_monitoring()
+            if log_monitor_service.running:
+                logger.info("✅ Monitoramento de sessões iniciado pelo runtime")
+
+    def _stop_services(self):
+        from .services import log_monitor_service
+        from .workers import access_log_worker
+
+        if access_log_worker.running:
+            access_log_worker.stop_worker()
+        if log_monitor_service.running:
+            log_monitor_service.stop_monitoring()
+
+    # ------------------------------------------------------------------
+    # Liderança
+    # ------------------------------------------------------------------
+
+    def _acquire(self):
+        return RuntimeLease.acquire(
+            self.lease_name, self.owner,
+            ttl_seconds=self.ttl_seconds, hostname=self.hostname, pid=os.getpid(),
+        )
+
+    def _become_leader(self):
+        self.is_leader = True
+        logger.info(f"👑 Lease {self.lease_name} adquirido por {self.owner}")
+        SystemLog.log_info(
+            message=f"Runtime assumiu a liderança ({self.lease_name})",
+            category='system',
+            device_id=self.device_id,
+            details={'owner': self.owner, 'ttl_seconds': self.ttl_seconds},
+        )
+        self._ensure_services()
+
+    def _lose_leadership(self):
+        self.is_leader = False
+        self._stop_services()
+        logger.warning(f"⚠️ Lease {self.lease_name} perdido por {self.owner}")
+        SystemLog.log_warning(
+            message=f"Runtime perdeu a liderança ({self.lease_name})",
+            category='system',
+            device_id=self.device_id,
+            details={'owner': self.owner},
+        )
+
+    def tick(self):
+        """Um ciclo de heartbeat: adquire, renova ou perde o lease."""
+        close_old_connections()
+        acquired = self._acquire()
+
+        if acquired and not self.is_leader:
+            self._become_leader()
+        elif acquired:
+            self._ensure_services()
+        elif self.is_leader:
+            self._lose_leadership()
+        
+        if self.is_leader:
+            publish_snapshot()
+
+    def run(self):
+        """Loop principal (bloqueante) até stop()."""
+        logger.info(f"🚀 Runtime iniciado ({self.owner}, lease {self.lease_name})")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Erro no ciclo do runtime: {e}")
+                    # Sem acesso ao banco não é possível garantir o lease
+                    if self.is_leader:
+                        self.is_leader = False
+                        self._stop_services()
+                self._stop_event.wait(self.heartbeat_seconds)
+        finally:
+            self._stop_services()
+            try:
+                RuntimeLease.release(self.lease_name, self.owner)
+            except Exception as e:
+                logger.error(f"Erro ao liberar lease {self.lease_name}: {e}")
+            self.is_leader = False
+            logger.info(f"🛑 Runtime finalizado ({self.owner})")
+
+    def stop(self):
+        """Sinaliza o fim do loop principal."""
+        self._stop_event.set()
+
+    def get_status(self):
+        """Status do runtime local e do lease."""
+        lease = RuntimeLease.objects.filter(name=self.lease_name).first()
+        return {
+            'owner': self.owner,
+            'is_leader': self.is_leader,
+            'lease_name': self.lease_name,
+            'lease_owner': lease.owner if lease else None,
+            'lease_heartbeat_at': lease.heartbeat_at if lease else None,
+            'lease_expired': lease.is_expired if lease else True,
+        }
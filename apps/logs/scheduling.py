@@ -0,0 +1,178 @@
+"""
+Intervalo de polling adaptativo para a sincronização da catraca e o
+processamento de sessões.
+
+Depois de um ciclo com trabalho o intervalo volta ao mínimo; a cada ciclo
+ocioso ele cresce (× LOG_POLL_BACKOFF) até o máximo configurado. Assim a
+madrugada gera poucas consultas à catraca e ao banco, e uma troca de turno é
+atendida no intervalo mínimo a partir do primeiro log.
+
+Opcionalmente (LOG_POLL_PROFILE_ENABLED) um perfil de movimento por horário,
+aprendido do histórico de AccessLog, mantém o intervalo no mínimo durante os
+horários de pico e alguns minutos antes deles (pré-aquecimento), sem esperar
+o primeiro log para reagir.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Set
+from django.conf import settings
+from django.db.models import Count, Min
+from django.db.models.functions import ExtractHour, ExtractMinute
+from apps.core.registry import service_registry
+from apps.core.utils import TimezoneUtils
+
+logger = logging.getLogger(__name__)
+
+
+class TrafficProfile:
+    """Volume médio de AccessLog por faixa de horário (hora local)."""
+
+    def __init__(self):
+        self.days = getattr(settings, 'LOG_POLL_PROFILE_DAYS', 14)
+        self.slot_minutes = getattr(settings, 'LOG_POLL_PROFILE_SLOT_MINUTES', 15)
+        self.min_events = getattr(settings, 'LOG_POLL_PROFILE_MIN_EVENTS', 5)
+        self.lead_minutes = getattr(settings, 'LOG_POLL_PROFILE_LEAD_MINUTES', 15)
+        self.refresh_seconds = getattr(settings, 'LOG_POLL_PROFILE_REFRESH_SECONDS', 3600)
+        self.averages: Dict[int, float] = {}
+        self.busy_slots: Set[int] = set()
+        self.refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _slot(self, local_datetime) -> int:
+        return (local_datetime.hour * 60 + local_datetime.minute) // self.slot_minutes
+
+    def refresh(self):
+        """Recalcula o perfil com uma única query agregada por minuto do dia."""
+        from .models import AccessLog
+
+        now = TimezoneUtils.get_utc_now()
+        logs = AccessLog.objects.filter(device_timestamp__gte=now - timedelta(days=self.days))
+        first = logs.aggregate(first=Min('device_timestamp'))['first']
+        rows = (
+            logs.order_by()
+            .annotate(
+                hour=ExtractHour('device_timestamp', tzinfo=TimezoneUtils.DISPLAY_TZ),
+                minute=ExtractMinute('device_timestamp', tzinfo=TimezoneUtils.DISPLAY_TZ),
+            )
+            .values('hour', 'minute')
+            .annotate(total=Count('id'))
+        )
+
+        # Média por dia de histórico efetivamente disponível (até `days`)
+        history_days = max(1, min(self.days, math.ceil((now - first).total_seconds() / 86400))) if first else 1
+        totals: Dict[int, int] = {}
+        for row in rows:
+            slot = (row['hour'] * 60 + row['minute']) // self.slot_minutes
+            totals[slot] = totals.get(slot, 0) + row['total']
+
+        with self._lock:
+            self.averages = {slot: total / history_days for slot, total in totals.items()}
+            self.busy_slots = {slot for slot, average in self.averages.items() if average >= self.min_events}
+            self.refreshed_at = time.monotonic()
+        logger.info(
+            f"Perfil de movimento atualizado: {len(self.busy_slots)} faixas de pico de "
+            f"{self.slot_minutes} min ({history_days} dia(s) de histórico)"
+        )
+
+    def _ensure_fresh(self):
+        if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_seconds:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # Sem perfil o intervalo continua adaptativo, apenas sem pré-aquecimento
+            logger.warning(f"Não foi possível atualizar o perfil de movimento: {e}")
+            self.refreshed_at = time.monotonic()
+
+    def is_warm(self, at=None) -> bool:
+        """Horário de pico agora (ou dentro do tempo de antecedência)?"""
+        self._ensure_fresh()
+        at = at or TimezoneUtils.get_display_now()
+        with self._lock:
+            if not self.busy_slots:
+                return False
+            return (self._slot(at) in self.busy_slots
+                    or self._slot(at + timedelta(minutes=self.lead_minutes)) in self.busy_slots)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                'busy_slots': [
+                    f"{slot * self.slot_minutes // 60:02d}:{slot * self.slot_minutes % 60:02d}"
+                    for slot in sorted(self.busy_slots)
+                ],
+                'slot_minutes': self.slot_minutes,
+                'lead_minutes': self.lead_minutes,
+                'peak_average': round(max(self.averages.values()), 1) if self.averages else 0,
+            }
+
+
+class AdaptiveInterval:
+    """
+    Intervalo entre ciclos de um loop de polling.
+
+    record() ajusta o intervalo pelo resultado do ciclo; wait() dorme o
+    intervalo atual e pode ser interrompido por nudge() (ex: novos logs
+    gravados, parada do serviço).
+    """
+
+    def __init__(self, name: str, min_interval: float, max_interval: Optional[float] = None,
+                 backoff: Optional[float] = None, profile: Optional[TrafficProfile] = None):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval if max_interval is not None else min_interval, min_interval)
+        self.backoff = max(backoff if backoff is not None else getattr(settings, 'LOG_POLL_BACKOFF', 1.5), 1)
+        self.profile = profile
+        self.current = min_interval
+        self.idle_cycles = 0
+        self._wake = threading.Event()
+
+    def _ceiling(self) -> float:
+        if self.profile is not None and self.profile.is_warm():
+            return self.min_interval
+        return self.max_interval
+
+    def record(self, found: int) -> float:
+        """Registra o resultado do ciclo e retorna o próximo intervalo."""
+        if found:
+            self.idle_cycles = 0
+            self.current = self.min_interval
+        else:
+            self.idle_cycles += 1
+            self.current = min(self.current * self.backoff, self._ceiling())
+        return self.current
+
+    def nudge(self):
+        """Volta ao intervalo mínimo e acorda o loop que estiver aguardando."""
+        self.idle_cycles = 0
+        self.current = self.min_interval
+        self._wake.set()
+
+    def wait(self) -> float:
+        """Aguarda o intervalo atual (ou até nudge()). Retorna o tempo aguardado."""
+        started = time.monotonic()
+        self._wake.wait(self.current)
+        self._wake.clear()
+        return time.monotonic() - started
+
+    def get_status(self) -> Dict:
+        return {
+            'current': round(self.current, 2),
+            'min': self.min_interval,
+            'max': self.max_interval,
+            'idle_cycles': self.idle_cycles,
+        }
+
+
+def get_traffic_profile() -> Optional[TrafficProfile]:
+    """Perfil de movimento compartilhado, se habilitado."""
+    if not getattr(settings, 'LOG_POLL_PROFILE_ENABLED', False):
+        return None
+    return service_registry.get('logs.traffic_profile')
+
+
+# Instância global do perfil de movimento
+traffic_profile = service_registry.register('logs.traffic_profile', TrafficProfile)
@@ -18,7 +18,7 @@ class AccessLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = AccessLog
         fields = [
-            'id', 'device_log_id', 'user_id', 'user_name', 'event_type',
+            'id', 'device_log_id', 'log_epoch', 'user_id', 'user_name', 'event_type',
             'event_description', 'device_id', 'device_name', 'portal_id',
             'device_timestamp', 'received_timestamp', 'processed_timestamp',
             'processing_status', 'processing_error', 'raw_data', 'processed_data',
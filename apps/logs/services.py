@@ -4,16 +4,24 @@ Serviços para monitoramento automático de logs.
 import threading
 import time
 import logging
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import F, Q
 from apps.logs.models import AccessLog, SystemLog
 from apps.employees.models import Employee
 from apps.employee_sessions.models import EmployeeSession
+from apps.employee_sessions.history import session_history
 from apps.core.models import SystemConfiguration
 from apps.interjornada.services import InterjornadaService
 from apps.employee_sessions.services import session_service
+from apps.core.registry import service_registry
+from .distributed import is_distributed
+from .push import push_active
+from .scheduling import AdaptiveInterval, get_traffic_profile
+from .metrics import event_processing_seconds, events_processed, last_session_processed_log_id, position_labels
 
 logger = logging.getLogger(__name__)
 
@@ -38,9 +46,16 @@ class LogMonitorService:
             self.monitor_thread = None
             self.client = None
             self.last_processed_id = 0
+            # Logs gravados até este pk e ainda pendentes ficam de fora (mesmo corte do início)
+            self.start_after_pk = 0
             self.consecutive_errors = 0
             self.max_consecutive_errors = 5
             self.monitor_interval = max(getattr(settings, 'LOG_MONITOR_INTERVAL', 1), 1)  # Mínimo 1 segundo
+            # Intervalo adaptativo: monitor_interval após processar logs, crescendo até o máximo quando ocioso
+            self.schedule = AdaptiveInterval(
+                'session_monitor', self.monitor_interval, getattr(settings, 'LOG_MONITOR_MAX_INTERVAL', 3),
+                profile=get_traffic_profile(),
+            )
             self.batch_size = min(getattr(settings, 'LOG_MONITOR_BATCH_SIZE', 20), 20)  # Máximo 20 para resposta rápida
             self.device_id = getattr(settings, 'LOG_MONITOR_DEVICE_ID', 1)
             self._no_logs_count = 0
@@ -63,12 +78,17 @@ class LogMonitorService:
         
         try:
             # Obter último log processado para sessões
-            last_processed = AccessLog.objects.filter(session_processed=True).order_by('-device_log_id').first()
+            last_processed = AccessLog.objects.filter(session_processed=True).order_by('-id').first()
             if last_processed:
                 self.last_processed_id = last_processed.device_log_id
+                self.start_after_pk = last_processed.id
+                last_session_processed_log_id.set_max(
+                    self.last_processed_id, **position_labels(last_processed.device_id, last_processed.log_epoch),
+                )
                 logger.info(f"Último log processado para sessões: ID {self.last_processed_id}")
             else:
                 self.last_processed_id = 0
+                self.start_after_pk = 0
                 logger.info("Nenhum log anterior processado para sessões, iniciando do zero")
             
             # Iniciar thread de monitoramento
@@ -89,6 +109,7 @@ class LogMonitorService:
             return
         
         self.running = False
+        self.schedule.nudge()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
         self._no_logs_count = 0
@@ -102,27 +123,40 @@ class LogMonitorService:
             'last_processed_id': self.last_processed_id,
             'consecutive_errors': self.consecutive_errors,
             'monitor_interval': self.monitor_interval,
+            'poll_interval': self.schedule.get_status(),
             'batch_size': self.batch_size
         }
         try:
-            status['pending_logs'] = AccessLog.objects.filter(session_processed=False).count()
-            last_processed_log = AccessLog.objects.filter(session_processed=True).order_by('-session_processed_at').only('session_processed_at').first()
-            status['last_session_processed_at'] = last_processed_log.session_processed_at if last_processed_log else None
+            status.update(cache.get_or_set(
+                'logs:monitor_status_stats',
+                self._get_status_stats,
+                getattr(settings, 'MONITOR_STATUS_CACHE_SECONDS', 5),
+            ))
         except Exception as e:
             logger.debug(f"Não foi possível obter estatísticas complementares: {e}")
         return status
     
+    def _get_status_stats(self):
+        """Estatísticas com COUNT, em cache para não pesar nas telas com polling."""
+        last_processed_log = AccessLog.objects.filter(session_processed=True).order_by('-session_processed_at').only('session_processed_at').first()
+        return {
+            'pending_logs': AccessLog.objects.filter(session_processed=False).count(),
+            'last_session_processed_at': last_processed_log.session_processed_at if last_processed_log else None,
+        }
+    
     def _monitor_loop(self):
         """Loop principal de monitoramento."""
         logger.info("Loop de monitoramento iniciado")
         
-        # Contador para verificar validações de giro
-        giro_check_counter = 0
+        # Validações de giro a cada 10 intervalos mínimos (independe do intervalo adaptativo)
+        giro_check_every = 10 * self.monitor_interval
+        last_giro_check = time.monotonic()
         
         while self.running:
             try:
-                # Processar logs pendentes para sessões
-                processed_count = self.process_pending_logs()
+                # Processar logs pendentes para sessões (no modo distribuído os
+                # workers Celery processam os logs; aqui ficam só as rotinas periódicas)
+                processed_count = 0 if is_distributed() else self.process_pending_logs()
                 
                 if processed_count:
                     logger.info(f"{processed_count} logs processados para sessões (último ID {self.last_processed_id})")
@@ -135,12 +169,13 @@ class LogMonitorService:
                     if self._no_logs_count % 10 == 0:
                         logger.debug(f"Nenhum log novo para processar (último ID: {self.last_processed_id})")
                 
-                # Verificar validações de giro pendentes a cada 10 iterações
-                giro_check_counter += 1
-                if giro_check_counter >= 10:
+                # Verificar validações de giro pendentes periodicamente
+                # (com push ativo os giros chegam pelo receptor de notificações)
+                if time.monotonic() - last_giro_check >= giro_check_every:
                     try:
-                        self.interjornada_service.check_pending_giro_validations()
-                        giro_check_counter = 0
+                        if not push_active():
+                            self.interjornada_service.check_pending_giro_validations()
+                        last_giro_check = time.monotonic()
                     except Exception as e:
                         logger.error(f"Erro ao verificar validações de giro: {e}")
                 
@@ -150,8 +185,9 @@ class LogMonitorService:
                 # Sincronizar grupos com o estado do sistema
                 self.sync_groups_with_system_state()
                 
-                # Aguardar próximo ciclo
-                time.sleep(self.monitor_interval)
+                # Aguardar próximo ciclo (intervalo mínimo enquanto houver logs para processar)
+                self.schedule.record(processed_count)
+                self.schedule.wait()
                 
             except Exception as e:
                 logger.error(f"Erro no ciclo de monitoramento: {e}")
@@ -168,11 +204,24 @@ class LogMonitorService:
         logger.info("Loop de monitoramento finalizado")
     
     def process_pending_logs(self):
-        """Busca logs ainda não processados para sessões e executa pipeline determinístico."""
+        """
+        Busca logs ainda não processados para sessões e executa pipeline determinístico.
+        
+        Os logs de todas as catracas são processados em ordem de timestamp (os
+        IDs do dispositivo só são comparáveis dentro de uma mesma catraca).
+        Logs de funcionários em reprocessamento ficam para um próximo lote.
+        """
         try:
+            from .reprocess import employee_reprocessor
+            
+            paused_users = employee_reprocessor.paused_user_ids()
             pending_logs = AccessLog.objects.filter(
-                device_log_id__gt=self.last_processed_id
-            ).order_by('device_log_id')[: self.batch_size]
+                session_processed=False, id__gt=self.start_after_pk,
+            )
+            if paused_users:
+                # Excluídos antes do corte do lote para não travar os demais funcionários
+                pending_logs = pending_logs.exclude(user_id__in=paused_users)
+            pending_logs = pending_logs.order_by('device_timestamp', 'id')[: self.batch_size]
             
             processed = 0
             last_id = self.last_processed_id
@@ -195,11 +244,31 @@ class LogMonitorService:
             self.consecutive_errors += 1
             return 0
     
-    def process_access_log(self, access_log: AccessLog):
-        """Processa um log persistido no banco para a lógica de sessões/interjornada."""
+    def process_access_log(self, access_log: AccessLog, raise_errors=False):
+        """
+        Processa um log persistido no banco para a lógica de sessões/interjornada.
+        
+        Com raise_errors=True, falhas do processamento são propagadas em vez de
+        marcar o log com erro (usado pela fila distribuída, que controla os retries).
+        """
         if access_log.session_processed:
             return
         
+        started = time.perf_counter()
+        outcome = 'exception'
+        try:
+            self._process_access_log(access_log, raise_errors)
+            outcome = access_log.processing_status if access_log.session_processed else 'pending'
+            if access_log.session_processed:
+                last_session_processed_log_id.set_max(
+                    access_log.device_log_id, **position_labels(access_log.device_id, access_log.log_epoch),
+                )
+        finally:
+            event_processing_seconds.observe(time.perf_counter() - started, outcome=outcome)
+            events_processed.inc(outcome=outcome)
+    
+    def _process_access_log(self, access_log: AccessLog, raise_errors=False):
+        """Lógica de process_access_log (sem instrumentação)."""
         user_id = access_log.user_id
         event = access_log.event_description
         event_type = access_log.event_type
@@ -265,6 +334,8 @@ class LogMonitorService:
                     continue
                 else:
                     logger.error(f"Erro ao processar log {access_log.device_log_id}: {e}")
+                    if raise_errors:
+                        raise
                     access_log.mark_session_error(str(e))
                     break
     
@@ -510,43 +581,41 @@ class LogMonitorService:
                 return_time__lte=now
             ).select_related('employee')
             
-            for session in expired_sessions:
-                try:
-                    logger.info(f"Sessão expirada detectada para {session.employee.name} - removendo automaticamente")
-                    
-                    # IMPORTANTE: Remover da blacklist antes de deletar a sessão
-                    from apps.employee_sessions.services import session_service
-                    blacklist_success = session_service.unblock_user_from_interjornada(session.employee)
-                    
-                    SystemLog.objects.create(
-                        level='INFO',
-                        category='interjornada',
-                        message=f'Sessão de interjornada finalizada automaticamente - {session.employee.name}',
-                        user_id=session.employee.device_id,
-                        user_name=session.employee.name,
-                        details={
-                            'session_id': session.id,
-                            'work_duration': session.work_duration_minutes,
-                            'rest_duration': session.rest_duration_minutes,
-                            'finalized_at': now.isoformat(),
-                            'blacklist_removed': blacklist_success
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"Erro ao remover sessão expirada de {session.employee.name}: {e}")
+            # Histórico das sessões finalizadas gravado num único lote
+            with session_history.batch():
+                for session in expired_sessions:
+                    try:
+                        logger.info(f"Sessão expirada detectada para {session.employee.name} - removendo automaticamente")
+                        
+                        # IMPORTANTE: Remover da blacklist antes de deletar a sessão
+                        from apps.employee_sessions.services import session_service
+                        blacklist_success = session_service.unblock_user_from_interjornada(session.employee)
+                        
+                        SystemLog.objects.create(
+                            level='INFO',
+                            category='interjornada',
+                            message=f'Sessão de interjornada finalizada automaticamente - {session.employee.name}',
+                            user_id=session.employee.device_id,
+                            user_name=session.employee.name,
+                            details={
+                                'session_id': session.id,
+                                'work_duration': session.work_duration_minutes,
+                                'rest_duration': session.rest_duration_minutes,
+                                'finalized_at': now.isoformat(),
+                                'blacklist_removed': blacklist_success
+                            }
+                        )
+                    except Exception as e:
+                        logger.error(f"Erro ao remover sessão expirada de {session.employee.name}: {e}")
             
             # Verificar sessões ativas que excederam o tempo de acesso livre
-            from apps.core.models import SystemConfiguration
-            config = SystemConfiguration.objects.first()
-            if config:
-                # Calcular o limite de tempo considerando o timezone correto
-                time_limit = now - timedelta(minutes=config.liberado_minutes)
-                sessions_pending_exit = EmployeeSession.objects.filter(
-                    state='active',
-                    first_access__lte=time_limit
-                ).select_related('employee')
-                
-                logger.info(f"Verificando sessões ativas. Limite: {time_limit}, Config: {config.liberado_minutes} minutos")
+            # (cada sessão guarda as próprias durações efetivas)
+            work_over, _ = EmployeeSession.time_limit_filters(now)
+            sessions_pending_exit = list(
+                EmployeeSession.objects.filter(work_over, state='active').select_related('employee')
+            )
+            if sessions_pending_exit:
+                logger.info(f"Verificando sessões ativas: {len(sessions_pending_exit)} excederam o tempo de trabalho")
                 
                 for session in sessions_pending_exit:
                     try:
@@ -560,27 +629,25 @@ class LogMonitorService:
             
             # Verificar sessões pending_rest que já excederam o tempo de trabalho
             # IMPORTANTE: NÃO bloquear automaticamente - aguardar saída manual pelo Portal 2
-            pending_sessions = EmployeeSession.objects.filter(state='pending_rest').select_related('employee')
+            pending_sessions = EmployeeSession.objects.filter(work_over, state='pending_rest').select_related('employee')
             for session in pending_sessions:
                 try:
-                    # Calcular se já excedeu o tempo de trabalho
-                    work_time_limit = session.first_access + timedelta(minutes=session.work_duration_minutes)
-                    if now > work_time_limit:
-                        logger.info(f"Usuário {session.employee.name} em pending_rest excedeu tempo de trabalho - Aguardando saída manual pelo Portal 2")
-                        
-                        # NÃO bloquear automaticamente - aguardar saída manual
-                        # O usuário deve sair pelo Portal 2 para iniciar a interjornada
-                        logger.info(f"Usuário {session.employee.name} deve sair pelo Portal 2 para iniciar interjornada")
-                        
+                    logger.info(f"Usuário {session.employee.name} em pending_rest excedeu tempo de trabalho - Aguardando saída manual pelo Portal 2")
+                    
+                    # NÃO bloquear automaticamente - aguardar saída manual
+                    # O usuário deve sair pelo Portal 2 para iniciar a interjornada
+                    logger.info(f"Usuário {session.employee.name} deve sair pelo Portal 2 para iniciar interjornada")
+                    
                 except Exception as e:
                     logger.error(f"Erro ao verificar sessão pending_rest de {session.employee.name}: {e}")
             
             # Garantir que sessões ativas tenham last_access atualizado
-            active_sessions = EmployeeSession.objects.filter(state='active').select_related('employee')
+            active_sessions = EmployeeSession.objects.filter(state='active').filter(
+                Q(last_access__isnull=True) | Q(last_access__lt=F('first_access'))
+            )
             for session in active_sessions:
-                if session.last_access is None or session.last_access < session.first_access:
-                    session.last_access = session.first_access
-                    session.save(update_fields=['last_access'])
+                session.last_access = session.first_access
+                session.save(update_fields=['last_access'])
         except Exception as e:
             logger.error(f"Erro ao aplicar regras de tempo para sessões: {e}")
     
@@ -620,4 +687,4 @@ class LogMonitorService:
 
 
 # Instância global do serviço
-log_monitor_service = LogMonitorService()
\ No newline at end of file
+log_monitor_service = service_registry.register('logs.log_monitor_service', LogMonitorService)
\ No newline at end of file
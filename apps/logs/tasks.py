@@ -4,7 +4,8 @@ Tarefas Celery para o app logs.
 from celery import shared_task
 from django.conf import settings
 from .models import AccessLog, SystemLog, LogProcessingQueue
-from .services import log_processing_service, log_queue_service
+from .distributed import is_distributed, log_dispatcher
+from .metrics import publish_snapshot
 from apps.core.utils import TimezoneUtils
 import logging
 
@@ -14,109 +15,129 @@ logger = logging.getLogger(__name__)
 @shared_task(bind=True, name='apps.logs.tasks.process_device_logs_task')
 def process_device_logs_task(self, device_id, logs):
     """
-    Tarefa para processar logs de um dispositivo.
+    Tarefa para gravar logs brutos de um dispositivo.
+    
+    No modo distribuído os logs criados são enfileirados por funcionário;
+    no modo thread o runtime em segundo plano os processa.
     """
     try:
         from apps.devices.models import Device
+        from .workers import access_log_worker
         device = Device.objects.get(id=device_id)
         
-        # Processar logs
-        stats = log_processing_service.process_device_logs(logs, device_id, device.name)
+        synced_count, created = access_log_worker.ingest_logs(logs, device)
+        stats = {
+            'received_logs': len(logs),
+            'new_logs': len(created),
+            'synced_logs': synced_count,
+            'enqueued_logs': len(created) if is_distributed() else 0,
+        }
         
         # Log de processamento
-        SystemLog.log_info(
-            message=f"Logs processados do dispositivo {device.name}: {stats['new_logs']} novos, {stats['processed_logs']} processados",
-            category='logs',
-            device_id=device_id,
-            device_name=device.name,
-            details=stats
-        )
+        if created:
+            SystemLog.log_info(
+                message=f"Logs recebidos do dispositivo {device.name}: {stats['new_logs']} novos",
+                category='device',
+                device_id=device_id,
+                device_name=device.name,
+                details=stats
+            )
         
+        publish_snapshot()
         return stats
         
     except Exception as e:
         logger.error(f"Erro na tarefa de processamento de logs do dispositivo {device_id}: {e}")
         SystemLog.log_error(
             message=f"Erro na tarefa de processamento de logs: {str(e)}",
-            category='logs',
+            category='device',
             device_id=device_id,
             details={'error': str(e)}
         )
         raise
 
 
+@shared_task(bind=True, name='apps.logs.tasks.process_log_entry_task', acks_late=True)
+def process_log_entry_task(self, entry_id):
+    """
+    Tarefa para processar o backlog de um funcionário a partir de uma entrada da fila.
+    
+    Roteada para a fila da partição do funcionário (logs.p<n>), consumida por
+    um único worker com concorrência 1 para preservar a ordem dos eventos.
+    """
+    stats = log_dispatcher.process_entry(entry_id)
+    publish_snapshot()
+    return stats
+
+
 @shared_task(bind=True, name='apps.logs.tasks.process_log_queue_task')
 def process_log_queue_task(self):
     """
-    Tarefa para processar fila de logs.
+    Tarefa para enfileirar logs que ainda não entraram na fila de processamento.
+    
+    Cobre logs criados fora da ingestão (ex: logs manuais) no modo distribuído.
     """
+    if not is_distributed():
+        return {
+            'status': 'stopped',
+            'message': 'Processamento distribuído não está ativo'
+        }
+    
     try:
-        # Verificar se processamento está ativo
-        if not log_queue_service.is_processing:
-            return {
-                'status': 'stopped',
-                'message': 'Processamento não está ativo'
-            }
-        
-        # Processar fila
-        stats = log_queue_service.process_queue(batch_size=10)
-        
-        # Log de processamento
-        if stats['status'] == 'running' and (stats['processed'] > 0 or stats['failed'] > 0):
-            SystemLog.log_info(
-                message=f"Fila de logs processada: {stats['processed']} processados, {stats['failed']} falharam",
-                category='logs',
-                details=stats
-            )
-        
-        return stats
+        enqueued = log_dispatcher.enqueue_unqueued()
+        return {
+            'status': 'running',
+            'enqueued': enqueued
+        }
         
     except Exception as e:
         logger.error(f"Erro na tarefa de processamento da fila de logs: {e}")
         SystemLog.log_error(
             message=f"Erro na tarefa de processamento da fila: {str(e)}",
-            category='logs',
+            category='system',
             details={'error': str(e)}
         )
         raise
 
 
 @shared_task(bind=True, name='apps.logs.tasks.cleanup_old_logs_task')
-def cleanup_old_logs_task(self, days=30):
+def cleanup_old_logs_task(self, days=None, archive=None, compact=None):
     """
     Tarefa para limpar logs antigos.
+    
+    Remove em chunks por faixa de id (com pausa entre eles), arquivando os
+    registros em segmentos JSONL.gz antes da remoção.
     """
     try:
-        from datetime import datetime, timedelta
-        cutoff_date = TimezoneUtils.get_utc_now() - timedelta(days=days)
-        
-        # Limpar logs de acesso antigos
-        access_logs_deleted = AccessLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()[0]
+        from .retention import log_retention_service
         
-        # Limpar logs do sistema antigos
-        system_logs_deleted = SystemLog.objects.filter(
-            timestamp__lt=cutoff_date
-        ).delete()[0]
+        if archive is None:
+            archive = getattr(settings, 'LOG_ARCHIVE_ENABLED', True)
+        if compact is None:
+            compact = getattr(settings, 'LOG_COMPACT_RAW_DATA', False)
         
-        # Limpar entradas da fila antigas
-        queue_entries_deleted = LogProcessingQueue.objects.filter(
-            created_at__lt=cutoff_date,
-            status__in=['completed', 'failed']
-        ).delete()[0]
+        retention = log_retention_service.run_retention(days=days, archive=archive)
+        results = retention['results']
         
+        access_logs_deleted = results['access_logs']['deleted']
+        system_logs_deleted = results['system_logs']['deleted']
+        queue_entries_deleted = results['processing_queue']['deleted']
         total_deleted = access_logs_deleted + system_logs_deleted + queue_entries_deleted
+        total_archived = sum(r['archived'] for r in results.values())
         
-        if total_deleted > 0:
+        compacted = log_retention_service.compact_raw_data() if compact else 0
+        
+        if total_deleted > 0 or compacted > 0:
             SystemLog.log_info(
-                message=f"Limpeza de logs antigos concluída: {total_deleted} registros removidos",
+                message=f"Limpeza de logs antigos concluída: {total_deleted} registros removidos, {total_archived} arquivados",
                 category='logs',
                 details={
                     'access_logs_deleted': access_logs_deleted,
                     'system_logs_deleted': system_logs_deleted,
                     'queue_entries_deleted': queue_entries_deleted,
-                    'cutoff_date': cutoff_date.isoformat()
+                    'archived': total_archived,
+                    'compacted': compacted,
+                    'cutoff_date': retention['cutoff']
                 }
             )
         
@@ -127,7 +148,9 @@ def cleanup_old_logs_task(self, days=30):
             'system_logs_deleted': system_logs_deleted,
             'queue_entries_deleted': queue_entries_deleted,
             'total_deleted': total_deleted,
-            'cutoff_date': cutoff_date.isoformat()
+            'archived': total_archived,
+            'compacted': compacted,
+            'cutoff_date': retention['cutoff']
         }
         
     except Exception as e:
@@ -143,66 +166,37 @@ def cleanup_old_logs_task(self, days=30):
 @shared_task(bind=True, name='apps.logs.tasks.retry_failed_logs_task')
 def retry_failed_logs_task(self):
     """
-    Tarefa para tentar novamente logs que falharam.
+    Tarefa para reenviar entradas da fila prontas para nova tentativa.
+    
+    Inclui retries vencidos, envios perdidos e entradas presas em processamento.
     """
+    if not is_distributed():
+        return {
+            'status': 'stopped',
+            'message': 'Processamento distribuído não está ativo'
+        }
+    
     try:
-        # Buscar logs que falharam e podem ser tentados novamente
-        failed_logs = LogProcessingQueue.objects.filter(
-            status='failed',
-            attempts__lt=3  # Máximo de 3 tentativas
-        ).order_by('created_at')[:50]  # Limitar a 50 por vez
-        
-        retry_count = 0
-        success_count = 0
-        error_count = 0
-        
-        for queue_entry in failed_logs:
-            try:
-                # Marcar como processando
-                queue_entry.mark_as_processing()
-                
-                # Tentar processar novamente
-                success = log_queue_service._process_queue_entry(queue_entry)
-                
-                if success:
-                    queue_entry.mark_as_completed()
-                    success_count += 1
-                else:
-                    queue_entry.mark_as_failed("Tentativa de retry falhou")
-                    error_count += 1
-                
-                retry_count += 1
-                
-            except Exception as e:
-                queue_entry.mark_as_failed(f"Erro no retry: {str(e)}")
-                error_count += 1
-                retry_count += 1
-                logger.error(f"Erro ao processar retry do log {queue_entry.id}: {e}")
+        stats = log_dispatcher.sweep()
         
-        if retry_count > 0:
-            SystemLog.log_info(
-                message=f"Retry de logs falhados concluído: {retry_count} tentados, {success_count} sucessos, {error_count} falhas",
-                category='logs',
-                details={
-                    'retry_count': retry_count,
-                    'success_count': success_count,
-                    'error_count': error_count
-                }
+        if stats['recovered'] > 0:
+            SystemLog.log_warning(
+                message=f"Fila de processamento: {stats['recovered']} entradas presas recuperadas",
+                category='system',
+                details=stats
             )
         
         return {
             'status': 'success',
-            'message': f'Retry concluído: {retry_count} tentados',
-            'retry_count': retry_count,
-            'success_count': success_count,
-            'error_count': error_count
+            'message': f"Retry concluído: {stats['sent']} funcionários reenviados",
+            **stats
         }
         
     except Exception as e:
         logger.error(f"Erro na tarefa de retry de logs falhados: {e}")
         SystemLog.log_error(
             message=f"Erro na tarefa de retry: {str(e)}",
-            category='logs',
+            category='system',
             details={'error': str(e)}
         )
         raise
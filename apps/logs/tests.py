@@ -0,0 +1,512 @@
+"""
+Testes do app de logs.
+"""
+import socket
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from apps.core.metrics import metrics
+from apps.core.utils import TimezoneUtils
+from apps.devices.models import Device
+from apps.employee_sessions.models import EmployeeSession
+from apps.employees.group_service import GroupService
+from apps.employees.models import Employee, EmployeeGroup
+from apps.interjornada.policy import policy_index
+from .distributed import LogDispatcher, partition_for, queue_for
+from .metrics import (
+    collect, device_head_log_id, last_session_processed_log_id, last_synced_log_id, logs_ingested, position_labels,
+    publish_snapshot,
+)
+from .models import (
+    AccessLog, DeviceLogCursor, DevicePushStatus, LogBackfill, LogProcessingQueue, MetricsSnapshot, RuntimeLease,
+    SystemLog,
+)
+from .replay import ReplayEngine, compare_with_stored, load_logs, stored_outcome
+from .reprocess import LEASE_PREFIX, EmployeeReprocessor
+from .retention import LogRetentionService
+from .services import LogMonitorService
+from .workers import AccessLogWorker
+
+# Timestamp Unix (catraca) fixo para os logs de teste
+BASE_TIME = 1760000000
+
+
+def device_log(log_id, user_id=7, offset=0):
+    return {'id': log_id, 'time': BASE_TIME + offset, 'user_id': user_id, 'event': 7, 'portal_id': 1}
+
+
+class DeviceLogResetTests(TestCase):
+    """Reinicialização da numeração de logs da catraca (tabela limpa / reset de fábrica)."""
+
+    def setUp(self):
+        self.device = Device.objects.create(
+            name='Catraca Teste', device_type='primary', ip_address='127.0.0.1', port=8081,
+            username='admin', password='admin',
+        )
+        self.worker = AccessLogWorker()
+        self.worker.poller = mock.Mock()
+        self.worker.ingest_batches([(self.device, [device_log(log_id, offset=log_id) for log_id in range(1, 6)])])
+        self.cursor = DeviceLogCursor.objects.get(device=self.device)
+
+    def poll(self, logs, head_id):
+        self.worker.poller.poll_sync.return_value = [
+            {'device': self.device, 'success': True, 'logs': logs, 'error': None},
+        ]
+        self.worker.poller.head_log_id_sync.return_value = head_id
+        return self.worker._sync_logs()
+
+    def test_reset_rewinds_cursor_and_ingests_reused_ids(self):
+        self.assertEqual(self.cursor.last_log_id, 5)
+
+        # A catraca voltou a numerar a partir de 1: a busca após o cursor vem vazia
+        self.assertEqual(self.poll([], head_id=2), 0)
+
+        self.cursor.refresh_from_db()
+        self.assertEqual(self.cursor.last_log_id, 0)
+        self.assertEqual(self.cursor.reset_count, 1)
+        self.assertIsNotNone(self.cursor.last_reset_at)
+        self.assertIn('Reinicialização', self.cursor.last_error)
+        self.assertTrue(SystemLog.objects.filter(category='device', level='WARNING').exists())
+
+        # Logs antigos preservados com os IDs originais, na geração anterior
+        self.assertEqual(self.cursor.log_epoch, 1)
+        self.assertEqual(self.stored_ids(), [(0, 1), (0, 2), (0, 3), (0, 4), (0, 5)])
+
+        # Os novos logs 1 e 2 são gravados na nova geração (não descartados como duplicados)
+        new_logs = [device_log(1, offset=100), device_log(2, offset=101)]
+        self.assertEqual(self.poll(new_logs, head_id=2), 2)
+        self.cursor.refresh_from_db()
+        self.assertEqual(self.cursor.last_log_id, 2)
+        self.assertEqual(self.stored_ids()[-2:], [(1, 1), (1, 2)])
+
+        # Repetidos na mesma geração continuam descartados
+        self.worker.ingest_batches([(self.device, new_logs)])
+        self.assertEqual(AccessLog.objects.filter(device_id=self.device.id).count(), 7)
+
+    def stored_ids(self):
+        return list(AccessLog.objects.filter(device_id=self.device.id).order_by('device_timestamp')
+                    .values_list('log_epoch', 'device_log_id'))
+
+    def test_second_reset_starts_another_generation(self):
+        self.poll([], head_id=0)
+        self.poll([device_log(1, offset=100), device_log(2, offset=101)], head_id=2)
+
+        self.worker._reset_checked.clear()
+        self.poll([], head_id=1)
+        self.poll([device_log(1, offset=200)], head_id=1)
+
+        self.assertEqual(
+            self.stored_ids(), [(0, 1), (0, 2), (0, 3), (0, 4), (0, 5), (1, 1), (1, 2), (2, 1)],
+        )
+        cursor = DeviceLogCursor.objects.get(device=self.device)
+        self.assertEqual((cursor.reset_count, cursor.log_epoch, cursor.last_log_id), (2, 2, 1))
+
+    def test_new_cursor_starts_at_latest_generation(self):
+        self.poll([], head_id=0)
+        self.poll([device_log(1, offset=100), device_log(2, offset=101)], head_id=2)
+
+        DeviceLogCursor.objects.all().delete()
+        cursor = DeviceLogCursor.for_device(self.device)
+        self.assertEqual((cursor.log_epoch, cursor.last_log_id), (1, 2))
+
+    def test_backfill_writes_into_current_generation(self):
+        from .backfill import BackfillEngine
+
+        self.poll([], head_id=0)
+        job = LogBackfill.objects.create(device=self.device, after_id=0, end_id=3, checkpoint_id=0)
+        written = BackfillEngine()._write_page(job, [device_log(1, offset=100), device_log(3, offset=102)], 3, 0.1)
+
+        self.assertEqual(written, 2)
+        self.assertEqual(self.stored_ids()[-2:], [(1, 1), (1, 3)])
+
+    def test_logs_without_device_are_unique(self):
+        self.worker.ingest_batches([(None, [device_log(9), device_log(9)])])
+        self.assertEqual(AccessLog.objects.filter(device_id__isnull=True).count(), 1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AccessLog.objects.create(
+                device_log_id=9, user_id=7, user_name='Usuário 7', event_type=7,
+                device_timestamp=TimezoneUtils.get_utc_now(), created_at=TimezoneUtils.get_utc_now(),
+                updated_at=TimezoneUtils.get_utc_now(),
+            )
+
+    def test_empty_page_at_head_is_not_a_reset(self):
+        self.assertEqual(self.poll([], head_id=5), 0)
+
+        self.cursor.refresh_from_db()
+        self.assertEqual(self.cursor.last_log_id, 5)
+        self.assertEqual(self.cursor.reset_count, 0)
+        self.assertEqual(self.cursor.log_epoch, 0)
+
+    def test_head_check_is_throttled(self):
+        self.poll([], head_id=5)
+        self.poll([], head_id=5)
+        self.assertEqual(self.worker.poller.head_log_id_sync.call_count, 1)
+
+        self.worker._reset_checked[self.device.id] = time.monotonic() - self.worker.backlog_check_interval
+        self.poll([], head_id=5)
+        self.assertEqual(self.worker.poller.head_log_id_sync.call_count, 2)
+
+
+class PausedEmployeeBatchTests(TestCase):
+    """Logs de funcionários em reprocessamento não podem travar o lote dos demais."""
+
+    def setUp(self):
+        self.device = Device.objects.create(
+            name='Catraca Teste', device_type='primary', ip_address='127.0.0.1', port=8081,
+            username='admin', password='admin',
+        )
+        worker = AccessLogWorker()
+        worker.poller = mock.Mock()
+        # Os logs mais antigos são todos do funcionário pausado e ocupam um lote inteiro
+        paused_logs = [device_log(log_id, user_id=7, offset=log_id) for log_id in range(1, 26)]
+        other_logs = [device_log(log_id, user_id=8, offset=log_id) for log_id in range(26, 29)]
+        worker.ingest_batches([(self.device, paused_logs + other_logs)])
+        RuntimeLease.acquire(f'{LEASE_PREFIX}7', owner='reprocess-test', ttl_seconds=300)
+
+    def test_paused_employee_does_not_stall_other_employees(self):
+        monitor = LogMonitorService()
+        monitor.start_after_pk = 0
+        self.assertLessEqual(monitor.batch_size, 25)
+
+        with mock.patch.object(LogMonitorService, 'process_access_log') as process:
+            self.assertEqual(monitor.process_pending_logs(), 3)
+
+        self.assertEqual({call.args[0].user_id for call in process.call_args_list}, {8})
+
+
+@override_settings(LOG_PROCESSING_PARTITIONS=4, LOG_PROCESSING_STALE_SECONDS=60)
+class PartitionedProcessingTests(TestCase):
+    """Fila particionada por funcionário: posse das entradas e varredura."""
+
+    def setUp(self):
+        self.dispatcher = LogDispatcher()
+        now = TimezoneUtils.get_utc_now()
+        logs = [
+            AccessLog(
+                device_log_id=log_id, user_id=user_id, user_name=f'Usuário {user_id}', event_type=7, portal_id=1,
+                device_timestamp=now + timedelta(seconds=log_id), created_at=now, updated_at=now,
+            )
+            for log_id, user_id in enumerate([7, 7, 8, 7], 1)
+        ]
+        AccessLog.objects.bulk_create(logs)
+        with mock.patch.object(LogDispatcher, '_send', return_value=True) as send:
+            self.entries = self.dispatcher.enqueue(AccessLog.objects.order_by('device_log_id'))
+        self.sent = [call.args for call in send.call_args_list]
+
+    def entry(self, device_log_id):
+        return LogProcessingQueue.objects.get(access_log__device_log_id=device_log_id)
+
+    def process(self, device_log_id, side_effect=None):
+        with mock.patch.object(LogMonitorService, 'process_access_log', side_effect=side_effect) as process:
+            stats = self.dispatcher.process_entry(self.entry(device_log_id).id)
+        return stats, [call.args[0].device_log_id for call in process.call_args_list]
+
+    def test_partition_is_stable_per_employee(self):
+        self.assertEqual(partition_for(7), partition_for(7))
+        self.assertTrue(all(0 <= partition_for(user_id) < 4 for user_id in range(100)))
+        self.assertEqual(queue_for(7), f'logs.p{partition_for(7)}')
+        # Uma tarefa por entrada, para a fila do funcionário dono do log
+        self.assertEqual(self.sent, [(entry.id, entry.access_log.user_id) for entry in self.entries])
+
+    def test_entry_processes_the_employee_backlog_in_order(self):
+        stats, processed = self.process(4)
+
+        self.assertEqual(processed, [1, 2, 4])
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual(self.entry(3).status, 'pending')
+        self.assertEqual(self.entry(4).attempts, 1)
+
+    def test_failure_schedules_retry_and_holds_the_backlog(self):
+        stats, processed = self.process(1, side_effect=[None, RuntimeError('falha')])
+
+        self.assertEqual(processed, [1, 2])
+        self.assertEqual(stats['stopped'], 'retry_scheduled')
+        self.assertEqual(self.entry(2).status, 'retry')
+        self.assertEqual(self.entry(4).status, 'pending')
+
+        # Antes do horário do retry nada avança
+        stats, processed = self.process(4)
+        self.assertEqual((stats['stopped'], processed), ('waiting_retry', []))
+
+    def test_entry_claimed_by_another_worker_is_left_alone(self):
+        LogProcessingQueue.objects.filter(id=self.entry(1).id).update(
+            status='processing', last_attempt=TimezoneUtils.get_utc_now(),
+        )
+
+        stats, processed = self.process(2)
+
+        self.assertEqual((stats['stopped'], processed), ('in_progress', []))
+
+    def test_sweep_recovers_stale_claims_and_resends_backlog_heads(self):
+        long_ago = TimezoneUtils.get_utc_now() - timedelta(minutes=5)
+        LogProcessingQueue.objects.filter(id=self.entry(2).id).update(status='processing', last_attempt=long_ago)
+        LogProcessingQueue.objects.filter(id=self.entry(3).id).update(created_at=long_ago)
+
+        with mock.patch.object(LogDispatcher, '_send', return_value=True) as send:
+            result = self.dispatcher.sweep()
+
+        self.assertEqual(result, {'recovered': 1, 'users': 2, 'sent': 2})
+        self.assertEqual(self.entry(2).status, 'retry')
+        self.assertEqual(
+            sorted(call.args for call in send.call_args_list), [(self.entry(2).id, 7), (self.entry(3).id, 8)],
+        )
+
+
+class ReplayParityTests(TestCase):
+    """O replay decide cada log como o processamento ao vivo (mesmo status e resultado)."""
+
+    def setUp(self):
+        cache.clear()
+        policy_index.invalidate()
+        self.default_group = EmployeeGroup.objects.create(name='Funcionários', device_group_id=1)
+        self.blacklist = EmployeeGroup.objects.create(
+            name='BLACKLIST_INTERJORNADA', device_group_id=1000, is_blacklist=True,
+        )
+        for device_id in range(1, 7):
+            Employee.objects.create(
+                device_id=device_id, name=f'Funcionário {device_id}', employee_code=f'F{device_id}',
+                group=self.default_group,
+            )
+
+    def events(self):
+        """(horário, user_id, evento, portal): dois turnos por funcionário, com saídas cedo e reentradas."""
+        base = TimezoneUtils.get_utc_now() - timedelta(days=3)
+        events = []
+        # 9 não está cadastrado e 0 é evento de manutenção
+        for user_id in list(range(1, 7)) + [9, 0]:
+            start = base + timedelta(minutes=17 * user_id)
+            for day in range(2):
+                events += [
+                    (start, user_id, 7, 1),
+                    (start + timedelta(hours=2), user_id, 7, 2),
+                    (start + timedelta(hours=3), user_id, 7, 1),
+                    (start + timedelta(hours=8, minutes=user_id), user_id, 7, 2),
+                    (start + timedelta(hours=9), user_id, 3, 1),
+                    (start + timedelta(hours=10), user_id, (7, 6, 13)[user_id % 3], 1),
+                ]
+                if user_id % 2:
+                    # Sem saída: a sessão passa para 'pending_rest' e sai no dia seguinte
+                    events.pop(3)
+                start += timedelta(hours=8 + 12 + user_id)
+        return sorted(events)
+
+    def run_live(self, events):
+        """Monitoramento ao vivo com o relógio no horário de cada log."""
+        monitor = LogMonitorService()
+        clock = {}
+        with mock.patch.object(TimezoneUtils, 'get_utc_now', lambda: clock['now']), \
+                mock.patch('django.utils.timezone.now', lambda: clock['now']), \
+                mock.patch.object(GroupService, 'move_to_blacklist', return_value=True), \
+                mock.patch.object(GroupService, 'restore_from_blacklist', return_value=True):
+            for device_log_id, (timestamp, user_id, event, portal_id) in enumerate(events, 1):
+                clock['now'] = timestamp
+                # Ciclo do monitoramento antes do log: regras de tempo e sincronização de grupos
+                monitor.enforce_session_timeouts()
+                blocked = EmployeeSession.objects.filter(state='blocked').values_list('employee_id', flat=True)
+                Employee.objects.filter(id__in=blocked).update(group=self.blacklist)
+                Employee.objects.exclude(id__in=blocked).update(group=self.default_group)
+                log = AccessLog.objects.create(
+                    device_log_id=device_log_id, user_id=user_id, user_name=f'Usuário {user_id}',
+                    event_type=event, portal_id=portal_id, device_timestamp=timestamp,
+                    created_at=timestamp, updated_at=timestamp,
+                )
+                monitor.process_access_log(log)
+            monitor.enforce_session_timeouts()
+
+    def test_replay_matches_live_pipeline(self):
+        events = self.events()
+        self.run_live(events)
+
+        engine = ReplayEngine().run(load_logs()).finish(events[-1][0])
+        comparison = compare_with_stored(engine.decisions)
+
+        self.assertEqual(comparison['compared'], len(events))
+        self.assertEqual(comparison['mismatches'], [])
+        # O fixture exercita as decisões principais
+        self.assertTrue({'allow', 'deny', 'blacklist_blocked', 'maintenance_event', 'employee_not_found'}
+                        <= set(engine.outcomes))
+
+        live_sessions = {
+            session.employee.device_id: session.state
+            for session in EmployeeSession.objects.select_related('employee')
+        }
+        replay_sessions = {session.user_id: session.state for session in engine.open_sessions()}
+        self.assertEqual(replay_sessions, live_sessions)
+
+    def test_reprocess_restores_the_live_decisions_of_one_employee(self):
+        events = self.events()
+        self.run_live(events)
+        live = {
+            log.pk: stored_outcome(log.processing_status, log.processed_data)
+            for log in AccessLog.objects.filter(user_id=1)
+        }
+        live_state = EmployeeSession.objects.get(employee__device_id=1).state
+        others = list(AccessLog.objects.exclude(user_id=1).values_list('pk', 'processing_status', 'processed_data'))
+
+        # Estado derivado perdido: decisões apagadas e sessão removida
+        AccessLog.objects.filter(user_id=1).update(processing_status='pending', processed_data={})
+        EmployeeSession.objects.filter(employee__device_id=1).delete()
+        first_log = AccessLog.objects.filter(user_id=1).order_by('device_timestamp').first()
+
+        with mock.patch.object(TimezoneUtils, 'get_utc_now', lambda: events[-1][0]), \
+                mock.patch.object(GroupService, 'move_to_blacklist', return_value=True), \
+                mock.patch.object(GroupService, 'restore_from_blacklist', return_value=True):
+            result = EmployeeReprocessor().reprocess(1, from_log_id=first_log.pk)
+
+        self.assertTrue(result['success'])
+        self.assertEqual((result['logs'], result['changed']), (len(live), len(live)))
+        self.assertEqual({
+            log.pk: stored_outcome(log.processing_status, log.processed_data)
+            for log in AccessLog.objects.filter(user_id=1)
+        }, live)
+        self.assertEqual(EmployeeSession.objects.get(employee__device_id=1).state, live_state)
+        self.assertEqual(
+            list(AccessLog.objects.exclude(user_id=1).values_list('pk', 'processing_status', 'processed_data')),
+            others,
+        )
+        self.assertFalse(RuntimeLease.objects.filter(name=f'{LEASE_PREFIX}1').exclude(owner='').exists())
+
+
+@override_settings(DEVICE_PUSH_ENABLED=True, DEVICE_PUSH_TOKEN='', DEVICE_PUSH_ALLOWED_IPS=[])
+class DevicePushAuthTests(TestCase):
+    """Autenticação do receptor de notificações push (sem login nem CSRF)."""
+
+    url = '/api/v1/logs/push/device_is_alive'
+
+    def post(self, url=None, **extra):
+        return self.client.post(url or self.url, data='{"device_id": 1}', content_type='application/json', **extra)
+
+    def test_refuses_when_no_authentication_is_configured(self):
+        forged = {'object_changes': [{'object': 'access_logs', 'type': 'inserted',
+                                      'values': {'id': '1', 'time': str(BASE_TIME), 'event': '7', 'user_id': '7'}}]}
+        response = self.client.post('/api/v1/logs/push/dao', data=forged, content_type='application/json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.post().status_code, 403)
+        self.assertFalse(AccessLog.objects.exists())
+        self.assertFalse(DevicePushStatus.objects.exists())
+
+    @override_settings(DEVICE_PUSH_TOKEN='segredo')
+    def test_bearer_token(self):
+        self.assertEqual(self.post().status_code, 403)
+        self.assertEqual(self.post(HTTP_AUTHORIZATION='Bearer errado').status_code, 403)
+        self.assertEqual(self.post(HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
+
+    @override_settings(DEVICE_PUSH_TOKEN='segredo')
+    def test_token_in_path_for_monitors_without_headers(self):
+        self.assertEqual(self.post('/api/v1/logs/push/errado/device_is_alive').status_code, 403)
+        self.assertEqual(self.post('/api/v1/logs/push/segredo/device_is_alive').status_code, 200)
+
+    @override_settings(DEVICE_PUSH_ALLOWED_IPS=['10.0.0.5'])
+    def test_allowed_ips(self):
+        self.assertEqual(self.post(REMOTE_ADDR='10.0.0.9').status_code, 403)
+        self.assertEqual(self.post(REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+
+class LogRetentionTests(TestCase):
+    """Retenção em chunks com arquivamento e compactação dos logs antigos."""
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        with override_settings(LOG_ARCHIVE_DIR=archive_dir.name, LOG_RETENTION_CHUNK_SIZE=2,
+                               LOG_RETENTION_PAUSE_SECONDS=0):
+            self.service = LogRetentionService()
+
+        now = TimezoneUtils.get_utc_now()
+        for log_id, days_ago in enumerate((40, 40, 35, 31, 20, 1), 1):
+            moment = now - timedelta(days=days_ago)
+            AccessLog.objects.create(
+                device_log_id=log_id, user_id=7, user_name='Usuário 7', event_type=7, portal_id=1,
+                device_timestamp=moment, created_at=moment, updated_at=moment,
+                raw_data=dict(device_log(log_id), card_value='123', identifier_id=0),
+                processed_data={'session': {'reason': 'allow'}, 'extra': 'x' * 100},
+                processing_status='processed', session_processed=True,
+            )
+
+    def test_purge_archives_old_logs_in_chunks_and_restores(self):
+        stats = self.service.run_retention(days=30, datasets=['access_logs'])['results']['access_logs']
+
+        self.assertEqual(stats['deleted'], 4)
+        self.assertEqual(stats['archived'], 4)
+        self.assertEqual(stats['chunks'], 2)
+        self.assertEqual(sorted(AccessLog.objects.values_list('device_log_id', flat=True)), [5, 6])
+        archived = list(self.service.query_archive('access_logs'))
+        self.assertEqual(sorted(row['device_log_id'] for row in archived), [1, 2, 3, 4])
+
+        # Restaurar duas vezes não duplica
+        self.service.restore('access_logs')
+        self.service.restore('access_logs')
+        self.assertEqual(AccessLog.objects.count(), 6)
+
+    def test_compact_keeps_original_id_and_stored_session(self):
+        self.assertEqual(self.service.compact_raw_data(days=30), 4)
+
+        log = AccessLog.objects.get(device_log_id=1)
+        self.assertEqual(log.raw_data, {'id': 1, 'compacted': True})
+        self.assertEqual(log.processed_data, {'session': {'reason': 'allow'}})
+        self.assertEqual(stored_outcome(log.processing_status, log.processed_data), ('processed', 'allow'))
+        self.assertIn('card_value', AccessLog.objects.get(device_log_id=5).raw_data)
+
+        # Já compactados não são reescritos
+        self.assertEqual(self.service.compact_raw_data(days=30), 0)
+
+
+@override_settings(METRICS_TOKEN='segredo')
+class MetricsCollectTests(TestCase):
+    """Métricas combinadas dos processos do pipeline."""
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def publish(self, role, ingested):
+        """Publica como o processo `role` (outro processo: as métricas locais voltam a zero)."""
+        metrics.reset()
+        logs_ingested.inc(ingested)
+        with override_settings(METRICS_ROLE=role):
+            publish_snapshot(force=True)
+        metrics.reset()
+
+    def samples(self, collected, name):
+        return {tuple(labels): value for labels, value in collected[f'{metrics.prefix}{name}']['samples']}
+
+    def test_restarted_process_replaces_its_snapshot(self):
+        self.publish('run_background_runtime', 40)
+        self.publish('logs-p0:0', 7)
+        # O runtime reiniciou: contagem nova no mesmo papel, não somada à anterior
+        self.publish('run_background_runtime', 3)
+
+        self.assertEqual(MetricsSnapshot.objects.count(), 2)
+        ingested = self.samples(collect(), 'logs_ingested_total')
+        self.assertEqual(ingested, {
+            (f'{socket.gethostname()}:run_background_runtime',): 3,
+            (f'{socket.gethostname()}:logs-p0:0',): 7,
+        })
+
+    def test_lags_are_per_device_in_the_latest_epoch(self):
+        device_head_log_id.set(120, **position_labels(1, 0))
+        last_synced_log_id.set(100, **position_labels(1, 0))
+        last_session_processed_log_id.set(90, **position_labels(1, 0))
+        # Dispositivo 2 reiniciou a numeração: a geração 0 antiga não conta mais
+        device_head_log_id.set(5000, **position_labels(2, 0))
+        last_synced_log_id.set(5000, **position_labels(2, 0))
+        last_session_processed_log_id.set(5000, **position_labels(2, 0))
+        device_head_log_id.set(8, **position_labels(2, 1))
+        last_synced_log_id.set(6, **position_labels(2, 1))
+
+        collected = collect()
+
+        self.assertEqual(self.samples(collected, 'ingest_lag_ids'), {('1',): 20, ('2',): 2})
+        self.assertEqual(self.samples(collected, 'processing_lag_ids'), {('1',): 10, ('2',): 6})
+
+    def test_token_only_in_header(self):
+        self.assertEqual(self.client.get('/api/v1/logs/metrics/?token=segredo').status_code, 403)
+        response = self.client.get('/api/v1/logs/metrics/', HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('logs_ingested_total', response.content.decode())
@@ -13,4 +13,11 @@ urlpatterns = [
     path('api/monitor-status/', views.api_monitor_status, name='api_monitor_status'),
     path('api/realtime-logs/', views.api_realtime_logs, name='api_realtime_logs'),
     path('api/logs-publicos/', views.api_logs_publicos, name='api_logs_publicos'),
+    path('api/pipeline-metrics/', views.api_pipeline_metrics, name='api_pipeline_metrics'),
+    path('api/reprocess-employee/', views.api_reprocess_employee, name='api_reprocess_employee'),
+    path('metrics/', views.metrics_prometheus, name='metrics_prometheus'),
+    # Notificações push da catraca (sem barra final: a catraca monta <caminho>/<notificação>)
+    path('push/<slug:notification>', views.device_push, name='device_push'),
+    # Token no caminho: só para monitores sem header Authorization (fica nos logs de acesso)
+    path('push/<str:token>/<slug:notification>', views.device_push, name='device_push_token'),
 ]
\ No newline at end of file
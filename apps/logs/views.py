@@ -1,17 +1,25 @@
 """
 Views para logs de acesso.
 """
+import json
+import logging
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from datetime import datetime, timedelta
 from .models import AccessLog, SystemLog
+from .filters import filter_access_logs
 from .services import log_monitor_service
 from apps.employees.models import Employee
 
+logger = logging.getLogger(__name__)
+
 
 @staff_member_required
 def historico_acessos(request):
@@ -25,39 +33,8 @@ def historico_acessos(request):
     date_to = request.GET.get('date_to', '')
     user_id = request.GET.get('user_id', '')
     
-    # Query base
-    logs = AccessLog.objects.all().order_by('-device_timestamp')
-    
-    # Aplicar filtros
-    if search:
-        logs = logs.filter(
-            Q(user_name__icontains=search) |
-            Q(user_id__icontains=search) |
-            Q(device_log_id__icontains=search)
-        )
-    
-    if event_type:
-        logs = logs.filter(event_type=event_type)
-    
-    if portal_id:
-        logs = logs.filter(portal_id=portal_id)
-    
-    if user_id:
-        logs = logs.filter(user_id=user_id)
-    
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            logs = logs.filter(device_timestamp__date__gte=date_from_obj.date())
-        except ValueError:
-            pass
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-            logs = logs.filter(device_timestamp__date__lte=date_to_obj.date())
-        except ValueError:
-            pass
+    # Query base com os filtros compartilhados com a exportação
+    logs = filter_access_logs(request.GET).order_by('-device_timestamp')
     
     # Paginação
     paginator = Paginator(logs, 50)  # 50 logs por página
@@ -288,6 +265,139 @@ def api_monitor_status(request):
     
     return JsonResponse(status)
 
+def metrics_prometheus(request):
+    """
+    Métricas do pipeline no formato de texto do Prometheus.
+    
+    Acesso para staff ou com o token METRICS_TOKEN no header
+    `Authorization: Bearer <token>` (não na URL, que fica nos logs de acesso).
+    """
+    from django.conf import settings
+    from django.http import HttpResponse, HttpResponseForbidden
+    from apps.core.metrics import MetricsRegistry
+    from .metrics import collect
+    
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    supplied = authorization[len('Bearer '):].strip() if authorization.startswith('Bearer ') else ''
+    is_staff = request.user.is_authenticated and request.user.is_staff
+    if not is_staff and not (token and constant_time_compare(supplied, token)):
+        return HttpResponseForbidden('Acesso negado\n', content_type='text/plain')
+    
+    return HttpResponse(
+        MetricsRegistry.render(collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def device_push(request, notification, token=''):
+    """
+    Receptor das notificações push do IDFace (monitor online).
+    
+    O monitor da catraca deve apontar para `/api/v1/logs/push`, com o token
+    no header `Authorization: Bearer <DEVICE_PUSH_TOKEN>` e/ou restrito aos
+    endereços de DEVICE_PUSH_ALLOWED_IPS. O token no caminho
+    (`/api/v1/logs/push/<token>`) é aceito para monitores que não enviam
+    headers, mas fica gravado nos logs de acesso do servidor web. Sem token
+    e sem lista de IPs, todas as notificações são recusadas.
+    """
+    from django.conf import settings
+    from .push import NOTIFICATIONS, push_enabled, push_receiver
+    
+    if not push_enabled():
+        return JsonResponse({'success': False, 'error': 'Push desabilitado'}, status=404)
+    
+    expected = getattr(settings, 'DEVICE_PUSH_TOKEN', '')
+    allowed_ips = getattr(settings, 'DEVICE_PUSH_ALLOWED_IPS', [])
+    if not expected and not allowed_ips:
+        # Sem autenticação qualquer um poderia forjar logs e giros (e bloquear funcionários)
+        logger.error("Notificação push recusada: DEVICE_PUSH_ENABLED sem DEVICE_PUSH_TOKEN nem DEVICE_PUSH_ALLOWED_IPS")
+        return JsonResponse({'success': False, 'error': 'Push sem autenticação configurada'}, status=403)
+    
+    if allowed_ips and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        logger.warning(f"Notificação push recusada de {request.META.get('REMOTE_ADDR')}")
+        return JsonResponse({'success': False, 'error': 'Acesso negado'}, status=403)
+    
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):].strip()
+    else:
+        supplied = token
+        if token:
+            logger.debug("Token de push recebido no caminho da URL - prefira o header Authorization: Bearer")
+    if expected and not constant_time_compare(supplied, expected):
+        return JsonResponse({'success': False, 'error': 'Acesso negado'}, status=403)
+    
+    if notification not in NOTIFICATIONS:
+        return JsonResponse({'success': False, 'error': f'Notificação desconhecida: {notification}'}, status=404)
+    
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    
+    try:
+        result = push_receiver.handle(notification, payload, remote_addr=request.META.get('REMOTE_ADDR'))
+    except Exception as e:
+        # 500 faz a catraca reenviar; a reconciliação por polling cobre o restante
+        logger.error(f"Erro ao processar notificação push {notification}: {e}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    
+    return JsonResponse({'success': True, **result})
+
+
+@staff_member_required
+def api_pipeline_metrics(request):
+    """API com o resumo das métricas do pipeline (AJAX do monitor)."""
+    from .metrics import summary
+    
+    return JsonResponse({
+        'success': True,
+        'metrics': summary(),
+        'timestamp': timezone.now().isoformat(),
+    })
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def api_reprocess_employee(request):
+    """
+    Reprocessa um funcionário a partir de um log ou horário.
+    
+    Parâmetros (form ou JSON): user_id, from_log_id ou since (ISO 8601), dry_run.
+    """
+    from django.utils.dateparse import parse_datetime
+    from .reprocess import employee_reprocessor
+    
+    if request.content_type == 'application/json':
+        try:
+            params = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'JSON inválido'}, status=400)
+    else:
+        params = request.POST
+    
+    try:
+        user_id = int(params.get('user_id'))
+        from_log_id = int(params['from_log_id']) if params.get('from_log_id') else None
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'user_id e from_log_id devem ser números'}, status=400)
+    
+    since = None
+    if params.get('since'):
+        since = parse_datetime(str(params['since']))
+        if since is None:
+            return JsonResponse({'success': False, 'message': 'since inválido (use ISO 8601)'}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    
+    dry_run = str(params.get('dry_run', '')).lower() in ('1', 'true', 'on', 'yes')
+    result = employee_reprocessor.reprocess(user_id, from_log_id=from_log_id, since=since, dry_run=dry_run)
+    return JsonResponse(result, status=200 if result['success'] else 400)
+
+
 @staff_member_required
 def realtime_monitor(request):
     """Página de monitor em tempo real."""
@@ -6,21 +6,33 @@ import time
 import logging
 from datetime import datetime, timedelta
 from django.utils import timezone
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from django.db import transaction
 from django.conf import settings
+from apps.devices.async_client import ConcurrentDevicePoller
+from apps.devices.circuit_breaker import circuit_breakers
 from apps.devices.device_client import DeviceClient
-from apps.logs.models import AccessLog, SystemLog
+from apps.devices.models import Device
+from apps.logs.models import AccessLog, DeviceLogCursor, SystemLog
 from apps.employees.models import Employee
 from apps.core.utils import TimezoneUtils
+from apps.core.registry import service_registry
+from .metrics import (
+    device_head_log_id, ingest_batch_seconds, ingest_batch_size, last_synced_log_id, logs_ingested, position_labels,
+)
+from .scheduling import AdaptiveInterval, get_traffic_profile
+from .backfill import backfill_engine
 
 logger = logging.getLogger(__name__)
 
 
 class AccessLogWorker:
     """
-    Worker responsável por sincronizar logs da catraca com o banco de dados,
+    Worker responsável por sincronizar logs das catracas com o banco de dados,
     garantindo sequência e tolerância a quedas.
+    
+    Cada Device habilitado tem o seu cursor (DeviceLogCursor); os dispositivos
+    são consultados em paralelo e os lotes gravados intercalados por timestamp.
     """
     
     def __init__(self):
@@ -31,8 +43,22 @@ class AccessLogWorker:
         self.consecutive_errors = 0
         self.max_consecutive_errors = 10
         self.sync_interval = getattr(settings, 'LOG_SYNC_INTERVAL', 2)  # 2 segundos
+        # Intervalo adaptativo: sync_interval após logs novos, crescendo até o máximo quando ocioso
+        self.schedule = AdaptiveInterval(
+            'log_sync', self.sync_interval, getattr(settings, 'LOG_SYNC_MAX_INTERVAL', 10),
+            profile=get_traffic_profile(),
+        )
+        # Com notificações push ativas, o polling só reconcilia o que não chegou por push
+        self.reconcile_interval = getattr(settings, 'LOG_SYNC_RECONCILE_INTERVAL', 30)
         self.batch_size = getattr(settings, 'LOG_SYNC_BATCH_SIZE', 50)
         self.device_id = getattr(settings, 'LOG_SYNC_DEVICE_ID', 1)
+        self.poller = ConcurrentDevicePoller()
+        self.cursors: Dict[int, DeviceLogCursor] = {}
+        # Atraso maior que LOG_BACKFILL_THRESHOLD IDs vai para o backfill (0 desativa)
+        self.backfill_threshold = getattr(settings, 'LOG_BACKFILL_THRESHOLD', 1000)
+        self.backlog_check_interval = 60  # segundos entre verificações por dispositivo
+        self._backlog_checked: Dict[int, float] = {}
+        self._reset_checked: Dict[int, float] = {}
         
         # Configurações de retry
         self.retry_delay = 5  # segundos
@@ -45,12 +71,14 @@ class AccessLogWorker:
             return False
             
         try:
-            # Inicializar cliente da catraca
-            self.client = DeviceClient(None)  # Usar configurações do settings
-            if not self.client.login():
-                logger.error("Falha ao fazer login na catraca")
+            devices = self.load_devices()
+            if not devices:
+                logger.error("Nenhum dispositivo habilitado para sincronizar logs")
                 return False
-                
+            
+            # Cliente do primeiro dispositivo (consulta de nomes de usuários)
+            self.client = DeviceClient(devices[0])
+            
             # Obter último ID sincronizado
             self._load_last_synced_id()
             
@@ -58,7 +86,14 @@ class AccessLogWorker:
             self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
             self.worker_thread.start()
             
-            logger.info(f"AccessLogWorker iniciado (intervalo: {self.sync_interval}s, batch: {self.batch_size})")
+            # Backfills interrompidos (queda do runtime) são retomados do checkpoint
+            if backfill_engine.claimable().exists():
+                backfill_engine.start()
+            
+            logger.info(
+                f"AccessLogWorker iniciado ({len(devices)} dispositivo(s), intervalo: {self.sync_interval}s, "
+                f"batch: {self.batch_size})"
+            )
             logger.info(f"Último ID sincronizado: {self.last_synced_id}")
             return True
             
@@ -73,8 +108,10 @@ class AccessLogWorker:
             return
             
         self.running = False
+        self.schedule.nudge()
         if self.worker_thread and self.worker_thread.is_alive():
             self.worker_thread.join(timeout=5)
+        backfill_engine.stop()
             
         logger.info("AccessLogWorker parado")
     
@@ -100,6 +137,7 @@ class AccessLogWorker:
             try:
                 # Sincronizar logs
                 synced_count = self._sync_logs()
+                self.schedule.record(synced_count)
                 
                 if synced_count > 0:
                     logger.info(f"{synced_count} logs sincronizados (último ID: {self.last_synced_id})")
@@ -113,7 +151,7 @@ class AccessLogWorker:
                         logger.debug(f"Nenhum log novo para sincronizar (último ID: {self.last_synced_id})")
                 
                 # Aguardar próximo ciclo
-                time.sleep(self.sync_interval)
+                self._wait_next_cycle()
                 
             except Exception as e:
                 logger.error(f"Erro no ciclo do AccessLogWorker: {e}")
@@ -131,60 +169,272 @@ class AccessLogWorker:
         
         logger.info("Loop do AccessLogWorker finalizado")
     
+    def _wait_next_cycle(self):
+        """
+        Aguarda o intervalo adaptativo; enquanto a catraca estiver enviando
+        notificações push, continua aguardando até completar o intervalo de
+        reconciliação.
+        """
+        from .push import push_active
+        
+        waited = 0
+        while self.running:
+            waited += self.schedule.wait()
+            if waited >= self.reconcile_interval or not push_active():
+                return
+    
+    def load_devices(self) -> List[Device]:
+        """
+        Dispositivos habilitados, recarregados a cada ciclo: uma catraca
+        cadastrada no admin entra na sincronização seguinte, sem novo deploy.
+        
+        Sem nenhum Device cadastrado, cria o dispositivo primário a partir de
+        PRIMARY_DEVICE_* (instalações anteriores à ingestão por dispositivo).
+        """
+        devices = list(Device.objects.filter(is_enabled=True).order_by('id'))
+        if devices or Device.objects.exists():
+            return devices
+        
+        device, created = Device.objects.get_or_create(
+            ip_address=settings.PRIMARY_DEVICE_IP,
+            port=settings.PRIMARY_DEVICE_PORT,
+            defaults={
+                'name': 'Catraca Principal',
+                'device_type': 'primary',
+                'username': settings.PRIMARY_DEVICE_USERNAME,
+                'password': settings.PRIMARY_DEVICE_PASSWORD,
+                'use_https': settings.PRIMARY_DEVICE_USE_HTTPS,
+            },
+        )
+        if created:
+            logger.info(f"Dispositivo primário cadastrado a partir do settings: {device}")
+        return [device]
+    
+    def _load_cursors(self, devices: List[Device]) -> Dict[int, DeviceLogCursor]:
+        """Cursores dos dispositivos (relidos do banco: o receptor push também os avança)."""
+        cursors = {
+            cursor.device_id: cursor
+            for cursor in DeviceLogCursor.objects.filter(device_id__in=[device.id for device in devices])
+        }
+        for device in devices:
+            if device.id not in cursors:
+                # Os logs sem dispositivo (anteriores aos cursores) pertencem à catraca primária
+                cursors[device.id] = DeviceLogCursor.for_device(device, claim_legacy=device.device_type == 'primary')
+        for cursor in cursors.values():
+            last_synced_log_id.set(cursor.last_log_id, **position_labels(cursor.device_id, cursor.log_epoch))
+        self.cursors = cursors
+        return cursors
+    
     def _sync_logs(self) -> int:
-        """Sincroniza logs da catraca com o banco."""
+        """Sincroniza os logs de todos os dispositivos habilitados (em paralelo)."""
         try:
-            # Verificar conexão
-            if not self.client.is_connected():
-                logger.warning("Conexão perdida, tentando reconectar...")
-                if not self.client.login():
-                    logger.error("Falha ao reconectar")
-                    return 0
-            
-            # Buscar logs da catraca (apenas IDs positivos para evitar logs manuais)
-            logs = self.client.get_recent_access_logs(
-                limit=self.batch_size,
-                min_id=max(1, self.last_synced_id)  # Garantir que min_id seja sempre positivo
-            )
+            devices = self.load_devices()
+            if not devices:
+                return 0
+            cursors = self._load_cursors(devices)
             
-            if not logs:
+            # Dispositivos com o circuito aberto ficam fora do ciclo; a sonda cuida da reconexão
+            ready = []
+            for device in devices:
+                circuit = circuit_breakers.get(device.base_url)
+                if circuit.allow_request():
+                    ready.append(device)
+                else:
+                    circuit.schedule_probe(DeviceClient(device)._login)
+            if not ready:
+                logger.debug("Circuito aberto em todos os dispositivos - sincronização adiada")
                 return 0
             
-            # Verificar se o dispositivo foi reinicializado
-            # Se todos os logs do dispositivo têm IDs menores que o último sincronizado,
-            # provavelmente o dispositivo foi reinicializado
-            max_device_log_id = max(log.get('id', 0) for log in logs)
-            if max_device_log_id < self.last_synced_id:
-                logger.warning(f"Dispositivo pode ter sido reinicializado! "
-                             f"Último ID sincronizado: {self.last_synced_id}, "
-                             f"Maior ID no dispositivo: {max_device_log_id}")
-                
-                # Buscar logs mais recentes sem filtro de min_id
-                logs = self.client.get_recent_access_logs(
-                    limit=self.batch_size,
-                    min_id=0
-                )
-                
-                if not logs:
-                    return 0
+            results = self.poller.poll_sync(
+                ready, {device.id: cursors[device.id].last_log_id for device in ready}, limit=self.batch_size,
+            )
+            
+            batches = []
+            for result in results:
+                device = result['device']
+                circuit = circuit_breakers.get(device.base_url)
+                cursor = cursors[device.id]
+                if not result['success']:
+                    circuit.record_failure(result['error'])
+                    cursor.record_error(result['error'])
+                    logger.warning(f"Falha ao buscar logs de {device.name}: {result['error']}")
+                    continue
                 
-                logger.info(f"Buscando logs sem filtro de ID. Encontrados {len(logs)} logs")
+                circuit.record_success()
+                if len(result['logs']) >= self.batch_size and self._hand_off_backlog(device, cursor):
+                    continue
+                if result['logs']:
+                    # A busca é crescente a partir do cursor: o maior ID retornado é o mais novo visto
+                    device_head_log_id.set_max(
+                        max(log.get('id', 0) for log in result['logs']),
+                        **position_labels(device.id, cursor.log_epoch),
+                    )
+                    batches.append((device, result['logs']))
+                elif not self._check_device_reset(device, cursor):
+                    # Página vazia: a catraca não tem nada além do cursor
+                    device_head_log_id.set_max(cursor.last_log_id, **position_labels(device.id, cursor.log_epoch))
+                    if cursor.last_error:
+                        cursor.advance(cursor.last_log_id)
             
-            # Processar logs em lote
-            synced_count = 0
-            with transaction.atomic():
-                for log_data in logs:
-                    if self._process_log_data(log_data):
-                        synced_count += 1
-                        self.last_synced_id = max(self.last_synced_id, log_data.get('id', 0))
+            if not batches:
+                return 0
             
+            synced_count, _ = self.ingest_batches(batches, cursors)
             return synced_count
             
         except Exception as e:
             logger.error(f"Erro ao sincronizar logs: {e}")
             return 0
     
-    def _process_log_data(self, log_data: Dict) -> bool:
+    def _hand_off_backlog(self, device: Device, cursor: DeviceLogCursor) -> bool:
+        """
+        Página cheia: se o dispositivo estiver muito atrás, transfere o atraso
+        para o backfill e o tail segue a partir dos logs mais recentes.
+        """
+        if not self.backfill_threshold:
+            return False
+        now = time.monotonic()
+        if now - self._backlog_checked.get(device.id, 0) < self.backlog_check_interval:
+            return False
+        self._backlog_checked[device.id] = now
+        
+        try:
+            head_id = self.poller.head_log_id_sync(device)
+        except Exception as e:
+            logger.warning(f"Não foi possível consultar o último log de {device.name}: {e}")
+            return False
+        device_head_log_id.set_max(head_id, **position_labels(device.id, cursor.log_epoch))
+        return backfill_engine.hand_off(device, cursor, head_id, keep=self.batch_size) is not None
+    
+    def _check_device_reset(self, device: Device, cursor: DeviceLogCursor) -> bool:
+        """
+        Página vazia: se o maior ID da catraca ficou abaixo do cursor, a
+        numeração foi reiniciada (tabela de logs limpa ou reset de fábrica) e a
+        busca após o cursor nunca mais retornaria logs. Nesse caso os logs
+        gravados ficam na geração anterior e o cursor volta para 0 numa nova
+        geração (DeviceLogCursor.rewind_after_reset).
+        """
+        if cursor.last_log_id <= 0:
+            return False
+        now = time.monotonic()
+        if now - self._reset_checked.get(device.id, 0) < self.backlog_check_interval:
+            return False
+        self._reset_checked[device.id] = now
+        
+        try:
+            head_id = self.poller.head_log_id_sync(device)
+        except Exception as e:
+            logger.warning(f"Não foi possível consultar o último log de {device.name}: {e}")
+            return False
+        if head_id >= cursor.last_log_id:
+            return False
+        
+        last_log_id = cursor.last_log_id
+        log_epoch = cursor.rewind_after_reset(head_id)
+        device_head_log_id.set(head_id, **position_labels(device.id, log_epoch))
+        last_synced_log_id.set(0, **position_labels(device.id, log_epoch))
+        logger.warning(
+            f"Dispositivo {device.name} pode ter sido reinicializado! Último ID sincronizado: "
+            f"{last_log_id}, maior ID no dispositivo: {head_id} - cursor reiniciado na geração {log_epoch}"
+        )
+        SystemLog.log_warning(
+            f"Reinicialização da numeração de logs detectada em {device.name}",
+            category='device',
+            details={
+                'device_id': device.id,
+                'last_synced_id': last_log_id,
+                'device_head_id': head_id,
+                'log_epoch': log_epoch,
+            },
+        )
+        return True
+    
+    def ingest_logs(self, logs: List[Dict], device: Optional[Device] = None):
+        """
+        Grava um lote de logs de um dispositivo numa transação.
+        
+        Sem device, os logs são atribuídos ao primeiro dispositivo habilitado.
+        
+        Returns:
+            tuple: (quantidade sincronizada, lista de AccessLog criados)
+        """
+        if device is None:
+            devices = self.load_devices()
+            device = devices[0] if devices else None
+        return self.ingest_batches([(device, logs)])
+    
+    def ingest_batches(self, batches: List[Tuple[Optional[Device], List[Dict]]],
+                       cursors: Optional[Dict[int, DeviceLogCursor]] = None):
+        """
+        Grava numa transação os lotes de vários dispositivos, intercalados por
+        timestamp (a ordem em que as sessões os processam), e avança os cursores.
+        
+        No modo distribuído (LOG_PROCESSING_MODE='celery') os logs criados são
+        enfileirados para processamento após o commit.
+        
+        Returns:
+            tuple: (quantidade sincronizada, lista de AccessLog criados)
+        """
+        from .distributed import is_distributed, log_dispatcher
+        
+        entries = [(device, log_data) for device, logs in batches for log_data in logs]
+        entries.sort(key=lambda entry: (
+            entry[1].get('time') or 0, entry[0].id if entry[0] else 0, entry[1].get('id') or 0,
+        ))
+        
+        synced_count = 0
+        synced_id = self.last_synced_id
+        created = []
+        started = time.perf_counter()
+        # Se uma gravação falhar a transação inteira é desfeita e o cursor não
+        # avança: o lote é buscado de novo no próximo ciclo
+        with transaction.atomic():
+            device_cursors = {
+                device.id: (cursors or {}).get(device.id) or DeviceLogCursor.for_device(device)
+                for device, logs in batches if device is not None and logs
+            }
+            for device, log_data in entries:
+                cursor = device_cursors.get(device.id) if device else None
+                if self._process_log_data(log_data, device, created, cursor.log_epoch if cursor else 0):
+                    synced_count += 1
+                    synced_id = max(synced_id, log_data.get('id', 0))
+            
+            for device, logs in batches:
+                if device is None or not logs:
+                    continue
+                cursor = device_cursors[device.id]
+                device_created = [log for log in created if log.device_id == device.id]
+                cursor.advance(
+                    max(log_data.get('id') or 0 for log_data in logs),
+                    last_log_at=max((log.device_timestamp for log in device_created), default=None),
+                    logs=len(device_created),
+                )
+        
+        self.last_synced_id = synced_id
+        ingest_batch_seconds.observe(time.perf_counter() - started)
+        ingest_batch_size.observe(len(entries))
+        logs_ingested.inc(len(created))
+        for cursor in device_cursors.values():
+            last_synced_log_id.set(cursor.last_log_id, **position_labels(cursor.device_id, cursor.log_epoch))
+        
+        if created:
+            if is_distributed():
+                log_dispatcher.enqueue(created)
+            else:
+                self._wake_session_monitor()
+        
+        return synced_count, created
+    
+    @staticmethod
+    def _wake_session_monitor():
+        """Acorda o processamento de sessões deste processo (se estiver aguardando ocioso)."""
+        from .services import log_monitor_service
+        
+        if log_monitor_service.is_initialized and log_monitor_service.running:
+            log_monitor_service.schedule.nudge()
+    
+    def _process_log_data(self, log_data: Dict, device: Optional[Device] = None,
+                          created: Optional[List] = None, log_epoch: int = 0) -> bool:
         """Processa um log individual da catraca."""
         try:
             log_id = log_data.get('id')
@@ -197,59 +447,83 @@ class AccessLogWorker:
                 logger.debug(f"Log {log_id} é manual (ID negativo), ignorando")
                 return True
             
-            # Verificar se já existe
-            if AccessLog.objects.filter(device_log_id=log_id).exists():
+            # Verificar se já existe (IDs são únicos por dispositivo e geração da numeração)
+            device_id = device.id if device else None
+            if AccessLog.objects.filter(device_id=device_id, log_epoch=log_epoch, device_log_id=log_id).exists():
                 logger.debug(f"Log {log_id} já existe, ignorando")
                 return True
             
-            # Mapear dados do log
-            user_id = log_data.get('user_id', 0)
-            event_code = log_data.get('event', 0)
-            portal_id = log_data.get('portal_id', 1)
-            timestamp = log_data.get('time', 0)
-            
-            # Usar timestamp exato da catraca (sem conversão)
-            if timestamp:
-                # A catraca envia timestamp Unix que precisa ser ajustado
-                # O timestamp Unix da catraca está 3 horas atrás do correto
-                import pytz
-                local_tz = pytz.timezone('America/Sao_Paulo')
-                # Ajustar o timestamp Unix adicionando 3 horas (10800 segundos)
-                adjusted_timestamp = timestamp + 10800
-                local_time = datetime.fromtimestamp(adjusted_timestamp, tz=local_tz)
-                device_timestamp = local_time.astimezone(pytz.UTC)
-            else:
-                device_timestamp = timezone.now()
-            
-            # Obter nome do usuário
-            user_name = self._get_user_name(user_id, log_data)
-            
-            # Mapear evento
-            event_description = self._map_event_code(event_code)
-            
-            # Criar log no banco
-            # created_at deve ser exatamente igual ao device_timestamp (horário local)
-            access_log = AccessLog.objects.create(
-                device_log_id=log_id,
-                user_id=user_id,
-                user_name=user_name,
-                event_type=event_code,
-                event_description=event_description,
-                portal_id=portal_id,
-                device_timestamp=device_timestamp,
-                raw_data=log_data,
-                processing_status='pending',
-                created_at=device_timestamp,
-                updated_at=device_timestamp
+            access_log = self.build_access_log(
+                log_data, device, self._get_user_name(log_data.get('user_id', 0), log_data), log_epoch=log_epoch,
             )
+            access_log.save(force_insert=True)
+            
+            if created is not None:
+                created.append(access_log)
             
-            logger.debug(f"Log {log_id} criado: {user_name} - {event_description}")
+            logger.debug(f"Log {log_id} criado: {access_log.user_name} - {access_log.event_description}")
             return True
             
         except Exception as e:
             logger.error(f"Erro ao processar log {log_data.get('id', 'unknown')}: {e}")
             return False
     
+    def build_access_log(self, log_data: Dict, device: Optional[Device], user_name: str,
+                         **fields) -> AccessLog:
+        """
+        Monta (sem gravar) o AccessLog de um log da catraca.
+        
+        Usado pela ingestão ao vivo e pelo backfill (bulk insert); campos extras
+        (ex: status de processamento) podem ser passados em fields.
+        """
+        user_id = log_data.get('user_id', 0)
+        event_code = log_data.get('event', 0)
+        timestamp = log_data.get('time', 0)
+        
+        # Usar timestamp exato da catraca (sem conversão)
+        if timestamp:
+            # A catraca envia timestamp Unix que precisa ser ajustado
+            # O timestamp Unix da catraca está 3 horas atrás do correto
+            import pytz
+            local_tz = pytz.timezone('America/Sao_Paulo')
+            # Ajustar o timestamp Unix adicionando 3 horas (10800 segundos)
+            adjusted_timestamp = timestamp + 10800
+            local_time = datetime.fromtimestamp(adjusted_timestamp, tz=local_tz)
+            device_timestamp = local_time.astimezone(pytz.UTC)
+        else:
+            device_timestamp = timezone.now()
+        
+        # created_at deve ser exatamente igual ao device_timestamp (horário local)
+        values = {
+            'device_log_id': log_data.get('id'),
+            'user_id': user_id,
+            'user_name': user_name,
+            'event_type': event_code,
+            'event_description': self._map_event_code(event_code),
+            'device_id': device.id if device else None,
+            'device_name': device.name if device else None,
+            'portal_id': log_data.get('portal_id', 1),
+            'device_timestamp': device_timestamp,
+            'raw_data': log_data,
+            'processing_status': 'pending',
+            'created_at': device_timestamp,
+            'updated_at': device_timestamp,
+        }
+        values.update(fields)
+        return AccessLog(**values)
+    
+    @staticmethod
+    def resolve_user_names(user_ids) -> Dict[int, str]:
+        """Nomes dos funcionários ativos em uma única consulta (sem consultar a catraca)."""
+        user_ids = set(user_ids)
+        names = dict(
+            Employee.objects.filter(device_id__in=user_ids, is_active=True).values_list('device_id', 'name')
+        )
+        return {
+            user_id: "Não Identificado" if user_id == 0 else names.get(user_id, f'Usuário {user_id}')
+            for user_id in user_ids
+        }
+    
     def _get_user_name(self, user_id: int, log_data: Dict) -> str:
         """Obtém o nome do usuário."""
         if user_id == 0:
@@ -302,10 +576,26 @@ class AccessLogWorker:
             'last_synced_id': self.last_synced_id,
             'consecutive_errors': self.consecutive_errors,
             'sync_interval': self.sync_interval,
+            'poll_interval': self.schedule.get_status(),
+            'reconcile_interval': self.reconcile_interval,
             'batch_size': self.batch_size,
-            'connected': self.client.is_connected() if self.client else False
+            'backfill': backfill_engine.get_status(),
+            'connected': self.client.is_connected() if self.client else False,
+            'circuit': self.client.circuit.get_status() if self.client else None,
+            'devices': [
+                {
+                    'device_id': device_id,
+                    'log_epoch': cursor.log_epoch,
+                    'head_log_id': device_head_log_id.value(**position_labels(device_id, cursor.log_epoch)),
+                    'last_log_id': cursor.last_log_id,
+                    'last_synced_at': cursor.last_synced_at,
+                    'logs_synced': cursor.logs_synced,
+                    'last_error': cursor.last_error or None,
+                }
+                for device_id, cursor in sorted(self.cursors.items())
+            ],
         }
 
 
 # Instância global do worker
-access_log_worker = AccessLogWorker()
+access_log_worker = service_registry.register('logs.access_log_worker', AccessLogWorker)
@@ -11,6 +11,7 @@ from .models import EmployeeSession
 from apps.employees.models import Employee
 from apps.core.models import SystemConfiguration
 from apps.logs.models import SystemLog
+from apps.core.registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -273,4 +274,4 @@ class SessionService:
 
 
 # Instância global do serviço
-session_service = SessionService()
+session_service = service_registry.register('sessions.session_service', SessionService)
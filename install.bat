@@ -154,6 +154,7 @@ echo 🚀 CRIANDO SCRIPT DE INICIALIZAÇÃO...
     echo @echo off
     echo echo 🚀 Iniciando Sistema de Interjornada...
     echo call venv\Scripts\activate.bat
+    echo start "Runtime Interjornada" python manage.py run_background_runtime
     echo python manage.py runserver 8000
     echo pause
 ) > start_server.bat
@@ -253,6 +253,7 @@ LOG_LEVEL=INFO
                 f.write(f"""@echo off
 echo 🚀 Iniciando Sistema de Interjornada...
 cd /d "{self.project_root}"
+start "Runtime Interjornada" "{python_path}" manage.py run_background_runtime
 "{python_path}" manage.py runserver 8000
 pause
 """)
@@ -265,6 +266,9 @@ pause
                 f.write(f"""#!/bin/bash
 echo "🚀 Iniciando Sistema de Interjornada..."
 cd "{self.project_root}"
+"{python_path}" manage.py run_background_runtime &
+RUNTIME_PID=$!
+trap "kill $RUNTIME_PID" EXIT
 "{python_path}" manage.py runserver 8000
 """)
             os.chmod(start_script, 0o755)
@@ -155,6 +155,10 @@ cat > start_server.sh << 'EOF'
 #!/bin/bash
 echo "🚀 Iniciando Sistema de Interjornada..."
 source venv/bin/activate
+# Ingestão da catraca e sessões rodam num processo separado do servidor
+python manage.py run_background_runtime &
+RUNTIME_PID=$!
+trap "kill $RUNTIME_PID" EXIT
 python manage.py runserver 8000
 EOF
 
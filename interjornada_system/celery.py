@@ -38,6 +38,7 @@ app.conf.update(
     # Configurações de roteamento
     task_routes={
         'apps.devices.tasks.*': {'queue': 'devices'},
+        # process_log_entry_task é enviada explicitamente para logs.p<n> (partição do funcionário)
         'apps.logs.tasks.*': {'queue': 'logs'},
         'apps.interjornada.tasks.*': {'queue': 'interjornada'},
         'apps.dashboard.tasks.*': {'queue': 'dashboard'},
@@ -57,6 +58,10 @@ app.conf.update(
             'task': 'apps.interjornada.tasks.monitor_interjornada_task',
             'schedule': 5.0,  # A cada 5 segundos
         },
+        'retry-log-processing': {
+            'task': 'apps.logs.tasks.retry_failed_logs_task',
+            'schedule': 30.0,  # A cada 30 segundos (modo distribuído)
+        },
         'cleanup-old-logs': {
             'task': 'apps.logs.tasks.cleanup_old_logs_task',
             'schedule': 3600.0,  # A cada hora
@@ -65,6 +70,10 @@ app.conf.update(
             'task': 'apps.interjornada.tasks.update_daily_statistics_task',
             'schedule': 300.0,  # A cada 5 minutos
         },
+        'sync-employees': {
+            'task': 'apps.employees.tasks.periodic_employee_sync_task',
+            'schedule': 300.0,  # A cada 5 minutos (sem alterações, só o download)
+        },
     },
 )
 
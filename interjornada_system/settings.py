@@ -148,7 +148,77 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOG_MONITOR_INTERVAL = 1  # Intervalo em segundos entre verificações (1s para interjornada)
 LOG_MONITOR_BATCH_SIZE = 20  # Tamanho do lote para processamento (reduzido para resposta mais rápida)
 LOG_MONITOR_DEVICE_ID = 1  # ID do dispositivo para monitorar
-LOG_MONITOR_AUTO_START = True  # Iniciar monitoramento automaticamente
+
+# Intervalo de polling adaptativo: LOG_SYNC_INTERVAL/LOG_MONITOR_INTERVAL logo após
+# encontrar logs, crescendo (× LOG_POLL_BACKOFF) até o máximo enquanto ocioso.
+# Máximo igual ao mínimo mantém o intervalo fixo.
+LOG_SYNC_MAX_INTERVAL = config('LOG_SYNC_MAX_INTERVAL', default=10, cast=float)
+LOG_MONITOR_MAX_INTERVAL = config('LOG_MONITOR_MAX_INTERVAL', default=3, cast=float)
+LOG_POLL_BACKOFF = config('LOG_POLL_BACKOFF', default=1.5, cast=float)
+# Perfil de movimento por horário (histórico de AccessLog): intervalo mínimo nos
+# horários de pico e LOG_POLL_PROFILE_LEAD_MINUTES antes deles
+LOG_POLL_PROFILE_ENABLED = config('LOG_POLL_PROFILE_ENABLED', default=False, cast=bool)
+LOG_POLL_PROFILE_DAYS = config('LOG_POLL_PROFILE_DAYS', default=14, cast=int)
+LOG_POLL_PROFILE_SLOT_MINUTES = config('LOG_POLL_PROFILE_SLOT_MINUTES', default=15, cast=int)
+LOG_POLL_PROFILE_MIN_EVENTS = config('LOG_POLL_PROFILE_MIN_EVENTS', default=5, cast=float)
+LOG_POLL_PROFILE_LEAD_MINUTES = config('LOG_POLL_PROFILE_LEAD_MINUTES', default=15, cast=int)
+LOG_POLL_PROFILE_REFRESH_SECONDS = config('LOG_POLL_PROFILE_REFRESH_SECONDS', default=3600, cast=int)
+# Os processos Django não iniciam o runtime (ingestão + sessões): ele roda apenas em
+# `manage.py run_background_runtime`, iniciado também por start_system.py/quick_start.py.
+# Mantido desligado; se ligado, apenas avisa na inicialização (configurações antigas).
+LOG_MONITOR_AUTO_START = config('LOG_MONITOR_AUTO_START', default=False, cast=bool)
+
+# Runtime em segundo plano com líder único (lease com heartbeat no banco)
+RUNTIME_LEASE_TTL_SECONDS = config('RUNTIME_LEASE_TTL_SECONDS', default=30, cast=int)
+RUNTIME_HEARTBEAT_SECONDS = config('RUNTIME_HEARTBEAT_SECONDS', default=10, cast=int)
+
+# Processamento de logs: 'thread' (runtime em segundo plano) ou 'celery'
+# (tarefas por log em filas particionadas por funcionário: logs.p0 ... logs.pN-1)
+LOG_PROCESSING_MODE = config('LOG_PROCESSING_MODE', default='thread')
+LOG_PROCESSING_PARTITIONS = config('LOG_PROCESSING_PARTITIONS', default=4, cast=int)
+LOG_PROCESSING_MAX_ATTEMPTS = config('LOG_PROCESSING_MAX_ATTEMPTS', default=5, cast=int)
+LOG_PROCESSING_STALE_SECONDS = config('LOG_PROCESSING_STALE_SECONDS', default=60, cast=int)
+
+# Métricas do pipeline (endpoint Prometheus em /api/v1/logs/metrics/)
+# METRICS_TOKEN só é aceito no header Authorization: Bearer
+# METRICS_ROLE: papel estável do processo no snapshot (padrão: comando ou nó Celery)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ROLE = config('METRICS_ROLE', default='')
+METRICS_PUBLISH_SECONDS = config('METRICS_PUBLISH_SECONDS', default=15, cast=int)
+METRICS_SNAPSHOT_MAX_AGE_SECONDS = config('METRICS_SNAPSHOT_MAX_AGE_SECONDS', default=300, cast=int)
+MONITOR_STATUS_CACHE_SECONDS = config('MONITOR_STATUS_CACHE_SECONDS', default=5, cast=int)
+
+# Notificações push da catraca (monitor online do IDFace em /api/v1/logs/push/<notificação>).
+# Com notificações recentes, o polling de logs e giros cai para o intervalo de reconciliação.
+# Exige DEVICE_PUSH_TOKEN (header Authorization: Bearer) e/ou DEVICE_PUSH_ALLOWED_IPS:
+# sem nenhum dos dois o endpoint recusa todas as notificações.
+DEVICE_PUSH_ENABLED = config('DEVICE_PUSH_ENABLED', default=False, cast=bool)
+DEVICE_PUSH_TOKEN = config('DEVICE_PUSH_TOKEN', default='')
+DEVICE_PUSH_ALLOWED_IPS = config('DEVICE_PUSH_ALLOWED_IPS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+DEVICE_PUSH_STALE_SECONDS = config('DEVICE_PUSH_STALE_SECONDS', default=90, cast=int)
+LOG_SYNC_RECONCILE_INTERVAL = config('LOG_SYNC_RECONCILE_INTERVAL', default=30, cast=int)
+
+# Backfill de logs históricos (manage.py backfill_logs). Um dispositivo mais de
+# LOG_BACKFILL_THRESHOLD IDs atrás tem o atraso transferido para o backfill e a
+# sincronização ao vivo segue dos logs mais recentes (0 desativa).
+LOG_BACKFILL_THRESHOLD = config('LOG_BACKFILL_THRESHOLD', default=1000, cast=int)
+LOG_BACKFILL_PAGE_SIZE = config('LOG_BACKFILL_PAGE_SIZE', default=1000, cast=int)
+LOG_BACKFILL_PAUSE_SECONDS = config('LOG_BACKFILL_PAUSE_SECONDS', default=0.05, cast=float)
+LOG_BACKFILL_STALE_SECONDS = config('LOG_BACKFILL_STALE_SECONDS', default=120, cast=int)
+LOG_BACKFILL_RETRY_SECONDS = config('LOG_BACKFILL_RETRY_SECONDS', default=30, cast=int)
+# Os eventos do atraso transferido pelo tail (queda) seguem para o processamento de
+# sessões; False grava-os apenas como histórico, como as cargas iniciais
+LOG_BACKFILL_TAIL_PROCESS_SESSIONS = config('LOG_BACKFILL_TAIL_PROCESS_SESSIONS', default=True, cast=bool)
+
+# Reprocessamento de um funcionário (manage.py reprocess_employee). Os logs das
+# REPROCESS_LOOKBACK_HOURS anteriores ao ponto de partida reconstroem a sessão
+# daquele momento; o lease pausa apenas os logs do funcionário.
+REPROCESS_LOOKBACK_HOURS = config('REPROCESS_LOOKBACK_HOURS', default=48, cast=int)
+REPROCESS_LEASE_SECONDS = config('REPROCESS_LEASE_SECONDS', default=120, cast=int)
+
+# Índice de políticas: intervalo máximo para perceber, em cada processo, alterações
+# de regras/grupos/configuração feitas em outro processo (versão gravada no banco)
+POLICY_INDEX_VERSION_CHECK_SECONDS = config('POLICY_INDEX_VERSION_CHECK_SECONDS', default=5, cast=int)
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -230,11 +300,15 @@ GIRO_VALIDATION_TIMEOUT_SECONDS = config('GIRO_VALIDATION_TIMEOUT_SECONDS', defa
 # Configurações de Timeout
 DEVICE_CONNECTION_TIMEOUT = config('DEVICE_CONNECTION_TIMEOUT', default=15, cast=int)
 DEVICE_REQUEST_TIMEOUT = config('DEVICE_REQUEST_TIMEOUT', default=10, cast=int)
+# Prazo de cada dispositivo no monitoramento concorrente (0 = request_timeout do dispositivo)
+DEVICE_POLL_DEADLINE_SECONDS = config('DEVICE_POLL_DEADLINE_SECONDS', default=0, cast=float)
 
 # Configurações de Reconexão
 MAX_RECONNECTION_ATTEMPTS = config('MAX_RECONNECTION_ATTEMPTS', default=10, cast=int)
 BASE_RECONNECTION_DELAY = config('BASE_RECONNECTION_DELAY', default=2, cast=int)
 MAX_RECONNECTION_DELAY = config('MAX_RECONNECTION_DELAY', default=60, cast=int)
+# Falhas consecutivas que abrem o circuit breaker do dispositivo (falha rápida + sonda em segundo plano)
+DEVICE_CIRCUIT_FAILURE_THRESHOLD = config('DEVICE_CIRCUIT_FAILURE_THRESHOLD', default=3, cast=int)
 
 # Configurações de Cache
 WHITELIST_CACHE_DURATION = config('WHITELIST_CACHE_DURATION', default=3600, cast=int)  # 1 hora
@@ -244,6 +318,17 @@ API_CACHE_DURATION = config('API_CACHE_DURATION', default=60, cast=int)  # 1 min
 LOG_RETENTION_DAYS = config('LOG_RETENTION_DAYS', default=30, cast=int)
 MAX_LOG_ENTRIES = config('MAX_LOG_ENTRIES', default=10000, cast=int)
 
+# Retenção em chunks e arquivamento (JSONL.gz particionado por data)
+LOG_ARCHIVE_ENABLED = config('LOG_ARCHIVE_ENABLED', default=True, cast=bool)
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'logs'))
+LOG_RETENTION_CHUNK_SIZE = config('LOG_RETENTION_CHUNK_SIZE', default=1000, cast=int)
+LOG_RETENTION_PAUSE_SECONDS = config('LOG_RETENTION_PAUSE_SECONDS', default=0.2, cast=float)
+LOG_COMPACT_RAW_DATA = config('LOG_COMPACT_RAW_DATA', default=False, cast=bool)
+LOG_COMPACT_AFTER_DAYS = config('LOG_COMPACT_AFTER_DAYS', default=7, cast=int)
+
+# Sincronização periódica de funcionários (fingerprint por dispositivo)
+EMPLOYEE_SYNC_ENABLED = config('EMPLOYEE_SYNC_ENABLED', default=True, cast=bool)
+
 # Configurações de Grupo de Exceção
 EXEMPTION_GROUP_NAME = config('EXEMPTION_GROUP_NAME', default='whitelist')
 
@@ -2,7 +2,9 @@
 """
 Script rápido para inicializar o sistema Django.
 """
+import atexit
 import os
+import subprocess
 import sys
 import django
 from django.core.management import execute_from_command_line
@@ -12,6 +14,24 @@ def setup_django():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'interjornada_system.settings')
     django.setup()
 
+def start_background_runtime():
+    """Inicia o runtime (ingestão da catraca + sessões) num processo separado do servidor."""
+    # O autoreload do runserver reexecuta este script: o runtime já foi iniciado pelo pai
+    if os.environ.get('RUN_MAIN') == 'true':
+        return True
+    print("🔄 Iniciando runtime em segundo plano...")
+    try:
+        process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'run_background_runtime'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        atexit.register(process.terminate)
+        print(f"✅ Runtime iniciado (PID {process.pid})")
+    except Exception as e:
+        print(f"❌ Erro ao iniciar runtime: {e}")
+        return False
+    return True
+
 def main():
     """Função principal."""
     print("=" * 60)
@@ -94,6 +114,8 @@ def main():
     print("🔌 API: http://localhost:8000/api/v1/")
     print("=" * 60)
     
+    start_background_runtime()
+    
     # Iniciar servidor
     print("\n🚀 Iniciando servidor...")
     execute_from_command_line(['manage.py', 'runserver', '0.0.0.0:8000'])
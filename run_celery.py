@@ -18,6 +18,18 @@ def run_celery_worker():
     ]
     subprocess.run(cmd)
 
+def run_partition_worker(partition):
+    """Executa um worker de partição (concorrência 1 preserva a ordem por funcionário)."""
+    print(f"🔀 Iniciando worker da partição logs.p{partition}...")
+    cmd = [
+        'celery', '-A', 'interjornada_system', 'worker',
+        '--loglevel=info',
+        '--concurrency=1',
+        f'--queues=logs.p{partition}',
+        f'--hostname=logs-p{partition}@%h'
+    ]
+    subprocess.run(cmd)
+
 def run_celery_beat():
     """Executa Celery Beat."""
     print("⏰ Iniciando Celery Beat...")
@@ -70,6 +82,14 @@ def main():
         worker_process.start()
         processes.append(worker_process)
         
+        # Workers de partição (modo distribuído)
+        from decouple import config
+        if config('LOG_PROCESSING_MODE', default='thread') == 'celery':
+            for partition in range(config('LOG_PROCESSING_PARTITIONS', default=4, cast=int)):
+                partition_process = Process(target=run_partition_worker, args=(partition,))
+                partition_process.start()
+                processes.append(partition_process)
+        
         # Beat
         beat_process = Process(target=run_celery_beat)
         beat_process.start()
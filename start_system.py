@@ -2,7 +2,9 @@
 """
 Script para inicializar o Sistema de Controle de Interjornada Django.
 """
+import atexit
 import os
+import subprocess
 import sys
 import django
 from django.core.management import execute_from_command_line
@@ -109,6 +111,24 @@ def start_services():
         return False
     return True
 
+def start_background_runtime():
+    """Inicia o runtime (ingestão da catraca + sessões) num processo separado do servidor."""
+    # O autoreload do runserver reexecuta este script: o runtime já foi iniciado pelo pai
+    if os.environ.get('RUN_MAIN') == 'true':
+        return True
+    print("🔄 Iniciando runtime em segundo plano...")
+    try:
+        process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'run_background_runtime'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        atexit.register(process.terminate)
+        print(f"✅ Runtime iniciado (PID {process.pid})")
+    except Exception as e:
+        print(f"❌ Erro ao iniciar runtime: {e}")
+        return False
+    return True
+
 def main():
     """Função principal."""
     print("=" * 60)
@@ -125,6 +145,7 @@ def main():
         ("Criar superusuário", create_superuser),
         ("Criar dados padrão", create_default_data),
         ("Iniciar serviços", start_services),
+        ("Iniciar runtime em segundo plano", start_background_runtime),
     ]
     
     for step_name, step_func in steps: